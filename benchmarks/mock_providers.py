@@ -0,0 +1,338 @@
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlparse
+
+import numpy as np
+from PIL import Image
+
+# Routes whose behavior can be configured independently
+ROUTES = ("gemini", "google_search", "unsplash", "shutterstock", "images", "elevenlabs")
+
+
+@dataclass
+class MockBehavior:
+    """
+    Simulated network conditions of a mocked route.
+
+    :ivar latency: Mean delay before the response starts, in seconds.
+    :type latency: float
+    :ivar jitter: Maximum random deviation added to or removed from ``latency``, in seconds.
+    :type jitter: float
+    :ivar error_rate: Fraction of requests answered with ``503 Service Unavailable``.
+    :type error_rate: float
+    """
+    latency: float = 0.02
+    jitter: float = 0.01
+    error_rate: float = 0.0
+
+
+@dataclass
+class MockStats:
+    """
+    Requests served by the mock providers.
+
+    :ivar requests: Number of requests per route.
+    :type requests: dict
+    :ivar errors: Number of injected errors per route.
+    :type errors: dict
+    :ivar bytes_sent: Number of response body bytes per route.
+    :type bytes_sent: dict
+    """
+    requests: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    bytes_sent: Dict[str, int] = field(default_factory=dict)
+
+
+class MockProviders:
+    """
+    Local stand-in for every external service the pipeline calls.
+
+    A threaded HTTP server answers Gemini ``generateContent`` and ``streamGenerateContent``
+    (server-sent events, one record per event), Google Custom Search, Unsplash
+    and Shutterstock searches, serves generated JPEGs from an image host and streams fake MP3
+    data like the ElevenLabs streaming endpoint. Each route waits a configurable latency with
+    jitter and fails a configurable fraction of requests, so throughput can be measured without
+    network access or API spend. ``environ()`` returns the environment pointing ``main()`` at it.
+
+    :ivar behaviors: Simulated network conditions, keyed by route.
+    :type behaviors: dict
+    :ivar image_size: Size of the served images, in pixels.
+    :type image_size: tuple[int, int]
+    :ivar audio_bytes: Size of every synthesized clip, in bytes.
+    :type audio_bytes: int
+    :ivar audio_chunk_size: Size of the streamed audio chunks, in bytes.
+    :type audio_chunk_size: int
+    :ivar results: Number of image results returned per search page; every page lists new images.
+    :type results: int
+    :ivar record_interval: Seconds the mocked model takes to write each script record, streamed or not.
+    :type record_interval: float
+    :ivar stats: Requests served so far.
+    :type stats: MockStats
+    """
+
+    def __init__(self, behaviors: Optional[Dict[str, MockBehavior]] = None, image_size: Tuple[int, int] = (1280, 960),
+                 audio_bytes: int = 256 * 1024, audio_chunk_size: int = 16 * 1024, results: int = 3,
+                 record_interval: float = 0.0, host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        unknown = set(behaviors or {}) - set(ROUTES)
+        if unknown:
+            raise ValueError(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+        self.behaviors = {route: MockBehavior() for route in ROUTES}
+        self.behaviors.update(behaviors or {})
+        self.image_size = image_size
+        self.audio_bytes = audio_bytes
+        self.audio_chunk_size = audio_chunk_size
+        self.results = results
+        self.record_interval = record_interval
+        self.stats = MockStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._images = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environ(self) -> Dict[str, str]:
+        """
+        Returns the environment variables routing every provider to this server, with dummy credentials.
+        """
+        return {
+            "GEMINI_BASE_URL": self.base_url,
+            "ELEVEN_LABS_BASE_URL": self.base_url,
+            "GOOGLE_SEARCH_URL": f"{self.base_url}/customsearch/v1",
+            "UNSPLASH_URL": f"{self.base_url}/search/photos",
+            "SHUTTERSTOCK_URL": f"{self.base_url}/v2/images/search",
+            "GOOGLE_KEY": "mock",
+            "ELEVEN_LABS_KEY": "mock",
+            "GOOGLE_SEARCH_KEY": "mock",
+            "SEARCH_ENGINE_ID": "mock",
+            "UNSPLASH_KEY": "mock",
+            "SHUTTERSTOCK_KEY": "mock",
+            "SHUTTERSTOCK_TOKEN": "mock",
+        }
+
+    def start(self) -> "MockProviders":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _delay(self, route: str) -> bool:
+        """
+        Sleeps for the route's latency and returns whether the request should fail.
+        """
+        behavior = self.behaviors[route]
+        with self._lock:
+            delay = behavior.latency + self._random.uniform(-behavior.jitter, behavior.jitter)
+            failed = self._random.random() < behavior.error_rate
+            self.stats.requests[route] = self.stats.requests.get(route, 0) + 1
+            if failed:
+                self.stats.errors[route] = self.stats.errors.get(route, 0) + 1
+        time.sleep(max(0.0, delay))
+        return failed
+
+    def _count_bytes(self, route: str, size: int) -> None:
+        with self._lock:
+            self.stats.bytes_sent[route] = self.stats.bytes_sent.get(route, 0) + size
+
+    def _image(self, name: str) -> bytes:
+        with self._lock:
+            image = self._images.get(name)
+        if image is None:
+            # Seeded noise gives every URL its own stable picture, so none look like duplicates
+            generator = np.random.default_rng(zlib.crc32(name.encode("utf-8")))
+            width, height = self.image_size
+            thumbnail = generator.integers(0, 256, (height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8)
+            picture = Image.fromarray(thumbnail).resize((width, height), Image.BILINEAR)
+            buffer = io.BytesIO()
+            picture.save(buffer, "JPEG", quality=85)
+            image = buffer.getvalue()
+            with self._lock:
+                self._images[name] = image
+        return image
+
+    def _image_urls(self, query: str, page: int = 1):
+        slug = quote(re.sub(r"\W+", "-", query.casefold()).strip("-") or "image")
+        first = (page - 1) * self.results
+        return [f"{self.base_url}/images/{slug}-{index}.jpg" for index in range(first, first + self.results)]
+
+    def _records(self, body: dict) -> list:
+        prompt = "".join(
+            part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        categories = prompt.rsplit("Categories:", 1)[-1]
+        return [
+            {
+                "category": category,
+                "image_query": f"{category} landmark photo",
+                "narration_script": f"Our next category is {category}. Get ready!",
+            }
+            for category in (line.strip() for line in categories.splitlines())
+            if category
+        ]
+
+    def _handler(self):
+        providers = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, delayed ACKs add ~40 ms per response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {name: values[0] for name, values in parse_qs(url.query).items()}
+                width, height = providers.image_size
+                if url.path == "/customsearch/v1":
+                    page = (int(query.get("start", 1)) - 1) // 10 + 1
+                    self._search("google_search", lambda urls: {"items": [
+                        {"link": link, "mime": "image/jpeg", "image": {"width": width, "height": height}}
+                        for link in urls]}, query.get("q", ""), page)
+                elif url.path == "/search/photos":
+                    self._search("unsplash", lambda urls: {"results": [
+                        {"urls": {"regular": link}, "width": width, "height": height} for link in urls]},
+                        query.get("query", ""), int(query.get("page", 1)))
+                elif url.path == "/v2/images/search":
+                    self._search("shutterstock", lambda urls: {"data": [
+                        {"assets": {"preview_1500": {"url": link, "width": width, "height": height}}}
+                        for link in urls]}, query.get("query", ""), int(query.get("page", 1)))
+                elif url.path.startswith("/images/"):
+                    if providers._delay("images"):
+                        return self._unavailable("images")
+                    self._send("images", 200, providers._image(url.path), "image/jpeg")
+                else:
+                    self._send(None, 404, b"{}", "application/json")
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length) if length else b""
+                if url.path.endswith(":generateContent"):
+                    if providers._delay("gemini"):
+                        return self._unavailable("gemini")
+                    records = providers._records(json.loads(raw_body or b"{}"))
+                    time.sleep(providers.record_interval * len(records))
+                    response = {
+                        "candidates": [{
+                            "content": {"role": "model", "parts": [{"text": json.dumps(records)}]},
+                            "finishReason": "STOP",
+                        }],
+                    }
+                    self._send("gemini", 200, json.dumps(response).encode("utf-8"), "application/json")
+                elif url.path.endswith(":streamGenerateContent"):
+                    if providers._delay("gemini"):
+                        return self._unavailable("gemini")
+                    self._stream_records(providers._records(json.loads(raw_body or b"{}")))
+                elif url.path.startswith("/v1/text-to-speech/") and url.path.endswith("/stream"):
+                    if providers._delay("elevenlabs"):
+                        return self._unavailable("elevenlabs")
+                    self._stream_audio()
+                else:
+                    self._send(None, 404, b"{}", "application/json")
+
+            def _search(self, route, build, query, page=1):
+                if providers._delay(route):
+                    return self._unavailable(route)
+                body = json.dumps(build(providers._image_urls(query, page))).encode("utf-8")
+                self._send(route, 200, body, "application/json")
+
+            def _stream_records(self, records):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [("[" if index == 0 else ",") + json.dumps(record) for index, record in enumerate(records)]
+                size = 0
+                for index, piece in enumerate(pieces + ["]"]):
+                    if index < len(pieces):
+                        time.sleep(providers.record_interval)
+                    candidate = {"content": {"role": "model", "parts": [{"text": piece}]}}
+                    if index == len(pieces):
+                        candidate["finishReason"] = "STOP"
+                    event = f"data: {json.dumps({'candidates': [candidate]})}\r\n\r\n".encode("utf-8")
+                    self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                    self.wfile.flush()
+                    size += len(event)
+                self.wfile.write(b"0\r\n\r\n")
+                providers._count_bytes("gemini", size)
+
+            def _stream_audio(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Content-Length", str(providers.audio_bytes))
+                self.end_headers()
+                remaining = providers.audio_bytes
+                chunk = b"\xff\xfb" + b"\x00" * (providers.audio_chunk_size - 2)
+                while remaining > 0:
+                    size = min(remaining, len(chunk))
+                    self.wfile.write(chunk[:size])
+                    self.wfile.flush()
+                    remaining -= size
+                providers._count_bytes("elevenlabs", providers.audio_bytes)
+
+            def _unavailable(self, route):
+                body = json.dumps({"error": {"code": 503, "message": "Injected failure"}}).encode("utf-8")
+                self._send(route, 503, body, "application/json", {"Retry-After": "0"})
+
+            def _send(self, route, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                if route is not None:
+                    providers._count_bytes(route, len(body))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mocked Gemini, image search, image host and ElevenLabs APIs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean response delay, in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Maximum deviation from the delay, in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 503.")
+    args = parser.parse_args()
+
+    behavior = MockBehavior(args.latency, args.jitter, args.error_rate)
+    providers = MockProviders({route: behavior for route in ROUTES}, port=args.port)
+    for name, value in providers.environ().items():
+        print(f"export {name}={value}")
+    providers.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import json
+import math
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+from benchmarks.mock_providers import ROUTES, MockBehavior, MockProviders
+from scr import main as pipeline_main
+from scr.script.controller import ScriptController
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of ``values``, or None when there are none.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def _serve(options: dict, addresses) -> None:
+    providers = MockProviders(**options)
+    addresses.put(providers.environ())
+    providers.serve_forever()
+
+
+def run_benchmark(episodes: int = 5, categories: int = 5, max_workers: int = 8, audio: bool = True,
+                  scheduler: bool = False, behavior: Optional[MockBehavior] = None,
+                  image_size=(1280, 960), audio_bytes: int = 256 * 1024, record_interval: float = 0.0,
+                  isolate: bool = True) -> Dict:
+    """
+    Runs ``main()`` end to end against the mock providers and reports throughput and latency.
+
+    Every episode gets its own categories and writes into a temporary ``DATA_DIR`` with the
+    cache bypassed, so each one does the full amount of work. With ``isolate`` the mock server
+    runs in a child process, keeping its memory out of the reported peak RSS.
+
+    :param episodes: Number of episodes generated back to back.
+    :param categories: Number of categories per episode.
+    :param max_workers: Pipeline concurrency, as ``PIPELINE_MAX_WORKERS``.
+    :param audio: Whether the audio stage runs.
+    :param scheduler: Whether the provider rate limits apply; off measures the pipeline alone.
+    :param behavior: Simulated network conditions applied to every mocked route.
+    :param record_interval: Seconds the mocked model takes to write each script record.
+    :return: Report with episodes/hour, per-stage p50/p95/p99 in seconds, peak RSS and bytes written.
+    :rtype: dict
+    """
+    options = {
+        "behaviors": {route: behavior or MockBehavior() for route in ROUTES},
+        "image_size": tuple(image_size),
+        "audio_bytes": audio_bytes,
+        "record_interval": record_interval,
+    }
+    server = None
+    providers = None
+    if isolate:
+        addresses = multiprocessing.Queue()
+        server = multiprocessing.Process(target=_serve, args=(options, addresses), daemon=True)
+        server.start()
+        environ = addresses.get(timeout=30)
+    else:
+        providers = MockProviders(**options).start()
+        environ = providers.environ()
+
+    durations = {"script": []}
+    failures = 0
+    original_stream_records = ScriptController.stream_records
+
+    def timed_stream_records(controller, *args, **kwargs):
+        # Times the whole stream: from the request until its last record was handed to the pipeline
+        started = time.perf_counter()
+        try:
+            yield from original_stream_records(controller, *args, **kwargs)
+        finally:
+            durations["script"].append(time.perf_counter() - started)
+
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            environ = {
+                **environ,
+                "DATA_DIR": data_dir,
+                "CACHE_BYPASS": "1",
+                "PIPELINE_MAX_WORKERS": str(max_workers),
+                "PIPELINE_AUDIO": "1" if audio else "",
+                "SCHEDULER_BYPASS": "" if scheduler else "1",
+            }
+            started = time.perf_counter()
+            with patch.dict("os.environ", environ), \
+                    patch.object(ScriptController, "stream_records", timed_stream_records):
+                for episode in range(episodes):
+                    topic = ",".join(f"Episode {episode} Category {index}" for index in range(categories))
+                    with patch("builtins.input", return_value=topic):
+                        results = pipeline_main.main()
+                    for result in results:
+                        failures += len(result.errors)
+                        for stage, duration in result.durations.items():
+                            durations.setdefault(stage, []).append(duration)
+            elapsed = time.perf_counter() - started
+            bytes_written = directory_size(Path(data_dir))
+    finally:
+        if providers is not None:
+            providers.stop()
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    return {
+        "episodes": episodes,
+        "categories": categories,
+        "elapsed": elapsed,
+        "episodes_per_hour": episodes / elapsed * 3600,
+        "failed_stages": failures,
+        "stages": {
+            stage: {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+            for stage, values in durations.items()
+        },
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "bytes_written": bytes_written,
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"episodes:          {report['episodes']} x {report['categories']} categories",
+        f"elapsed:           {report['elapsed']:.2f} s",
+        f"episodes/hour:     {report['episodes_per_hour']:.1f}",
+        f"failed stages:     {report['failed_stages']}",
+        f"peak RSS:          {report['peak_rss_bytes'] / 2 ** 20:.1f} MiB",
+        f"bytes written:     {report['bytes_written'] / 2 ** 20:.1f} MiB",
+        "stage             p50       p95       p99",
+    ]
+    for stage, quantiles in report["stages"].items():
+        values = " ".join(
+            f"{value * 1000:7.1f}ms" if value is not None else "      n/a" for value in quantiles.values())
+        lines.append(f"{stage:<17} {values}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the episode pipeline against local mock providers.")
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean provider latency, in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Maximum latency deviation, in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of provider requests failing.")
+    parser.add_argument("--image-size", type=int, nargs=2, default=(1280, 960), metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--audio-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--record-interval", type=float, default=0.05,
+                        help="Seconds the mocked model takes to write each script record.")
+    parser.add_argument("--no-audio", action="store_true", help="Skip the audio stage.")
+    parser.add_argument("--scheduler", action="store_true", help="Apply the provider rate limits.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        episodes=args.episodes,
+        categories=args.categories,
+        max_workers=args.workers,
+        audio=not args.no_audio,
+        scheduler=args.scheduler,
+        behavior=MockBehavior(args.latency, args.jitter, args.error_rate),
+        image_size=args.image_size,
+        audio_bytes=args.audio_bytes,
+        record_interval=args.record_interval,
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+# Entry points started by the CLI, the batch runner and every spawned job worker
+ENTRY_POINTS = ("scr.main", "scr.batch.controller", "scr.jobs.controller")
+# Provider SDKs that must only be imported once a provider is used
+PROVIDER_SDKS = ("google.genai", "elevenlabs", "playsound", "requests_oauthlib")
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """
+    Parses the ``-X importtime`` lines of ``output``, in the order the imports finished.
+    """
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        module = name.lstrip()
+        timings.append(ImportTiming(module, int(self_us), int(cumulative_us), (len(name) - len(module) - 1) // 2))
+    return timings
+
+
+def measure_startup(module: str, runs: int = 5, top: int = 10) -> Dict:
+    """
+    Imports ``module`` in ``runs`` fresh interpreters with ``-X importtime``.
+
+    :return: Median wall time of the interpreter and of the import, in seconds, the modules with the
+        largest self time in the fastest run, and the provider SDKs the import pulled in.
+    :rtype: dict
+    """
+    walls = []
+    imports = []
+    fastest = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        walls.append(time.perf_counter() - started)
+        timings = parse_importtime(process.stderr)
+        total = next(timing.cumulative_us for timing in reversed(timings) if timing.module == module) / 1e6
+        imports.append(total)
+        if fastest is None or total <= min(imports):
+            fastest = timings
+
+    return {
+        "module": module,
+        "runs": runs,
+        "wall": statistics.median(walls),
+        "import": statistics.median(imports),
+        "slowest_modules": [
+            {"module": timing.module, "self": timing.self_us / 1e6}
+            for timing in sorted(fastest, key=lambda timing: timing.self_us, reverse=True)[:top]
+        ],
+        "provider_sdks": sorted({
+            sdk for timing in fastest for sdk in PROVIDER_SDKS
+            if timing.module == sdk or timing.module.startswith(f"{sdk}.")
+        }),
+    }
+
+
+def format_report(reports: List[Dict]) -> str:
+    lines = ["module                      wall      import    provider SDKs"]
+    for report in reports:
+        lines.append(f"{report['module']:<26} {report['wall'] * 1000:7.1f}ms {report['import'] * 1000:7.1f}ms   "
+                     f"{', '.join(report['provider_sdks']) or 'none'}")
+    for report in reports:
+        lines.append(f"slowest imports of {report['module']}:")
+        lines.extend(f"  {entry['self'] * 1000:7.1f}ms  {entry['module']}" for entry in report["slowest_modules"])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of the pipeline entry points.")
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS), help="Modules to import.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters started per module.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imported modules listed per module.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+
+    reports = [measure_startup(module, args.runs, args.top) for module in args.modules]
+    print(json.dumps(reports, indent=2) if args.json else format_report(reports))
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from PIL import Image
+
+from scr.imaging.controller import dhash, hamming_distance
+from scr.manifest.controller import file_sha256
+from scr.tracing.controller import DISABLED, TracingController
+
+# Largest Hamming distance between difference hashes still treated as the same picture;
+# recompression and small resizes typically flip fewer than 6 of the 64 bits
+DEFAULT_MAX_DISTANCE = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    dhash INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    suffix TEXT NOT NULL,
+    url TEXT,
+    uses INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_used REAL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    asset_id INTEGER NOT NULL REFERENCES assets (id),
+    PRIMARY KEY (query, asset_id)
+);
+CREATE INDEX IF NOT EXISTS queries_category ON queries (category);
+"""
+COLUMNS = "a.id, a.sha256, a.dhash, a.width, a.height, a.bytes, a.suffix, a.url, a.uses"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query or category so case and spacing variants share their assets.
+    """
+    return " ".join(query.casefold().split())
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit; 64-bit hashes are stored in two's complement
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+@dataclass
+class Asset:
+    """
+    Photo kept in the asset library.
+
+    :ivar id: Row id of the asset.
+    :type id: int
+    :ivar path: Location of the original download in the library.
+    :type path: pathlib.Path
+    :ivar url: URL the photo was downloaded from.
+    :type url: str
+    :ivar sha256: Hash of the file contents.
+    :type sha256: str
+    :ivar dhash: Difference hash of the picture.
+    :type dhash: int
+    :ivar width: Width of the original, in pixels.
+    :type width: int
+    :ivar height: Height of the original, in pixels.
+    :type height: int
+    :ivar bytes: Size of the original, in bytes.
+    :type bytes: int
+    :ivar uses: Number of times the asset was placed into an episode.
+    :type uses: int
+    """
+    id: int
+    path: Path
+    url: Optional[str]
+    sha256: str
+    dhash: int
+    width: int
+    height: int
+    bytes: int
+    uses: int
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes under the Hamming distance.
+
+    Every child of a node sits at a known distance from it, so the triangle inequality lets a
+    search skip each subtree whose edge lies outside ``[d - max_distance, d + max_distance]``.
+    Looking up near-duplicates then visits a small fraction of the hashes instead of all of them.
+    """
+
+    def __init__(self, distance: Callable[[int, int], int] = hamming_distance):
+        self._distance = distance
+        self._root = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = (value, [item], {})
+            return
+
+        node = self._root
+        while True:
+            node_value, items, children = node
+            distance = self._distance(value, node_value)
+            if distance == 0:
+                items.append(item)
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, object]]:
+        """
+        Returns the items within ``max_distance`` of ``value``, closest first, as ``(distance, item)``.
+        """
+        matches = []
+        pending = [self._root] if self._root is not None else []
+        while pending:
+            node_value, items, children = pending.pop()
+            distance = self._distance(value, node_value)
+            if distance <= max_distance:
+                matches.extend((distance, item) for item in items)
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    pending.append(child)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class AssetsController:
+    """
+    Library of downloaded photos, indexed in SQLite for reuse across episodes.
+
+    Every photo downloaded for a category is copied, under its content hash, into ``library_dir``
+    and recorded with its source URL, the queries it was found for, its difference hash,
+    dimensions and usage count. Before searching, ``find`` looks for an asset already found for
+    the same query or category, so a category that comes back in a later episode costs neither
+    search quota nor a download, and ``data/photos/{category}.jpg`` being overwritten by the next
+    run no longer loses the original. A download that is a near-duplicate of a known asset, the
+    same picture recompressed or resized by another host, is recorded as an alias of it instead
+    of a second copy; near-duplicates are looked up in an in-memory BK-tree of the hashes.
+
+    :ivar path: Location of the SQLite index.
+    :type path: pathlib.Path
+    :ivar library_dir: Directory holding the original of every asset.
+    :type library_dir: pathlib.Path
+    :ivar max_distance: Largest Hamming distance between two hashes of the same picture.
+    :type max_distance: int
+    :ivar tracer: Tracer counting reused, added and duplicate assets.
+    :type tracer: TracingController
+    """
+
+    def __init__(self, path: Optional[Path] = None, library_dir: Optional[Path] = None,
+                 max_distance: int = DEFAULT_MAX_DISTANCE, tracer: Optional[TracingController] = None,
+                 clock: Callable[[], float] = time.time):
+        current_dir = Path(__file__).parent
+        project_root = current_dir.parent.parent
+        if path is None:
+            path = project_root / "data" / "assets.sqlite"
+        if library_dir is None:
+            library_dir = project_root / "data" / "library"
+
+        self.path = Path(path)
+        self.library_dir = Path(library_dir)
+        self.max_distance = max_distance
+        self.tracer = tracer or DISABLED
+        self._clock = clock
+        self._local = threading.local()
+        self._tree = BKTree()
+        self._tree_lock = threading.Lock()
+        self._tree_last_id = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def find(self, query: str, category: Optional[str] = None) -> Optional[Asset]:
+        """
+        Returns the asset found earlier for ``query``, or failing that for ``category``, preferring
+        the most used one; None if the library has none whose original is still on disk.
+        """
+        query = normalize_query(query)
+        category = normalize_query(category) if category else None
+        rows = self._connection().execute(
+            f"SELECT {COLUMNS} FROM assets a JOIN queries q ON q.asset_id = a.id "
+            "WHERE q.query = ? OR q.category = ? "
+            "GROUP BY a.id ORDER BY MAX(q.query = ?) DESC, a.uses DESC, a.id DESC",
+            (query, category, query),
+        ).fetchall()
+        for row in rows:
+            asset = self._asset(row)
+            if asset.path.is_file():
+                return asset
+        return None
+
+    def use(self, asset: Asset, destination: Path) -> Path:
+        """
+        Places the original of ``asset`` at ``destination`` and counts the use.
+        """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        self._place(asset.path, destination)
+        with self._transaction() as connection:
+            connection.execute("UPDATE assets SET uses = uses + 1, last_used = ? WHERE id = ?",
+                               (self._clock(), asset.id))
+        asset.uses += 1
+        self.tracer.count("assets", result="reused")
+        return destination
+
+    def add(self, source: Path, url: Optional[str], query: str, category: str = "") -> Tuple[Asset, bool]:
+        """
+        Records the photo at ``source``, downloaded from ``url`` for ``query``, as one use of an asset.
+        A photo already in the library, byte for byte or as a near-duplicate, is recorded as an
+        alias of the existing asset.
+
+        :return: The asset and whether it is new to the library.
+        :rtype: tuple[Asset, bool]
+        """
+        source = Path(source)
+        sha256 = file_sha256(source)
+        with Image.open(source) as image:
+            width, height = image.size
+            image_hash = dhash(image)
+        size = source.stat().st_size
+        query = normalize_query(query)
+        category = normalize_query(category)
+
+        # Match against the hashes other processes added too; the near-duplicate is chosen before
+        # the transaction, as scanning the tree does not need the write lock
+        near = self.similar(image_hash, self.max_distance)
+        now = self._clock()
+        with self._transaction() as connection:
+            row = connection.execute(f"SELECT {COLUMNS} FROM assets a WHERE a.sha256 = ?", (sha256,)).fetchone()
+            if row is None and near:
+                row = connection.execute(f"SELECT {COLUMNS} FROM assets a WHERE a.id = ?",
+                                         (near[0][1].id,)).fetchone()
+            if row is not None:
+                asset = self._asset(row)
+                if asset.sha256 == sha256 and not asset.path.is_file():
+                    # Restore an original removed from the library by hand
+                    asset.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._place(source, asset.path)
+                connection.execute("UPDATE assets SET uses = uses + 1, last_used = ? WHERE id = ?", (now, asset.id))
+                connection.execute("INSERT OR IGNORE INTO queries (query, category, asset_id) VALUES (?, ?, ?)",
+                                   (query, category, asset.id))
+                asset.uses += 1
+                self.tracer.count("assets", result="duplicate")
+                return asset, False
+
+            suffix = source.suffix.lower() or ".jpg"
+            library_path = self._library_path(sha256, suffix)
+            library_path.parent.mkdir(parents=True, exist_ok=True)
+            self._place(source, library_path)
+            cursor = connection.execute(
+                "INSERT INTO assets (sha256, dhash, width, height, bytes, suffix, url, uses, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                (sha256, _to_signed(image_hash), width, height, size, suffix, url, now, now),
+            )
+            connection.execute("INSERT INTO queries (query, category, asset_id) VALUES (?, ?, ?)",
+                               (query, category, cursor.lastrowid))
+
+        self.tracer.count("assets", result="added")
+        return Asset(id=cursor.lastrowid, path=library_path, url=url, sha256=sha256, dhash=image_hash,
+                     width=width, height=height, bytes=size, uses=1), True
+
+    def similar(self, image_hash: int, max_distance: Optional[int] = None) -> List[Tuple[int, Asset]]:
+        """
+        Returns the assets whose difference hash lies within ``max_distance`` of ``image_hash``,
+        closest first, as ``(distance, asset)``.
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        with self._tree_lock:
+            rows = self._connection().execute(
+                "SELECT id, dhash FROM assets WHERE id > ? ORDER BY id", (self._tree_last_id,)).fetchall()
+            for asset_id, value in rows:
+                self._tree.add(_to_unsigned(value), asset_id)
+                self._tree_last_id = asset_id
+            matches = self._tree.search(image_hash, max_distance)
+
+        similar = []
+        for distance, asset_id in matches:
+            row = self._connection().execute(
+                f"SELECT {COLUMNS} FROM assets a WHERE a.id = ?", (asset_id,)).fetchone()
+            similar.append((distance, self._asset(row)))
+        return similar
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _library_path(self, sha256: str, suffix: str) -> Path:
+        return self.library_dir / sha256[:2] / f"{sha256}{suffix}"
+
+    def _asset(self, row) -> Asset:
+        asset_id, sha256, value, width, height, size, suffix, url, uses = row
+        return Asset(id=asset_id, path=self._library_path(sha256, suffix), url=url, sha256=sha256,
+                     dhash=_to_unsigned(value), width=width, height=height, bytes=size, uses=uses)
+
+    @staticmethod
+    def _place(source: Path, destination: Path) -> None:
+        # Hard link when possible: photos are only ever replaced by rename, never written in place,
+        # so a link shares the bytes without later framing reaching the library copy
+        temp_path = destination.parent / f".{destination.name}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            try:
+                os.link(source, temp_path)
+            except OSError:
+                shutil.copyfile(source, temp_path)
+            os.replace(temp_path, destination)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; every change goes through an explicit BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA busy_timeout = 30000")
+            connection.execute("PRAGMA journal_mode = WAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
@@ -1,10 +1,116 @@
+import asyncio
+import contextvars
+import itertools
 import os
-from typing import Iterator
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 from pathlib import Path
 
-from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
-from playsound import playsound
+from scr.cache.controller import CacheController
+from scr.clients.controller import ClientsController
+from scr.manifest.controller import shared_mkstemp
+from scr.phrases.controller import PhrasesController, split_phrases
+from scr.scheduler.controller import SchedulerController
+
+VOICE_ID = "22VndfJPBU7AZORAZZTT"
+MODEL_ID = "eleven_multilingual_v2"
+VOICE_SETTINGS = {
+    "speed": 1.08,
+    "stability": 0.15,
+    "similarity_boost": 0.53,
+    "style": 0.80,
+    "use_speaker_boost": True,
+}
+# Size of the write buffer used while streaming audio to disk, in bytes
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class NarrationProfile:
+    """
+    Voice, model and language a narration is rendered with.
+
+    :ivar name: Profile name; the audio of every profile but the controller's own is written to a
+        subdirectory of that name, and the pipeline runs it as the ``audio.{name}`` stage.
+    :type name: str
+    :ivar voice_id: ElevenLabs voice the scripts are read with.
+    :type voice_id: str
+    :ivar model_id: ElevenLabs model; ``eleven_multilingual_v2`` reads any supported language.
+    :type model_id: str
+    :ivar voice_settings: Stability, similarity, style and speed of the voice.
+    :type voice_settings: dict
+    :ivar language: ISO 639-1 code the narration is read in and translated to, or None for the
+        script's own language.
+    :type language: str
+    """
+    name: str = "default"
+    voice_id: str = VOICE_ID
+    model_id: str = MODEL_ID
+    voice_settings: dict = field(default_factory=lambda: dict(VOICE_SETTINGS))
+    language: Optional[str] = None
+
+    def __post_init__(self):
+        if not self.name or not self.name.strip() or "/" in self.name or "\\" in self.name:
+            raise ValueError("profile name must be a non-empty directory name")
+
+    @property
+    def settings(self) -> dict:
+        """
+        Every setting that changes the rendered audio, keying cached clips and phrases.
+        """
+        if self.language is None:
+            return self.voice_settings
+        return {**self.voice_settings, "language_code": self.language}
+
+
+def parse_profiles(value: str, voice_id: str = VOICE_ID) -> List[NarrationProfile]:
+    """
+    Parses comma-separated profiles written as ``name[:language][=voice_id]``, e.g. ``es,en:en=VOICE``;
+    profiles naming no voice are read with ``voice_id``.
+
+    :raises ValueError: If a profile has no name or two profiles share one.
+    """
+    profiles = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, voice = item.partition("=")
+        name, _, language = name.partition(":")
+        profiles.append(NarrationProfile(
+            name=name.strip(),
+            voice_id=voice.strip() or voice_id,
+            language=language.strip() or None,
+        ))
+    names = [profile.name for profile in profiles]
+    if len(set(names)) != len(names):
+        raise ValueError("narration profile names must be unique")
+    return profiles
+
+
+@dataclass
+class SynthesisResult:
+    """
+    Transfer statistics of an audio stream written to disk.
+
+    :ivar path: Final location of the audio file.
+    :type path: pathlib.Path
+    :ivar bytes_written: Size of the audio file, in bytes.
+    :type bytes_written: int
+    :ivar time_to_first_byte: Seconds between the start of the request and the first chunk.
+    :type time_to_first_byte: float
+    :ivar duration: Seconds between the start of the request and the file being renamed into place.
+    :type duration: float
+    """
+    path: Path
+    bytes_written: int
+    time_to_first_byte: Optional[float]
+    duration: float
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_written / self.duration if self.duration > 0 else 0.0
 
 
 class AudioController:
@@ -16,49 +122,413 @@ class AudioController:
     file system. Designed for efficient handling of streamed audio and file
     management.
 
-    :ivar client: Instance of ElevenLabs client used for text-to-speech processing.
-    :type client: ElevenLabs
+    ``agenerate_audio`` and ``asynthesize_to_file`` are the asyncio counterparts, streaming from
+    the async ElevenLabs client so many clips can be synthesized on one event loop. They use the
+    same cache keys and write files the same way as the blocking methods.
+
+    Every method takes an optional narration ``profile`` overriding the controller's own, so one
+    controller renders several voices or languages at the same time; the clips of another profile
+    are cached under their own keys and written to ``audio_dir/{profile.name}``.
+
+    :ivar clients: Shared clients layer providing the reused ElevenLabs client.
+    :type clients: ClientsController
+    :ivar cache: Optional response cache; identical scripts are replayed from disk.
+    :type cache: CacheController
+    :ivar audio_dir: Directory the audio files are written to.
+    :type audio_dir: pathlib.Path
+    :ivar scheduler: Optional rate limiter and retry scheduler wrapping every synthesis request.
+    :type scheduler: SchedulerController
+    :ivar profile: Narration profile used when a call names none.
+    :type profile: NarrationProfile
+    :ivar phrases: Optional phrase store; scripts are then synthesized sentence by sentence and
+        sentences already stored are reused instead of the whole-script cache.
+    :type phrases: PhrasesController
     """
 
-    def generate_audio(self, script) -> Iterator[bytes]:
+    def __init__(self, clients: Optional[ClientsController] = None, cache: Optional[CacheController] = None,
+                 audio_dir: Optional[Path] = None, scheduler: Optional[SchedulerController] = None,
+                 voice_id: str = VOICE_ID, phrases: Optional[PhrasesController] = None,
+                 profile: Optional[NarrationProfile] = None):
+        if audio_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            audio_dir = project_root / "data" / "audios"
+
+        self.clients = clients or ClientsController()
+        self.cache = cache
+        self.audio_dir = Path(audio_dir)
+        self.scheduler = scheduler
+        self.profile = profile or NarrationProfile(voice_id=voice_id)
+        self.phrases = phrases
+
+    @property
+    def voice_id(self) -> str:
+        return self.profile.voice_id
+
+    def output_dir(self, profile: Optional[NarrationProfile] = None) -> Path:
+        """
+        Returns the directory the clips of ``profile`` are written to.
+        """
+        if profile is None or profile == self.profile:
+            return self.audio_dir
+        return self.audio_dir / profile.name
+
+    def generate_audio(self, script, profile: Optional[NarrationProfile] = None) -> Iterator[bytes]:
         if not script:
             raise ValueError("script cannot be empty")
+        profile = profile or self.profile
 
-        eleven_labs_key = os.environ.get("ELEVEN_LABS_KEY")
-        if not eleven_labs_key:
-            raise EnvironmentError("ELEVEN_LABS_KEY environment variable is not set")
-        client = ElevenLabs(
-            api_key=eleven_labs_key
-        )
+        if self.phrases is not None:
+            return self._phrase_stream(script, profile=profile)
 
-        response = client.text_to_speech.convert_as_stream(
-            text=script,
-            voice_id="22VndfJPBU7AZORAZZTT",
-            model_id="eleven_multilingual_v2",
-            voice_settings=VoiceSettings(
-                speed=1.08,
-                stability=0.15,
-                similarity_boost=0.53,
-                style=0.80,
-                use_speaker_boost=True
-            )
-        )
+        if self.cache is not None:
+            key = self._cache_key(script, profile)
+            data = self.cache.get(key)
+            if data is not None:
+                return iter([data])
+            return self._trace_stream(self._cache_stream(key, self._synthesize(script, profile)))
+
+        return self._trace_stream(self._synthesize(script, profile))
+
+    async def agenerate_audio(self, script, profile: Optional[NarrationProfile] = None) -> AsyncIterator[bytes]:
+        """
+        Async counterpart of ``generate_audio``, yielding the audio chunks as they arrive.
+        """
+        if not script:
+            raise ValueError("script cannot be empty")
+        profile = profile or self.profile
+
+        if self.phrases is not None:
+            for chunk in await asyncio.to_thread(lambda: list(self._phrase_stream(script, profile=profile))):
+                yield chunk
+            return
+
+        key = self._cache_key(script, profile) if self.cache is not None else None
+        if key is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                yield data
+                return
+
+        chunks = []
+        async for chunk in self._asynthesize(script, profile):
+            if key is not None:
+                chunks.append(chunk)
+            yield chunk
+        # Only a fully consumed stream is stored, a dropped one never reaches the cache
+        if key is not None:
+            self.cache.put(key, b"".join(chunks))
+
+    def save_audio_to_file(self, audio, file_name: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> SynthesisResult:
+        """
+        Streams ``audio`` chunks into a temporary file and renames it to ``{file_name}.mp3``
+        once the stream is complete, so an interrupted stream never leaves a truncated file.
+
+        :param audio: Iterable of audio chunks.
+        :type audio: Iterable[bytes]
+        :param file_name: Name of the audio file, without extension.
+        :type file_name: str
+        :param buffer_size: Size of the write buffer, in bytes.
+        :type buffer_size: int
+        :return: Statistics of the written file.
+        :rtype: SynthesisResult
+        """
+        return self._write_stream(audio, file_name, buffer_size, time.perf_counter())
+
+    def synthesize_to_file(self, script, file_name: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                           profile: Optional[NarrationProfile] = None) -> SynthesisResult:
+        """
+        Synthesizes ``script`` and streams it straight to ``{file_name}.mp3``.
+
+        Unlike ``generate_audio``, a cache miss is never buffered in memory: the stream is
+        written to disk and the finished file is copied into the cache.
+
+        :param script: Text to synthesize.
+        :type script: str
+        :param file_name: Name of the audio file, without extension.
+        :type file_name: str
+        :param buffer_size: Size of the write buffer, in bytes.
+        :type buffer_size: int
+        :param profile: Narration profile to render with, or None for the controller's own.
+        :type profile: NarrationProfile
+        :return: Statistics of the written file, including time to first byte.
+        :rtype: SynthesisResult
+        :raises ValueError: If the script is empty.
+        """
+        if not script:
+            raise ValueError("script cannot be empty")
+        profile = profile or self.profile
+        directory = self.output_dir(profile)
+
+        with self.clients.tracer.span("audio.synthesize", profile=profile.name) as span:
+            started = time.perf_counter()
+            if self.phrases is not None:
+                return self._write_stream(self._phrase_stream(script, span, profile), file_name, buffer_size, started,
+                                          directory)
+
+            if self.cache is None:
+                return self._write_stream(self._synthesize(script, profile), file_name, buffer_size, started,
+                                          directory)
+
+            key = self._cache_key(script, profile)
+            cached_path = self.cache.lookup(key)
+            span.set(cached=cached_path is not None)
+            if cached_path is not None:
+                return self._write_stream(self._read_chunks(cached_path, buffer_size), file_name, buffer_size, started,
+                                          directory)
+
+            result = self._write_stream(self._synthesize(script, profile), file_name, buffer_size, started, directory)
+            self.cache.put_file(key, result.path)
+            return result
+
+    async def asynthesize_to_file(self, script, file_name: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                                  timeout: Optional[float] = None,
+                                  profile: Optional[NarrationProfile] = None) -> SynthesisResult:
+        """
+        Async counterpart of ``synthesize_to_file``. With a phrase store, the sentences are synthesized
+        by the blocking path in a worker thread, as the store serializes them per phrase with locks.
+
+        :param timeout: Seconds to wait for the whole clip, or None to wait indefinitely.
+        :type timeout: float
+        :raises ValueError: If the script is empty.
+        :raises asyncio.TimeoutError: If the clip is not written within ``timeout``; no file is left behind.
+        """
+        if not script:
+            raise ValueError("script cannot be empty")
+        if self.phrases is not None:
+            return await asyncio.wait_for(
+                asyncio.to_thread(self.synthesize_to_file, script, file_name, buffer_size, profile), timeout)
+        return await asyncio.wait_for(
+            self._asynthesize_to_file(script, file_name, buffer_size, profile or self.profile), timeout)
+
+    async def _asynthesize_to_file(self, script, file_name: str, buffer_size: int,
+                                   profile: NarrationProfile) -> SynthesisResult:
+        directory = self.output_dir(profile)
+        with self.clients.tracer.span("audio.synthesize", profile=profile.name) as span:
+            started = time.perf_counter()
+            if self.cache is None:
+                return await self._awrite_stream(self._asynthesize(script, profile), file_name, buffer_size, started,
+                                                 directory)
+
+            key = self._cache_key(script, profile)
+            cached_path = self.cache.lookup(key)
+            span.set(cached=cached_path is not None)
+            if cached_path is not None:
+                return self._write_stream(self._read_chunks(cached_path, buffer_size), file_name, buffer_size, started,
+                                          directory)
+
+            result = await self._awrite_stream(self._asynthesize(script, profile), file_name, buffer_size, started,
+                                               directory)
+            self.cache.put_file(key, result.path)
+            return result
+
+    def synthesize_many(self, jobs: List[Tuple[str, str]], max_workers: int = 4,
+                        buffer_size: int = DEFAULT_BUFFER_SIZE) -> List[SynthesisResult]:
+        """
+        Runs ``synthesize_to_file`` for several (script, file_name) pairs at the same time.
+
+        Each stream is written to disk as it arrives, so memory use is bounded by
+        ``max_workers`` write buffers regardless of clip length.
+
+        :param jobs: Pairs of (script, file_name).
+        :type jobs: list[tuple[str, str]]
+        :param max_workers: Maximum number of concurrent synthesis streams.
+        :type max_workers: int
+        :return: One result per job, in input order.
+        :rtype: list[SynthesisResult]
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.synthesize_to_file, script, file_name, buffer_size)
+                for script, file_name in jobs
+            ]
+            return [future.result() for future in futures]
+
+    def _phrase_stream(self, script, span=None, profile: Optional[NarrationProfile] = None) -> Iterator[bytes]:
+        """
+        Makes sure every sentence of ``script`` is in the phrase store, synthesizing the missing
+        ones concurrently, and returns the stored segments joined in order.
+        """
+        phrases = split_phrases(script)
+        if not phrases:
+            raise ValueError("script cannot be empty")
+        profile = profile or self.profile
+        with ThreadPoolExecutor(max_workers=min(4, len(phrases))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._phrase, phrase, profile)
+                for phrase in phrases
+            ]
+            segments = [future.result() for future in futures]
+        if span is not None:
+            span.set(phrases=len(segments), synthesized=sum(created for _, created in segments))
+        return self.phrases.assemble([path for path, _ in segments])
+
+    def _phrase(self, phrase: str, profile: NarrationProfile) -> Tuple[Path, bool]:
+        key = self.phrases.key(phrase, profile.voice_id, profile.model_id, profile.settings)
+        return self.phrases.get_or_create(key, lambda: self._synthesize(phrase, profile))
+
+    def _cache_key(self, script, profile: NarrationProfile) -> str:
+        return self.cache.key("elevenlabs", f"{profile.voice_id}/{profile.model_id}", profile.settings, script)
+
+    def _synthesize(self, script, profile: NarrationProfile) -> Iterator[bytes]:
+        if self.scheduler is None:
+            return self._request_stream(script, profile)
+        response = self.scheduler.call("elevenlabs", self._open_stream, script, profile)
+        # ElevenLabs bills the characters of every request, however much of the stream is read
+        self.scheduler.record_usage("elevenlabs", characters=len(script))
+        return response
+
+    def _request_stream(self, script, profile: NarrationProfile) -> Iterator[bytes]:
+        client = self.clients.eleven_labs_client()
+        response = client.text_to_speech.stream(text=script, **self._voice_arguments(profile))
 
         return response
 
-    def save_audio_to_file(self, audio, file_name: str) -> None:
-        # Constants for directory paths
-        current_dir = Path(__file__).parent
-        project_root = current_dir.parent.parent
-        audio_file_path = project_root / "data" / "audios"
+    @staticmethod
+    def _voice_arguments(profile: NarrationProfile) -> dict:
+        from elevenlabs import VoiceSettings
+
+        arguments = {
+            "voice_id": profile.voice_id,
+            "model_id": profile.model_id,
+            "voice_settings": VoiceSettings(**profile.voice_settings),
+        }
+        if profile.language is not None:
+            arguments["language_code"] = profile.language
+        return arguments
+
+    def _open_stream(self, script, profile: NarrationProfile) -> Iterator[bytes]:
+        # The request is only sent once the stream is iterated, so throttling errors surface
+        # on the first chunk; pulling it here lets the scheduler retry the whole request
+        response = iter(self._request_stream(script, profile))
+        first_chunk = next(response, None)
+        if first_chunk is None:
+            return iter(())
+        return itertools.chain([first_chunk], response)
+
+    async def _asynthesize(self, script, profile: NarrationProfile) -> AsyncIterator[bytes]:
+        if self.scheduler is None:
+            response = self._arequest_stream(script, profile)
+        else:
+            response = await self.scheduler.acall("elevenlabs", self._aopen_stream, script, profile)
+            self.scheduler.record_usage("elevenlabs", characters=len(script))
+        async for chunk in response:
+            yield chunk
+
+    def _arequest_stream(self, script, profile: NarrationProfile) -> AsyncIterator[bytes]:
+        client = self.clients.async_eleven_labs_client()
+        return client.text_to_speech.stream(text=script, **self._voice_arguments(profile))
+
+    async def _aopen_stream(self, script, profile: NarrationProfile) -> AsyncIterator[bytes]:
+        # Like ``_open_stream``: pulls the first chunk so throttling errors are retried by the scheduler
+        response = self._arequest_stream(script, profile).__aiter__()
+        try:
+            first_chunk = await response.__anext__()
+        except StopAsyncIteration:
+            first_chunk = None
+        return self._achain(first_chunk, response)
 
+    @staticmethod
+    async def _achain(first_chunk: Optional[bytes], response: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        if first_chunk is None:
+            return
+        yield first_chunk
+        async for chunk in response:
+            yield chunk
+
+    def _cache_stream(self, key: str, audio: Iterator[bytes]) -> Iterator[bytes]:
+        # Only a fully consumed stream is stored, a dropped one never reaches the cache
+        chunks = []
+        for chunk in audio:
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(key, b"".join(chunks))
+
+    def _trace_stream(self, audio: Iterator[bytes]) -> Iterator[bytes]:
+        # Times a stream consumed by the caller; the span is recorded once it is exhausted
+        if not self.clients.tracer.enabled:
+            return audio
+        return self._timed_stream(audio)
+
+    def _timed_stream(self, audio: Iterator[bytes]) -> Iterator[bytes]:
+        started = time.perf_counter()
+        time_to_first_chunk = None
+        size = 0
+        for chunk in audio:
+            if time_to_first_chunk is None:
+                time_to_first_chunk = time.perf_counter() - started
+            size += len(chunk)
+            yield chunk
+        self.clients.tracer.record("audio.stream", time.perf_counter() - started,
+                                   time_to_first_chunk=time_to_first_chunk, bytes=size)
+        self.clients.tracer.count("bytes", size, kind="audio")
+
+    @staticmethod
+    def _read_chunks(path: Path, chunk_size: int) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def _write_stream(self, audio, file_name: str, buffer_size: int, started: float,
+                      directory: Optional[Path] = None) -> SynthesisResult:
+        file_path, file_descriptor, temp_path = self._temp_file(file_name, directory or self.audio_dir)
+        time_to_first_byte = None
+        bytes_written = 0
+        try:
+            with open(file_descriptor, "wb", buffering=buffer_size) as f:
+                for chunk in audio:
+                    if time_to_first_byte is None:
+                        time_to_first_byte = time.perf_counter() - started
+                    f.write(chunk)
+                    bytes_written += len(chunk)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return self._written(file_path, bytes_written, time_to_first_byte, started)
+
+    async def _awrite_stream(self, audio: AsyncIterator[bytes], file_name: str, buffer_size: int,
+                             started: float, directory: Optional[Path] = None) -> SynthesisResult:
+        # Same as ``_write_stream``; a cancelled stream removes its temporary file like a failed one
+        file_path, file_descriptor, temp_path = self._temp_file(file_name, directory or self.audio_dir)
+        time_to_first_byte = None
+        bytes_written = 0
+        try:
+            with open(file_descriptor, "wb", buffering=buffer_size) as f:
+                async for chunk in audio:
+                    if time_to_first_byte is None:
+                        time_to_first_byte = time.perf_counter() - started
+                    f.write(chunk)
+                    bytes_written += len(chunk)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        finally:
+            await audio.aclose()
+        return self._written(file_path, bytes_written, time_to_first_byte, started)
+
+    @staticmethod
+    def _temp_file(file_name: str, directory: Path) -> Tuple[Path, int, str]:
         # Ensure the directory exists
-        audio_file_path.mkdir(parents=True, exist_ok=True)
+        directory.mkdir(parents=True, exist_ok=True)
 
         # Define the full file path with .mp3 extension
-        file_path = audio_file_path / f"{file_name}.mp3"
+        file_path = directory / f"{file_name}.mp3"
 
-        # Save the audio bytes to the file
-        with open(file_path, "wb") as f:
-            for chunk in audio:
-                f.write(chunk)
+        # Stream into a temporary file next to the target so the final rename is atomic
+        file_descriptor, temp_path = shared_mkstemp(directory, prefix=f".{file_name}.", suffix=".part")
+        return file_path, file_descriptor, temp_path
+
+    def _written(self, file_path: Path, bytes_written: int, time_to_first_byte: Optional[float],
+                 started: float) -> SynthesisResult:
+        result = SynthesisResult(
+            path=file_path,
+            bytes_written=bytes_written,
+            time_to_first_byte=time_to_first_byte,
+            duration=time.perf_counter() - started,
+        )
+        self.clients.tracer.record("audio.stream", result.duration, time_to_first_chunk=time_to_first_byte,
+                                   bytes=bytes_written)
+        self.clients.tracer.count("bytes", bytes_written, kind="audio")
+        return result
@@ -0,0 +1,404 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from scr.assets.controller import AssetsController
+from scr.audio.controller import VOICE_ID, AudioController, NarrationProfile, parse_profiles
+from scr.budget.controller import episode_scope
+from scr.bundle.controller import BundleController
+from scr.cache.controller import CacheController
+from scr.clients.controller import ClientsController
+from scr.imaging.controller import FRAMES, ImagingController
+from scr.manifest.controller import ManifestController, episode_slug, shared_mkstemp
+from scr.photos.controller import ENDPOINTS, PhotosController
+from scr.phrases.controller import PhrasesController
+from scr.pipeline.controller import PipelineController
+from scr.scheduler.controller import SchedulerController
+from scr.script.controller import ScriptController
+from scr.search.controller import SearchController
+from scr.tracing.controller import DISABLED, TracingController
+
+
+@dataclass
+class EpisodeSpec:
+    """
+    One episode of a batch.
+
+    :ivar name: Episode name, used for its manifest and asset directories.
+    :type name: str
+    :ivar categories: Trivia categories of the episode, in order.
+    :type categories: list[str]
+    :ivar voice: ElevenLabs voice id, or None for the default voice.
+    :type voice: str
+    :ivar frame: Video orientation, ``portrait`` or ``landscape``.
+    :type frame: str
+    :ivar providers: Image search providers to use, in order of preference, or None for all.
+    :type providers: list[str]
+    :ivar profiles: Narration profiles rendered at the same time, or None for ``voice`` only. The first
+        one writes to the episode's audio directory, every other to a subdirectory named after it.
+    :type profiles: list[NarrationProfile]
+    """
+    name: str
+    categories: List[str]
+    voice: Optional[str] = None
+    frame: str = "portrait"
+    providers: Optional[List[str]] = None
+    profiles: Optional[List[NarrationProfile]] = None
+
+
+@dataclass
+class EpisodeReport:
+    """
+    Outcome of building one episode.
+
+    :ivar name: Episode name.
+    :type name: str
+    :ivar duration: Seconds spent building the episode.
+    :type duration: float
+    :ivar categories: Number of categories built.
+    :type categories: int
+    :ivar skipped: Number of stages reused from a previous run.
+    :type skipped: int
+    :ivar errors: Failed stages, as ``{category: {stage: message}}``.
+    :type errors: dict
+    :ivar error: Error that stopped the whole episode, e.g. a failed script request.
+    :type error: str
+    :ivar cost: Provider spend attributed to the episode this month, in US dollars, if accounted for.
+    :type cost: float
+    """
+    name: str
+    duration: float = 0.0
+    categories: int = 0
+    skipped: int = 0
+    errors: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    error: Optional[str] = None
+    cost: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.errors
+
+
+def _split(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def parse_episode(data: dict, position: int) -> EpisodeSpec:
+    """
+    Builds an episode from a row of an episodes file; ``topics`` is accepted for ``categories``
+    and ``orientation`` for ``frame``. List fields may be lists or comma-separated strings;
+    ``profiles`` are written as ``name[:language][=voice_id]``, see ``parse_profiles``.
+
+    :raises ValueError: If the episode has no categories, an unknown orientation or provider,
+        or an invalid narration profile.
+    """
+    categories = _split(data.get("categories", data.get("topics")))
+    if not categories:
+        raise ValueError(f"Episode {position} has no categories")
+
+    frame = (data.get("frame") or data.get("orientation") or "portrait").strip()
+    if frame not in FRAMES:
+        raise ValueError(f"Episode {position} orientation must be one of: {', '.join(FRAMES)}")
+
+    providers = _split(data.get("providers")) or None
+    unknown = [provider for provider in providers or [] if provider not in ENDPOINTS]
+    if unknown:
+        raise ValueError(f"Episode {position} has unknown providers: {', '.join(unknown)}")
+
+    voice = (data.get("voice") or "").strip() or None
+    try:
+        profiles = parse_profiles(",".join(_split(data.get("profiles"))), voice or VOICE_ID) or None
+    except ValueError as error:
+        raise ValueError(f"Episode {position} {error}") from error
+
+    return EpisodeSpec(
+        name=(data.get("name") or "").strip() or ", ".join(categories),
+        categories=categories,
+        voice=voice,
+        frame=frame,
+        providers=providers,
+        profiles=profiles,
+    )
+
+
+def load_episodes(path: Path) -> List[EpisodeSpec]:
+    """
+    Reads episodes from a CSV file with a header row, a JSON-lines file or a YAML list.
+
+    :raises ValueError: If the file type is not supported or an episode is invalid.
+    """
+    path = Path(path)
+    suffix = path.suffix.casefold()
+    with open(path, encoding="utf-8", newline="") as file:
+        if suffix == ".csv":
+            rows = list(csv.DictReader(file))
+        elif suffix in (".jsonl", ".ndjson"):
+            rows = [json.loads(line) for line in file if line.strip()]
+        elif suffix in (".yaml", ".yml"):
+            import yaml
+
+            rows = yaml.safe_load(file) or []
+            if isinstance(rows, dict):
+                rows = rows.get("episodes", [])
+        else:
+            raise ValueError(f"Unsupported episodes file: {path.name}")
+
+    return [parse_episode(row, position) for position, row in enumerate(rows, start=1)]
+
+
+class BatchController:
+    """
+    Builds many episodes unattended, sharing clients, caches, rate limits and worker pools.
+
+    Up to ``episodes_in_flight`` episodes are built at once: each generates its script, then
+    submits its photo and audio stages to a single thread pool shared by the whole batch, so
+    slow episodes never leave workers idle. Photos are post-processed in one process pool per
+    orientation, and every episode writes its assets to its own directory under ``data_dir``.
+    A failing episode is reported and never stops the others.
+
+    :ivar clients: Shared network clients.
+    :type clients: ClientsController
+    :ivar cache: Optional response cache shared by every episode.
+    :type cache: CacheController
+    :ivar scheduler: Optional rate limiter shared by every episode.
+    :type scheduler: SchedulerController
+    :ivar search: Optional multi-provider image search shared by every episode.
+    :type search: SearchController
+    :ivar data_dir: Root of the ``photos``, ``audios`` and ``manifests`` directories.
+    :type data_dir: pathlib.Path
+    :ivar max_workers: Size of the stage thread pool shared by every episode.
+    :type max_workers: int
+    :ivar episodes_in_flight: Maximum number of episodes built at the same time.
+    :type episodes_in_flight: int
+    :ivar audio: Whether the audio stage runs.
+    :type audio: bool
+    :ivar phrases: Optional phrase store shared by every episode, so repeated sentences are synthesized once.
+    :type phrases: PhrasesController
+    :ivar assets: Optional asset library shared by every episode, so categories seen before reuse their photo.
+    :type assets: AssetsController
+    :ivar bundles: Whether every episode's assets are also appended to a single-file bundle under ``bundles``.
+    :type bundles: bool
+    """
+
+    def __init__(self, clients: ClientsController, cache: Optional[CacheController] = None,
+                 scheduler: Optional[SchedulerController] = None, search: Optional[SearchController] = None,
+                 data_dir: Optional[Path] = None, max_workers: int = 8, episodes_in_flight: int = 2,
+                 audio: bool = True, endpoints: Optional[Dict[str, str]] = None,
+                 tracer: Optional[TracingController] = None, output: Callable[[str], None] = print,
+                 phrases: Optional[PhrasesController] = None, assets: Optional[AssetsController] = None,
+                 bundles: bool = False):
+        if max_workers < 1 or episodes_in_flight < 1:
+            raise ValueError("max_workers and episodes_in_flight must be at least 1")
+
+        if data_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            data_dir = project_root / "data"
+
+        self.clients = clients
+        self.cache = cache
+        self.scheduler = scheduler
+        self.search = search
+        self.data_dir = Path(data_dir)
+        self.max_workers = max_workers
+        self.episodes_in_flight = episodes_in_flight
+        self.audio = audio
+        self.endpoints = endpoints
+        self.tracer = tracer or DISABLED
+        self.phrases = phrases
+        self.assets = assets
+        self.bundles = bundles
+        self._output = output
+        self._lock = threading.Lock()
+        self._imaging = {}
+
+    def run(self, episodes: List[EpisodeSpec]) -> List[EpisodeReport]:
+        """
+        Builds every episode and prints a progress line as each one finishes.
+
+        :return: One report per episode, in input order.
+        :rtype: list[EpisodeReport]
+        """
+        reports = [None] * len(episodes)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as stage_executor, \
+                    ThreadPoolExecutor(max_workers=self.episodes_in_flight) as episode_executor:
+                futures = {
+                    episode_executor.submit(self._build_episode, episode, stage_executor): index
+                    for index, episode in enumerate(episodes)
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    report = future.result()
+                    reports[futures[future]] = report
+                    self._output(f"[{done}/{len(episodes)}] {report.name}: {self._status(report)}")
+        finally:
+            for imaging in self._imaging.values():
+                imaging.close()
+            self._imaging.clear()
+
+        built = sum(report.ok for report in reports)
+        failed_stages = sum(len(stages) for report in reports for stages in report.errors.values())
+        self._output(f"Built {built}/{len(reports)} episodes, {failed_stages} failed stages")
+        return reports
+
+    def write_report(self, reports: List[EpisodeReport], path: Path, elapsed: Optional[float] = None) -> None:
+        """
+        Atomically writes the exit report of a batch as JSON.
+        """
+        path = Path(path)
+        data = {
+            "finished": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed": elapsed,
+            "episodes": len(reports),
+            "built": sum(report.ok for report in reports),
+            "reports": [{**asdict(report), "ok": report.ok} for report in reports],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = shared_mkstemp(path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _status(report: EpisodeReport) -> str:
+        if report.error is not None:
+            return f"failed after {report.duration:.1f}s: {report.error}"
+        failed = sum(len(stages) for stages in report.errors.values())
+        status = "ok" if not failed else f"{failed} failed stages"
+        return f"{status} in {report.duration:.1f}s ({report.skipped} reused)"
+
+    def _imaging_controller(self, frame: str) -> ImagingController:
+        with self._lock:
+            if frame not in self._imaging:
+                self._imaging[frame] = ImagingController(frame=frame)
+            return self._imaging[frame]
+
+    def _build_episode(self, episode: EpisodeSpec, executor) -> EpisodeReport:
+        report = EpisodeReport(episode.name)
+        started = time.perf_counter()
+        slug = episode_slug(episode.name)
+        bundle = None
+        if self.bundles:
+            bundle = BundleController(episode.name, bundles_dir=self.data_dir / "bundles", tracer=self.tracer)
+        try:
+            with self.tracer.span("episode", episode=episode.name), episode_scope(episode.name):
+                # Localized narrations come from the same script request as the original one
+                languages = [profile.language for profile in episode.profiles or [] if profile.language]
+                script = ScriptController(self.clients, self.cache, self.scheduler, languages=languages)
+                records = script.stream_records(episode.categories)
+
+                photos = PhotosController(
+                    self.clients, self.cache, photos_dir=self.data_dir / "photos" / slug, scheduler=self.scheduler,
+                    search=self.search, endpoints=self.endpoints, search_providers=episode.providers,
+                    assets=self.assets, frame=episode.frame,
+                )
+                audio = None
+                if self.audio:
+                    audio = AudioController(
+                        self.clients, self.cache, audio_dir=self.data_dir / "audios" / slug,
+                        scheduler=self.scheduler, voice_id=episode.voice or VOICE_ID, phrases=self.phrases,
+                        profile=episode.profiles[0] if episode.profiles else None,
+                    )
+                pipeline = PipelineController(
+                    photos_controller=photos,
+                    audio_controller=audio,
+                    manifest=ManifestController(episode.name, manifests_dir=self.data_dir / "manifests"),
+                    imaging_controller=self._imaging_controller(episode.frame),
+                    tracer=self.tracer,
+                    executor=executor,
+                    bundle=bundle,
+                    profiles=episode.profiles,
+                )
+                results = pipeline.run(records)
+        except Exception as error:
+            report.error = f"{type(error).__name__}: {error}"
+            report.duration = time.perf_counter() - started
+            report.cost = self._cost(episode)
+            return report
+        finally:
+            if bundle is not None:
+                bundle.close()
+
+        report.duration = time.perf_counter() - started
+        report.categories = len(results)
+        report.skipped = sum(len(result.skipped) for result in results)
+        report.errors = {
+            result.category: {stage: str(error) for stage, error in result.errors.items()}
+            for result in results
+            if result.errors
+        }
+        report.cost = self._cost(episode)
+        return report
+
+    def _cost(self, episode: EpisodeSpec) -> Optional[float]:
+        if self.scheduler is None or self.scheduler.budget is None:
+            return None
+        return self.scheduler.budget.spent(episode=episode.name)
+
+
+def main(argv=None) -> int:
+    """
+    Builds every episode of a CSV, JSON-lines or YAML file without any prompt.
+
+    :return: Process exit code, 1 if any episode or stage failed.
+    :rtype: int
+    """
+    from scr.main import (build_assets, build_phrases, build_search, build_shared_controllers, data_path,
+                          search_endpoints)
+
+    parser = argparse.ArgumentParser(description="Build trivia episodes in batch from an episodes file.")
+    parser.add_argument("episodes", type=Path, help="CSV, JSON-lines or YAML file listing the episodes.")
+    parser.add_argument("--report", type=Path, help="Exit report path (default data/reports/batch-<time>.json).")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("PIPELINE_MAX_WORKERS", "16")),
+                        help="Stage worker threads shared by all episodes.")
+    parser.add_argument("--episodes-in-flight", type=int, default=2, help="Episodes built at the same time.")
+    parser.add_argument("--no-audio", action="store_true", help="Skip the audio stage.")
+    parser.add_argument("--bundle", action="store_true",
+                        help="Also append each episode's assets to a single file under data/bundles.")
+    args = parser.parse_args(argv)
+
+    episodes = load_episodes(args.episodes)
+    tracer = TracingController.from_environment()
+    clients, cache, scheduler = build_shared_controllers(args.workers, tracer)
+    endpoints = search_endpoints()
+    search = PhotosController(clients, cache, scheduler=scheduler, endpoints=endpoints).register_providers(
+        build_search(scheduler))
+
+    data_dir = data_path("") or Path(__file__).parent.parent.parent / "data"
+    batch = BatchController(
+        clients, cache, scheduler, search, data_dir=data_dir, max_workers=args.workers,
+        episodes_in_flight=args.episodes_in_flight, audio=not args.no_audio, endpoints=endpoints, tracer=tracer,
+        phrases=build_phrases(tracer), assets=build_assets(tracer), bundles=args.bundle,
+    )
+    started = time.perf_counter()
+    try:
+        reports = batch.run(episodes)
+    finally:
+        search.close()
+        tracer.close()
+
+    report_path = args.report or data_dir / "reports" / f"batch-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    batch.write_report(reports, report_path, time.perf_counter() - started)
+    print(f"Report written to {report_path}")
+    return 0 if all(report.ok for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
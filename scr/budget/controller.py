@@ -0,0 +1,242 @@
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+from scr.manifest.controller import shared_mkstemp
+from scr.scheduler.controller import QuotaExceededError, file_lock
+from scr.tracing.controller import DISABLED, TracingController
+
+
+class BudgetExceededError(QuotaExceededError):
+    """
+    Raised when a paid call would exceed the monthly budget of its provider or of the whole project.
+    Being a quota error, it makes the image search move on to the next provider.
+    """
+
+
+@dataclass
+class UnitPrice:
+    """
+    Price of one unit consumed from a provider.
+
+    :ivar price: Price of one unit, in US dollars.
+    :type price: float
+    :ivar free_daily: Units served for free every calendar day before ``price`` applies.
+    :type free_daily: int
+    """
+    price: float
+    free_daily: int = 0
+
+
+# List prices of the plans the pipeline is built for; override them with the account's own rates
+DEFAULT_PRICES = {
+    "gemini": {"prompt_tokens": UnitPrice(0.075e-6), "response_tokens": UnitPrice(0.30e-6)},
+    "google_search": {"queries": UnitPrice(5.0 / 1000, free_daily=100)},
+    "unsplash": {"queries": UnitPrice(0.0)},
+    # Watermarked previews are downloaded without a license; set a price to account for licensed ones
+    "shutterstock": {"queries": UnitPrice(0.0), "downloads": UnitPrice(0.0)},
+    "elevenlabs": {"characters": UnitPrice(0.30 / 1000)},
+}
+# Share of the monthly budget kept for critical work; past it, optional requests are deferred
+DEFAULT_RESERVE = 0.1
+
+_current_episode = contextvars.ContextVar("current_episode", default=None)
+
+
+@contextlib.contextmanager
+def episode_scope(name: str) -> Iterator[None]:
+    """
+    Attributes the calls made inside the block, and in the threads it starts with a copied
+    context, to the episode ``name``.
+    """
+    token = _current_episode.set(name)
+    try:
+        yield
+    finally:
+        _current_episode.reset(token)
+
+
+class BudgetController:
+    """
+    Accounts for the units every provider call consumes and what they cost, per provider and episode.
+
+    Controllers report what each successful call consumed through ``SchedulerController.record_usage``:
+    prompt and response tokens of Gemini, characters sent to ElevenLabs, search queries and
+    licensed downloads. Units are priced with ``prices``, net of each provider's free daily
+    units, and added under a file lock to a ledger persisted to disk, shared by every worker
+    process, that starts over every calendar month. Calls made inside ``episode_scope`` are
+    also attributed to that episode, across the threads it starts.
+
+    With a ``monthly_budget``, the scheduler refuses a paid call once the budget, or the
+    provider's own share in ``provider_budgets``, is spent, while free calls and cached responses
+    keep flowing. Once less than ``reserve`` of the budget is left, the budget is constrained:
+    searches stop hedging, rank free providers first, and request a single page of a single
+    query, so the remainder goes to the calls an episode cannot do without.
+
+    :ivar monthly_budget: Spend allowed per calendar month, in US dollars, or None to only account.
+    :type monthly_budget: float
+    :ivar provider_budgets: Optional spend allowed per provider and month, in US dollars.
+    :type provider_budgets: dict
+    :ivar prices: Price of each unit, keyed by provider and unit.
+    :type prices: dict
+    :ivar reserve: Share of ``monthly_budget`` kept for critical work.
+    :type reserve: float
+    :ivar ledger_path: JSON file holding this month's consumption.
+    :type ledger_path: pathlib.Path
+    :ivar tracer: Tracer counting units and spend per provider.
+    :type tracer: TracingController
+    """
+
+    def __init__(self, monthly_budget: Optional[float] = None, provider_budgets: Optional[Dict[str, float]] = None,
+                 prices: Optional[Dict[str, Dict[str, UnitPrice]]] = None, reserve: float = DEFAULT_RESERVE,
+                 ledger_path: Optional[Path] = None, tracer: Optional[TracingController] = None,
+                 today: Callable[[], datetime.date] = datetime.date.today):
+        if monthly_budget is not None and monthly_budget < 0:
+            raise ValueError("monthly_budget cannot be negative")
+        if not 0 <= reserve < 1:
+            raise ValueError("reserve must be between 0 and 1")
+
+        if ledger_path is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            ledger_path = project_root / "data" / "budget.json"
+
+        self.monthly_budget = monthly_budget
+        self.provider_budgets = dict(provider_budgets or {})
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self.reserve = reserve
+        self.ledger_path = Path(ledger_path)
+        self.tracer = tracer or DISABLED
+        self._today = today
+
+    def record(self, provider: str, **units: float) -> float:
+        """
+        Adds the ``units`` consumed by one call to ``provider`` to the ledger.
+
+        :return: Cost of the call, in US dollars.
+        :rtype: float
+        """
+        episode = _current_episode.get()
+        with file_lock(self.ledger_path.with_suffix(".lock")):
+            ledger = self._read_ledger()
+            today = ledger["days"].setdefault(self._today().isoformat(), {}).setdefault(provider, {})
+            cost = 0.0
+            for unit, amount in units.items():
+                price = self.prices.get(provider, {}).get(unit, UnitPrice(0.0))
+                free = max(price.free_daily - today.get(unit, 0), 0)
+                cost += max(amount - free, 0) * price.price
+                today[unit] = today.get(unit, 0) + amount
+
+            totals = [ledger["providers"].setdefault(provider, {"units": {}, "cost": 0.0})]
+            if episode is not None:
+                totals.append(ledger["episodes"].setdefault(episode, {}).setdefault(
+                    provider, {"units": {}, "cost": 0.0}))
+            for total in totals:
+                for unit, amount in units.items():
+                    total["units"][unit] = total["units"].get(unit, 0) + amount
+                total["cost"] += cost
+            ledger["spent"] += cost
+            self._write_ledger(ledger)
+
+        for unit, amount in units.items():
+            self.tracer.count("units", amount, provider=provider, unit=unit)
+        self.tracer.count("spend_dollars", cost, provider=provider)
+        return cost
+
+    def check(self, provider: str) -> None:
+        """
+        Raises if the next call to ``provider`` would be paid for with money the budget no longer has.
+
+        :raises BudgetExceededError: If the monthly budget, or the provider's share of it, is spent.
+        """
+        ledger = self._read_ledger()
+        if self._next_is_free(provider, ledger):
+            return
+        spent = ledger["providers"].get(provider, {}).get("cost", 0.0)
+        limit = self.provider_budgets.get(provider)
+        if limit is not None and spent >= limit:
+            raise BudgetExceededError(f"Monthly budget of ${limit:.2f} for {provider} spent")
+        if self.monthly_budget is not None and ledger["spent"] >= self.monthly_budget:
+            raise BudgetExceededError(f"Monthly budget of ${self.monthly_budget:.2f} spent")
+
+    def constrained(self) -> bool:
+        """
+        Returns whether less than ``reserve`` of the monthly budget is left, so optional work is deferred.
+        """
+        if self.monthly_budget is None:
+            return False
+        return self.spent() >= self.monthly_budget * (1 - self.reserve)
+
+    def unit_cost(self, provider: str) -> float:
+        """
+        Returns the price of the next unit of ``provider``'s main unit, 0 while free units are left.
+        """
+        ledger = self._read_ledger()
+        if self._next_is_free(provider, ledger):
+            return 0.0
+        return max((price.price for price in self.prices.get(provider, {}).values()), default=0.0)
+
+    def spent(self, provider: Optional[str] = None, episode: Optional[str] = None) -> float:
+        """
+        Returns this month's spend, in US dollars, optionally of one provider and/or one episode.
+        """
+        ledger = self._read_ledger()
+        if episode is not None:
+            providers = ledger["episodes"].get(episode, {})
+        elif provider is None:
+            return ledger["spent"]
+        else:
+            providers = ledger["providers"]
+        if provider is not None:
+            return providers.get(provider, {}).get("cost", 0.0)
+        return sum(total["cost"] for total in providers.values())
+
+    def report(self) -> dict:
+        """
+        Returns this month's ledger: total spend, and units and spend per provider and per episode.
+        """
+        ledger = self._read_ledger()
+        return {
+            "month": ledger["month"],
+            "budget": self.monthly_budget,
+            "spent": ledger["spent"],
+            "providers": ledger["providers"],
+            "episodes": ledger["episodes"],
+        }
+
+    def _next_is_free(self, provider: str, ledger: dict) -> bool:
+        # A call is free if each of its units is free or still within today's free allowance
+        used = ledger["days"].get(self._today().isoformat(), {}).get(provider, {})
+        return all(
+            price.price == 0 or used.get(unit, 0) < price.free_daily
+            for unit, price in self.prices.get(provider, {}).items()
+        )
+
+    def _month(self) -> str:
+        return self._today().strftime("%Y-%m")
+
+    def _read_ledger(self) -> dict:
+        empty = {"month": self._month(), "spent": 0.0, "providers": {}, "episodes": {}, "days": {}}
+        try:
+            data = json.loads(self.ledger_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return empty
+        if data.get("month") != empty["month"]:
+            return empty
+        return {**empty, **data}
+
+    def _write_ledger(self, ledger: dict) -> None:
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = shared_mkstemp(self.ledger_path.parent, prefix=".budget-")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(ledger, file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.ledger_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
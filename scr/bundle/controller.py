@@ -0,0 +1,324 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional
+
+from scr.manifest.controller import episode_slug, file_sha256
+from scr.tracing.controller import DISABLED, TracingController
+
+MAGIC = b"TVBUNDL1"
+VERSION = 1
+# Payloads start on page boundaries, so every asset can be mapped and sliced on its own
+ALIGNMENT = 4096
+# Magic, version, index capacity and number of entries, padded to 64 bytes
+HEADER = struct.Struct("<8sIII44x")
+# Name, kind, offset, length, SHA-256 and flags of one asset, 256 bytes
+ENTRY = struct.Struct("<176s16sQQ32sI12x")
+DEFAULT_CAPACITY = 255
+FLAG_REMOVED = 1
+CHUNK_SIZE = 1024 * 1024
+
+
+def align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+@dataclass(frozen=True)
+class BundleEntry:
+    """
+    Index entry of an asset stored in a bundle.
+
+    :ivar kind: Asset kind, the pipeline stage that produced it, e.g. ``photos`` or ``audio``.
+    :type kind: str
+    :ivar name: Asset name, the category it belongs to; any Unicode text, spaces and accents included.
+    :type name: str
+    :ivar offset: Position of the payload in the bundle, a multiple of ``ALIGNMENT``.
+    :type offset: int
+    :ivar length: Size of the payload, in bytes.
+    :type length: int
+    :ivar sha256: Hash of the payload.
+    :type sha256: str
+    """
+    kind: str
+    name: str
+    offset: int
+    length: int
+    sha256: str
+
+
+class BundleController:
+    """
+    Stores every asset of an episode in a single file that is read through ``mmap``.
+
+    Episodes otherwise span many small files named after their categories, which are slow to
+    copy, sync and open on network storage. A bundle starts with a fixed-size header and an
+    index of up to ``capacity`` entries, each recording an asset's kind, name, offset, length
+    and SHA-256, followed by the payloads, each starting on a 4 KiB boundary. Assets are
+    appended as the pipeline finishes them: the payload is written and synced first and the
+    entry count in the header is bumped last, so an interrupted append leaves the previous
+    bundle intact. Appending an asset again supersedes its earlier entry; ``remove`` records a
+    tombstone. Readers get zero-copy ``memoryview`` slices of the mapped file, and ffmpeg reads
+    payloads in place through its ``subfile`` protocol.
+
+    A bundle has a single writer at a time; readers in other processes see new assets once
+    they ``refresh``.
+
+    :ivar path: Location of the bundle file.
+    :type path: pathlib.Path
+    :ivar capacity: Number of index entries reserved when the bundle is created.
+    :type capacity: int
+    :ivar tracer: Tracer counting appended bytes.
+    :type tracer: TracingController
+    """
+
+    def __init__(self, episode: str, bundles_dir: Optional[Path] = None, capacity: int = DEFAULT_CAPACITY,
+                 tracer: Optional[TracingController] = None):
+        if not episode or not episode.strip():
+            raise ValueError("episode cannot be empty")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        if bundles_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            bundles_dir = project_root / "data" / "bundles"
+
+        self.path = Path(bundles_dir) / f"{episode_slug(episode)}.bundle"
+        self.capacity = capacity
+        self.tracer = tracer or DISABLED
+        self._lock = threading.Lock()
+        self._map = None
+        self._entries = []
+
+    @property
+    def data_start(self) -> int:
+        return align(HEADER.size + self.capacity * ENTRY.size)
+
+    def entries(self) -> List[BundleEntry]:
+        """
+        Returns the current entry of every asset, in the order the assets were first appended.
+        """
+        with self._lock:
+            self._refresh()
+            return list(self._current().values())
+
+    def entry(self, kind: str, name: str) -> Optional[BundleEntry]:
+        with self._lock:
+            self._refresh()
+            return self._current().get((kind, name))
+
+    def view(self, kind: str, name: str) -> memoryview:
+        """
+        Returns the payload of an asset as a read-only slice of the mapped bundle, without copying it.
+        The bundle cannot be closed while a view is still referenced.
+
+        :raises KeyError: If the bundle holds no such asset.
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._current().get((kind, name))
+            if entry is None:
+                raise KeyError(f"{kind}/{name} is not in {self.path.name}")
+            return memoryview(self._map)[entry.offset:entry.offset + entry.length]
+
+    def url(self, kind: str, name: str) -> str:
+        """
+        Returns an ffmpeg ``subfile`` URL reading the payload of an asset straight from the bundle.
+
+        :raises KeyError: If the bundle holds no such asset.
+        """
+        entry = self.entry(kind, name)
+        if entry is None:
+            raise KeyError(f"{kind}/{name} is not in {self.path.name}")
+        end = entry.offset + entry.length - 1
+        return f"subfile,,start,{entry.offset},end,{end},,:{self.path.resolve()}"
+
+    def verify(self) -> List[BundleEntry]:
+        """
+        Re-hashes every current payload.
+
+        :return: The entries whose payload no longer matches its hash.
+        :rtype: list[BundleEntry]
+        """
+        corrupt = []
+        for entry in self.entries():
+            view = self.view(entry.kind, entry.name)
+            try:
+                if hashlib.sha256(view).hexdigest() != entry.sha256:
+                    corrupt.append(entry)
+            finally:
+                view.release()
+        return corrupt
+
+    def append(self, kind: str, name: str, chunks: Iterable[bytes]) -> BundleEntry:
+        """
+        Appends an asset streamed as ``chunks``, superseding any earlier asset of the same kind and name.
+
+        :raises ValueError: If the kind or name is too long or the index is full.
+        """
+        name_field, kind_field = self._fields(kind, name)
+        with self._lock:
+            with self._open() as file:
+                count = self._read_count(file)
+                if count >= self.capacity:
+                    raise ValueError(f"{self.path.name} index is full ({self.capacity} entries)")
+                entries = self._read_entries(file, count)
+                offset = align(max([self.data_start] + [entry.offset + entry.length for entry in entries]))
+
+                file.seek(offset)
+                digest = hashlib.sha256()
+                length = 0
+                for chunk in chunks:
+                    file.write(chunk)
+                    digest.update(chunk)
+                    length += len(chunk)
+                entry = BundleEntry(kind, name, offset, length, digest.hexdigest())
+                self._commit(file, count, ENTRY.pack(name_field, kind_field, offset, length, digest.digest(), 0))
+            self.tracer.count("bytes", length, kind="bundle")
+            return entry
+
+    def append_file(self, kind: str, name: str, path: Path) -> BundleEntry:
+        """
+        Appends the file at ``path``, unless the bundle already holds the same contents for it.
+        """
+        current = self.entry(kind, name)
+        if current is not None and current.sha256 == file_sha256(path):
+            return current
+
+        def chunks():
+            with open(path, "rb") as file:
+                while chunk := file.read(CHUNK_SIZE):
+                    yield chunk
+        return self.append(kind, name, chunks())
+
+    def remove(self, kind: str, name: str) -> None:
+        """
+        Records that an asset is no longer part of the episode; its payload stays in the file.
+        """
+        name_field, kind_field = self._fields(kind, name)
+        with self._lock:
+            with self._open() as file:
+                count = self._read_count(file)
+                if count >= self.capacity:
+                    raise ValueError(f"{self.path.name} index is full ({self.capacity} entries)")
+                self._commit(file, count, ENTRY.pack(name_field, kind_field, 0, 0, b"", FLAG_REMOVED))
+
+    def refresh(self) -> None:
+        """
+        Maps assets appended by another process since the bundle was last read.
+        """
+        with self._lock:
+            self._refresh(force=True)
+
+    def close(self) -> None:
+        """
+        Unmaps the bundle; it is mapped again on next use.
+
+        :raises BufferError: If a view returned by ``view`` is still referenced.
+        """
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+            self._map = None
+            self._entries = []
+
+    @staticmethod
+    def _fields(kind: str, name: str):
+        name_field = name.encode("utf-8")
+        kind_field = kind.encode("utf-8")
+        if not name_field or len(name_field) > 176:
+            raise ValueError("name must be 1 to 176 bytes of UTF-8")
+        if not kind_field or len(kind_field) > 16:
+            raise ValueError("kind must be 1 to 16 bytes of UTF-8")
+        return name_field, kind_field
+
+    def _open(self) -> BinaryIO:
+        try:
+            file = open(self.path, "r+b")
+        except FileNotFoundError:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            file = open(self.path, "w+b")
+            file.write(HEADER.pack(MAGIC, VERSION, self.capacity, 0))
+            file.truncate(self.data_start)
+            return file
+        try:
+            magic, version, capacity, _ = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path.name} is not a version {VERSION} episode bundle")
+        except BaseException:
+            file.close()
+            raise
+        self.capacity = capacity
+        return file
+
+    def _commit(self, file: BinaryIO, count: int, packed: bytes) -> None:
+        # The entry becomes visible only once the payload and the entry are on disk
+        file.seek(HEADER.size + count * ENTRY.size)
+        file.write(packed)
+        file.flush()
+        os.fsync(file.fileno())
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, self.capacity, count + 1))
+        file.flush()
+
+    @staticmethod
+    def _read_count(file: BinaryIO) -> int:
+        file.seek(0)
+        return HEADER.unpack(file.read(HEADER.size))[3]
+
+    @staticmethod
+    def _read_entries(file: BinaryIO, count: int) -> List[BundleEntry]:
+        file.seek(HEADER.size)
+        return _parse_entries(file.read(count * ENTRY.size), count)
+
+    def _refresh(self, force: bool = False) -> None:
+        # Maps the bundle on first use, and again when it grew since it was mapped
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            self._map, self._entries = None, []
+            return
+        if not force and self._map is not None and len(self._map) == size:
+            count = HEADER.unpack_from(self._map)[3]
+            if count == len(self._entries):
+                return
+
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, capacity, count = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            raise ValueError(f"{self.path.name} is not a version {VERSION} episode bundle")
+        # A previous map still referenced by a view is closed once the view is released
+        self.capacity = capacity
+        self._map = mapped
+        self._entries = _parse_entries(mapped[HEADER.size:HEADER.size + count * ENTRY.size], count)
+
+    def _current(self) -> Dict[tuple, BundleEntry]:
+        current = {}
+        for entry in self._entries:
+            key = (entry.kind, entry.name)
+            if entry.sha256:
+                # Re-inserting moves nothing: dicts keep the position of the first insertion
+                current[key] = entry
+            else:
+                current.pop(key, None)
+        return current
+
+
+def _parse_entries(data: bytes, count: int) -> List[BundleEntry]:
+    entries = []
+    for index in range(count):
+        name, kind, offset, length, digest, flags = ENTRY.unpack_from(data, index * ENTRY.size)
+        entries.append(BundleEntry(
+            kind=kind.rstrip(b"\0").decode("utf-8"),
+            name=name.rstrip(b"\0").decode("utf-8"),
+            offset=offset,
+            length=length,
+            sha256="" if flags & FLAG_REMOVED else digest.hex(),
+        ))
+    return entries
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from scr.manifest.controller import shared_mkstemp
+from scr.tracing.controller import DISABLED, TracingController
+
+# Default lifetime of a cache entry, in seconds
+DEFAULT_TTL = 30 * 24 * 60 * 60
+# Default upper bound for the total size of the cache directory, in bytes
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+class CacheController:
+    """
+    Content-addressed on-disk cache for provider responses.
+
+    Entries are keyed by a SHA-256 hash of (provider, model/voice id, settings, input
+    text) and stored under ``data/cache``. Each entry is written to a temporary file and
+    renamed into place, so readers never see a partial payload. The entry's mtime records
+    when it was written (used for the TTL) and its atime records when it was last read
+    (used for LRU eviction once the cache grows past ``max_bytes``).
+
+    :ivar cache_dir: Directory holding the cache entries.
+    :type cache_dir: pathlib.Path
+    :ivar ttl: Seconds after which an entry is considered stale, or None to never expire.
+    :type ttl: float
+    :ivar max_bytes: Total size above which least recently used entries are evicted.
+    :type max_bytes: int
+    :ivar enabled: When False the cache is bypassed entirely, neither read nor written.
+    :type enabled: bool
+    :ivar refresh: When True existing entries are ignored and overwritten with fresh data.
+    :type refresh: bool
+    :ivar tracer: Tracer counting cache hits and misses.
+    :type tracer: TracingController
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: Optional[float] = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True, refresh: bool = False,
+                 tracer: Optional[TracingController] = None):
+        if cache_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            cache_dir = project_root / "data" / "cache"
+
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.refresh = refresh
+        self.tracer = tracer or DISABLED
+        self._lock = threading.Lock()
+        self._size = None
+
+    @staticmethod
+    def key(provider: str, model: str, settings: Optional[dict], text: str) -> str:
+        """
+        Builds the content address of a provider request.
+
+        :param provider: Name of the provider, e.g. ``gemini`` or ``elevenlabs``.
+        :type provider: str
+        :param model: Model, voice or search engine identifier.
+        :type model: str
+        :param settings: Request settings that change the response; must be JSON serializable.
+        :type settings: dict
+        :param text: Input text sent to the provider.
+        :type text: str
+        :return: Hex digest identifying the request.
+        :rtype: str
+        """
+        payload = json.dumps([provider, model, settings or {}, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """
+        Returns the path of the fresh entry for ``key``, or None on a miss, a stale entry or a refresh.
+        """
+        if not self.enabled:
+            return None
+        if self.refresh:
+            self.tracer.count("cache_lookups", result="miss")
+            return None
+
+        path = self.path(key)
+        try:
+            stat = path.stat()
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                self.tracer.count("cache_lookups", result="miss")
+                return None
+            # Record the access time explicitly, mounts with noatime never update it
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            self.tracer.count("cache_lookups", result="miss")
+            return None
+        self.tracer.count("cache_lookups", result="hit")
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the cached payload for ``key``, or None on a miss, a stale entry or a refresh.
+        """
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Atomically stores ``data`` under ``key`` and evicts old entries if the cache is full.
+        """
+        self._store(key, lambda file: file.write(data))
+
+    def put_file(self, key: str, source: Path) -> None:
+        """
+        Atomically stores a copy of the file at ``source`` under ``key`` without loading it in memory.
+        """
+        def copy(file):
+            with open(source, "rb") as source_file:
+                shutil.copyfileobj(source_file, file)
+
+        self._store(key, copy)
+
+    def _store(self, key: str, write: Callable) -> None:
+        if not self.enabled:
+            return
+
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_path = shared_mkstemp(path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                write(file)
+                size = file.tell()
+            try:
+                previous_size = path.stat().st_size
+            except FileNotFoundError:
+                previous_size = 0
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size - previous_size
+        self._evict()
+
+    def get_or_fetch(self, provider: str, model: str, settings: Optional[dict], text: str,
+                     fetch: Callable[[], bytes]) -> bytes:
+        """
+        Returns the cached payload for a request, calling ``fetch`` and storing its result on a miss.
+        """
+        key = self.key(provider, model, settings, text)
+        data = self.get(key)
+        if data is None:
+            data = fetch()
+            self.put(key, data)
+        return data
+
+    async def aget_or_fetch(self, provider: str, model: str, settings: Optional[dict], text: str,
+                            fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Async counterpart of ``get_or_fetch``, awaiting ``fetch`` on a miss.
+        """
+        key = self.key(provider, model, settings, text)
+        data = self.get(key)
+        if data is None:
+            data = await fetch()
+            self.put(key, data)
+        return data
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._entries():
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        return [path for path in self.cache_dir.glob("*/*") if not path.name.startswith(".tmp-")]
+
+    def _stats(self):
+        # Other worker processes may evict entries at any time; those are skipped
+        stats = []
+        for path in self._entries():
+            try:
+                stats.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        return stats
+
+    def _evict(self) -> None:
+        with self._lock:
+            stats = None
+            if self._size is None:
+                stats = self._stats()
+                self._size = sum(stat.st_size for stat, _ in stats)
+            if self._size <= self.max_bytes:
+                return
+
+            if stats is None:
+                stats = self._stats()
+            # Least recently used first
+            stats.sort(key=lambda item: item[0].st_atime)
+            for stat, path in stats:
+                if self._size <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                self._size -= stat.st_size
@@ -0,0 +1,300 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from scr.tracing.controller import DISABLED, TracingController
+
+if TYPE_CHECKING:
+    import httpx
+    from elevenlabs.client import AsyncElevenLabs, ElevenLabs
+    from google import genai
+
+# Connection setup timings of the last request sent by the current thread
+_connection_timings = threading.local()
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        # Covers DNS resolution and the TCP handshake, which urllib3 performs in one call
+        started = time.perf_counter()
+        connection = super()._new_conn()
+        _connection_timings.connect = time.perf_counter() - started
+        return connection
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _connection_timings.tls = time.perf_counter() - started - getattr(_connection_timings, "connect", 0.0)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class ClientsController:
+    """
+    Owns the network clients shared by the script, photos and audio controllers.
+
+    A single keep-alive ``requests.Session`` is mounted with connection pools sized to
+    the pipeline's concurrency, so repeated searches and downloads against the same
+    host reuse TCP/TLS connections. The Gemini and ElevenLabs SDK clients are built
+    lazily on first use and then reused for the lifetime of the process.
+
+    The ``a``-prefixed methods are the asyncio counterparts. They share one ``httpx.AsyncClient``
+    per event loop, which the async ElevenLabs client also sends its requests through, so a
+    single loop can keep hundreds of requests in flight without a thread per request. Gemini's
+    async interface is the ``aio`` attribute of the shared Gemini client.
+
+    :ivar pool_size: Maximum number of kept-alive connections per host.
+    :type pool_size: int
+    :ivar connect_timeout: Seconds to wait for a connection to be established.
+    :type connect_timeout: float
+    :ivar read_timeout: Seconds to wait for a response once connected.
+    :type read_timeout: float
+    :ivar gemini_base_url: Optional Gemini API host, e.g. the local mock providers.
+    :type gemini_base_url: str
+    :ivar eleven_labs_base_url: Optional ElevenLabs API host, e.g. the local mock providers.
+    :type eleven_labs_base_url: str
+    :ivar max_async_connections: Maximum number of open connections of each event loop's async client.
+    :type max_async_connections: int
+    :ivar tracer: Tracer shared by every controller using these clients; each request is
+        recorded as an ``http`` span with its connect, TLS, time-to-first-byte and transfer times.
+    :type tracer: TracingController
+    """
+
+    def __init__(self, pool_size: int = 8, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 gemini_base_url: Optional[str] = None, eleven_labs_base_url: Optional[str] = None,
+                 tracer: Optional[TracingController] = None, max_async_connections: int = 100):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.gemini_base_url = gemini_base_url
+        self.eleven_labs_base_url = eleven_labs_base_url
+        self.max_async_connections = max_async_connections
+        self.tracer = tracer or DISABLED
+        self._lock = threading.Lock()
+        self._session = None
+        self._genai_client = None
+        self._eleven_labs_client = None
+        # An httpx.AsyncClient is bound to the event loop that first used it
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def timeout(self):
+        return self.connect_timeout, self.read_timeout
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                if self.tracer.enabled:
+                    adapter.poolmanager.pool_classes_by_scheme = {
+                        "http": _TimedHTTPConnectionPool,
+                        "https": _TimedHTTPSConnectionPool,
+                    }
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def get(self, url, **kwargs) -> requests.Response:
+        """
+        Sends a GET request through the shared session, applying the default timeouts.
+
+        :param url: URL to request.
+        :type url: str
+        :return: Response returned by the server.
+        :rtype: requests.Response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if not self.tracer.enabled:
+            return self.session.get(url, **kwargs)
+
+        with self.tracer.span("http", host=urlparse(url).hostname) as span:
+            _connection_timings.__dict__.clear()
+            started = time.perf_counter()
+            response = self.session.get(url, **kwargs)
+            ttfb = response.elapsed.total_seconds()
+            span.set(
+                status=response.status_code,
+                connect=getattr(_connection_timings, "connect", 0.0),
+                tls=getattr(_connection_timings, "tls", 0.0),
+                ttfb=ttfb,
+            )
+            # Streamed bodies are read, timed and counted by the caller
+            if not kwargs.get("stream"):
+                size = len(response.content)
+                span.set(bytes=size, transfer=max(0.0, time.perf_counter() - started - ttfb))
+                self.tracer.count("bytes", size, kind="http")
+            return response
+
+    def genai_client(self) -> "genai.Client":
+        """
+        Returns the shared Gemini client, creating it on first use.
+
+        :raises EnvironmentError: If the `GOOGLE_KEY` environment variable is not set.
+        """
+        with self._lock:
+            if self._genai_client is None:
+                google_key = os.environ.get("GOOGLE_KEY")
+                if not google_key:
+                    raise EnvironmentError("GOOGLE_KEY environment variable is not set")
+                # The SDKs take most of the startup time; they are imported by the first request
+                from google import genai
+                from google.genai import types
+
+                self._genai_client = genai.Client(
+                    api_key=google_key,
+                    http_options=types.HttpOptions(
+                        timeout=int(self.read_timeout * 1000),
+                        base_url=self.gemini_base_url,
+                    ),
+                )
+            return self._genai_client
+
+    def eleven_labs_client(self) -> "ElevenLabs":
+        """
+        Returns the shared ElevenLabs client, creating it on first use.
+
+        :raises EnvironmentError: If the `ELEVEN_LABS_KEY` environment variable is not set.
+        """
+        with self._lock:
+            if self._eleven_labs_client is None:
+                eleven_labs_key = os.environ.get("ELEVEN_LABS_KEY")
+                if not eleven_labs_key:
+                    raise EnvironmentError("ELEVEN_LABS_KEY environment variable is not set")
+                from elevenlabs.client import ElevenLabs
+
+                options = {}
+                if self.eleven_labs_base_url:
+                    options["base_url"] = self.eleven_labs_base_url
+                self._eleven_labs_client = ElevenLabs(
+                    api_key=eleven_labs_key,
+                    timeout=self.read_timeout,
+                    **options,
+                )
+            return self._eleven_labs_client
+
+    def async_session(self) -> "httpx.AsyncClient":
+        """
+        Returns the async HTTP client of the running event loop, creating it on first use.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            if "session" not in clients:
+                import httpx
+
+                clients["session"] = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_connections=self.max_async_connections,
+                                        max_keepalive_connections=self.pool_size),
+                )
+            return clients["session"]
+
+    async def aget(self, url, **kwargs) -> "httpx.Response":
+        """
+        Async counterpart of ``get``: sends a GET request through the running loop's async client
+        and reads the whole body.
+
+        :param url: URL to request.
+        :type url: str
+        :return: Response returned by the server.
+        :rtype: httpx.Response
+        """
+        session = self.async_session()
+        if not self.tracer.enabled:
+            return await session.get(url, **kwargs)
+
+        with self.tracer.span("http", host=urlparse(url).hostname) as span:
+            started = time.perf_counter()
+            async with session.stream("GET", url, **kwargs) as response:
+                ttfb = time.perf_counter() - started
+                await response.aread()
+            size = len(response.content)
+            span.set(status=response.status_code, ttfb=ttfb, bytes=size, transfer=time.perf_counter() - started - ttfb)
+            self.tracer.count("bytes", size, kind="http")
+            return response
+
+    @asynccontextmanager
+    async def astream(self, url, **kwargs) -> AsyncIterator["httpx.Response"]:
+        """
+        Sends a GET request whose body is streamed by the caller, and closes it on exit.
+        """
+        session = self.async_session()
+        with self.tracer.span("http", host=urlparse(url).hostname) as span:
+            started = time.perf_counter()
+            async with session.stream("GET", url, **kwargs) as response:
+                span.set(status=response.status_code, ttfb=time.perf_counter() - started)
+                yield response
+
+    def async_eleven_labs_client(self) -> "AsyncElevenLabs":
+        """
+        Returns the async ElevenLabs client of the running event loop, creating it on first use.
+
+        :raises EnvironmentError: If the `ELEVEN_LABS_KEY` environment variable is not set.
+        """
+        session = self.async_session()
+        with self._lock:
+            clients = self._async_clients[asyncio.get_running_loop()]
+            if "eleven_labs" not in clients:
+                eleven_labs_key = os.environ.get("ELEVEN_LABS_KEY")
+                if not eleven_labs_key:
+                    raise EnvironmentError("ELEVEN_LABS_KEY environment variable is not set")
+                from elevenlabs.client import AsyncElevenLabs
+
+                options = {}
+                if self.eleven_labs_base_url:
+                    options["base_url"] = self.eleven_labs_base_url
+                clients["eleven_labs"] = AsyncElevenLabs(
+                    api_key=eleven_labs_key,
+                    timeout=self.read_timeout,
+                    httpx_client=session,
+                    **options,
+                )
+            return clients["eleven_labs"]
+
+    async def aclose(self) -> None:
+        """
+        Closes the async connections of the running event loop; they are reopened on next use.
+        """
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        if "session" in clients:
+            await clients["session"].aclose()
+
+    def close(self) -> None:
+        """
+        Closes the pooled HTTP connections. SDK clients are dropped and rebuilt on next use.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._genai_client = None
+            self._eleven_labs_client = None
@@ -0,0 +1,375 @@
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from scr.clients.controller import ClientsController
+
+# Largest file accepted from an image host, in bytes
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+# Size of the chunks read from the network and of the file write buffer, in bytes
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class _Cancelled(Exception):
+    pass
+
+
+@dataclass
+class DownloadResult:
+    """
+    Outcome of a completed download.
+
+    :ivar url: URL the file was downloaded from.
+    :type url: str
+    :ivar path: Final location of the file.
+    :type path: pathlib.Path
+    :ivar bytes_written: Size of the file, in bytes.
+    :type bytes_written: int
+    :ivar content_type: Content type reported by the server.
+    :type content_type: str
+    :ivar resumed: Whether the download continued a partial file left by an earlier attempt.
+    :type resumed: bool
+    :ivar failed: Candidate URLs that were tried and failed before this one won.
+    :type failed: list[str]
+    """
+    url: str
+    path: Path
+    bytes_written: int
+    content_type: str
+    resumed: bool = False
+    failed: List[str] = field(default_factory=list)
+
+
+class DownloadController:
+    """
+    Streams remote files to disk in fixed-size chunks.
+
+    Every download is written to a ``.part`` file next to its destination and renamed into
+    place once complete, so memory stays flat regardless of file size and readers never see
+    a partial file. Responses with an unexpected content type or larger than ``max_bytes``
+    are rejected. A part file left behind by a network error is resumed with an HTTP Range
+    request on the next attempt, conditional on the remote file being unchanged: the response's
+    ETag or Last-Modified is kept next to the part file and sent as ``If-Range``, so a server
+    holding a newer file answers with all of it. A part file without one is downloaded again
+    from the start. ``adownload`` and ``adownload_first`` do the same on an event loop.
+
+    :ivar clients: Shared clients layer whose pooled session is used for every request.
+    :type clients: ClientsController
+    :ivar max_bytes: Largest accepted file, in bytes.
+    :type max_bytes: int
+    :ivar allowed_types: Accepted content type prefixes.
+    :type allowed_types: tuple[str]
+    :ivar chunk_size: Size of each network read and of the write buffer, in bytes.
+    :type chunk_size: int
+    :ivar resume: Whether part files from earlier attempts are resumed.
+    :type resume: bool
+    """
+
+    def __init__(self, clients: Optional[ClientsController] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 allowed_types: Tuple[str, ...] = ("image/",), chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 resume: bool = True):
+        self.clients = clients or ClientsController()
+        self.max_bytes = max_bytes
+        self.allowed_types = tuple(allowed_types)
+        self.chunk_size = chunk_size
+        self.resume = resume
+
+    def download(self, url: str, destination: Path) -> DownloadResult:
+        """
+        Downloads ``url`` to ``destination``.
+
+        :param url: URL of the file.
+        :type url: str
+        :param destination: Final path of the file.
+        :type destination: pathlib.Path
+        :return: Details of the completed download.
+        :rtype: DownloadResult
+        :raises ValueError: If the content type is not allowed or the file exceeds ``max_bytes``.
+        :raises requests.exceptions.RequestException: If the request fails.
+        """
+        destination = Path(destination)
+        part_path = self._part_path(url, destination)
+        result = self._fetch(url, part_path, destination)
+        self._publish(part_path, destination)
+        return result
+
+    def download_first(self, urls: List[str], destination: Path, race: int = 1) -> DownloadResult:
+        """
+        Downloads the first valid file from a ranked list of candidate URLs.
+
+        Candidates are tried in order. With ``race`` greater than one, that many candidates
+        are downloaded at the same time and the first one to complete wins right away; the others
+        are cancelled and their partial files removed in the background.
+
+        :param urls: Candidate URLs, best first.
+        :type urls: list[str]
+        :param destination: Final path of the file.
+        :type destination: pathlib.Path
+        :param race: Number of candidates downloaded concurrently.
+        :type race: int
+        :return: Details of the winning download.
+        :rtype: DownloadResult
+        :raises ValueError: If there are no candidates.
+        :raises Exception: The last candidate's error if every candidate failed.
+        """
+        if not urls:
+            raise ValueError("No candidate URLs to download")
+
+        last_error = None
+        failed = []
+        for start in range(0, len(urls), max(race, 1)):
+            batch = urls[start:start + max(race, 1)]
+            try:
+                if len(batch) == 1:
+                    result = self.download(batch[0], destination)
+                else:
+                    result = self._race(batch, Path(destination))
+            except (ValueError, requests.exceptions.RequestException) as error:
+                last_error = error
+                failed.extend(batch)
+                continue
+            result.failed = failed + result.failed
+            return result
+
+        raise last_error
+
+    def _race(self, urls: List[str], destination: Path) -> DownloadResult:
+        cancel = threading.Event()
+        last_error = None
+        failed = []
+
+        executor = ThreadPoolExecutor(max_workers=len(urls))
+        try:
+            futures = {
+                # Run each attempt in a copy of the caller's context so its spans keep their parent
+                executor.submit(contextvars.copy_context().run, self._fetch, url,
+                                self._part_path(url, destination), destination, cancel): url
+                for url in urls
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except _Cancelled:
+                    continue
+                except (ValueError, requests.exceptions.RequestException) as error:
+                    last_error = error
+                    failed.append(futures[future])
+                    continue
+
+                self._publish(self._part_path(futures[future], destination), destination)
+                # Return right away: losers stop at their next chunk, or once their server answers,
+                # and remove their partial files in the background
+                cancel.set()
+                for loser, url in futures.items():
+                    if loser is not future and not loser.cancel():
+                        loser.add_done_callback(self._discard(self._part_path(url, destination)))
+                result.failed = failed
+                return result
+        finally:
+            executor.shutdown(wait=False)
+
+        raise last_error
+
+    @staticmethod
+    def _discard(part_path: Path):
+        def discard(future):
+            # A cancelled fetch removed its part file itself, a failed one keeps it to be resumed
+            if not future.cancelled() and future.exception() is None:
+                DownloadController._remove_part(part_path)
+        return discard
+
+    @staticmethod
+    def _part_path(url: str, destination: Path) -> Path:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        return destination.with_name(f".{destination.name}.{digest}.part")
+
+    @staticmethod
+    def _validator_path(part_path: Path) -> Path:
+        return part_path.with_name(f"{part_path.name}.validator")
+
+    @staticmethod
+    def _remove_part(part_path: Path) -> None:
+        part_path.unlink(missing_ok=True)
+        DownloadController._validator_path(part_path).unlink(missing_ok=True)
+
+    @staticmethod
+    def _publish(part_path: Path, destination: Path) -> None:
+        os.replace(part_path, destination)
+        DownloadController._validator_path(part_path).unlink(missing_ok=True)
+
+    def _resume_headers(self, part_path: Path) -> Tuple[dict, int]:
+        # Returns the headers resuming the part file and its size, or starts over when the part file
+        # cannot be checked against the remote file
+        if not self.resume or not part_path.exists():
+            return {}, 0
+        try:
+            validator = self._validator_path(part_path).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            validator = ""
+        offset = part_path.stat().st_size
+        if not offset or not validator:
+            return {}, 0
+        return {"Range": f"bytes={offset}-", "If-Range": validator}, offset
+
+    def _save_validator(self, response, part_path: Path) -> None:
+        # Only strong ETags may be sent in If-Range; Last-Modified is the fallback
+        etag = response.headers.get("ETag", "")
+        validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified", "")
+        validator_path = self._validator_path(part_path)
+        if validator:
+            validator_path.write_text(validator, encoding="utf-8")
+        else:
+            validator_path.unlink(missing_ok=True)
+
+    def _fetch(self, url: str, part_path: Path, destination: Path,
+               cancel: Optional[threading.Event] = None) -> DownloadResult:
+        with self.clients.tracer.span("download", host=urlparse(url).hostname) as span:
+            part_path.parent.mkdir(parents=True, exist_ok=True)
+            headers, offset = self._resume_headers(part_path)
+
+            if headers:
+                response = self.clients.get(url, stream=True, headers=headers)
+            else:
+                response = self.clients.get(url, stream=True)
+            try:
+                if offset and response.status_code == 416:
+                    # The part file no longer matches the remote file, start over
+                    self._remove_part(part_path)
+                    response.close()
+                    return self._fetch(url, part_path, destination, cancel)
+                resumed = self._accept(url, response, part_path, offset)
+                if not resumed:
+                    # A 200 answers a changed file, or a server ignoring Range; its bytes replace the part file
+                    offset = 0
+                    self._save_validator(response, part_path)
+
+                bytes_written = offset
+                transfer_started = time.perf_counter()
+                try:
+                    with open(part_path, "ab" if resumed else "wb", buffering=self.chunk_size) as file:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            if cancel is not None and cancel.is_set():
+                                raise _Cancelled()
+                            bytes_written += len(chunk)
+                            if bytes_written > self.max_bytes:
+                                raise ValueError(f"{url} is larger than {self.max_bytes} bytes")
+                            file.write(chunk)
+                except (ValueError, _Cancelled):
+                    self._remove_part(part_path)
+                    raise
+            finally:
+                response.close()
+
+            span.set(bytes=bytes_written - offset, transfer=time.perf_counter() - transfer_started, resumed=resumed)
+            self.clients.tracer.count("bytes", bytes_written - offset, kind="download")
+
+        return DownloadResult(
+            url=url,
+            path=destination,
+            bytes_written=bytes_written,
+            content_type=response.headers.get("Content-Type", ""),
+            resumed=resumed,
+        )
+
+    async def adownload(self, url: str, destination: Path) -> DownloadResult:
+        """
+        Async counterpart of ``download``, streaming through the clients' async HTTP client.
+        A cancelled download leaves its part file behind, to be resumed by the next attempt.
+        """
+        destination = Path(destination)
+        part_path = self._part_path(url, destination)
+        result = await self._afetch(url, part_path, destination)
+        self._publish(part_path, destination)
+        return result
+
+    async def adownload_first(self, urls: List[str], destination: Path) -> DownloadResult:
+        """
+        Async counterpart of ``download_first``, trying the candidates one after another.
+
+        :raises ValueError: If there are no candidates.
+        :raises Exception: The last candidate's error if every candidate failed.
+        """
+        import httpx
+
+        if not urls:
+            raise ValueError("No candidate URLs to download")
+
+        last_error = None
+        failed = []
+        for url in urls:
+            try:
+                result = await self.adownload(url, destination)
+            except (ValueError, httpx.HTTPError) as error:
+                last_error = error
+                failed.append(url)
+                continue
+            result.failed = failed
+            return result
+
+        raise last_error
+
+    def _accept(self, url: str, response, part_path: Path, offset: int) -> bool:
+        # Validates the status and headers of a requests or httpx response, and returns whether
+        # it continues the part file
+        response.raise_for_status()
+
+        content_type = response.headers.get("Content-Type", "")
+        if not content_type.startswith(self.allowed_types):
+            self._remove_part(part_path)
+            raise ValueError(f"Unexpected content type '{content_type}' for {url}")
+
+        resumed = bool(offset) and response.status_code == 206
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and (offset if resumed else 0) + int(content_length) > self.max_bytes:
+            self._remove_part(part_path)
+            raise ValueError(f"{url} is larger than {self.max_bytes} bytes")
+        return resumed
+
+    async def _afetch(self, url: str, part_path: Path, destination: Path) -> DownloadResult:
+        with self.clients.tracer.span("download", host=urlparse(url).hostname) as span:
+            part_path.parent.mkdir(parents=True, exist_ok=True)
+            headers, offset = self._resume_headers(part_path)
+
+            async with self.clients.astream(url, headers=headers) as response:
+                if offset and response.status_code == 416:
+                    # The part file no longer matches the remote file, start over
+                    self._remove_part(part_path)
+                    return await self._afetch(url, part_path, destination)
+                resumed = self._accept(url, response, part_path, offset)
+                if not resumed:
+                    # A 200 answers a changed file, or a server ignoring Range; its bytes replace the part file
+                    offset = 0
+                    self._save_validator(response, part_path)
+
+                bytes_written = offset
+                transfer_started = time.perf_counter()
+                try:
+                    with open(part_path, "ab" if resumed else "wb", buffering=self.chunk_size) as file:
+                        async for chunk in response.aiter_bytes(self.chunk_size):
+                            bytes_written += len(chunk)
+                            if bytes_written > self.max_bytes:
+                                raise ValueError(f"{url} is larger than {self.max_bytes} bytes")
+                            file.write(chunk)
+                except ValueError:
+                    self._remove_part(part_path)
+                    raise
+
+            span.set(bytes=bytes_written - offset, transfer=time.perf_counter() - transfer_started, resumed=resumed)
+            self.clients.tracer.count("bytes", bytes_written - offset, kind="download")
+
+        return DownloadResult(
+            url=url,
+            path=destination,
+            bytes_written=bytes_written,
+            content_type=response.headers.get("Content-Type", ""),
+            resumed=resumed,
+        )
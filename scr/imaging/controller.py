@@ -0,0 +1,166 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from scr.manifest.controller import shared_mkstemp
+
+# Target video frame sizes, in pixels
+FRAMES = {
+    "portrait": (1080, 1920),
+    "landscape": (1920, 1080),
+}
+DEFAULT_QUALITY = 85
+# Maximum number of differing dHash bits for two images to count as near-duplicates
+DEFAULT_DUPLICATE_THRESHOLD = 6
+
+
+@dataclass
+class ProcessedImage:
+    """
+    A photo re-encoded to the video frame.
+
+    :ivar path: Location of the processed JPEG.
+    :type path: pathlib.Path
+    :ivar width: Width of the processed image, in pixels.
+    :type width: int
+    :ivar height: Height of the processed image, in pixels.
+    :type height: int
+    :ivar dhash: 64-bit difference hash of the processed image.
+    :type dhash: int
+    :ivar bytes_written: Size of the processed JPEG, in bytes.
+    :type bytes_written: int
+    """
+    path: Path
+    width: int
+    height: int
+    dhash: int
+    bytes_written: int
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Computes the difference hash of ``image``: one bit per horizontally adjacent pixel pair
+    of a ``(hash_size + 1) x hash_size`` grayscale thumbnail.
+    """
+    thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = thumbnail.tobytes()
+    value = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            left = pixels[row * (hash_size + 1) + column]
+            right = pixels[row * (hash_size + 1) + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+def process_image(source: Path, destination: Path, size: Tuple[int, int], quality: int) -> ProcessedImage:
+    """
+    Decodes ``source``, crops and resizes it to fill ``size`` and writes it to ``destination``
+    as a JPEG. Runs in worker processes, so it only takes and returns picklable values.
+    """
+    with Image.open(source) as image:
+        # Let the JPEG decoder downscale by a power of two while decoding large originals
+        image.draft("RGB", size)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+        framed = ImageOps.fit(image, size, Image.LANCZOS)
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    file_descriptor, temp_path = shared_mkstemp(destination.parent, prefix=f".{destination.name}.")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            framed.save(file, "JPEG", quality=quality, optimize=True, progressive=True)
+        os.replace(temp_path, destination)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+    return ProcessedImage(
+        path=destination,
+        width=framed.width,
+        height=framed.height,
+        dhash=dhash(framed),
+        bytes_written=destination.stat().st_size,
+    )
+
+
+class ImagingController:
+    """
+    Post-processes downloaded photos so every one matches the video frame.
+
+    Each photo is decoded, cropped and resized to fill the portrait or landscape frame and
+    re-encoded as a real JPEG at a fixed quality, in place by default. Decoding and encoding
+    are CPU-bound, so the work runs in a process pool shared by all callers. Near-duplicate
+    photos are found by comparing the difference hashes of the processed images.
+
+    :ivar size: Target frame size, in pixels.
+    :type size: tuple[int, int]
+    :ivar quality: JPEG quality of the re-encoded photos.
+    :type quality: int
+    :ivar max_workers: Number of worker processes, or None for one per core.
+    :type max_workers: int
+    :ivar duplicate_threshold: Maximum dHash distance between near-duplicate photos.
+    :type duplicate_threshold: int
+    """
+
+    def __init__(self, frame: str = "portrait", quality: int = DEFAULT_QUALITY, max_workers: Optional[int] = None,
+                 duplicate_threshold: int = DEFAULT_DUPLICATE_THRESHOLD):
+        if frame not in FRAMES:
+            raise ValueError(f"frame must be one of: {', '.join(FRAMES)}")
+
+        self.size = FRAMES[frame]
+        self.quality = quality
+        self.max_workers = max_workers
+        self.duplicate_threshold = duplicate_threshold
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def process(self, source: Path, destination: Optional[Path] = None) -> ProcessedImage:
+        """
+        Processes a single photo in the worker pool, replacing it unless ``destination`` is given.
+        """
+        return self._submit(source, destination).result()
+
+    def process_many(self, sources: List[Path]) -> List[ProcessedImage]:
+        futures = [self._submit(source) for source in sources]
+        return [future.result() for future in futures]
+
+    def find_duplicates(self, images: List[ProcessedImage]) -> List[Tuple[ProcessedImage, ProcessedImage]]:
+        """
+        Returns (duplicate, original) pairs; the first occurrence of a photo is the original.
+        """
+        originals = []
+        duplicates = []
+        for image in images:
+            original = next(
+                (kept for kept in originals if hamming_distance(kept.dhash, image.dhash) <= self.duplicate_threshold),
+                None,
+            )
+            if original is None:
+                originals.append(image)
+            else:
+                duplicates.append((image, original))
+        return duplicates
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _submit(self, source: Path, destination: Optional[Path] = None):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            executor = self._executor
+        return executor.submit(process_image, Path(source), Path(destination or source), self.size, self.quality)
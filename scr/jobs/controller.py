@@ -0,0 +1,625 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from scr.assets.controller import AssetsController
+from scr.audio.controller import VOICE_ID, AudioController, NarrationProfile
+from scr.batch.controller import EpisodeSpec, load_episodes
+from scr.budget.controller import episode_scope
+from scr.cache.controller import CacheController
+from scr.clients.controller import ClientsController
+from scr.imaging.controller import DEFAULT_QUALITY, FRAMES, process_image
+from scr.manifest.controller import episode_slug, file_sha256
+from scr.mastering.controller import MasteringController
+from scr.photos.controller import PhotosController
+from scr.phrases.controller import PhrasesController
+from scr.scheduler.controller import SchedulerController
+from scr.script.controller import ScriptController
+from scr.search.controller import SearchController
+from scr.tracing.controller import DISABLED, TracingController
+from scr.video.controller import VideoController
+
+STATUS_BLOCKED = "blocked"
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Tasks closest to a finished episode are leased first, so episodes complete one after another
+STAGE_PRIORITY = {
+    "script": 0,
+    "photos": 1,
+    "audio": 1,
+    "compose": 2,
+}
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 5.0
+
+
+class PermanentTaskError(ValueError):
+    """
+    Raised by a task that would fail the same way on every retry; the task is failed at once.
+    """
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    episode TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    stage TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (episode, category, stage)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, priority, available_at);
+"""
+
+
+@dataclass
+class Task:
+    """
+    A unit of work leased from the queue.
+
+    :ivar id: Task id.
+    :type id: int
+    :ivar episode: Name of the episode the task belongs to.
+    :type episode: str
+    :ivar category: Category the task builds, empty for episode-wide stages.
+    :type category: str
+    :ivar stage: ``script``, ``photos``, ``audio`` or ``compose``.
+    :type stage: str
+    :ivar payload: Episode settings and the stage input.
+    :type payload: dict
+    :ivar attempts: Number of times the task has been leased, this lease included.
+    :type attempts: int
+    :ivar token: Lease token; results are only accepted while it is still the current lease.
+    :type token: str
+    """
+    id: int
+    episode: str
+    category: str
+    stage: str
+    payload: dict
+    attempts: int
+    token: str
+
+
+class JobsController:
+    """
+    SQLite-backed work queue splitting episode builds into per-category tasks.
+
+    Submitting an episode queues its ``script`` task. Once the script is generated, a ``photos``
+    and an ``audio`` task are queued per category, together with a blocked ``compose`` task that
+    is released when every asset of the episode is done. Workers in any number of processes,
+    possibly on several machines sharing the database file, lease tasks for ``lease_seconds`` and
+    renew the lease while working. A task whose worker dies is leased again once its lease
+    expires; failed tasks are retried with exponential backoff up to ``max_attempts`` times.
+
+    Every state change runs in an immediate transaction, and results are only accepted from the
+    current lease holder, so a worker that lost its lease cannot overwrite a newer attempt. Task
+    outputs are written atomically to per-episode paths, so running a task twice is harmless.
+
+    :ivar path: Location of the SQLite database.
+    :type path: pathlib.Path
+    :ivar lease_seconds: How long a lease lasts without being renewed.
+    :type lease_seconds: float
+    :ivar max_attempts: Number of times a task is tried before it is marked failed.
+    :type max_attempts: int
+    :ivar retry_delay: Delay before the first retry, doubled for every further attempt.
+    :type retry_delay: float
+    :ivar wal: Whether the database uses write-ahead logging; disable it on network file systems,
+        where WAL's shared memory does not work across machines.
+    :type wal: bool
+    """
+
+    def __init__(self, path: Optional[Path] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, retry_delay: float = DEFAULT_RETRY_DELAY,
+                 wal: bool = True, clock: Callable[[], float] = time.time):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+        if path is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            path = project_root / "data" / "jobs.sqlite"
+
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.wal = wal
+        self._clock = clock
+        self._local = threading.local()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def submit(self, episode: EpisodeSpec, audio: bool = True, compose: bool = True) -> bool:
+        """
+        Queues the script task of ``episode``; submitting the same episode again does nothing.
+
+        :return: Whether the episode was newly queued.
+        :rtype: bool
+        :raises ValueError: If ``compose`` is requested without ``audio``.
+        """
+        if compose and not audio:
+            raise ValueError("compose requires the audio stage")
+
+        payload = {**asdict(episode), "audio": audio, "compose": compose}
+        with self._transaction() as connection:
+            return self._insert(connection, episode.name, "", "script", payload, STATUS_PENDING) > 0
+
+    def lease(self, owner: str) -> Optional[Task]:
+        """
+        Leases the next available task for ``owner``, or returns None if nothing is ready.
+        """
+        now = self._clock()
+        with self._transaction() as connection:
+            expired = connection.execute(
+                "SELECT id, episode, stage FROM tasks WHERE status = ? AND lease_expires <= ? AND attempts >= ?",
+                (STATUS_LEASED, now, self.max_attempts),
+            ).fetchall()
+            for task_id, episode, stage in expired:
+                self._set_failed(connection, task_id, episode, stage, "Lease expired on the last attempt", now)
+
+            row = connection.execute(
+                "SELECT id, episode, category, stage, payload, attempts FROM tasks "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (STATUS_PENDING, now, STATUS_LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            task_id, episode, category, stage, payload, attempts = row
+            token = uuid.uuid4().hex
+            connection.execute(
+                "UPDATE tasks SET status = ?, attempts = ?, lease_owner = ?, lease_token = ?, lease_expires = ?, "
+                "updated = ? WHERE id = ?",
+                (STATUS_LEASED, attempts + 1, owner, token, now + self.lease_seconds, now, task_id),
+            )
+        return Task(task_id, episode, category, stage, json.loads(payload), attempts + 1, token)
+
+    def renew(self, task: Task) -> bool:
+        """
+        Extends the lease of ``task``.
+
+        :return: Whether the lease was still held.
+        :rtype: bool
+        """
+        now = self._clock()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_expires = ?, updated = ? WHERE id = ? AND status = ? AND lease_token = ?",
+                (now + self.lease_seconds, now, task.id, STATUS_LEASED, task.token),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task: Task, result: dict) -> bool:
+        """
+        Stores the result of ``task`` and queues the tasks it unlocks.
+
+        :return: Whether the result was accepted, i.e. the lease was still held.
+        :rtype: bool
+        """
+        now = self._clock()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_token = NULL, updated = ? "
+                "WHERE id = ? AND status = ? AND lease_token = ?",
+                (STATUS_DONE, json.dumps(result), now, task.id, STATUS_LEASED, task.token),
+            )
+            if cursor.rowcount != 1:
+                return False
+
+            if task.stage == "script":
+                self._queue_assets(connection, task, result["records"])
+            elif task.stage in ("photos", "audio"):
+                self._release_compose(connection, task.episode, now)
+        return True
+
+    def fail(self, task: Task, error: BaseException, retry: bool = True) -> bool:
+        """
+        Records that ``task`` failed and schedules a retry while attempts remain.
+
+        :return: Whether the failure was accepted, i.e. the lease was still held.
+        :rtype: bool
+        """
+        now = self._clock()
+        message = f"{type(error).__name__}: {error}"
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND status = ? AND lease_token = ?",
+                (task.id, STATUS_LEASED, task.token),
+            ).fetchone()
+            if row is None:
+                return False
+
+            attempts = row[0]
+            if retry and attempts < self.max_attempts:
+                connection.execute(
+                    "UPDATE tasks SET status = ?, available_at = ?, error = ?, lease_token = NULL, updated = ? "
+                    "WHERE id = ?",
+                    (STATUS_PENDING, now + self.retry_delay * 2 ** (attempts - 1), message, now, task.id),
+                )
+            else:
+                self._set_failed(connection, task.id, task.episode, task.stage, message, now)
+        return True
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the number of tasks per status for every episode.
+        """
+        rows = self._connection().execute(
+            "SELECT episode, status, COUNT(*) FROM tasks GROUP BY episode, status ORDER BY episode")
+        summary = {}
+        for episode, status, count in rows:
+            summary.setdefault(episode, {})[status] = count
+        return summary
+
+    def errors(self, episode: str) -> Dict[str, str]:
+        """
+        Returns the last error of every failed or retried task of ``episode``, keyed by ``stage/category``.
+        """
+        rows = self._connection().execute(
+            "SELECT stage, category, error FROM tasks WHERE episode = ? AND error IS NOT NULL ORDER BY id",
+            (episode,))
+        return {f"{stage}/{category}" if category else stage: error for stage, category, error in rows}
+
+    def result(self, episode: str, stage: str, category: str = "") -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT result FROM tasks WHERE episode = ? AND category = ? AND stage = ? AND status = ?",
+            (episode, category, stage, STATUS_DONE),
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def work(self, runner: Callable[[Task], dict], owner: Optional[str] = None, idle_timeout: Optional[float] = None,
+             poll_interval: float = 1.0, stop: Optional[threading.Event] = None) -> int:
+        """
+        Leases and runs tasks until ``stop`` is set, or until no task was available for ``idle_timeout``
+        seconds. The lease is renewed in the background while ``runner`` works on a task.
+
+        :return: Number of tasks run.
+        :rtype: int
+        """
+        owner = owner or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        stop = stop or threading.Event()
+        idle_since = time.monotonic()
+        processed = 0
+        while not stop.is_set():
+            task = self.lease(owner)
+            if task is None:
+                if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            finished = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(task, finished), daemon=True)
+            heartbeat.start()
+            try:
+                result = runner(task)
+            except Exception as error:
+                self.fail(task, error, retry=not isinstance(error, PermanentTaskError))
+            else:
+                self.complete(task, result)
+            finally:
+                finished.set()
+                heartbeat.join()
+            processed += 1
+            idle_since = time.monotonic()
+        return processed
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _heartbeat(self, task: Task, finished: threading.Event) -> None:
+        while not finished.wait(self.lease_seconds / 3):
+            if not self.renew(task):
+                return
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; every change goes through an explicit BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA busy_timeout = 30000")
+            if self.wal:
+                connection.execute("PRAGMA journal_mode = WAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _insert(self, connection, episode: str, category: str, stage: str, payload: dict, status: str) -> int:
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO tasks (episode, category, stage, priority, payload, status, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (episode, category, stage, STAGE_PRIORITY[stage], json.dumps(payload), status, self._clock()),
+        )
+        return cursor.rowcount
+
+    def _queue_assets(self, connection, task: Task, records: List[dict]) -> None:
+        payload = task.payload
+        for record in records:
+            self._insert(connection, task.episode, record["category"], "photos",
+                         {**payload, "query": record["image_query"]}, STATUS_PENDING)
+            if payload.get("audio", True):
+                self._insert(connection, task.episode, record["category"], "audio",
+                             {**payload, "narration": record["narration_script"] or record["image_query"],
+                              "narrations": record.get("narrations") or {}},
+                             STATUS_PENDING)
+        if payload.get("compose", True):
+            self._insert(connection, task.episode, "", "compose",
+                         {**payload, "categories": [record["category"] for record in records]}, STATUS_BLOCKED)
+
+    def _release_compose(self, connection, episode: str, now: float) -> None:
+        remaining = connection.execute(
+            "SELECT COUNT(*) FROM tasks WHERE episode = ? AND stage IN ('photos', 'audio') AND status != ?",
+            (episode, STATUS_DONE),
+        ).fetchone()[0]
+        if remaining == 0:
+            connection.execute(
+                "UPDATE tasks SET status = ?, updated = ? WHERE episode = ? AND stage = 'compose' AND status = ?",
+                (STATUS_PENDING, now, episode, STATUS_BLOCKED),
+            )
+
+    def _set_failed(self, connection, task_id: int, episode: str, stage: str, message: str, now: float) -> None:
+        connection.execute(
+            "UPDATE tasks SET status = ?, error = ?, lease_token = NULL, updated = ? WHERE id = ?",
+            (STATUS_FAILED, message, now, task_id),
+        )
+        if stage in ("photos", "audio"):
+            # The video can no longer be composed; fail it now instead of leaving it blocked forever
+            connection.execute(
+                "UPDATE tasks SET status = ?, error = ?, updated = ? WHERE episode = ? AND stage = 'compose' "
+                "AND status = ?",
+                (STATUS_FAILED, f"Missing asset: {message}", now, episode, STATUS_BLOCKED),
+            )
+
+
+class TaskRunner:
+    """
+    Runs queued tasks with controllers shared by every task of a worker process.
+
+    Assets are written under ``data_dir`` in one directory per episode, exactly where the batch
+    CLI puts them, so queued and batch builds of the same episode reuse each other's files.
+    Photos are post-processed to the video frame in the worker itself: the queue already runs
+    one task per worker, so CPU-bound work scales with the number of worker processes.
+
+    :ivar clients: Network clients of the worker process.
+    :type clients: ClientsController
+    :ivar cache: Optional response cache.
+    :type cache: CacheController
+    :ivar scheduler: Optional rate limiter.
+    :type scheduler: SchedulerController
+    :ivar search: Optional multi-provider image search.
+    :type search: SearchController
+    :ivar data_dir: Root of the ``photos``, ``audios`` and ``videos`` directories.
+    :type data_dir: pathlib.Path
+    :ivar phrases: Optional phrase store; workers sharing its directory reuse each other's sentences.
+    :type phrases: PhrasesController
+    :ivar assets: Optional asset library; its index is shared by every worker, like the job database.
+    :type assets: AssetsController
+    """
+
+    def __init__(self, clients: ClientsController, cache: Optional[CacheController] = None,
+                 scheduler: Optional[SchedulerController] = None, search: Optional[SearchController] = None,
+                 data_dir: Optional[Path] = None, endpoints: Optional[Dict[str, str]] = None,
+                 tracer: Optional[TracingController] = None, phrases: Optional[PhrasesController] = None,
+                 assets: Optional[AssetsController] = None):
+        if data_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            data_dir = project_root / "data"
+
+        self.clients = clients
+        self.cache = cache
+        self.scheduler = scheduler
+        self.search = search
+        self.data_dir = Path(data_dir)
+        self.endpoints = endpoints
+        self.tracer = tracer or DISABLED
+        self.phrases = phrases
+        self.assets = assets
+
+    def __call__(self, task: Task) -> dict:
+        with self.tracer.span("task", episode=task.episode, category=task.category or None, stage=task.stage,
+                              attempt=task.attempts), episode_scope(task.episode):
+            return getattr(self, f"_run_{task.stage}")(task)
+
+    def _directory(self, kind: str, task: Task) -> Path:
+        return self.data_dir / kind / episode_slug(task.episode)
+
+    @staticmethod
+    def _profiles(task: Task) -> List[NarrationProfile]:
+        return [NarrationProfile(**profile) for profile in task.payload.get("profiles") or []]
+
+    def _run_script(self, task: Task) -> dict:
+        # Localized narrations come from the same script request as the original one
+        languages = [profile.language for profile in self._profiles(task) if profile.language]
+        records = ScriptController(self.clients, self.cache, self.scheduler, languages=languages).generate_records(
+            task.payload["categories"])
+        return {"records": [asdict(record) for record in records]}
+
+    def _run_photos(self, task: Task) -> dict:
+        photos = PhotosController(
+            self.clients, self.cache, photos_dir=self._directory("photos", task), scheduler=self.scheduler,
+            search=self.search, endpoints=self.endpoints, search_providers=task.payload.get("providers"),
+            assets=self.assets, frame=task.payload.get("frame", "portrait"),
+        )
+        download = photos.generate_photos(task.payload["query"], task.category)
+        if download is None:
+            raise PermanentTaskError(f"No image results for: {task.payload['query']}")
+        image = process_image(download.path, download.path, FRAMES[task.payload.get("frame", "portrait")],
+                              DEFAULT_QUALITY)
+        return {"path": str(image.path), "url": download.url, "sha256": file_sha256(image.path),
+                "dhash": image.dhash}
+
+    def _run_audio(self, task: Task) -> dict:
+        profiles = self._profiles(task)
+        audio = AudioController(
+            self.clients, self.cache, audio_dir=self._directory("audios", task), scheduler=self.scheduler,
+            voice_id=task.payload.get("voice") or VOICE_ID, phrases=self.phrases,
+            profile=profiles[0] if profiles else None,
+        )
+        narrations = task.payload.get("narrations") or {}
+        result = {}
+        for profile in profiles or [audio.profile]:
+            narration = narrations.get(profile.language) or task.payload["narration"]
+            synthesis = audio.synthesize_to_file(narration, task.category, profile=profile)
+            clip = {"path": str(synthesis.path), "sha256": file_sha256(synthesis.path)}
+            if profile == audio.profile:
+                result.update(clip)
+            else:
+                result.setdefault("profiles", {})[profile.name] = clip
+        return result
+
+    def _run_compose(self, task: Task) -> dict:
+        mastering = MasteringController(audio_dir=self._directory("audios", task))
+        video = VideoController(
+            photos_dir=self._directory("photos", task),
+            audio_dir=self._directory("audios", task),
+            videos_dir=self.data_dir / "videos",
+            frame=task.payload.get("frame", "portrait"),
+            mastering=mastering,
+        )
+        try:
+            path = video.compose(task.payload["categories"], output_name=episode_slug(task.episode))
+        finally:
+            mastering.close()
+        return {"path": str(path)}
+
+
+def _worker_process(database: Path, data_dir: Optional[Path], threads: int, idle_timeout: Optional[float],
+                    wal: bool) -> None:
+    from scr.main import build_assets, build_phrases, build_search, build_shared_controllers, search_endpoints
+
+    tracer = TracingController.from_environment()
+    clients, cache, scheduler = build_shared_controllers(max(threads, 1) * 2, tracer)
+    endpoints = search_endpoints()
+    search = PhotosController(clients, cache, scheduler=scheduler, endpoints=endpoints).register_providers(
+        build_search(scheduler))
+    runner = TaskRunner(clients, cache, scheduler, search, data_dir=data_dir, endpoints=endpoints, tracer=tracer,
+                        phrases=build_phrases(tracer), assets=build_assets(tracer))
+
+    def work():
+        queue = JobsController(database, wal=wal)
+        try:
+            queue.work(runner, idle_timeout=idle_timeout)
+        finally:
+            queue.close()
+
+    # Extra threads keep a worker busy while its other tasks wait on the network
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    search.close()
+    tracer.close()
+
+
+def run_workers(database: Path, processes: int, threads: int = 1, data_dir: Optional[Path] = None,
+                idle_timeout: Optional[float] = None, wal: bool = True) -> int:
+    """
+    Starts ``processes`` worker processes, each running ``threads`` task loops, and waits for them.
+
+    :return: Number of worker processes that exited with an error.
+    :rtype: int
+    """
+    workers = [
+        multiprocessing.Process(target=_worker_process, args=(database, data_dir, threads, idle_timeout, wal))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(worker.exitcode != 0 for worker in workers)
+
+
+def main(argv=None) -> int:
+    """
+    Submits episodes to the work queue, runs workers on this machine or prints the queue status.
+    """
+    from scr.main import data_path
+
+    parser = argparse.ArgumentParser(description="Build trivia episodes through a shared SQLite work queue.")
+    parser.add_argument("--db", type=Path, default=data_path("jobs.sqlite"), help="Queue database.")
+    parser.add_argument("--no-wal", action="store_true", help="Use rollback journaling, for network file systems.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue every episode of a CSV, JSON-lines or YAML file.")
+    submit.add_argument("episodes", type=Path)
+    submit.add_argument("--no-audio", action="store_true", help="Skip the audio and compose stages.")
+    submit.add_argument("--no-compose", action="store_true", help="Skip the video compose stage.")
+
+    work = commands.add_parser("work", help="Run worker processes until the queue is idle.")
+    work.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    work.add_argument("--threads", type=int, default=2, help="Task loops per worker process.")
+    work.add_argument("--idle-timeout", type=float, default=30.0,
+                      help="Seconds without available tasks before a worker exits.")
+
+    commands.add_parser("status", help="Print the number of tasks per status for every episode.")
+    args = parser.parse_args(argv)
+
+    queue = JobsController(args.db, wal=not args.no_wal)
+    if args.command == "submit":
+        episodes = load_episodes(args.episodes)
+        queued = sum(
+            queue.submit(episode, audio=not args.no_audio, compose=not (args.no_audio or args.no_compose))
+            for episode in episodes
+        )
+        print(f"Queued {queued}/{len(episodes)} episodes in {queue.path}")
+        return 0
+
+    if args.command == "work":
+        return 1 if run_workers(queue.path, args.processes, args.threads, data_path(""), args.idle_timeout,
+                                wal=not args.no_wal) else 0
+
+    failed = False
+    for episode, counts in queue.status().items():
+        failed = failed or STATUS_FAILED in counts
+        print(f"{episode}: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+        for task, error in queue.errors(episode).items():
+            print(f"  {task}: {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
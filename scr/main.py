@@ -1,43 +1,204 @@
-from operator import index
+import os
+from pathlib import Path
+from typing import List, Optional
 
-from scr.audio.controller import AudioController
-from scr.photos.controller import PhotosController
+from scr.assets.controller import AssetsController
+from scr.audio.controller import AudioController, NarrationProfile, parse_profiles
+from scr.budget.controller import BudgetController, episode_scope
+from scr.bundle.controller import BundleController
+from scr.cache.controller import CacheController
+from scr.clients.controller import ClientsController
+from scr.imaging.controller import ImagingController
+from scr.manifest.controller import ManifestController
+from scr.photos.controller import ENDPOINTS, PhotosController
+from scr.phrases.controller import PhrasesController
+from scr.pipeline.controller import PipelineController
+from scr.scheduler.controller import SchedulerController
 from scr.script.controller import ScriptController
+from scr.search.controller import SearchController
+from scr.tracing.controller import TracingController
+
+
+def data_path(name: str) -> Optional[Path]:
+    """
+    Returns ``DATA_DIR/name`` when ``DATA_DIR`` relocates the generated files, e.g. to keep
+    benchmark runs out of data/, and None to let each controller use its default directory.
+    """
+    data_dir = os.environ.get("DATA_DIR")
+    return Path(data_dir) / name if data_dir else None
+
+
+def search_endpoints() -> dict:
+    """
+    Returns the search endpoints overridden through ``{PROVIDER}_URL`` environment variables.
+    """
+    return {
+        provider: os.environ[f"{provider.upper()}_URL"]
+        for provider in ENDPOINTS
+        if os.environ.get(f"{provider.upper()}_URL")
+    }
+
+
+def build_shared_controllers(max_workers: int, tracer: TracingController):
+    """
+    Builds the controllers shared by every episode: one pool of connections and SDK clients,
+    the response cache and the provider rate limits.
+
+    The scheduler also accounts for provider spend, see ``build_budget``.
+
+    :return: The clients, cache and scheduler controllers; the scheduler is None with ``SCHEDULER_BYPASS``.
+    :rtype: tuple
+    """
+    clients_controller = ClientsController(
+        pool_size=max_workers,
+        tracer=tracer,
+        gemini_base_url=os.environ.get("GEMINI_BASE_URL"),
+        eleven_labs_base_url=os.environ.get("ELEVEN_LABS_BASE_URL"),
+    )
+    cache_controller = CacheController(
+        cache_dir=data_path("cache"),
+        enabled=not os.environ.get("CACHE_BYPASS"),
+        refresh=bool(os.environ.get("CACHE_REFRESH")),
+        tracer=tracer,
+    )
+    scheduler_controller = None
+    if not os.environ.get("SCHEDULER_BYPASS"):
+        scheduler_controller = SchedulerController(quota_path=data_path("quota.json"), tracer=tracer,
+                                                   budget=build_budget(tracer))
+    return clients_controller, cache_controller, scheduler_controller
+
+
+def build_budget(tracer: TracingController) -> Optional[BudgetController]:
+    """
+    Returns the spend accounting shared by every episode, or None with ``BUDGET_BYPASS``.
+    ``MONTHLY_BUDGET`` caps the spend per calendar month, in US dollars; without it, spend is only accounted.
+    """
+    if os.environ.get("BUDGET_BYPASS"):
+        return None
+    monthly_budget = os.environ.get("MONTHLY_BUDGET")
+    return BudgetController(
+        monthly_budget=float(monthly_budget) if monthly_budget else None,
+        ledger_path=data_path("budget.json"),
+        tracer=tracer,
+    )
+
+
+def build_search(scheduler: Optional[SchedulerController]) -> SearchController:
+    """
+    Returns the multi-provider image search, favouring cheaper providers once the scheduler's budget runs low.
+    """
+    return SearchController(budget=scheduler.budget if scheduler is not None else None)
+
+
+def build_phrases(tracer: TracingController) -> Optional[PhrasesController]:
+    """
+    Returns the phrase store reusing synthesized sentences when ``TTS_PHRASES`` is set, otherwise None.
+    """
+    if not os.environ.get("TTS_PHRASES"):
+        return None
+    return PhrasesController(phrases_dir=data_path("phrases"), tracer=tracer)
+
+
+def build_assets(tracer: TracingController) -> Optional[AssetsController]:
+    """
+    Returns the asset library reusing photos across episodes, or None with ``ASSETS_BYPASS``.
+    """
+    if os.environ.get("ASSETS_BYPASS"):
+        return None
+    return AssetsController(path=data_path("assets.sqlite"), library_dir=data_path("library"), tracer=tracer)
+
+
+def build_profiles() -> Optional[List[NarrationProfile]]:
+    """
+    Returns the narration profiles listed in ``NARRATION_PROFILES`` as ``name[:language][=voice_id]``,
+    e.g. ``es,en:en``, or None to narrate with the default voice only.
+    """
+    return parse_profiles(os.environ.get("NARRATION_PROFILES", "")) or None
+
+
+def build_bundle(episode: str, tracer: TracingController) -> Optional[BundleController]:
+    """
+    Returns the single-file bundle the episode's assets are appended to when ``EPISODE_BUNDLE`` is set,
+    otherwise None.
+    """
+    if not os.environ.get("EPISODE_BUNDLE"):
+        return None
+    return BundleController(episode, bundles_dir=data_path("bundles"), tracer=tracer)
 
 
 def main():
     """
     Main function to generate script content and convert it into audio.
     """
-    # Instantiate controllers
-    script_controller = ScriptController()
-    audio_controller = AudioController()
-    photos_controller = PhotosController()
+    max_workers = int(os.environ.get("PIPELINE_MAX_WORKERS", "8"))
 
-    # Prompt for content generation
-    user_input = input("Enter a topic (e.g., drinks, dishes, places): ")
-    prompt = f"""
-      I need you to list Google Image search prompts for a trivia game, NO ADDED COMMENTS. Please use the following template for each prompt: [Category] [Specific Subject/Object/Action] [Visual Descriptor] [Optional: Time Period/Style/Modifier] photo/image.
+    # TRACE_PATH appends spans to a JSON-lines file, METRICS_PORT serves Prometheus metrics
+    tracer = TracingController.from_environment()
 
-For each of the following trivia categories, provide one Google Image search prompt using the template:
+    # Instantiate controllers sharing one pool of connections, SDK clients, response cache and rate limits
+    clients_controller, cache_controller, scheduler_controller = build_shared_controllers(max_workers, tracer)
+    # Every narration profile is rendered from the one script, localized narrations included
+    profiles = build_profiles()
+    script_controller = ScriptController(
+        clients_controller,
+        cache_controller,
+        scheduler_controller,
+        languages=[profile.language for profile in profiles or [] if profile.language],
+    )
+    audio_controller = AudioController(
+        clients_controller,
+        cache_controller,
+        audio_dir=data_path("audios"),
+        scheduler=scheduler_controller,
+        phrases=build_phrases(tracer),
+        profile=profiles[0] if profiles else None,
+    )
+    photos_controller = PhotosController(
+        clients_controller,
+        cache_controller,
+        photos_dir=data_path("photos"),
+        scheduler=scheduler_controller,
+        endpoints=search_endpoints(),
+        assets=build_assets(tracer),
+        frame=os.environ.get("VIDEO_FRAME", "portrait"),
+    )
+    # Route photo searches across every configured provider, hedging slow ones
+    photos_controller.search = photos_controller.register_providers(build_search(scheduler_controller))
 
-{user_input.replace(',', '\n')}
-
-Please fill in each part of the template with relevant and specific terms for each category.
-      """
-    generated_text = script_controller.generate_content(prompt)
+    # Stream the image query and narration of every category from a few structured requests
+    user_input = input("Enter a topic (e.g., drinks, dishes, places): ")
+    categories = [category.strip() for category in user_input.split(',') if category.strip()]
+    records = script_controller.stream_records(categories)
 
-    # Split the generated text into individual options
-    options = generated_text.split("\n")
+    # Fetch the assets of every category concurrently, starting with the first record to arrive
+    pipeline_controller = PipelineController(
+        photos_controller=photos_controller,
+        audio_controller=audio_controller if os.environ.get("PIPELINE_AUDIO") else None,
+        max_workers=max_workers,
+        manifest=ManifestController(",".join(categories), manifests_dir=data_path("manifests")),
+        imaging_controller=ImagingController(frame=os.environ.get("VIDEO_FRAME", "portrait")),
+        tracer=tracer,
+        bundle=build_bundle(",".join(categories), tracer),
+        profiles=profiles,
+    )
+    # Attribute the episode's provider spend to it, across the pipeline's worker threads
+    with episode_scope(",".join(categories)):
+        results = pipeline_controller.run(records)
+    pipeline_controller.imaging_controller.close()
+    if pipeline_controller.bundle is not None:
+        pipeline_controller.bundle.close()
+    photos_controller.search.close()
+    tracer.close()
 
-    # Remove asterisk (*) at the beginning of each option, strip whitespace, and filter out empty values
-    options_array = [option.lstrip("*").strip() for option in options if option.strip()]
+    for result in results:
+        for stage, error in result.errors.items():
+            print(f"{result.category}: {stage} failed: {error}")
+    if scheduler_controller is not None and scheduler_controller.budget is not None:
+        budget = scheduler_controller.budget
+        print(f"Spent ${budget.spent(episode=','.join(categories)):.4f} on this episode, "
+              f"${budget.spent():.4f} this month")
 
-    # Generate audio from the content and Save the audio to a file
-    for index, option in enumerate(options_array):
-        # audio_stream = audio_controller.generate_audio(option)
-        # audio_controller.save_audio_to_file(audio_stream, option)
-        photos_controller.generate_photos(option, user_input.split(',')[index])
+    return results
 
 
 if __name__ == "__main__":
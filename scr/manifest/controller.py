@@ -0,0 +1,146 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+STATUS_COMPLETE = "complete"
+STATUS_FAILED = "failed"
+
+
+def _umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Mode of a new file under the umask, read once while the process starts, as changing it is process-wide
+FILE_MODE = 0o666 & ~_umask()
+
+
+def shared_mkstemp(directory: Path, prefix: str, suffix: str = "") -> Tuple[int, str]:
+    """
+    Creates a temporary file to be renamed over a published file, like ``tempfile.mkstemp``. The
+    temporary file gets the mode of any new file instead of being readable by its owner only, so
+    workers running as other users on a shared file system can read what it is renamed to.
+    """
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=suffix)
+    os.fchmod(file_descriptor, FILE_MODE)
+    return file_descriptor, temp_path
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def episode_slug(episode: str) -> str:
+    """
+    Returns a file-system-safe name for an episode, shortened but still unique for long category lists.
+    """
+    slug = re.sub(r"[^\w-]+", "_", episode.strip().casefold()).strip("_")
+    if len(slug) > 80:
+        slug = f"{slug[:60]}_{hashlib.sha1(episode.encode('utf-8')).hexdigest()[:12]}"
+    return slug
+
+
+class ManifestController:
+    """
+    Tracks the assets of an episode so interrupted or repeated builds only redo what is missing.
+
+    The manifest is a JSON file under ``data/manifests`` holding one entry per category and
+    stage with the input it was built from, the chosen asset URL, the file path, its SHA-256
+    and a status. An asset is considered complete only if its entry was built from the same
+    input, its file still exists and the file's hash still matches. The file is rewritten
+    atomically after every update, so a crash never loses completed entries.
+
+    :ivar path: Location of the manifest file.
+    :type path: pathlib.Path
+    :ivar verify_hash: Whether completed files are re-hashed before being trusted.
+    :type verify_hash: bool
+    """
+
+    def __init__(self, episode: str, manifests_dir: Optional[Path] = None, verify_hash: bool = True):
+        if not episode or not episode.strip():
+            raise ValueError("episode cannot be empty")
+
+        if manifests_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            manifests_dir = project_root / "data" / "manifests"
+
+        self.path = Path(manifests_dir) / f"{episode_slug(episode)}.json"
+        self.verify_hash = verify_hash
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def entry(self, category: str, stage: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(self._key(category, stage))
+            return dict(entry) if entry is not None else None
+
+    def is_complete(self, category: str, stage: str, query: str) -> bool:
+        """
+        Returns whether the asset of ``category`` for ``stage`` was built from ``query`` and is still valid on disk.
+        """
+        entry = self.entry(category, stage)
+        if entry is None or entry.get("status") != STATUS_COMPLETE or entry.get("query") != query:
+            return False
+
+        path = Path(entry["path"])
+        if not path.is_file():
+            return False
+        return not self.verify_hash or file_sha256(path) == entry.get("sha256")
+
+    def record_complete(self, category: str, stage: str, query: str, path: Path, url: Optional[str] = None) -> None:
+        self._record(category, stage, {
+            "query": query,
+            "url": url,
+            "path": str(path),
+            "sha256": file_sha256(path),
+            "status": STATUS_COMPLETE,
+        })
+
+    def record_failed(self, category: str, stage: str, query: str, error: Exception) -> None:
+        self._record(category, stage, {
+            "query": query,
+            "status": STATUS_FAILED,
+            "error": str(error),
+        })
+
+    @staticmethod
+    def _key(category: str, stage: str) -> str:
+        return f"{stage}/{category}"
+
+    def _record(self, category: str, stage: str, entry: dict) -> None:
+        entry = {"category": category, "stage": stage, **entry,
+                 "updated": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        with self._lock:
+            self._entries[self._key(category, stage)] = entry
+            self._save()
+
+    def _load(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        return {self._key(entry["category"], entry["stage"]): entry for entry in data.get("assets", [])}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"assets": list(self._entries.values())}
+        file_descriptor, temp_path = shared_mkstemp(self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,403 @@
+import os
+import subprocess
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from scr.manifest.controller import shared_mkstemp
+
+# EBU R128 programme loudness, in LUFS
+DEFAULT_TARGET_LOUDNESS = -23.0
+# Maximum sample peak after normalization, in dBFS
+DEFAULT_PEAK_CEILING = -1.0
+DEFAULT_SILENCE_THRESHOLD = -50.0
+DEFAULT_SAMPLE_RATE = 44100
+# ITU-R BS.1770 K-weighting: a high-shelf pre-filter and the RLB high-pass, specified at 48 kHz
+K_WEIGHTING_RATE = 48000
+K_WEIGHTING_FILTERS = (
+    ((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585)),
+    ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621)),
+)
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+# Red Book CD frames per second, the time base of cue sheet indexes
+CUE_FRAMES_PER_SECOND = 75
+
+
+@dataclass
+class MasteredClip:
+    """
+    A narration clip trimmed and normalized to the target loudness.
+
+    :ivar name: Clip name, the category or ``intro``.
+    :type name: str
+    :ivar path: Location of the processed WAV file.
+    :type path: pathlib.Path
+    :ivar duration: Length of the processed clip, in seconds.
+    :type duration: float
+    :ivar loudness: Integrated loudness of the original clip, in LUFS.
+    :type loudness: float
+    :ivar gain: Gain applied to reach the target loudness, in dB.
+    :type gain: float
+    :ivar trimmed: Leading and trailing silence removed, in seconds.
+    :type trimmed: tuple[float, float]
+    """
+    name: str
+    path: Path
+    duration: float
+    loudness: float
+    gain: float
+    trimmed: Tuple[float, float]
+
+
+@dataclass
+class Cue:
+    """
+    Position of a clip within the episode track.
+
+    :ivar name: Clip name.
+    :type name: str
+    :ivar start: Offset of the clip from the start of the track, in seconds.
+    :type start: float
+    :ivar duration: Length of the clip, in seconds.
+    :type duration: float
+    """
+    name: str
+    start: float
+    duration: float
+
+
+@dataclass
+class EpisodeTrack:
+    """
+    Every clip of an episode joined into a single track.
+
+    :ivar path: Location of the episode WAV file.
+    :type path: pathlib.Path
+    :ivar cue_sheet: Location of the cue sheet listing each clip's offset.
+    :type cue_sheet: pathlib.Path
+    :ivar cues: Offset of each clip, in track order.
+    :type cues: list[Cue]
+    :ivar duration: Length of the track, in seconds.
+    :type duration: float
+    :ivar clips: The processed clips.
+    :type clips: list[MasteredClip]
+    """
+    path: Path
+    cue_sheet: Path
+    cues: List[Cue]
+    duration: float
+    clips: List[MasteredClip]
+
+
+def k_weighting(frequencies: np.ndarray) -> np.ndarray:
+    """
+    Returns the magnitude response of the K-weighting filter at ``frequencies``, in Hz.
+    """
+    z = np.exp(-2j * np.pi * frequencies / K_WEIGHTING_RATE)
+    response = np.ones_like(z)
+    for b, a in K_WEIGHTING_FILTERS:
+        response *= (b[0] + b[1] * z + b[2] * z ** 2) / (a[0] + a[1] * z + a[2] * z ** 2)
+    return np.abs(response)
+
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    Measures the gated integrated loudness of ``samples`` (channels x frames) per ITU-R BS.1770,
+    in LUFS. K-weighting is applied in the frequency domain and the 400 ms blocks with 75% overlap
+    are summed from a cumulative sum, so the whole measurement is vectorized.
+
+    :return: The loudness, or ``-inf`` for silence.
+    :rtype: float
+    """
+    frames = samples.shape[-1]
+    spectrum = np.fft.rfft(samples, axis=-1)
+    spectrum *= k_weighting(np.fft.rfftfreq(frames, 1 / sample_rate))
+    weighted = np.fft.irfft(spectrum, frames, axis=-1)
+
+    # Channel weights are 1 for mono and stereo, so the block power is the mean of the summed squares
+    energy = np.concatenate(([0.0], np.cumsum(np.square(weighted).sum(axis=0))))
+    block = min(frames, int(0.4 * sample_rate))
+    step = max(1, int(0.1 * sample_rate))
+    starts = np.arange(0, frames - block + 1, step)
+    powers = (energy[starts + block] - energy[starts]) / max(block, 1)
+
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(powers)
+    powers = powers[loudness > ABSOLUTE_GATE]
+    if not powers.size:
+        return float("-inf")
+    relative_gate = -0.691 + 10 * np.log10(powers.mean()) + RELATIVE_GATE
+    powers = powers[-0.691 + 10 * np.log10(powers) > relative_gate]
+    return float(-0.691 + 10 * np.log10(powers.mean()))
+
+
+def silence_bounds(samples: np.ndarray, sample_rate: int, threshold: float = DEFAULT_SILENCE_THRESHOLD,
+                   padding: float = 0.05) -> Tuple[int, int]:
+    """
+    Returns the first and last frame of ``samples`` worth keeping: 10 ms windows louder than
+    ``threshold`` dBFS RMS on any channel, widened by ``padding`` seconds on both sides.
+    """
+    window = max(1, int(0.01 * sample_rate))
+    frames = samples.shape[-1]
+    windows = frames // window
+    if windows == 0:
+        return 0, frames
+    blocks = samples[:, :windows * window].reshape(samples.shape[0], windows, window)
+    rms = np.sqrt(np.square(blocks).mean(axis=-1)).max(axis=0)
+    loud = np.flatnonzero(rms > 10 ** (threshold / 20))
+    if not loud.size:
+        return 0, 0
+    pad = int(padding * sample_rate)
+    return max(0, loud[0] * window - pad), min(frames, (loud[-1] + 1) * window + pad)
+
+
+def read_audio(path: Path, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1,
+               ffmpeg: str = "ffmpeg") -> np.ndarray:
+    """
+    Decodes ``path`` to float samples (channels x frames) at ``sample_rate``. 16-bit WAV files in
+    that format are read directly; anything else, such as the ElevenLabs MP3s, is decoded by ffmpeg.
+
+    :raises EnvironmentError: If ffmpeg is needed but not installed.
+    """
+    path = Path(path)
+    if path.suffix.casefold() == ".wav":
+        with wave.open(str(path), "rb") as file:
+            if (file.getframerate(), file.getnchannels(), file.getsampwidth()) == (sample_rate, channels, 2):
+                data = np.frombuffer(file.readframes(file.getnframes()), dtype="<i2")
+                return (data.reshape(-1, channels).T / 32768.0).astype(np.float32)
+
+    command = [ffmpeg, "-v", "error", "-i", str(path), "-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate),
+               "-"]
+    try:
+        completed = subprocess.run(command, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise EnvironmentError(f"{ffmpeg} is not installed")
+    except subprocess.CalledProcessError as error:
+        raise ValueError(f"Cannot decode {path.name}: {error.stderr.decode('utf-8', 'replace').strip()}")
+    return np.frombuffer(completed.stdout, dtype="<f4").reshape(-1, channels).T.copy()
+
+
+def write_wav(path: Path, samples: np.ndarray, sample_rate: int) -> None:
+    """
+    Atomically writes float ``samples`` (channels x frames) as a 16-bit WAV file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pcm = (np.clip(samples, -1.0, 32767 / 32768) * 32768).round().astype("<i2")
+    file_descriptor, temp_path = shared_mkstemp(path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(file_descriptor, "wb") as raw, wave.open(raw, "wb") as file:
+            file.setnchannels(samples.shape[0])
+            file.setsampwidth(2)
+            file.setframerate(sample_rate)
+            file.writeframes(pcm.T.tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def process_clip(source: Path, destination: Path, sample_rate: int, channels: int, target_loudness: float,
+                 peak_ceiling: float, silence_threshold: float, padding: float, ffmpeg: str) -> MasteredClip:
+    """
+    Decodes ``source``, trims its leading and trailing silence, normalizes it to ``target_loudness``
+    without letting the sample peak exceed ``peak_ceiling`` and writes it to ``destination``.
+    Runs in worker processes, so it only takes and returns picklable values.
+
+    :raises ValueError: If the clip is silent.
+    """
+    samples = read_audio(source, sample_rate, channels, ffmpeg)
+    start, end = silence_bounds(samples, sample_rate, silence_threshold, padding)
+    if end <= start:
+        raise ValueError(f"{Path(source).name} is silent")
+    trimmed = (start / sample_rate, (samples.shape[-1] - end) / sample_rate)
+    samples = samples[:, start:end]
+
+    loudness = integrated_loudness(samples, sample_rate)
+    gain = target_loudness - loudness
+    peak = float(np.abs(samples).max())
+    gain = min(gain, peak_ceiling - 20 * np.log10(peak))
+    samples = samples * np.float32(10 ** (gain / 20))
+
+    write_wav(destination, samples, sample_rate)
+    return MasteredClip(
+        name=Path(source).stem,
+        path=Path(destination),
+        duration=samples.shape[-1] / sample_rate,
+        loudness=loudness,
+        gain=float(gain),
+        trimmed=trimmed,
+    )
+
+
+def cue_time(seconds: float) -> str:
+    frames = round(seconds * CUE_FRAMES_PER_SECOND)
+    minutes, frames = divmod(frames, 60 * CUE_FRAMES_PER_SECOND)
+    seconds, frames = divmod(frames, CUE_FRAMES_PER_SECOND)
+    return f"{minutes:02d}:{seconds:02d}:{frames:02d}"
+
+
+class MasteringController:
+    """
+    Post-processes the narration clips of an episode and joins them into a single track.
+
+    Every clip is decoded, trimmed of leading and trailing silence and normalized to the EBU R128
+    target loudness, with its sample peak kept under a ceiling. The work is CPU-bound NumPy code,
+    so clips are processed in a process pool shared by all callers. The processed clips are then
+    concatenated, with a short gap between them, into one episode WAV, alongside a cue sheet of
+    each clip's offset. Everything runs offline on the files in ``audio_dir``.
+
+    :ivar audio_dir: Directory holding ``{category}.mp3`` clips and ``intro.mp3``.
+    :type audio_dir: pathlib.Path
+    :ivar output_dir: Directory the processed clips, episode track and cue sheet are written to.
+    :type output_dir: pathlib.Path
+    :ivar target_loudness: Integrated loudness of every clip after normalization, in LUFS.
+    :type target_loudness: float
+    :ivar peak_ceiling: Maximum sample peak after normalization, in dBFS.
+    :type peak_ceiling: float
+    :ivar silence_threshold: Level under which leading and trailing audio is trimmed, in dBFS.
+    :type silence_threshold: float
+    :ivar padding: Silence kept around the trimmed audio, in seconds.
+    :type padding: float
+    :ivar gap: Silence inserted between clips in the episode track, in seconds.
+    :type gap: float
+    :ivar sample_rate: Sample rate of the processed audio, in Hz.
+    :type sample_rate: int
+    :ivar channels: Number of channels of the processed audio.
+    :type channels: int
+    :ivar max_workers: Number of worker processes, or None for one per core.
+    :type max_workers: int
+    """
+
+    def __init__(self, audio_dir: Optional[Path] = None, output_dir: Optional[Path] = None,
+                 target_loudness: float = DEFAULT_TARGET_LOUDNESS, peak_ceiling: float = DEFAULT_PEAK_CEILING,
+                 silence_threshold: float = DEFAULT_SILENCE_THRESHOLD, padding: float = 0.05, gap: float = 0.5,
+                 sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1, max_workers: Optional[int] = None,
+                 ffmpeg: str = "ffmpeg"):
+        if audio_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            audio_dir = project_root / "data" / "audios"
+
+        self.audio_dir = Path(audio_dir)
+        self.output_dir = Path(output_dir) if output_dir is not None else self.audio_dir / "mastered"
+        self.target_loudness = target_loudness
+        self.peak_ceiling = peak_ceiling
+        self.silence_threshold = silence_threshold
+        self.padding = padding
+        self.gap = gap
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_workers = max_workers
+        self.ffmpeg = ffmpeg
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def sources(self, categories: List[str], intro: bool = True) -> List[Path]:
+        """
+        Lists the clips of an episode: ``intro``, if present, then one per category.
+
+        :raises FileNotFoundError: If a category's clip is missing.
+        """
+        sources = []
+        intro_audio = self._source("intro")
+        if intro and intro_audio is not None:
+            sources.append(intro_audio)
+        for category in categories:
+            source = self._source(category)
+            if source is None:
+                raise FileNotFoundError(f"Missing audio for {category}: {self.audio_dir / f'{category}.mp3'}")
+            sources.append(source)
+        return sources
+
+    def process(self, source: Path) -> MasteredClip:
+        """
+        Processes a single clip in the worker pool into ``output_dir/{name}.wav``.
+        """
+        return self._submit(source).result()
+
+    def master(self, categories: List[str], output_name: str = "episode", intro: bool = True) -> EpisodeTrack:
+        """
+        Processes every clip of an episode in parallel and joins them into ``output_dir/{output_name}.wav``
+        with a cue sheet at ``output_dir/{output_name}.cue``.
+
+        :raises FileNotFoundError: If a clip is missing.
+        :raises ValueError: If a clip is silent or cannot be decoded.
+        """
+        futures = [self._submit(source) for source in self.sources(categories, intro)]
+        clips = [future.result() for future in futures]
+
+        path = self.output_dir / f"{output_name}.wav"
+        cues = self._concatenate(clips, path)
+        cue_sheet = self.output_dir / f"{output_name}.cue"
+        self._write_cue_sheet(cue_sheet, path, cues)
+        duration = cues[-1].start + cues[-1].duration if cues else 0.0
+        return EpisodeTrack(path=path, cue_sheet=cue_sheet, cues=cues, duration=duration, clips=clips)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _source(self, name: str) -> Optional[Path]:
+        for suffix in (".mp3", ".wav"):
+            path = self.audio_dir / f"{name}{suffix}"
+            if path.is_file():
+                return path
+        return None
+
+    def _submit(self, source: Path):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            executor = self._executor
+        source = Path(source)
+        return executor.submit(
+            process_clip, source, self.output_dir / f"{source.stem}.wav", self.sample_rate, self.channels,
+            self.target_loudness, self.peak_ceiling, self.silence_threshold, self.padding, self.ffmpeg,
+        )
+
+    def _concatenate(self, clips: List[MasteredClip], path: Path) -> List[Cue]:
+        """
+        Copies the processed clips into one WAV file frame by frame, so the episode never has to fit in memory.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        gap = b"\x00" * (int(self.gap * self.sample_rate) * self.channels * 2)
+        cues = []
+        offset = 0
+        file_descriptor, temp_path = shared_mkstemp(path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(file_descriptor, "wb") as raw, wave.open(raw, "wb") as track:
+                track.setnchannels(self.channels)
+                track.setsampwidth(2)
+                track.setframerate(self.sample_rate)
+                for index, clip in enumerate(clips):
+                    if index:
+                        track.writeframes(gap)
+                        offset += len(gap) // (self.channels * 2)
+                    with wave.open(str(clip.path), "rb") as file:
+                        frames = file.getnframes()
+                        while chunk := file.readframes(self.sample_rate):
+                            track.writeframes(chunk)
+                    cues.append(Cue(clip.name, offset / self.sample_rate, frames / self.sample_rate))
+                    offset += frames
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return cues
+
+    @staticmethod
+    def _write_cue_sheet(path: Path, track: Path, cues: List[Cue]) -> None:
+        lines = [f'FILE "{track.name}" WAVE']
+        for number, cue in enumerate(cues, start=1):
+            title = cue.name.replace('"', "'")
+            lines += [f"  TRACK {number:02d} AUDIO", f'    TITLE "{title}"', f"    INDEX 01 {cue_time(cue.start)}"]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
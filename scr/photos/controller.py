@@ -1,14 +1,260 @@
+import asyncio
+import json
 import os
+import shutil
 
-import requests
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-from requests_oauthlib import OAuth2Session
+from scr.assets.controller import AssetsController
+from scr.cache.controller import CacheController
+from scr.clients.controller import ClientsController
+from scr.download.controller import DownloadController, DownloadResult
+from scr.imaging.controller import FRAMES
+from scr.manifest.controller import shared_mkstemp
+from scr.scheduler.controller import SchedulerController
+from scr.search.controller import Candidate, SearchController, rank_candidates
+from scr.video.controller import VideoController
+
+# Request parameters that carry credentials and must not be part of a cache key
+SECRET_PARAMS = ('key', 'client_id')
+# Search endpoint of each provider
+ENDPOINTS = {
+    'google_search': 'https://www.googleapis.com/customsearch/v1',
+    'unsplash': 'https://api.unsplash.com/search/photos',
+    'shutterstock': 'https://api.shutterstock.com/v2/images/search',
+}
+# Results per page of each provider; Custom Search returns at most 10
+PAGE_SIZE = 10
+# Query variants searched when a category asks for more than its own query, in order
+QUERY_VARIANTS = ("{query}", "{query} photo", "{query} high resolution")
+# Result pages requested at first; the next ones only when nothing listed so far is usable
+DEFAULT_PAGES = 1
+DEFAULT_MAX_PAGES = 2
+DEFAULT_MAX_CANDIDATES = 3
 
 
 class PhotosController:
+    """
+    Searches and downloads category photos from Google Custom Search, Unsplash and Shutterstock.
+
+    ``agenerate_photos`` and the ``a``-prefixed candidate methods are the asyncio counterparts,
+    requesting every page and query variant of a category concurrently on one event loop. They
+    build their requests and parse the responses with the same helpers as the blocking methods.
+
+    :ivar clients: Shared clients layer whose pooled session is used for every request.
+    :type clients: ClientsController
+    :ivar cache: Optional response cache for search results and downloaded photos.
+    :type cache: CacheController
+    :ivar downloader: Streams the chosen photo to disk, falling back through the search results.
+    :type downloader: DownloadController
+    :ivar photos_dir: Directory the photos are written to.
+    :type photos_dir: pathlib.Path
+    :ivar race: Number of top search results downloaded concurrently, keeping the first valid one.
+    :type race: int
+    :ivar scheduler: Optional rate limiter and retry scheduler wrapping every search request.
+    :type scheduler: SchedulerController
+    :ivar search_providers: Optional subset of the search providers to use, in order of preference.
+    :type search_providers: list[str]
+    :ivar endpoints: Search endpoint of each provider, keyed by provider name.
+    :type endpoints: dict
+    :ivar search: Optional multi-provider search; when set, ``generate_photos`` routes and hedges
+        across its providers instead of querying Google only.
+    :type search: SearchController
+    :ivar assets: Optional asset library; when set, ``generate_photos`` reuses a photo found earlier
+        for the same query or category before searching, and records every new download.
+    :type assets: AssetsController
+    :ivar frame: Video frame the photos are cropped to, which candidates are scored against.
+    :type frame: str
+    :ivar pages: Number of result pages requested at the same time when searching through ``search``.
+    :type pages: int
+    :ivar max_pages: Number of result pages searched at most; further pages are only requested while
+        no candidate listed so far is usable for the frame.
+    :type max_pages: int
+    :ivar query_variants: Number of query variants searched per category, the query itself first.
+    :type query_variants: int
+    :ivar max_candidates: Number of best-scoring candidates downloaded at most, in order, per photo.
+    :type max_candidates: int
+    """
+
+    def __init__(self, clients: Optional[ClientsController] = None, cache: Optional[CacheController] = None,
+                 downloader: Optional[DownloadController] = None, photos_dir: Optional[Path] = None,
+                 race: int = 1, scheduler: Optional[SchedulerController] = None,
+                 search: Optional[SearchController] = None, endpoints: Optional[Dict[str, str]] = None,
+                 search_providers: Optional[List[str]] = None, assets: Optional[AssetsController] = None,
+                 frame: str = "portrait", pages: int = DEFAULT_PAGES, query_variants: int = 1,
+                 max_candidates: int = DEFAULT_MAX_CANDIDATES, max_pages: int = DEFAULT_MAX_PAGES):
+        if frame not in FRAMES:
+            raise ValueError(f"frame must be one of: {', '.join(FRAMES)}")
+
+        if photos_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            photos_dir = project_root / "data" / "photos"
+
+        self.clients = clients or ClientsController()
+        self.cache = cache
+        self.downloader = downloader or DownloadController(self.clients)
+        self.photos_dir = Path(photos_dir)
+        self.race = race
+        self.scheduler = scheduler
+        self.search = search
+        self.endpoints = {**ENDPOINTS, **(endpoints or {})}
+        self.search_providers = search_providers
+        self.assets = assets
+        self.frame = frame
+        self.pages = pages
+        self.max_pages = max_pages
+        self.query_variants = query_variants
+        self.max_candidates = max_candidates
+
     def generate_photos(self, query, file_name):
-        url = 'https://www.googleapis.com/customsearch/v1'
+        if self.assets is not None:
+            asset = self.assets.find(query, file_name)
+            if asset is not None:
+                return self._reuse(asset, f"{file_name}.jpg")
+
+        if self.search is not None:
+            candidates = self.search_candidates(query)
+            return self._record(self._download_candidates(candidates, f"{file_name}.jpg"), query, file_name)
+
+        photo_urls = self.search_google(query)
+        if photo_urls:
+            providers = dict.fromkeys(photo_urls, 'google_search')
+            return self._record(self._download(photo_urls, f"{file_name}.jpg", providers), query, file_name)
+
+    async def agenerate_photos(self, query: str, file_name: str, timeout: Optional[float] = None) -> DownloadResult:
+        """
+        Async counterpart of ``generate_photos``.
+
+        :param timeout: Seconds to wait for the search and download, or None to wait indefinitely.
+        :type timeout: float
+        :raises asyncio.TimeoutError: If the photo is not written within ``timeout``.
+        """
+        return await asyncio.wait_for(self._agenerate_photos(query, file_name), timeout)
+
+    async def _agenerate_photos(self, query: str, file_name: str) -> DownloadResult:
+        if self.assets is not None:
+            asset = self.assets.find(query, file_name)
+            if asset is not None:
+                return self._reuse(asset, f"{file_name}.jpg")
+
+        candidates = await self.asearch_candidates(query)
+        return self._record(await self._adownload_candidates(candidates, f"{file_name}.jpg"), query, file_name)
+
+    def generate_photo_with_text(self, query):
+        photo_urls = self.search_unsplash(query)
+        if photo_urls:
+            return self._download(photo_urls, f"{query.replace(' ', '_')}.jpg", dict.fromkeys(photo_urls, 'unsplash'))
+
+    def generate_photo_with_shutterstock(self, query):
+        photo_urls = self.search_shutterstock(query)
+        if photo_urls:
+            return self._download(photo_urls, f"{query.replace(' ', '_')}.jpg",
+                                  dict.fromkeys(photo_urls, 'shutterstock'))
+
+    def search_candidates(self, query: str) -> List[Candidate]:
+        """
+        Lists the candidates for ``query`` across its variants and result pages, and returns the ones
+        worth downloading, best first. Later result pages are only searched while none of the candidates
+        listed so far is usable.
+
+        :raises ValueError: If no candidate is usable for the frame.
+        """
+        queries, pages, max_pages = self._search_plan(query)
+        with self.clients.tracer.span("photos.candidates", queries=len(queries), pages=pages) as span:
+            candidates = []
+            ranked = []
+            start = 1
+            while not ranked and start <= max_pages:
+                count = min(pages, max_pages - start + 1)
+                try:
+                    listed = self.search.candidates(queries, count, self.search_providers, start=start)
+                except Exception:
+                    # The first page decides whether the search failed; a later one can only add candidates
+                    if start == 1:
+                        raise
+                    break
+                candidates.extend(listed)
+                ranked = self.search.rank_candidates(candidates, FRAMES[self.frame], self.max_candidates,
+                                                     self.downloader.max_bytes)
+                start += count
+            span.set(listed=len(candidates), kept=len(ranked), searched=start - 1)
+        if not ranked:
+            raise ValueError(f"No usable image results for: {query}")
+        return ranked
+
+    async def asearch_candidates(self, query: str) -> List[Candidate]:
+        """
+        Async counterpart of ``search_candidates``: requests the pages of every query variant at once,
+        from the providers of ``search`` in their ranked order, or from Google without it.
+
+        :raises ValueError: If no candidate is usable for the frame.
+        """
+        queries, pages, max_pages = self._search_plan(query)
+        pagers = {
+            'google_search': self.agoogle_candidates,
+            'unsplash': self.aunsplash_candidates,
+            'shutterstock': self.ashutterstock_candidates,
+        }
+        if self.search is None:
+            providers = ['google_search']
+        else:
+            providers = [name for name in self.search.rank(self.search_providers) if name in pagers]
+            if not providers:
+                raise EnvironmentError("No image search provider is available")
+        with self.clients.tracer.span("photos.candidates", queries=len(queries), pages=pages) as span:
+            candidates = []
+            ranked = []
+            last_error = None
+            start = 1
+            while not ranked and start <= max_pages:
+                count = min(pages, max_pages - start + 1)
+                listed = []
+                for provider in providers:
+                    listings = await asyncio.gather(*(
+                        self._apage(provider, pagers[provider], variant, page)
+                        for variant in queries
+                        for page in range(start, start + count)
+                    ), return_exceptions=True)
+                    for listing in listings:
+                        if isinstance(listing, asyncio.CancelledError):
+                            raise listing
+                        if isinstance(listing, Exception):
+                            last_error = listing
+                        else:
+                            listed.extend(listing)
+                    if listed:
+                        break
+                start += count
+                if not listed:
+                    break
+
+                candidates.extend(listed)
+                if self.search is not None:
+                    ranked = self.search.rank_candidates(candidates, FRAMES[self.frame], self.max_candidates,
+                                                         self.downloader.max_bytes)
+                else:
+                    ranked = rank_candidates(candidates, FRAMES[self.frame], self.max_candidates,
+                                             self.downloader.max_bytes)
+            span.set(listed=len(candidates), kept=len(ranked), searched=start - 1)
+        if not ranked:
+            if last_error is not None and not candidates:
+                raise last_error
+            raise ValueError(f"No usable image results for: {query}")
+        return ranked
+
+    def search_google(self, query) -> List[str]:
+        return [candidate.url for candidate in self.google_candidates(query)]
+
+    def google_candidates(self, query, page: int = 1) -> List[Candidate]:
+        return self._google_parse(self._search(*self._google_request(query, page)), query, page)
+
+    async def agoogle_candidates(self, query, page: int = 1) -> List[Candidate]:
+        return self._google_parse(await self._asearch(*self._google_request(query, page)), query, page)
+
+    def _google_request(self, query, page: int) -> Tuple:
+        url = self.endpoints['google_search']
         search_key = os.environ.get("GOOGLE_SEARCH_KEY")
         if not search_key:
             raise EnvironmentError(
@@ -25,32 +271,38 @@ class PhotosController:
             'searchType': 'image',
             'image_sort_by': '',
         }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        results = response.json()['items']
+        if page > 1:
+            params['start'] = (page - 1) * PAGE_SIZE + 1
+        return 'google_search', search_engine_id, url, params, query
 
-        if results:
-            current_dir = Path(__file__).parent
-            project_root = current_dir.parent.parent
-            photos_file_path = project_root / "data" / "photos"
+    @staticmethod
+    def _google_parse(data: dict, query, page: int) -> List[Candidate]:
+        results = data.get('items', [])
+        return [
+            Candidate(
+                url=result['link'],
+                provider='google_search',
+                query=query,
+                position=(page - 1) * PAGE_SIZE + index,
+                width=result.get('image', {}).get('width'),
+                height=result.get('image', {}).get('height'),
+                mime=result.get('mime'),
+                byte_size=result.get('image', {}).get('byteSize'),
+            )
+            for index, result in enumerate(results)
+        ]
 
-            photo_url = results[0]['link']
-            response = requests.get(photo_url)
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError:
-                photo_url = results[1]['link']
-                response = requests.get(photo_url)
+    def search_unsplash(self, query) -> List[str]:
+        return [candidate.url for candidate in self.unsplash_candidates(query)]
 
-            final_file_name = f"{file_name}.jpg"
-            # Generating a unique filename
-            photo_path = photos_file_path / final_file_name
+    def unsplash_candidates(self, query, page: int = 1) -> List[Candidate]:
+        return self._unsplash_parse(self._search(*self._unsplash_request(query, page)), query, page)
 
-            with open(photo_path, "wb") as file:
-                file.write(response.content)
+    async def aunsplash_candidates(self, query, page: int = 1) -> List[Candidate]:
+        return self._unsplash_parse(await self._asearch(*self._unsplash_request(query, page)), query, page)
 
-    def generate_photo_with_text(self, query):
-        url = 'https://api.unsplash.com/search/photos'
+    def _unsplash_request(self, query, page: int) -> Tuple:
+        url = self.endpoints['unsplash']
         unsplash_key = os.environ.get("UNSPLASH_KEY")
         if not unsplash_key:
             raise EnvironmentError(
@@ -58,32 +310,42 @@ class PhotosController:
 
         params = {
             'query': query,
-            'per_page': 1,
+            'per_page': PAGE_SIZE,
             'orientation': 'portrait',
             'client_id': unsplash_key
         }
+        if page > 1:
+            params['page'] = page
+        return 'unsplash', '', url, params, query
 
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        results = response.json()['results']
-        if results:
-            current_dir = Path(__file__).parent
-            project_root = current_dir.parent.parent
-            photos_file_path = project_root / "data" / "photos"
+    @staticmethod
+    def _unsplash_parse(data: dict, query, page: int) -> List[Candidate]:
+        results = data['results']
+        # Unsplash serves its regular size as a JPEG, at most 1080 pixels wide
+        return [
+            Candidate(
+                url=result['urls']['regular'],
+                provider='unsplash',
+                query=query,
+                position=(page - 1) * PAGE_SIZE + index,
+                width=min(result['width'], 1080) if result.get('width') else None,
+                height=round(result['height'] * min(1.0, 1080 / result['width'])) if result.get('width') else None,
+                mime='image/jpeg',
+            )
+            for index, result in enumerate(results)
+        ]
 
-            photo_url = results[0]['urls']['regular']
-            response = requests.get(photo_url)
-            response.raise_for_status()
+    def search_shutterstock(self, query) -> List[str]:
+        return [candidate.url for candidate in self.shutterstock_candidates(query)]
 
-            file_name = f"{query.replace(' ', '_')}.jpg"
-            # Generating a unique filename
-            photo_path = photos_file_path / file_name
+    def shutterstock_candidates(self, query, page: int = 1) -> List[Candidate]:
+        return self._shutterstock_parse(self._search(*self._shutterstock_request(query, page)), query, page)
 
-            with open(photo_path, "wb") as file:
-                file.write(response.content)
+    async def ashutterstock_candidates(self, query, page: int = 1) -> List[Candidate]:
+        return self._shutterstock_parse(await self._asearch(*self._shutterstock_request(query, page)), query, page)
 
-    def generate_photo_with_shutterstock(self, query):
-        url = 'https://api.shutterstock.com/v2/images/search'
+    def _shutterstock_request(self, query, page: int) -> Tuple:
+        url = self.endpoints['shutterstock']
         shutterstock_key = os.environ.get("SHUTTERSTOCK_KEY")
         if not shutterstock_key:
             raise EnvironmentError(
@@ -97,32 +359,237 @@ class PhotosController:
         params = {
             'query': query,
             'sort': 'relevance',
-            'per_page': '1',
+            'per_page': str(PAGE_SIZE),
             # 'orientation': 'vertical',
             'client_id': shutterstock_key
         }
+        if page > 1:
+            params['page'] = str(page)
+        headers = {'Authorization': f'Bearer {shutterstock_token}'}
+        return 'shutterstock', '', url, params, query, headers
 
-        session = OAuth2Session()
-        session.headers['Authorization'] = f'Bearer {shutterstock_token}'
+    @staticmethod
+    def _shutterstock_parse(data: dict, query, page: int) -> List[Candidate]:
+        results = data['data']
+        return [
+            Candidate(
+                url=result['assets']['preview_1500']['url'],
+                provider='shutterstock',
+                query=query,
+                position=(page - 1) * PAGE_SIZE + index,
+                width=result['assets']['preview_1500'].get('width'),
+                height=result['assets']['preview_1500'].get('height'),
+                mime='image/jpeg',
+            )
+            for index, result in enumerate(results)
+        ]
 
-        response = session.get(url, params=params)
-        response.raise_for_status()
-        results = response.json()['data']
-        if results:
-            current_dir = Path(__file__).parent
-            project_root = current_dir.parent.parent
-            photos_file_path = project_root / "data" / "photos"
+    def register_providers(self, search: SearchController) -> SearchController:
+        """
+        Registers every image search provider whose credentials are set, in preference order.
+        """
+        providers = (
+            ('google_search', ("GOOGLE_SEARCH_KEY", "SEARCH_ENGINE_ID"), self.search_google, self.google_candidates),
+            ('unsplash', ("UNSPLASH_KEY",), self.search_unsplash, self.unsplash_candidates),
+            ('shutterstock', ("SHUTTERSTOCK_KEY", "SHUTTERSTOCK_TOKEN"), self.search_shutterstock,
+             self.shutterstock_candidates),
+        )
+        for name, variables, provider_search, pages in providers:
+            if all(os.environ.get(variable) for variable in variables):
+                search.register(name, provider_search, pages)
+        return search
+
+    def _search(self, provider, model, url, params, query, headers=None) -> dict:
+        def request():
+            if headers is None:
+                response = self.clients.get(url, params=params)
+            else:
+                response = self.clients.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        def fetch():
+            if self.scheduler is None:
+                return request()
+            data = self.scheduler.call(provider, request, key=self._rate_key(params))
+            self.scheduler.record_usage(provider, queries=1)
+            return data
 
-            photo_url = results[0]['assets']['preview_1500']['url']
-            response = requests.get(photo_url)
+        with self.clients.tracer.span("photos.search", provider=provider):
+            if self.cache is None:
+                return fetch()
+
+            settings = {name: value for name, value in params.items() if name not in SECRET_PARAMS}
+            data = self.cache.get_or_fetch(
+                provider, model, settings, query, lambda: json.dumps(fetch()).encode("utf-8"))
+            return json.loads(data)
+
+    async def _asearch(self, provider, model, url, params, query, headers=None) -> dict:
+        async def request():
+            if headers is None:
+                response = await self.clients.aget(url, params=params)
+            else:
+                response = await self.clients.aget(url, params=params, headers=headers)
             response.raise_for_status()
+            return response.json()
+
+        async def fetch():
+            if self.scheduler is None:
+                return await request()
+            data = await self.scheduler.acall(provider, request, key=self._rate_key(params))
+            self.scheduler.record_usage(provider, queries=1)
+            return data
+
+        async def fetch_bytes():
+            return json.dumps(await fetch()).encode("utf-8")
+
+        with self.clients.tracer.span("photos.search", provider=provider):
+            if self.cache is None:
+                return await fetch()
+
+            settings = {name: value for name, value in params.items() if name not in SECRET_PARAMS}
+            return json.loads(await self.cache.aget_or_fetch(provider, model, settings, query, fetch_bytes))
+
+    async def _apage(self, provider: str, pager, query: str, page: int) -> List[Candidate]:
+        if self.search is None:
+            return await pager(query, page)
+        return await self.search.acall(provider, pager, query, page)
+
+    @staticmethod
+    def _rate_key(params: dict) -> str:
+        # Requests are rate limited per credential
+        return next((params[name] for name in SECRET_PARAMS if name in params), 'default')
+
+    def _search_plan(self, query: str) -> Tuple[List[str], int, int]:
+        # Extra pages and query variants are optional; they are skipped while the budget runs out
+        queries = [template.format(query=query) for template in QUERY_VARIANTS[:max(self.query_variants, 1)]]
+        if self.scheduler is not None and self.scheduler.constrained():
+            return queries[:1], 1, 1
+        pages = max(self.pages, 1)
+        return queries, pages, max(self.max_pages, pages)
+
+    def _download(self, photo_urls: List[str], file_name: str, providers: Dict[str, str]) -> DownloadResult:
+        self.photos_dir.mkdir(parents=True, exist_ok=True)
+        photo_path = self.photos_dir / file_name
+
+        with self.clients.tracer.span("photos.download", candidates=len(photo_urls)) as span:
+            cached = self._cached(photo_urls, photo_path)
+            if cached is not None:
+                span.set(cached=True)
+                return cached
+
+            result = self.downloader.download_first(photo_urls, photo_path, race=self.race)
+            span.set(cached=False, bytes=result.bytes_written)
+
+        return self._store(result, providers)
+
+    async def _adownload(self, photo_urls: List[str], file_name: str, providers: Dict[str, str]) -> DownloadResult:
+        self.photos_dir.mkdir(parents=True, exist_ok=True)
+        photo_path = self.photos_dir / file_name
+
+        with self.clients.tracer.span("photos.download", candidates=len(photo_urls)) as span:
+            cached = self._cached(photo_urls, photo_path)
+            if cached is not None:
+                span.set(cached=True)
+                return cached
+
+            result = await self.downloader.adownload_first(photo_urls, photo_path)
+            span.set(cached=False, bytes=result.bytes_written)
+
+        return self._store(result, providers)
+
+    def _cached(self, photo_urls: List[str], photo_path: Path) -> Optional[DownloadResult]:
+        if self.cache is not None:
+            for photo_url in photo_urls:
+                cached_path = self.cache.lookup(self.cache.key('photo', '', None, photo_url))
+                if cached_path is not None:
+                    return self._copy_cached(photo_url, cached_path, photo_path)
+        return None
+
+    def _store(self, result: DownloadResult, providers: Dict[str, str]) -> DownloadResult:
+        # Only fresh downloads are accounted for, to the provider that listed the URL
+        provider = providers.get(result.url)
+        if self.scheduler is not None and provider is not None:
+            self.scheduler.record_usage(provider, downloads=1)
+        if self.cache is not None:
+            self.cache.put_file(self.cache.key('photo', '', None, result.url), result.path)
+        return result
+
+    def _download_candidates(self, candidates: List[Candidate], file_name: str) -> DownloadResult:
+        urls = [candidate.url for candidate in candidates]
+        try:
+            result = self._download(urls, file_name, {candidate.url: candidate.provider for candidate in candidates})
+        except Exception:
+            self._record_downloads(urls, None)
+            raise
+        return self._record_downloads(urls, result)
+
+    async def _adownload_candidates(self, candidates: List[Candidate], file_name: str) -> DownloadResult:
+        urls = [candidate.url for candidate in candidates]
+        try:
+            result = await self._adownload(urls, file_name,
+                                           {candidate.url: candidate.provider for candidate in candidates})
+        except Exception:
+            self._record_downloads(urls, None)
+            raise
+        return self._record_downloads(urls, result)
+
+    def _record_downloads(self, urls: List[str], result: Optional[DownloadResult]) -> Optional[DownloadResult]:
+        # Counts the outcome of each candidate towards its domain's success rate
+        if self.search is None:
+            return result
+        if result is None:
+            for url in urls:
+                self.search.record_download(url, ok=False)
+            return result
+        for url in result.failed:
+            self.search.record_download(url, ok=False)
+        self.search.record_download(result.url, ok=True)
+        return result
+
+    def _reuse(self, asset, file_name: str) -> DownloadResult:
+        with self.clients.tracer.span("photos.reuse", asset=asset.id):
+            photo_path = self.assets.use(asset, self.photos_dir / file_name)
+        return DownloadResult(url=asset.url, path=photo_path, bytes_written=asset.bytes, content_type="")
+
+    def _record(self, result: DownloadResult, query: str, category: str) -> DownloadResult:
+        if self.assets is not None:
+            self.assets.add(result.path, result.url, query, category)
+        return result
 
-            file_name = f"{query.replace(' ', '_')}.jpg"
-            # Generating a unique filename
-            photo_path = photos_file_path / file_name
+    @staticmethod
+    def _copy_cached(photo_url, cached_path: Path, photo_path: Path) -> DownloadResult:
+        file_descriptor, temp_path = shared_mkstemp(photo_path.parent, prefix=f".{photo_path.name}.")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file, open(cached_path, "rb") as cached_file:
+                shutil.copyfileobj(cached_file, file)
+            os.replace(temp_path, photo_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return DownloadResult(
+            url=photo_url,
+            path=photo_path,
+            bytes_written=photo_path.stat().st_size,
+            content_type="",
+        )
 
-            with open(photo_path, "wb") as file:
-                file.write(response.content)
+    def add_photo_to_video(self, categories: List[str], output_name: str = "episode",
+                           video: Optional[VideoController] = None, audio_dir: Optional[Path] = None) -> Path:
+        """
+        Renders the category photos and their narration clips, preceded by ``intro.mp3``, into a video.
 
-    def add_photo_to_video(self):
-        pass
+        :param categories: Categories in the order they appear in the video.
+        :type categories: list[str]
+        :param output_name: Name of the video file, without extension.
+        :type output_name: str
+        :param video: Compositor to render with; defaults to one reading from ``photos_dir`` and
+            ``audio_dir`` at the controller's frame.
+        :type video: VideoController
+        :param audio_dir: Directory holding the narration clips, or None for the default one.
+        :type audio_dir: pathlib.Path
+        :return: Path of the rendered video.
+        :rtype: pathlib.Path
+        """
+        video = video or VideoController(photos_dir=self.photos_dir, audio_dir=audio_dir, frame=self.frame)
+        return video.compose(categories, output_name)
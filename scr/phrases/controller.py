@@ -0,0 +1,120 @@
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from scr.cache.controller import CacheController
+from scr.manifest.controller import shared_mkstemp
+from scr.tracing.controller import DISABLED, TracingController
+
+# A phrase ends after terminal punctuation, optionally followed by closing quotes or brackets
+PHRASE_BOUNDARY = re.compile(r"(?:(?<=[.!?…])|(?<=[.!?…][\"')\]]))\s+")
+QUOTES = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-"})
+
+
+def normalize_phrase(text: str) -> str:
+    """
+    Normalizes ``text`` so near-identical spellings share a phrase: Unicode compatibility forms,
+    straight quotes and dashes, and single spaces. Case is kept, as it can change the reading.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(QUOTES)
+    return " ".join(text.split())
+
+
+def split_phrases(script: str) -> List[str]:
+    """
+    Splits ``script`` into normalized sentences, the units synthesized and reused independently.
+    """
+    return [phrase for phrase in PHRASE_BOUNDARY.split(normalize_phrase(script)) if phrase]
+
+
+def strip_id3(data: bytes) -> bytes:
+    """
+    Removes a leading ID3v2 and a trailing ID3v1 tag, so MP3 segments can be joined frame to frame.
+    """
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = 10 + ((data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F))
+        data = data[size:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+class PhrasesController:
+    """
+    Durable store of synthesized phrases, reused across scripts and episodes.
+
+    Scripts are split into sentences, and each sentence is stored as an MP3 segment keyed by
+    its normalized text, voice, model and voice settings. Intros, stingers and category lines
+    that come back episode after episode are synthesized once; a clip is assembled by joining
+    the stored segments. MP3 is a sequence of independent frames, so segments of the same
+    output format join without re-encoding. Unlike the response cache, phrases never expire
+    and are not bypassed by ``CACHE_BYPASS``: they are assets, not a transport optimization.
+
+    :ivar phrases_dir: Directory holding the phrase segments.
+    :type phrases_dir: pathlib.Path
+    :ivar tracer: Tracer counting reused and synthesized phrases.
+    :type tracer: TracingController
+    """
+
+    def __init__(self, phrases_dir: Optional[Path] = None, tracer: Optional[TracingController] = None):
+        if phrases_dir is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            phrases_dir = project_root / "data" / "phrases"
+
+        self.phrases_dir = Path(phrases_dir)
+        self.tracer = tracer or DISABLED
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def key(phrase: str, voice_id: str, model_id: str, settings: dict) -> str:
+        return CacheController.key("elevenlabs", f"{voice_id}/{model_id}", settings, normalize_phrase(phrase))
+
+    def path(self, key: str) -> Path:
+        return self.phrases_dir / key[:2] / f"{key}.mp3"
+
+    def get_or_create(self, key: str, synthesize: Callable[[], Iterable[bytes]]) -> Tuple[Path, bool]:
+        """
+        Returns the segment stored under ``key``, synthesizing it first if it is missing. Concurrent
+        callers asking for the same phrase wait for a single synthesis.
+
+        :return: The segment path and whether it was synthesized by this call.
+        :rtype: tuple[pathlib.Path, bool]
+        """
+        path = self.path(key)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if path.is_file():
+                self.tracer.count("phrases", result="reused")
+                return path, False
+
+            data = strip_id3(b"".join(synthesize()))
+            if not data:
+                raise ValueError("Synthesis returned no audio")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            file_descriptor, temp_path = shared_mkstemp(path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(file_descriptor, "wb") as file:
+                    file.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                Path(temp_path).unlink(missing_ok=True)
+                raise
+            self.tracer.count("phrases", result="synthesized")
+            return path, True
+
+    @staticmethod
+    def assemble(paths: List[Path], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Yields the segments at ``paths`` back to back, as one MP3 stream.
+        """
+        for path in paths:
+            with open(path, "rb") as file:
+                while chunk := file.read(chunk_size):
+                    yield chunk
@@ -0,0 +1,249 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from scr.audio.controller import NarrationProfile
+from scr.bundle.controller import BundleController
+from scr.imaging.controller import ImagingController
+from scr.manifest.controller import ManifestController
+from scr.script.controller import ScriptRecord
+from scr.tracing.controller import DISABLED, TracingController
+
+# Default number of in-flight calls allowed per external provider
+DEFAULT_PROVIDER_LIMITS = {
+    "google_search": 8,
+    "elevenlabs": 4,
+}
+
+
+@dataclass
+class CategoryResult:
+    """
+    Outcome of every pipeline stage run for a single trivia category.
+
+    :ivar category: Category name, also used as the asset file name.
+    :type category: str
+    :ivar query: Image search prompt generated for the category.
+    :type query: str
+    :ivar narration_script: Text synthesized for the category's audio clip.
+    :type narration_script: str
+    :ivar narrations: Narration script translated into other languages, keyed by language code.
+    :type narrations: dict
+    :ivar outputs: Return value of each stage that succeeded, keyed by stage name.
+    :type outputs: dict
+    :ivar errors: Exception raised by each stage that failed, keyed by stage name.
+    :type errors: dict
+    :ivar skipped: Stages whose asset was already complete in the episode manifest.
+    :type skipped: list[str]
+    :ivar durations: Wall-clock seconds spent in each stage that ran, keyed by stage name.
+    :type durations: dict
+    """
+    category: str
+    query: str
+    narration_script: str = ""
+    narrations: Dict[str, str] = field(default_factory=dict)
+    outputs: Dict[str, object] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    durations: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class PipelineController:
+    """
+    Runs the per-category asset stages of an episode concurrently.
+
+    Every (category, stage) pair is submitted to a bounded thread pool, so photo
+    search/download and TTS synthesis for all categories overlap instead of
+    running back to back. A semaphore per provider caps how many calls hit the
+    same API at once, independently of the overall pool size. A failing stage is
+    recorded on its category's result and never stops the other categories.
+
+    :ivar photos_controller: Controller used for the photo stage, or None to skip it.
+    :type photos_controller: PhotosController
+    :ivar audio_controller: Controller used for the audio stage, or None to skip it.
+    :type audio_controller: AudioController
+    :ivar max_workers: Maximum number of stages running at the same time.
+    :type max_workers: int
+    :ivar provider_limits: Maximum number of concurrent calls per provider.
+    :type provider_limits: dict
+    :ivar manifest: Optional episode manifest; stages whose asset is complete and unchanged are skipped.
+    :type manifest: ManifestController
+    :ivar imaging_controller: Optional post-processing of every downloaded photo to the video frame;
+        near-duplicate photos are dropped once all categories are done.
+    :type imaging_controller: ImagingController
+    :ivar tracer: Tracer recording a span per (category, stage); nested spans inherit both.
+    :type tracer: TracingController
+    :ivar executor: Optional thread pool shared with other pipelines, e.g. every episode of a batch;
+        ``max_workers`` only sizes the pool the pipeline creates for itself.
+    :type executor: concurrent.futures.Executor
+    :ivar bundle: Optional episode bundle every finished asset is appended to, kind being the stage
+        and name the category; dropped duplicate photos are removed from it again.
+    :type bundle: BundleController
+    :ivar profiles: Narration profiles every category is rendered with, each as a stage of its own so
+        they synthesize at the same time, or None for the audio controller's profile only. The
+        controller's own profile is the ``audio`` stage, any other the ``audio.{name}`` stage, read
+        from the record's narration in the profile's language when the script has one.
+    :type profiles: list[NarrationProfile]
+    """
+
+    def __init__(self, photos_controller=None, audio_controller=None, max_workers: int = 8,
+                 provider_limits: Optional[Dict[str, int]] = None, manifest: Optional[ManifestController] = None,
+                 imaging_controller: Optional[ImagingController] = None,
+                 tracer: Optional[TracingController] = None, executor: Optional[Executor] = None,
+                 bundle: Optional[BundleController] = None, profiles: Optional[List[NarrationProfile]] = None):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.photos_controller = photos_controller
+        self.audio_controller = audio_controller
+        self.max_workers = max_workers
+        self.provider_limits = {**DEFAULT_PROVIDER_LIMITS, **(provider_limits or {})}
+        self.manifest = manifest
+        self.imaging_controller = imaging_controller
+        self.tracer = tracer or DISABLED
+        self.executor = executor
+        self.bundle = bundle
+        self.profiles = profiles
+        self._semaphores = {
+            provider: threading.BoundedSemaphore(limit)
+            for provider, limit in self.provider_limits.items()
+        }
+
+    def run(self, records: Iterable[ScriptRecord]) -> List[CategoryResult]:
+        """
+        Runs every enabled stage for every category and waits for all of them.
+
+        Stages are submitted as soon as each record is read, so ``records`` can be a stream such as
+        ``ScriptController.stream_records``: assets of the first categories are fetched while the
+        script of the last ones is still being generated.
+
+        :param records: Generated script records, one per category.
+        :type records: Iterable[ScriptRecord]
+        :return: One result per category, in the order the records arrived.
+        :rtype: list[CategoryResult]
+        """
+        if self.executor is not None:
+            results = self._run_stages(self.executor, records)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = self._run_stages(executor, records)
+
+        if self.imaging_controller is not None:
+            self._drop_duplicate_photos(results)
+
+        return results
+
+    def _run_stages(self, executor: Executor, records: Iterable[ScriptRecord]) -> List[CategoryResult]:
+        results = []
+        futures = []
+        try:
+            for record in records:
+                result = CategoryResult(record.category, record.image_query, record.narration_script,
+                                        record.narrations)
+                results.append(result)
+                futures.extend(
+                    # Keep the caller's context, so stage spending stays attributed to its episode
+                    executor.submit(contextvars.copy_context().run, self._run_stage, result, stage, provider,
+                                    stage_input, task, finish)
+                    for stage, provider, stage_input, task, finish in self._stages(result)
+                )
+        finally:
+            # Never return, or raise a script error, while stages are still writing assets
+            wait(futures)
+        for future in futures:
+            future.result()
+        return results
+
+    def _stages(self, result: CategoryResult):
+        stages = []
+        if self.photos_controller is not None:
+            stages.append((
+                "photos",
+                "google_search",
+                result.query,
+                lambda: self.photos_controller.generate_photos(result.query, result.category),
+                lambda output: self._process_photo(result, output),
+            ))
+        if self.audio_controller is not None:
+            for profile in self.profiles or [self.audio_controller.profile]:
+                stages.append(self._audio_stage(result, profile))
+        return stages
+
+    def _audio_stage(self, result: CategoryResult, profile: NarrationProfile):
+        narration = result.narrations.get(profile.language) or result.narration_script or result.query
+        if profile == self.audio_controller.profile:
+            return ("audio", "elevenlabs", narration,
+                    lambda: self.audio_controller.synthesize_to_file(narration, result.category), None)
+        return (f"audio.{profile.name}", "elevenlabs", narration,
+                lambda: self.audio_controller.synthesize_to_file(narration, result.category, profile=profile), None)
+
+    def _process_photo(self, result: CategoryResult, output) -> None:
+        if self.imaging_controller is not None and output is not None:
+            result.outputs["image"] = self.imaging_controller.process(output.path)
+
+    def _drop_duplicate_photos(self, results: List[CategoryResult]) -> None:
+        owners = {id(result.outputs["image"]): result for result in results if "image" in result.outputs}
+        images = [result.outputs["image"] for result in results if "image" in result.outputs]
+
+        for duplicate, original in self.imaging_controller.find_duplicates(images):
+            result = owners[id(duplicate)]
+            error = ValueError(f"Photo is a near-duplicate of {owners[id(original)].category}'s photo")
+            duplicate.path.unlink(missing_ok=True)
+            result.outputs.pop("photos", None)
+            result.outputs.pop("image", None)
+            result.errors["photos"] = error
+            if self.manifest is not None:
+                self.manifest.record_failed(result.category, "photos", result.query, error)
+            if self.bundle is not None:
+                self.bundle.remove("photos", result.category)
+
+    def _run_stage(self, result: CategoryResult, stage: str, provider: str, stage_input: str,
+                   task: Callable, finish: Optional[Callable] = None) -> None:
+        if self.manifest is not None and self.manifest.is_complete(result.category, stage, stage_input):
+            result.outputs[stage] = Path(self.manifest.entry(result.category, stage)["path"])
+            result.skipped.append(stage)
+            if self.bundle is not None:
+                self._bundle(result, stage, result.outputs[stage])
+            return
+
+        semaphore = self._semaphores.get(provider)
+        started = time.perf_counter()
+        try:
+            with self.tracer.span("stage", category=result.category, stage=stage, provider=provider):
+                if semaphore is None:
+                    output = task()
+                else:
+                    with semaphore:
+                        output = task()
+                # CPU-bound post-processing never holds one of the provider's concurrency slots
+                if finish is not None:
+                    finish(output)
+        except Exception as error:
+            result.durations[stage] = time.perf_counter() - started
+            result.errors[stage] = error
+            if self.manifest is not None:
+                self.manifest.record_failed(result.category, stage, stage_input, error)
+            return
+
+        result.durations[stage] = time.perf_counter() - started
+        result.outputs[stage] = output
+        path = getattr(output, "path", None)
+        if self.manifest is not None and path is not None:
+            self.manifest.record_complete(result.category, stage, stage_input, path, getattr(output, "url", None))
+        if self.bundle is not None and path is not None:
+            self._bundle(result, stage, path)
+
+    def _bundle(self, result: CategoryResult, stage: str, path: Path) -> None:
+        # A bundle that cannot be written fails the stage, the asset file itself is kept
+        try:
+            self.bundle.append_file(stage, result.category, path)
+        except (OSError, ValueError) as error:
+            result.errors[stage] = error
@@ -0,0 +1,359 @@
+import asyncio
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional
+
+import requests
+
+from scr.manifest.controller import shared_mkstemp
+from scr.tracing.controller import DISABLED, TracingController
+
+try:
+    import fcntl
+except ImportError:
+    # Not a POSIX host; files are then only locked against the threads of the same process
+    fcntl = None
+
+if TYPE_CHECKING:
+    from scr.budget.controller import BudgetController
+
+# HTTP status codes worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Holds an exclusive lock on ``path`` for the duration of the block. The lock is shared by every
+    process of the host, so read-modify-write cycles of files updated by several workers never
+    lose an update. Lock a file of its own rather than the data file, which is replaced on every write.
+    Without ``fcntl``, i.e. on Windows, the lock only excludes the other threads of the process.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        with _thread_locks_lock:
+            lock = _thread_locks.setdefault(path.resolve(), threading.Lock())
+        with lock:
+            yield
+        return
+
+    with open(path, "a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class QuotaExceededError(RuntimeError):
+    """
+    Raised when a provider's daily quota has been used up.
+    """
+
+
+@dataclass
+class ProviderLimit:
+    """
+    Throughput limits of a single provider.
+
+    :ivar rate: Sustained number of requests per second allowed per key.
+    :type rate: float
+    :ivar burst: Number of requests that may be sent back to back before ``rate`` applies.
+    :type burst: int
+    :ivar daily_quota: Maximum number of requests per calendar day, or None for no limit.
+    :type daily_quota: int
+    """
+    rate: float
+    burst: int = 1
+    daily_quota: Optional[int] = None
+
+
+DEFAULT_LIMITS = {
+    "gemini": ProviderLimit(rate=0.5, burst=5),
+    "google_search": ProviderLimit(rate=1.5, burst=5, daily_quota=100),
+    "unsplash": ProviderLimit(rate=50 / 3600, burst=50),
+    "shutterstock": ProviderLimit(rate=1.0, burst=5),
+    "elevenlabs": ProviderLimit(rate=2.0, burst=4),
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket; ``acquire`` blocks until a token is available, and ``aacquire``
+    waits for it without blocking the event loop.
+
+    :ivar rate: Tokens added per second.
+    :type rate: float
+    :ivar capacity: Maximum number of stored tokens.
+    :type capacity: int
+    """
+
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while (wait := self._take()) > 0:
+            self._sleep(wait)
+
+    async def aacquire(self, sleep: Callable[[float], Awaitable] = asyncio.sleep) -> None:
+        while (wait := self._take()) > 0:
+            await sleep(wait)
+
+    def _take(self) -> float:
+        # Takes a token and returns 0, or returns how long until the next token is available
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class SchedulerController:
+    """
+    Wraps provider calls with rate limiting, retries and daily quota tracking.
+
+    Each (provider, key) pair gets its own token bucket, so several API keys for the same
+    provider are throttled independently. Calls failing with a throttling or transient error
+    are retried with exponential backoff and full jitter, honouring any ``Retry-After``
+    header. The number of requests sent per provider today is persisted to disk and updated
+    under a file lock, so the daily quota holds across runs and concurrent worker processes.
+    ``acall`` applies the same limits to coroutines, waiting with ``asyncio.sleep`` so other
+    requests on the loop keep running.
+    With a ``budget``, paid calls are refused once the money is spent, and controllers report
+    the units each call consumed through ``record_usage``.
+
+    :ivar limits: Throughput limits per provider.
+    :type limits: dict
+    :ivar max_retries: Number of retries after the first attempt.
+    :type max_retries: int
+    :ivar base_delay: Backoff delay of the first retry, in seconds.
+    :type base_delay: float
+    :ivar max_delay: Upper bound of any single backoff delay, in seconds.
+    :type max_delay: float
+    :ivar quota_path: JSON file holding today's request counts.
+    :type quota_path: pathlib.Path
+    :ivar tracer: Tracer counting retries and the time spent waiting for rate limits.
+    :type tracer: TracingController
+    :ivar budget: Optional cost accounting, enforcing a monthly budget.
+    :type budget: BudgetController
+    """
+
+    def __init__(self, limits: Optional[Dict[str, ProviderLimit]] = None, max_retries: int = 5,
+                 base_delay: float = 0.5, max_delay: float = 60.0, quota_path: Optional[Path] = None,
+                 sleep: Callable[[float], None] = time.sleep, tracer: Optional[TracingController] = None,
+                 async_sleep: Callable[[float], Awaitable] = asyncio.sleep,
+                 budget: Optional["BudgetController"] = None):
+        if quota_path is None:
+            current_dir = Path(__file__).parent
+            project_root = current_dir.parent.parent
+            quota_path = project_root / "data" / "quota.json"
+
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.quota_path = Path(quota_path)
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self.tracer = tracer or DISABLED
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def call(self, provider: str, function: Callable, *args, key: str = "default", **kwargs):
+        """
+        Calls ``function(*args, **kwargs)`` within the limits of ``provider``.
+
+        :param provider: Provider the call is sent to, e.g. ``google_search``.
+        :type provider: str
+        :param function: Callable performing a single request.
+        :type function: Callable
+        :param key: Identifier of the API key used, so each key is throttled separately.
+        :type key: str
+        :return: Return value of ``function``.
+        :raises QuotaExceededError: If the provider's daily quota is used up.
+        :raises BudgetExceededError: If the call would be paid for and the budget is spent.
+        """
+        attempt = 0
+        while True:
+            if self.budget is not None:
+                self.budget.check(provider)
+            bucket = self._bucket(provider, key)
+            if bucket is not None:
+                waited = time.perf_counter()
+                bucket.acquire()
+                self.tracer.count("rate_limit_wait_seconds", time.perf_counter() - waited, provider=provider)
+            self._consume_quota(provider)
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                if attempt >= self.max_retries or not self.is_retryable(error):
+                    raise
+                self.tracer.count("retries", provider=provider)
+                self._sleep(self._retry_delay(error, attempt))
+                attempt += 1
+
+    async def acall(self, provider: str, function: Callable[..., Awaitable], *args, key: str = "default", **kwargs):
+        """
+        Async counterpart of ``call``: awaits ``function(*args, **kwargs)`` within the limits of ``provider``.
+
+        :raises QuotaExceededError: If the provider's daily quota is used up.
+        :raises BudgetExceededError: If the call would be paid for and the budget is spent.
+        """
+        attempt = 0
+        while True:
+            if self.budget is not None:
+                self.budget.check(provider)
+            bucket = self._bucket(provider, key)
+            if bucket is not None:
+                waited = time.perf_counter()
+                await bucket.aacquire(self._async_sleep)
+                self.tracer.count("rate_limit_wait_seconds", time.perf_counter() - waited, provider=provider)
+            if self._has_quota(provider):
+                # Waiting for the quota file's lock must not stall the other requests on the loop
+                await asyncio.to_thread(self._consume_quota, provider)
+            try:
+                return await function(*args, **kwargs)
+            except Exception as error:
+                if attempt >= self.max_retries or not self.is_retryable(error):
+                    raise
+                self.tracer.count("retries", provider=provider)
+                await self._async_sleep(self._retry_delay(error, attempt))
+                attempt += 1
+
+    def usage(self, provider: str) -> int:
+        """
+        Returns the number of requests sent to ``provider`` today.
+        """
+        return self._read_usage().get(provider, 0)
+
+    def record_usage(self, provider: str, **units: float) -> None:
+        """
+        Accounts for the ``units`` consumed by a successful call to ``provider``, e.g. ``characters=120``.
+        """
+        if self.budget is not None:
+            self.budget.record(provider, **units)
+
+    def constrained(self) -> bool:
+        """
+        Returns whether the budget is running out, so optional requests should be skipped.
+        """
+        return self.budget is not None and self.budget.constrained()
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        # httpx is only loaded by the async clients; without it, none of its errors can occur
+        httpx = sys.modules.get("httpx")
+        if httpx is not None and isinstance(error, httpx.TransportError):
+            return True
+        return _status_code(error) in RETRYABLE_STATUS_CODES
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _bucket(self, provider: str, key: str) -> Optional[TokenBucket]:
+        limit = self.limits.get(provider)
+        if limit is None:
+            return None
+
+        with self._lock:
+            bucket = self._buckets.get((provider, key))
+            if bucket is None:
+                bucket = TokenBucket(limit.rate, limit.burst, sleep=self._sleep)
+                self._buckets[(provider, key)] = bucket
+            return bucket
+
+    def _has_quota(self, provider: str) -> bool:
+        limit = self.limits.get(provider)
+        return limit is not None and limit.daily_quota is not None
+
+    def _consume_quota(self, provider: str) -> None:
+        if not self._has_quota(provider):
+            return
+
+        # The file lock excludes the threads of this process too, so no thread lock is held while waiting on it
+        limit = self.limits[provider]
+        with file_lock(self.quota_path.with_suffix(".lock")):
+            counts = self._read_usage()
+            if counts.get(provider, 0) >= limit.daily_quota:
+                raise QuotaExceededError(f"Daily quota of {limit.daily_quota} requests to {provider} exhausted")
+            counts[provider] = counts.get(provider, 0) + 1
+            self._write_usage(counts)
+
+    def _read_usage(self) -> dict:
+        try:
+            data = json.loads(self.quota_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get("date") != datetime.date.today().isoformat():
+            return {}
+        return data.get("counts", {})
+
+    def _write_usage(self, counts: dict) -> None:
+        self.quota_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"date": datetime.date.today().isoformat(), "counts": counts}
+        file_descriptor, temp_path = shared_mkstemp(self.quota_path.parent, prefix=".quota-")
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.quota_path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    # requests.HTTPError, google.genai APIError and elevenlabs ApiError expose it differently
+    response = getattr(error, "response", None)
+    for value in (getattr(response, "status_code", None), getattr(error, "status_code", None),
+                  getattr(error, "code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.datetime.now(retry_at.tzinfo)).total_seconds(), 0.0)
@@ -1,5 +1,129 @@
-import os
-from google import genai
+import asyncio
+import contextvars
+import itertools
+import json
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from scr.cache.controller import CacheController
+from scr.clients.controller import ClientsController
+from scr.scheduler.controller import SchedulerController
+
+MODEL = "gemini-2.0-flash-lite"
+# Number of categories sent in a single structured generation request
+DEFAULT_BATCH_SIZE = 10
+
+RECORDS_PROMPT = """
+I need Google Image search prompts and narration scripts for a trivia game.
+For each of the following trivia categories, return one record with:
+- category: the category exactly as written below.
+- image_query: a Google Image search prompt following the template [Category] [Specific Subject/Object/Action] [Visual Descriptor] [Optional: Time Period/Style/Modifier] photo/image.
+- narration_script: one or two short sentences a host reads aloud to introduce the category.{translations}
+
+Categories:
+{categories}
+"""
+
+RECORDS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "category": {"type": "STRING"},
+            "image_query": {"type": "STRING"},
+            "narration_script": {"type": "STRING"},
+        },
+        "required": ["category", "image_query", "narration_script"],
+    },
+}
+
+TRANSLATIONS_PROMPT = """
+- translations: the narration_script translated into each of these languages, as objects with the language code \
+exactly as written and the translated narration_script: {languages}."""
+
+
+def records_schema(languages: Optional[List[str]] = None) -> dict:
+    """
+    Returns the response schema of a records request, asking for the narration in every one of ``languages``.
+    """
+    if not languages:
+        return RECORDS_SCHEMA
+    translation = {
+        "type": "OBJECT",
+        "properties": {"language": {"type": "STRING"}, "narration_script": {"type": "STRING"}},
+        "required": ["language", "narration_script"],
+    }
+    items = RECORDS_SCHEMA["items"]
+    return {**RECORDS_SCHEMA, "items": {
+        **items,
+        "properties": {**items["properties"], "translations": {"type": "ARRAY", "items": translation}},
+        "required": items["required"] + ["translations"],
+    }}
+
+
+@dataclass
+class ScriptRecord:
+    """
+    Generated script content for a single trivia category.
+
+    :ivar category: Category name, as given by the user.
+    :type category: str
+    :ivar image_query: Image search prompt for the category.
+    :type image_query: str
+    :ivar narration_script: Text read aloud for the category.
+    :type narration_script: str
+    :ivar narrations: Narration script translated into each requested language, keyed by language code.
+    :type narrations: dict
+    """
+    category: str
+    image_query: str
+    narration_script: str
+    narrations: Dict[str, str] = field(default_factory=dict)
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[object]:
+    """
+    Yields the items of a JSON array as soon as each one is complete, while the rest of the
+    array is still arriving in ``chunks``.
+
+    :raises ValueError: If the text is not a JSON array or ends before the array is closed.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    opened = False
+    closed = False
+    for chunk in chunks:
+        # Keep consuming after the closing bracket, so the source stream runs to completion
+        if closed:
+            continue
+        buffer += chunk
+        position = 0
+        while not closed:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not opened:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                closed = True
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item is still incomplete; wait for the next chunk
+                break
+            yield item
+        buffer = buffer[position:]
+    if not closed:
+        raise ValueError("Incomplete JSON array")
 
 
 class ScriptController:
@@ -11,10 +135,28 @@ class ScriptController:
     capabilities. The primary purpose of this class is to serve as a utility for content-generation
     tasks, ensuring seamless API communication and simplified usage for the caller.
 
-    :ivar some_attribute: Description of some attribute relevant to the class.
-    :type some_attribute: str
+    ``agenerate_content`` and ``agenerate_records`` are the asyncio counterparts, built on the
+    Gemini SDK's async interface; they share the prompts, cache keys and parsing of the blocking
+    methods and accept a ``timeout`` after which the request is cancelled.
+
+    :ivar clients: Shared clients layer providing the reused Gemini client.
+    :type clients: ClientsController
+    :ivar cache: Optional response cache; identical prompts are answered from disk.
+    :type cache: CacheController
+    :ivar scheduler: Optional rate limiter and retry scheduler wrapping every Gemini request.
+    :type scheduler: SchedulerController
+    :ivar languages: Language codes the narration of every record is also translated into, in the
+        same request, so localized narrations need no script pass of their own.
+    :type languages: list[str]
     """
 
+    def __init__(self, clients: Optional[ClientsController] = None, cache: Optional[CacheController] = None,
+                 scheduler: Optional[SchedulerController] = None, languages: Optional[List[str]] = None):
+        self.clients = clients or ClientsController()
+        self.cache = cache
+        self.scheduler = scheduler
+        self.languages = list(languages or [])
+
     def generate_content(self, prompt) -> str:
         """
         Generates content based on a given prompt using a specified model. This method utilizes
@@ -34,15 +176,353 @@ class ScriptController:
         if not prompt:
             raise ValueError("Prompt cannot be empty")
 
-        google_key = os.environ.get("GOOGLE_KEY")
-        if not google_key:
-            raise EnvironmentError("GOOGLE_KEY environment variable is not set")
+        with self.clients.tracer.span("script.generate_content", model=MODEL):
+            return self._generate_cached(prompt)
+
+    async def agenerate_content(self, prompt, timeout: Optional[float] = None) -> str:
+        """
+        Async counterpart of ``generate_content``.
+
+        :raises ValueError: If the prompt is empty or None.
+        :raises asyncio.TimeoutError: If no answer arrived within ``timeout`` seconds.
+        """
+        if not prompt:
+            raise ValueError("Prompt cannot be empty")
+
+        with self.clients.tracer.span("script.generate_content", model=MODEL):
+            return await asyncio.wait_for(self._agenerate_cached(prompt), timeout)
+
+    def stream_content(self, prompt) -> Iterator[str]:
+        """
+        Streaming variant of ``generate_content``: yields each line of the response as soon as it
+        is complete, so callers can act on the first options while the model writes the rest.
+
+        :raises ValueError: If the prompt is empty or None.
+        """
+        if not prompt:
+            raise ValueError("Prompt cannot be empty")
+
+        return self._lines(self._stream_cached(prompt))
+
+    def stream_records(self, categories: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                       max_workers: int = 4) -> Iterator[ScriptRecord]:
+        """
+        Streaming variant of ``generate_records``: every batch is streamed, and each record is
+        yielded as soon as its JSON object is complete, in the order records arrive. Categories
+        the model left out are requested once more after all batches ended.
+
+        :raises ValueError: If no categories are given or the model keeps leaving a category out.
+        """
+        categories = [category.strip() for category in categories if category.strip()]
+        if not categories:
+            raise ValueError("Categories cannot be empty")
+
+        return self._stream_records(categories, batch_size, max_workers)
+
+    def generate_records(self, categories: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                         max_workers: int = 4) -> List[ScriptRecord]:
+        """
+        Generates the image query and narration script of every category using schema-constrained
+        JSON output. Categories are split into batches of ``batch_size`` that are requested in
+        parallel, so an episode costs a small fixed number of round-trips. Records are matched
+        back to their category by name, and categories the model left out are requested once more.
+
+        :param categories: Category names.
+        :type categories: list[str]
+        :param batch_size: Maximum number of categories per request.
+        :type batch_size: int
+        :param max_workers: Maximum number of concurrent requests.
+        :type max_workers: int
+        :return: One record per category, in input order.
+        :rtype: list[ScriptRecord]
+        :raises ValueError: If no categories are given or the model keeps leaving a category out.
+        :raises EnvironmentError: If the required `GOOGLE_KEY` environment variable is not set.
+        """
+        categories = [category.strip() for category in categories if category.strip()]
+        if not categories:
+            raise ValueError("Categories cannot be empty")
+
+        batches = [categories[start:start + batch_size] for start in range(0, len(categories), batch_size)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            records = {}
+            for batch_records in executor.map(self._generate_batch, batches):
+                records.update(batch_records)
+
+        missing = [category for category in categories if category.casefold() not in records]
+        if missing:
+            records.update(self._generate_batch(missing))
+            missing = [category for category in categories if category.casefold() not in records]
+            if missing:
+                raise ValueError(f"No script generated for: {', '.join(missing)}")
+
+        return [records[category.casefold()] for category in categories]
+
+    async def agenerate_records(self, categories: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                                timeout: Optional[float] = None) -> List[ScriptRecord]:
+        """
+        Async counterpart of ``generate_records``; every batch is requested at the same time.
+
+        :raises ValueError: If no categories are given or the model keeps leaving a category out.
+        :raises asyncio.TimeoutError: If the records were not complete within ``timeout`` seconds.
+        """
+        categories = [category.strip() for category in categories if category.strip()]
+        if not categories:
+            raise ValueError("Categories cannot be empty")
+
+        return await asyncio.wait_for(self._agenerate_records(categories, batch_size), timeout)
+
+    async def _agenerate_records(self, categories: List[str], batch_size: int) -> List[ScriptRecord]:
+        batches = [categories[start:start + batch_size] for start in range(0, len(categories), batch_size)]
+        records = {}
+        for batch_records in await asyncio.gather(*(self._agenerate_batch(batch) for batch in batches)):
+            records.update(batch_records)
+
+        missing = [category for category in categories if category.casefold() not in records]
+        if missing:
+            records.update(await self._agenerate_batch(missing))
+            missing = [category for category in categories if category.casefold() not in records]
+            if missing:
+                raise ValueError(f"No script generated for: {', '.join(missing)}")
+
+        return [records[category.casefold()] for category in categories]
+
+    def _generate_batch(self, categories: List[str]) -> dict:
+        prompt, config, schema = self._records_request(categories)
+        with self.clients.tracer.span("script.batch", model=MODEL, categories=len(categories)):
+            text = self._generate_cached(prompt, {"response_schema": schema}, config)
+        return self._parse_records(text, categories)
+
+    async def _agenerate_batch(self, categories: List[str]) -> dict:
+        prompt, config, schema = self._records_request(categories)
+        with self.clients.tracer.span("script.batch", model=MODEL, categories=len(categories)):
+            text = await self._agenerate_cached(prompt, {"response_schema": schema}, config)
+        return self._parse_records(text, categories)
+
+    def _parse_records(self, text: str, categories: List[str]) -> dict:
+        wanted = {category.casefold(): category for category in categories}
+        records = {}
+        for item in json.loads(text):
+            record = self._parse_record(item, wanted)
+            if record is not None:
+                records[record.category.casefold()] = record
+        return records
+
+    def _stream_batch(self, categories: List[str]) -> Iterator[ScriptRecord]:
+        prompt, config, schema = self._records_request(categories)
+        wanted = {category.casefold(): category for category in categories}
+        with self.clients.tracer.span("script.batch", model=MODEL, categories=len(categories), stream=True):
+            for item in iter_json_array(self._stream_cached(prompt, {"response_schema": schema}, config)):
+                record = self._parse_record(item, wanted)
+                if record is not None:
+                    yield record
+
+    def _stream_records(self, categories: List[str], batch_size: int, max_workers: int) -> Iterator[ScriptRecord]:
+        batches = [categories[start:start + batch_size] for start in range(0, len(categories), batch_size)]
+        arrivals = queue.Queue()
+        finished = object()
+
+        def produce(batch):
+            try:
+                for record in self._stream_batch(batch):
+                    arrivals.put(record)
+            except Exception as error:
+                arrivals.put(error)
+            finally:
+                arrivals.put(finished)
+
+        records = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in batches:
+                executor.submit(contextvars.copy_context().run, produce, batch)
+            running = len(batches)
+            while running:
+                item = arrivals.get()
+                if item is finished:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                elif item.category.casefold() not in records:
+                    records[item.category.casefold()] = item
+                    yield item
+
+        missing = [category for category in categories if category.casefold() not in records]
+        if missing:
+            retried = self._generate_batch(missing)
+            for category in missing:
+                if category.casefold() in retried and category.casefold() not in records:
+                    records[category.casefold()] = retried[category.casefold()]
+                    yield retried[category.casefold()]
+            missing = [category for category in categories if category.casefold() not in records]
+            if missing:
+                raise ValueError(f"No script generated for: {', '.join(missing)}")
+
+    def _records_request(self, categories: List[str]):
+        from google.genai import types
+
+        translations = TRANSLATIONS_PROMPT.format(languages=", ".join(self.languages)) if self.languages else ""
+        prompt = RECORDS_PROMPT.format(categories="\n".join(categories), translations=translations)
+        schema = records_schema(self.languages)
+        config = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+        )
+        return prompt, config, schema
+
+    def _parse_record(self, item: dict, wanted: dict) -> Optional[ScriptRecord]:
+        key = str(item.get("category", "")).strip().casefold()
+        if key not in wanted:
+            return None
+        # Languages the model left out fall back to the original narration
+        narrations = {
+            str(translation.get("language", "")).strip(): str(translation.get("narration_script", "")).strip()
+            for translation in item.get("translations") or []
+            if isinstance(translation, dict)
+        }
+        return ScriptRecord(
+            category=wanted[key],
+            image_query=item["image_query"].strip(),
+            narration_script=item["narration_script"].strip(),
+            narrations={language: narrations[language] for language in self.languages if narrations.get(language)},
+        )
+
+    def _generate_cached(self, prompt, settings: Optional[dict] = None, config=None) -> str:
+        if self.cache is not None:
+            data = self.cache.get_or_fetch(
+                "gemini", MODEL, settings, prompt,
+                lambda: self._generate(prompt, config).encode("utf-8"),
+            )
+            return data.decode("utf-8")
+
+        return self._generate(prompt, config)
+
+    def _generate(self, prompt, config=None) -> str:
+        client = self.clients.genai_client()
+
+        def request():
+            if config is None:
+                return client.models.generate_content(
+                    model=MODEL,
+                    contents=prompt,
+                )
+            return client.models.generate_content(
+                model=MODEL,
+                contents=prompt,
+                config=config,
+            )
+
+        with self.clients.tracer.span("gemini.request", model=MODEL) as span:
+            if self.scheduler is None:
+                response = request()
+            else:
+                response = self.scheduler.call("gemini", request)
+                self._record_usage(response)
+            text = response.text
+            span.set(characters=len(text or ""))
+        return text
+
+    async def _agenerate_cached(self, prompt, settings: Optional[dict] = None, config=None) -> str:
+        if self.cache is not None:
+            async def fetch():
+                return (await self._agenerate(prompt, config)).encode("utf-8")
+
+            data = await self.cache.aget_or_fetch("gemini", MODEL, settings, prompt, fetch)
+            return data.decode("utf-8")
+
+        return await self._agenerate(prompt, config)
+
+    async def _agenerate(self, prompt, config=None) -> str:
+        client = self.clients.genai_client()
+
+        async def request():
+            if config is None:
+                return await client.aio.models.generate_content(
+                    model=MODEL,
+                    contents=prompt,
+                )
+            return await client.aio.models.generate_content(
+                model=MODEL,
+                contents=prompt,
+                config=config,
+            )
+
+        with self.clients.tracer.span("gemini.request", model=MODEL) as span:
+            if self.scheduler is None:
+                response = await request()
+            else:
+                response = await self.scheduler.acall("gemini", request)
+                self._record_usage(response)
+            text = response.text
+            span.set(characters=len(text or ""))
+        return text
+
+    def _stream_cached(self, prompt, settings: Optional[dict] = None, config=None) -> Iterator[str]:
+        if self.cache is None:
+            return self._stream(prompt, config)
+
+        key = self.cache.key("gemini", MODEL, settings, prompt)
+        data = self.cache.get(key)
+        if data is not None:
+            return iter([data.decode("utf-8")])
+        return self._cache_stream(key, self._stream(prompt, config))
+
+    def _cache_stream(self, key: str, chunks: Iterator[str]) -> Iterator[str]:
+        # Only a complete response is stored, shared with the non-streaming requests
+        text = []
+        for chunk in chunks:
+            text.append(chunk)
+            yield chunk
+        self.cache.put(key, "".join(text).encode("utf-8"))
+
+    def _stream(self, prompt, config=None) -> Iterator[str]:
+        client = self.clients.genai_client()
+
+        def request():
+            if config is None:
+                response = client.models.generate_content_stream(model=MODEL, contents=prompt)
+            else:
+                response = client.models.generate_content_stream(model=MODEL, contents=prompt, config=config)
+            # Errors surface on the first chunk; pulling it here lets the scheduler retry the request
+            response = iter(response)
+            first_chunk = next(response, None)
+            return response if first_chunk is None else itertools.chain([first_chunk], response)
+
+        started = time.perf_counter()
+        if self.scheduler is None:
+            response = request()
+        else:
+            response = self.scheduler.call("gemini", request)
+        time_to_first_chunk = time.perf_counter() - started
 
-        client = genai.Client(api_key=google_key)
+        characters = 0
+        last_chunk = None
+        for chunk in response:
+            last_chunk = chunk
+            text = chunk.text or ""
+            characters += len(text)
+            if text:
+                yield text
+        if self.scheduler is not None and last_chunk is not None:
+            # The last chunk carries the token counts of the whole response
+            self._record_usage(last_chunk)
+        self.clients.tracer.record("gemini.stream", time.perf_counter() - started, model=MODEL,
+                                   time_to_first_chunk=time_to_first_chunk, characters=characters)
 
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-lite",
-            contents=prompt,
+    def _record_usage(self, response) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        self.scheduler.record_usage(
+            "gemini",
+            prompt_tokens=getattr(usage, "prompt_token_count", None) or 0,
+            response_tokens=getattr(usage, "candidates_token_count", None) or 0,
         )
 
-        return response.text
+    @staticmethod
+    def _lines(chunks: Iterator[str]) -> Iterator[str]:
+        buffer = ""
+        for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split("\n")
+            yield from lines
+        if buffer:
+            yield buffer
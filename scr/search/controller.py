@@ -0,0 +1,436 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from scr.budget.controller import BudgetController
+from scr.scheduler.controller import QuotaExceededError
+
+# Hedge delay used until a provider has enough latency samples for a p95
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_SAMPLES = 5
+# Weight of each accepted image type; anything else, such as SVG, is never downloaded
+MIME_SCORES = {
+    "image/jpeg": 1.0,
+    "image/png": 0.9,
+    "image/webp": 0.9,
+    "image/gif": 0.2,
+}
+# Weight of a criterion the provider listed no metadata for
+UNKNOWN_SCORE = 0.7
+# How much each position further down the provider's ranking lowers its relevance
+RANK_DECAY = 0.05
+
+
+@dataclass
+class SearchResult:
+    """
+    Image URLs returned by the provider that answered first.
+
+    :ivar provider: Name of the provider the URLs came from.
+    :type provider: str
+    :ivar urls: Candidate image URLs, best first.
+    :type urls: list[str]
+    """
+    provider: str
+    urls: List[str]
+
+
+@dataclass
+class Candidate:
+    """
+    Image listed by a search provider, with the metadata it was listed with.
+
+    :ivar url: URL of the image.
+    :type url: str
+    :ivar provider: Name of the provider that listed it.
+    :type provider: str
+    :ivar query: Query it was found for.
+    :type query: str
+    :ivar position: Position in the provider's ranking, across result pages.
+    :type position: int
+    :ivar width: Width in pixels, if listed.
+    :type width: int
+    :ivar height: Height in pixels, if listed.
+    :type height: int
+    :ivar mime: Content type, if listed.
+    :type mime: str
+    :ivar byte_size: File size in bytes, if listed.
+    :type byte_size: int
+    """
+    url: str
+    provider: str = ""
+    query: str = ""
+    position: int = 0
+    width: Optional[int] = None
+    height: Optional[int] = None
+    mime: Optional[str] = None
+    byte_size: Optional[int] = None
+
+    @property
+    def domain(self) -> str:
+        host = urlparse(self.url).hostname or ""
+        return host[4:] if host.startswith("www.") else host
+
+
+def score_candidate(candidate: Candidate, size: Tuple[int, int], success_rate: float = 0.5,
+                    max_bytes: Optional[int] = None) -> float:
+    """
+    Scores how likely ``candidate`` is to download and frame well at ``size``, from its listing alone.
+
+    The score multiplies the weight of its content type, the share of the frame it fills without
+    upscaling, the square root of the share of the picture kept when cropping to the frame's aspect
+    ratio, the download success rate of its domain and its relevance as ranked by the provider.
+    Files listed as larger than ``max_bytes`` score zero.
+    """
+    if max_bytes is not None and candidate.byte_size is not None and candidate.byte_size > max_bytes:
+        return 0.0
+
+    mime_score = UNKNOWN_SCORE
+    if candidate.mime:
+        mime_score = MIME_SCORES.get(candidate.mime.split(";")[0].strip().lower(), 0.0)
+    if candidate.width and candidate.height:
+        width, height = size
+        upscale = max(width / candidate.width, height / candidate.height)
+        resolution = 1.0 if upscale <= 1.0 else 1.0 / upscale
+        aspect = (candidate.width / candidate.height) / (width / height)
+        kept = min(aspect, 1.0 / aspect) ** 0.5
+    else:
+        resolution = kept = UNKNOWN_SCORE
+    relevance = 1.0 / (1.0 + RANK_DECAY * candidate.position)
+    return mime_score * resolution * kept * success_rate * relevance
+
+
+def rank_candidates(candidates: List[Candidate], size: Tuple[int, int], limit: Optional[int] = None,
+                    max_bytes: Optional[int] = None,
+                    success_rate: Callable[[str], float] = lambda domain: 0.5) -> List[Candidate]:
+    """
+    Returns the candidates worth downloading for a frame of ``size``, best first, at most ``limit``.
+    ``success_rate`` gives the download success rate of a domain.
+    """
+    scored = [
+        (score_candidate(candidate, size, success_rate(candidate.domain), max_bytes), position)
+        for position, candidate in enumerate(candidates)
+    ]
+    ranked = sorted((item for item in scored if item[0] > 0), key=lambda item: (-item[0], item[1]))
+    return [candidates[position] for _, position in ranked[:limit]]
+
+
+class ProviderStats:
+    """
+    Rolling latency and error statistics of a single search provider.
+
+    :ivar window: Number of most recent calls the statistics are computed over.
+    :type window: int
+    :ivar exhausted: Whether the provider ran out of quota and is no longer routed to.
+    :type exhausted: bool
+    """
+
+    def __init__(self, window: int = 50):
+        self.window = window
+        self.exhausted = False
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._latencies.append(latency)
+            self._outcomes.append(ok)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+
+class SearchController:
+    """
+    Routes image searches across several providers and hedges slow requests.
+
+    Each provider is a callable taking a query and returning candidate image URLs. A search
+    goes to the provider with the best observed latency and error rate first; if it has not
+    answered within its p95 latency, the next provider is queried as well and the first
+    non-empty answer wins. Failed or empty answers move on to the next provider immediately,
+    and a provider that runs out of daily quota is skipped for the rest of the run. Requests
+    that lose the race are left to finish in the background so their latency still counts.
+
+    Providers registered with a paged search also list their images with metadata. ``candidates``
+    requests several result pages and query variants from such a provider at the same time,
+    hedged across providers like ``search``, and ``rank_candidates`` scores them from their size,
+    aspect ratio, type and the download success rate of their domain, so only the most promising
+    images are downloaded.
+
+    With a ``budget`` that is running out, searches stop hedging and providers are ranked by the
+    price of their next query first, so free providers and free daily queries are used up first.
+
+    :ivar providers: Registered search callables, keyed by provider name, in preference order.
+    :type providers: dict
+    :ivar hedge_delay: Delay before hedging while a provider has too few samples for a p95.
+    :type hedge_delay: float
+    :ivar max_workers: Maximum number of provider requests in flight across all searches.
+    :type max_workers: int
+    :ivar budget: Optional cost accounting the providers are ranked by once it is constrained.
+    :type budget: BudgetController
+    """
+
+    def __init__(self, providers: Optional[Dict[str, Callable[[str], List[str]]]] = None,
+                 hedge_delay: float = DEFAULT_HEDGE_DELAY, window: int = 50, max_workers: int = 16,
+                 clock: Callable[[], float] = time.monotonic, budget: Optional[BudgetController] = None):
+        self.providers = {}
+        self.hedge_delay = hedge_delay
+        self.max_workers = max_workers
+        self.budget = budget
+        self._window = window
+        self._clock = clock
+        self._stats = {}
+        self._pagers = {}
+        self._domains = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        for name, search in (providers or {}).items():
+            self.register(name, search)
+
+    def register(self, name: str, search: Callable[[str], List[str]],
+                 pages: Optional[Callable[[str, int], List[Candidate]]] = None) -> None:
+        """
+        Registers the provider ``name``. ``pages``, if given, returns the candidates of one result page.
+        """
+        self.providers[name] = search
+        self._stats[name] = ProviderStats(self._window)
+        if pages is not None:
+            self._pagers[name] = pages
+
+    def stats(self, name: str) -> ProviderStats:
+        return self._stats[name]
+
+    def rank(self, providers: Optional[List[str]] = None) -> List[str]:
+        """
+        Orders the available providers by median latency, inflated by their error rate.
+        Providers without enough samples are assumed to answer within the hedge delay.
+        ``providers`` restricts the ranking to those names, listed in order of preference.
+        While the budget is constrained, the cheapest providers come first.
+        """
+        constrained = self.budget is not None and self.budget.constrained()
+
+        def score(item):
+            position, name = item
+            stats = self._stats[name]
+            median = stats.quantile(0.5)
+            latency = self.hedge_delay if median is None else median
+            cost = self.budget.unit_cost(name) if constrained else 0.0
+            return cost, latency / max(1.0 - stats.error_rate, 0.05), position
+
+        names = self.providers if providers is None else [name for name in providers if name in self.providers]
+        available = [(position, name) for position, name in enumerate(names) if not self._stats[name].exhausted]
+        return [name for _, name in sorted(available, key=score)]
+
+    def search(self, query: str, providers: Optional[List[str]] = None) -> SearchResult:
+        """
+        Returns the first non-empty result for ``query``, optionally from the given ``providers`` only.
+
+        :raises EnvironmentError: If no provider is registered or all of them ran out of quota.
+        :raises ValueError: If every provider answered without results.
+        """
+        remaining = self.rank(providers)
+        if not remaining:
+            raise EnvironmentError("No image search provider is available")
+
+        executor = self._get_executor()
+
+        def submit(name):
+            # Keep the caller's tracing context, so provider spans stay attributed to its category
+            return [executor.submit(contextvars.copy_context().run, self._call, name, self.providers[name], query)]
+
+        name, listed = self._hedged(remaining, submit)
+        if name is None:
+            raise ValueError(f"No image results for: {query}")
+        return SearchResult(name, listed[0])
+
+    def candidates(self, queries: List[str], pages: int = 1, providers: Optional[List[str]] = None,
+                   start: int = 1) -> List[Candidate]:
+        """
+        Returns the candidates listed for every query in ``queries`` on ``pages`` result pages from page
+        ``start``, all requested at the same time. Providers are tried in ranked order until one lists any,
+        and the next one is queried as well when the latest has not answered within its p95 latency; a
+        provider without a paged search is asked for its first page only, and skipped for later pages.
+
+        :raises EnvironmentError: If no provider is registered or all of them ran out of quota.
+        :raises ValueError: If every provider answered without results.
+        """
+        remaining = self.rank(providers)
+        if start > 1:
+            remaining = [name for name in remaining if name in self._pagers]
+        if not remaining:
+            raise EnvironmentError("No image search provider is available")
+
+        executor = self._get_executor()
+
+        def submit(name):
+            pager = self._pagers.get(name)
+            if pager is None:
+                pager, page_count = self._first_page(name), 1
+            else:
+                page_count = max(pages, 1)
+            return [
+                executor.submit(contextvars.copy_context().run, self._call, name, pager, query, page)
+                for query in queries
+                for page in range(start, start + page_count)
+            ]
+
+        name, listed = self._hedged(remaining, submit)
+        if name is None:
+            raise ValueError(f"No image results for: {', '.join(queries)}")
+        found = {}
+        for candidates in listed:
+            for candidate in candidates:
+                found.setdefault(candidate.url, candidate)
+        return list(found.values())
+
+    def rank_candidates(self, candidates: List[Candidate], size: Tuple[int, int], limit: Optional[int] = None,
+                        max_bytes: Optional[int] = None) -> List[Candidate]:
+        """
+        Returns the candidates worth downloading for a frame of ``size``, best first, at most ``limit``,
+        weighing each by the download success rate of its domain.
+        """
+        return rank_candidates(candidates, size, limit, max_bytes, self.domain_success_rate)
+
+    def record_download(self, url: str, ok: bool) -> None:
+        """
+        Counts a download from the domain of ``url`` as succeeded or failed.
+        """
+        domain = Candidate(url).domain
+        with self._lock:
+            counts = self._domains.setdefault(domain, [0, 0])
+            counts[0 if ok else 1] += 1
+
+    def domain_success_rate(self, domain: str) -> float:
+        """
+        Returns the share of downloads from ``domain`` that succeeded, smoothed towards one half
+        so a single early failure does not rule a domain out.
+        """
+        with self._lock:
+            succeeded, failed = self._domains.get(domain, (0, 0))
+        return (succeeded + 1) / (succeeded + failed + 2)
+
+    async def acall(self, name: str, search: Callable[..., Awaitable[list]], *args) -> list:
+        """
+        Awaits ``search(*args)``, a request to the provider ``name`` made on an event loop, and counts
+        its latency and outcome towards the provider's ranking like a routed search.
+        """
+        stats = self._stats[name]
+        started = self._clock()
+        try:
+            listed = await search(*args)
+        except QuotaExceededError:
+            stats.exhausted = True
+            stats.record(self._clock() - started, ok=False)
+            raise
+        except Exception:
+            stats.record(self._clock() - started, ok=False)
+            raise
+        stats.record(self._clock() - started, ok=bool(listed))
+        return listed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _hedged(self, remaining: List[str], submit: Callable[[str], List[Future]]) -> Tuple[Optional[str], list]:
+        """
+        Sends the requests ``submit`` makes for the first provider of ``remaining``, and for the next one
+        whenever the latest has not answered within its p95 latency or answered without results.
+
+        :return: The first provider whose requests all completed with any result, and the result of each
+            request that succeeded, or (None, []) if every provider answered without results.
+        :raises Exception: The last error raised, if no provider listed anything and any request failed.
+        """
+        pending = {}
+        outstanding = {}
+        errors = []
+
+        def launch():
+            name = remaining.pop(0)
+            futures = submit(name)
+            outstanding[name] = futures
+            for future in futures:
+                pending[future] = name
+            return name
+
+        # Hedged requests are paid for too; they are dropped once the budget runs out
+        hedge = self.budget is None or not self.budget.constrained()
+        latest = launch()
+        while pending:
+            timeout = None
+            if remaining and hedge:
+                timeout = self._stats[latest].quantile(0.95)
+                timeout = self.hedge_delay if timeout is None else timeout
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                latest = launch()
+                continue
+
+            exhausted = False
+            for future in done:
+                name = pending.pop(future)
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                if any(other in pending for other in outstanding[name]):
+                    continue
+                # Results keep the order the requests were made in; requests that lose the race are
+                # left to finish, so their latency still counts
+                listed = [other.result() for other in outstanding[name] if other.exception() is None]
+                if any(listed):
+                    return name, listed
+                exhausted = True
+
+            if exhausted and remaining:
+                latest = launch()
+
+        if errors:
+            raise errors[-1]
+        return None, []
+
+    def _first_page(self, name: str) -> Callable[[str, int], List[Candidate]]:
+        search = self.providers[name]
+
+        def pager(query: str, page: int) -> List[Candidate]:
+            return [Candidate(url, name, query, position) for position, url in enumerate(search(query))]
+        return pager
+
+    def _call(self, name: str, search: Callable, *args) -> list:
+        stats = self._stats[name]
+        started = self._clock()
+        try:
+            urls = search(*args)
+        except QuotaExceededError:
+            stats.exhausted = True
+            stats.record(self._clock() - started, ok=False)
+            raise
+        except Exception:
+            stats.record(self._clock() - started, ok=False)
+            raise
+        stats.record(self._clock() - started, ok=bool(urls))
+        return urls
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
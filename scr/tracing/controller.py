@@ -0,0 +1,277 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Upper bounds of the span duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Span attributes inherited by every nested span, so deep calls stay attributable to their category
+INHERITED_ATTRIBUTES = ("category", "stage")
+METRIC_PREFIX = "trivia"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation; attributes can be added while it is open.
+
+    :ivar name: Operation name, e.g. ``http`` or ``audio.synthesize``.
+    :type name: str
+    :ivar attributes: Attributes recorded with the span.
+    :type attributes: dict
+    """
+
+    def __init__(self, tracer: "TracingController", name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = None
+        self.trace_id = None
+        self._tracer = tracer
+        self._token = None
+        self._started = 0.0
+        self._start_time = 0.0
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def _link(self, parent: Optional["Span"]) -> None:
+        if parent is not None:
+            self.parent_id = parent.span_id
+            self.trace_id = parent.trace_id
+            for name in INHERITED_ATTRIBUTES:
+                if name in parent.attributes:
+                    self.attributes.setdefault(name, parent.attributes[name])
+        else:
+            self.trace_id = uuid.uuid4().hex
+
+    def __enter__(self):
+        self._link(_current_span.get())
+        self._token = _current_span.set(self)
+        self._start_time = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        self._tracer._finish(self, duration, exc)
+        return False
+
+
+class _NoopSpan:
+    """
+    Shared span handed out while tracing is off; every operation is a no-op.
+    """
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class TracingController:
+    """
+    Records spans and counters for every stage of an episode build.
+
+    Spans nest per thread and inherit the ``category`` and ``stage`` attributes of the span
+    they were opened in, so an HTTP call made deep inside the photo stage is attributed to its
+    category. Finished spans are appended to a JSON-lines trace file and aggregated into a
+    duration histogram; counters track bytes, retries and cache hits. ``prometheus()`` renders
+    both in the Prometheus text format and ``serve()`` exposes it over HTTP. When disabled,
+    ``span`` returns a shared no-op object and counters return immediately.
+
+    :ivar enabled: Whether spans and counters are recorded.
+    :type enabled: bool
+    :ivar trace_path: Optional JSON-lines file every finished span is appended to.
+    :type trace_path: pathlib.Path
+    """
+
+    def __init__(self, trace_path: Optional[Path] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.trace_path = Path(trace_path) if trace_path is not None else None
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+        self._histograms: Dict[Tuple, list] = {}
+        self._server = None
+
+    @classmethod
+    def from_environment(cls) -> "TracingController":
+        """
+        Builds the tracer configured by ``TRACE_PATH`` and ``METRICS_PORT``; disabled when neither is set.
+        """
+        trace_path = os.environ.get("TRACE_PATH")
+        metrics_port = os.environ.get("METRICS_PORT")
+        if not trace_path and not metrics_port:
+            return DISABLED
+
+        tracer = cls(trace_path=trace_path or None)
+        if metrics_port:
+            tracer.serve(int(metrics_port))
+        return tracer
+
+    def span(self, name: str, **attributes):
+        """
+        Returns a context manager timing ``name``; use ``span.set(...)`` to add attributes.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def record(self, name: str, duration: float, **attributes) -> None:
+        """
+        Records an operation that was timed by the caller and just finished, e.g. a consumed stream.
+        """
+        if not self.enabled:
+            return
+        span = Span(self, name, attributes)
+        span._link(_current_span.get())
+        span._start_time = time.time() - duration
+        self._finish(span, duration, None)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Adds ``value`` to the counter ``name`` with the given labels.
+        """
+        if not self.enabled:
+            return
+        key = _counter_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def counter(self, name: str, **labels) -> float:
+        key = _counter_key(name, labels)
+        with self._lock:
+            return self._counters.get(key, 0.0)
+
+    def prometheus(self) -> str:
+        """
+        Renders the counters and span duration histogram in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric}{_labels(labels)} {_number(value)}")
+
+        if histograms:
+            metric = f"{METRIC_PREFIX}_span_duration_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, (buckets, total, count) in sorted(histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                    cumulative += bucket_count
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{metric}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{metric}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves ``prometheus()`` at ``/metrics`` from a background thread and returns the server.
+        """
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self) -> None:
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _finish(self, span: Span, duration: float, error: Optional[BaseException]) -> None:
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span._start_time,
+            "duration": duration,
+            "attributes": span.attributes,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+
+        labels = (("span", span.name),)
+        with self._lock:
+            buckets, total, count = self._histograms.get(labels, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+                    break
+            self._histograms[labels] = (buckets, total + duration, count + 1)
+
+            if self.trace_path is not None:
+                if self._trace_file is None:
+                    self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._trace_file = open(self.trace_path, "a", encoding="utf-8")
+                self._trace_file.write(json.dumps(record, default=str) + "\n")
+                self._trace_file.flush()
+
+
+def _counter_key(name: str, labels: dict) -> Tuple[str, Tuple]:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Shared tracer for controllers built without one
+DISABLED = TracingController(enabled=False)
+
@@ -0,0 +1,235 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+from scr.bundle.controller import BundleController
+from scr.imaging.controller import FRAMES
+from scr.mastering.controller import MasteringController
+
+DEFAULT_FPS = 30
+
+
+@dataclass
+class Segment:
+    """
+    A still photo shown for the length of its narration clip.
+
+    :ivar name: Segment name, the category or ``intro``.
+    :type name: str
+    :ivar photo: Photo shown during the segment, or None for a plain background; a ``subfile`` URL
+        when the photo is read from an episode bundle.
+    :type photo: pathlib.Path or str
+    :ivar audio: Narration clip of the segment, a path or a ``subfile`` URL.
+    :type audio: pathlib.Path or str
+    :ivar duration: Length of the narration clip, in seconds.
+    :type duration: float
+    """
+    name: str
+    photo: Optional[Union[Path, str]]
+    audio: Union[Path, str]
+    duration: float = 0.0
+
+
+class VideoController:
+    """
+    Renders trivia videos from the per-category photos and narration clips.
+
+    Every segment shows one photo for exactly the length of its audio clip. Segments are
+    rendered independently by ffmpeg processes running in parallel, each of which reads the
+    still image and streams encoded frames to disk, so nothing is held in memory. The
+    segments share codec settings and are then joined with ffmpeg's concat demuxer without
+    re-encoding. With an episode bundle, ffmpeg reads every photo and clip in place from the
+    bundle file instead of from the asset directories. With a mastering controller, the clips
+    are trimmed and loudness-normalized first and the segments play the mastered clips.
+
+    :ivar photos_dir: Directory holding ``{category}.jpg`` photos.
+    :type photos_dir: pathlib.Path
+    :ivar audio_dir: Directory holding ``{category}.mp3`` clips and ``intro.mp3``.
+    :type audio_dir: pathlib.Path
+    :ivar videos_dir: Directory the rendered videos are written to.
+    :type videos_dir: pathlib.Path
+    :ivar size: Video frame size, in pixels.
+    :type size: tuple[int, int]
+    :ivar fps: Frame rate of the rendered video.
+    :type fps: int
+    :ivar max_workers: Number of segments rendered at the same time.
+    :type max_workers: int
+    :ivar bundle: Optional episode bundle the segments are read from instead of the directories.
+    :type bundle: BundleController
+    :ivar mastering: Optional post-processing of the narration clips before they are rendered.
+    :type mastering: MasteringController
+    """
+
+    def __init__(self, photos_dir: Optional[Path] = None, audio_dir: Optional[Path] = None,
+                 videos_dir: Optional[Path] = None, frame: str = "portrait", fps: int = DEFAULT_FPS,
+                 max_workers: int = 4, ffmpeg: str = "ffmpeg", ffprobe: str = "ffprobe",
+                 bundle: Optional[BundleController] = None, mastering: Optional[MasteringController] = None):
+        if frame not in FRAMES:
+            raise ValueError(f"frame must be one of: {', '.join(FRAMES)}")
+
+        current_dir = Path(__file__).parent
+        project_root = current_dir.parent.parent
+        self.photos_dir = Path(photos_dir or project_root / "data" / "photos")
+        self.audio_dir = Path(audio_dir or project_root / "data" / "audios")
+        self.videos_dir = Path(videos_dir or project_root / "data" / "videos")
+        self.size = FRAMES[frame]
+        self.fps = fps
+        self.max_workers = max_workers
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.bundle = bundle
+        self.mastering = mastering
+
+    def segments(self, categories: List[str], intro: bool = True) -> List[Segment]:
+        """
+        Lists the segments of an episode: the intro clip, if present, then one per category.
+
+        :raises FileNotFoundError: If a category's photo or clip is missing.
+        """
+        if self.bundle is not None:
+            return self._bundle_segments(categories, intro)
+
+        segments = []
+        intro_audio = self.audio_dir / "intro.mp3"
+        if intro and intro_audio.is_file():
+            intro_photo = self.photos_dir / "intro.jpg"
+            segments.append(Segment("intro", intro_photo if intro_photo.is_file() else None, intro_audio))
+
+        for category in categories:
+            photo = self.photos_dir / f"{category}.jpg"
+            audio = self.audio_dir / f"{category}.mp3"
+            for path in (photo, audio):
+                if not path.is_file():
+                    raise FileNotFoundError(f"Missing asset for {category}: {path}")
+            segments.append(Segment(category, photo, audio))
+
+        return segments
+
+    def _bundle_segments(self, categories: List[str], intro: bool) -> List[Segment]:
+        segments = []
+        if intro and self.bundle.entry("audio", "intro") is not None:
+            intro_photo = self.bundle.entry("photos", "intro")
+            segments.append(Segment("intro", self.bundle.url("photos", "intro") if intro_photo else None,
+                                    self.bundle.url("audio", "intro")))
+
+        for category in categories:
+            try:
+                segments.append(Segment(category, self.bundle.url("photos", category),
+                                        self.bundle.url("audio", category)))
+            except KeyError as error:
+                raise FileNotFoundError(f"Missing asset for {category}: {error.args[0]}")
+        return segments
+
+    def compose(self, categories: List[str], output_name: str = "episode", intro: bool = True) -> Path:
+        """
+        Renders the episode video to ``{output_name}.mp4``.
+
+        :param categories: Categories in the order they appear in the video.
+        :type categories: list[str]
+        :param output_name: Name of the video file, without extension.
+        :type output_name: str
+        :param intro: Whether ``intro.mp3`` opens the video when present.
+        :type intro: bool
+        :return: Path of the rendered video.
+        :rtype: pathlib.Path
+        :raises ValueError: If there is nothing to render.
+        :raises FileNotFoundError: If an asset is missing.
+        :raises EnvironmentError: If ffmpeg or ffprobe is not installed.
+        """
+        segments = self.segments(categories, intro)
+        if not segments:
+            raise ValueError("No segments to render")
+        if self.mastering is not None:
+            self._master(segments, categories, output_name, intro)
+
+        self.videos_dir.mkdir(parents=True, exist_ok=True)
+        output_path = self.videos_dir / f"{output_name}.mp4"
+        work_dir = Path(tempfile.mkdtemp(dir=self.videos_dir, prefix=f".{output_name}-"))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                unknown = [segment for segment in segments if not segment.duration]
+                for segment, duration in zip(unknown, executor.map(self.duration, [s.audio for s in unknown])):
+                    segment.duration = duration
+                segment_paths = list(executor.map(
+                    lambda item: self.render_segment(item[1], work_dir / f"{item[0]:04d}.mp4"),
+                    enumerate(segments),
+                ))
+
+            concat_list = work_dir / "segments.txt"
+            concat_list.write_text("".join(f"file '{path.name}'\n" for path in segment_paths), encoding="utf-8")
+            temp_output = work_dir / "episode.mp4"
+            self._run([
+                self.ffmpeg, "-y", "-v", "error",
+                "-f", "concat", "-safe", "0", "-i", str(concat_list),
+                "-c", "copy", "-movflags", "+faststart",
+                str(temp_output),
+            ])
+            os.replace(temp_output, output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return output_path
+
+    def _master(self, segments: List[Segment], categories: List[str], output_name: str, intro: bool) -> None:
+        """
+        Masters the episode's clips and points every segment at its processed clip, whose length is already known.
+        """
+        track = self.mastering.master(categories, output_name=output_name, intro=intro)
+        clips = {clip.name: clip for clip in track.clips}
+        for segment in segments:
+            clip = clips.get(segment.name)
+            if clip is not None:
+                segment.audio = clip.path
+                segment.duration = clip.duration
+
+    def duration(self, audio: Path) -> float:
+        """
+        Returns the length of an audio clip, in seconds.
+        """
+        output = self._run([
+            self.ffprobe, "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            str(audio),
+        ])
+        return float(output.strip())
+
+    def render_segment(self, segment: Segment, output: Path) -> Path:
+        """
+        Encodes a single segment; the photo is scaled and padded to the frame.
+        """
+        width, height = self.size
+        if segment.photo is None:
+            video_input = ["-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={self.fps}"]
+        elif isinstance(segment.photo, str):
+            # A bundle URL has no image extension, so the looping image demuxer is picked explicitly
+            video_input = ["-f", "image2", "-pattern_type", "none", "-loop", "1", "-framerate", str(self.fps),
+                           "-i", segment.photo]
+        else:
+            video_input = ["-loop", "1", "-framerate", str(self.fps), "-i", str(segment.photo)]
+
+        self._run([
+            self.ffmpeg, "-y", "-v", "error",
+            *video_input,
+            "-i", str(segment.audio),
+            "-t", f"{segment.duration:.3f}",
+            "-vf", (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                    f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={self.fps}"),
+            "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2",
+            str(output),
+        ])
+        return output
+
+    @staticmethod
+    def _run(command: List[str]) -> str:
+        try:
+            completed = subprocess.run(command, check=True, capture_output=True, text=True)
+        except FileNotFoundError:
+            raise EnvironmentError(f"{command[0]} is not installed")
+        return completed.stdout
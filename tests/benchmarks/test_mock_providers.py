@@ -0,0 +1,63 @@
+import unittest
+
+import requests
+
+from benchmarks.mock_providers import MockBehavior, MockProviders
+from benchmarks.pipeline_benchmark import percentile, run_benchmark
+
+
+class TestMockProviders(unittest.TestCase):
+    """
+    Unit tests for the mock provider server and the end-to-end benchmark running against it.
+    """
+
+    def test_search_links_point_at_image_host(self):
+        with MockProviders(image_size=(64, 48), results=2) as providers:
+            response = requests.get(providers.environ()["GOOGLE_SEARCH_URL"], params={"q": "Tequila photo"}, timeout=5)
+            links = [item["link"] for item in response.json()["items"]]
+            image = requests.get(links[0], timeout=5)
+
+        self.assertEqual(len(links), 2)
+        self.assertEqual(image.headers["Content-Type"], "image/jpeg")
+        self.assertEqual(image.content[:2], b"\xff\xd8")
+        self.assertEqual(providers.stats.requests, {"google_search": 1, "images": 1})
+
+    def test_search_pages_list_new_images_with_metadata(self):
+        with MockProviders(image_size=(64, 48), results=2) as providers:
+            url = providers.environ()["GOOGLE_SEARCH_URL"]
+            first = requests.get(url, params={"q": "Tequila"}, timeout=5).json()["items"]
+            second = requests.get(url, params={"q": "Tequila", "start": 11}, timeout=5).json()["items"]
+
+        self.assertEqual(first[0]["image"], {"width": 64, "height": 48})
+        self.assertFalse({item["link"] for item in first} & {item["link"] for item in second})
+
+    def test_error_rate_injects_failures(self):
+        behavior = MockBehavior(latency=0, jitter=0, error_rate=1.0)
+        with MockProviders({"unsplash": behavior}) as providers:
+            response = requests.get(providers.environ()["UNSPLASH_URL"], params={"query": "Tequila"}, timeout=5)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(providers.stats.errors, {"unsplash": 1})
+
+    def test_unknown_route(self):
+        with self.assertRaises(ValueError):
+            MockProviders({"bing": MockBehavior()})
+
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertIsNone(percentile([], 95))
+
+    def test_run_benchmark_end_to_end(self):
+        report = run_benchmark(episodes=1, categories=2, max_workers=2, behavior=MockBehavior(0.0, 0.0),
+                               image_size=(320, 240), audio_bytes=4096, isolate=False)
+
+        self.assertEqual(report["failed_stages"], 0)
+        self.assertEqual(set(report["stages"]), {"script", "photos", "audio"})
+        self.assertGreater(report["episodes_per_hour"], 0)
+        self.assertGreater(report["bytes_written"], 2 * 4096)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from benchmarks.startup_benchmark import ENTRY_POINTS, ImportTiming, measure_startup, parse_importtime
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    """
+    Unit tests for the startup benchmark, validating the ``-X importtime`` parser and that the
+    entry points start without importing the provider SDKs.
+    """
+
+    def test_parse_importtime(self):
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   google.genai.types",
+            "import time:        30 |        150 | google.genai",
+            "Traceback is ignored",
+        ])
+
+        self.assertEqual(parse_importtime(output), [
+            ImportTiming("google.genai.types", 120, 120, 1),
+            ImportTiming("google.genai", 30, 150, 0),
+        ])
+
+    def test_entry_points_do_not_import_provider_sdks(self):
+        for module in ENTRY_POINTS:
+            with self.subTest(module=module):
+                report = measure_startup(module, runs=1, top=3)
+
+                self.assertEqual(report["provider_sdks"], [])
+                self.assertEqual(len(report["slowest_modules"]), 3)
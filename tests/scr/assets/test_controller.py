@@ -0,0 +1,104 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from scr.assets.controller import AssetsController, BKTree, normalize_query
+from scr.imaging.controller import hamming_distance
+
+
+def write_image(path, seed, size=(64, 48), quality=90):
+    generator = random.Random(seed)
+    image = Image.new("RGB", (8, 6))
+    image.putdata([tuple(generator.randrange(256) for _ in range(3)) for _ in range(48)])
+    image.resize(size, Image.BILINEAR).save(path, "JPEG", quality=quality)
+    return path
+
+
+class TestAssetsController(unittest.TestCase):
+    """
+    Unit tests for the AssetsController class, validating the index of downloaded photos,
+    their reuse by query or category and near-duplicate detection.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.controller = AssetsController(self.root / "assets.sqlite", self.root / "library")
+
+    def tearDown(self):
+        self.controller.close()
+        self.temp_dir.cleanup()
+
+    def test_bk_tree_matches_linear_scan(self):
+        generator = random.Random(7)
+        values = [generator.getrandbits(64) for _ in range(500)]
+        tree = BKTree()
+        for index, value in enumerate(values):
+            tree.add(value, index)
+        probe = values[42] ^ 0b1011
+
+        matches = tree.search(probe, 12)
+
+        expected = sorted((hamming_distance(probe, value), index) for index, value in enumerate(values)
+                          if hamming_distance(probe, value) <= 12)
+        self.assertEqual(sorted(matches), expected)
+        self.assertEqual(matches[0], (3, 42))
+        self.assertEqual(len(tree), 500)
+
+    def test_add_records_and_find_reuses(self):
+        photo = write_image(self.root / "Tequila.jpg", seed=1)
+
+        asset, created = self.controller.add(photo, "http://example.com/1.jpg", "Tequila  bottle", "Tequila")
+
+        self.assertTrue(created)
+        self.assertEqual((asset.width, asset.height, asset.uses), (64, 48, 1))
+        self.assertEqual(asset.path.read_bytes(), photo.read_bytes())
+        self.assertEqual(self.controller.find("tequila bottle").id, asset.id)
+        self.assertEqual(self.controller.find("agave spirit", "TEQUILA").id, asset.id)
+        self.assertIsNone(self.controller.find("mezcal", "Mezcal"))
+
+        destination = self.controller.use(asset, self.root / "episode" / "Tequila.jpg")
+
+        self.assertEqual(destination.read_bytes(), photo.read_bytes())
+        self.assertEqual(self.controller.find("tequila bottle").uses, 2)
+
+    def test_near_duplicate_becomes_alias(self):
+        original, _ = self.controller.add(write_image(self.root / "a.jpg", seed=2), "http://a/1.jpg", "tequila")
+        recompressed = write_image(self.root / "b.jpg", seed=2, size=(80, 60), quality=40)
+
+        asset, created = self.controller.add(recompressed, "http://b/1.jpg", "agave", "Agave")
+
+        self.assertFalse(created)
+        self.assertEqual(asset.id, original.id)
+        self.assertEqual(self.controller.find("agave").id, original.id)
+        self.assertEqual(len(list((self.root / "library").rglob("*.jpg"))), 1)
+
+        other, created = self.controller.add(write_image(self.root / "c.jpg", seed=3), "http://c/1.jpg", "mezcal")
+        self.assertTrue(created)
+        self.assertEqual([match.id for _, match in self.controller.similar(other.dhash, 0)], [other.id])
+
+    def test_index_is_shared_between_instances(self):
+        asset, _ = self.controller.add(write_image(self.root / "a.jpg", seed=4), "http://a/1.jpg", "pulque")
+
+        other = AssetsController(self.root / "assets.sqlite", self.root / "library")
+        try:
+            self.assertEqual(other.find("Pulque").id, asset.id)
+            self.assertEqual([match.id for _, match in other.similar(asset.dhash)], [asset.id])
+        finally:
+            other.close()
+
+    def test_missing_original_is_not_reused(self):
+        asset, _ = self.controller.add(write_image(self.root / "a.jpg", seed=5), "http://a/1.jpg", "pulque")
+        asset.path.unlink()
+
+        self.assertIsNone(self.controller.find("pulque"))
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Tequila\tBOTTLE "), "tequila bottle")
+
+
+if __name__ == '__main__':
+    unittest.main()
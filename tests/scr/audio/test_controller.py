@@ -1,6 +1,15 @@
+import asyncio
+import os
+import stat
+import tempfile
 import unittest
 from pathlib import Path
-from scr.audio.controller import AudioController
+from scr.audio.controller import AudioController, NarrationProfile, parse_profiles
+from scr.cache.controller import CacheController
+from scr.manifest.controller import FILE_MODE
+from scr.phrases.controller import PhrasesController
+from scr.budget.controller import BudgetController
+from scr.scheduler.controller import SchedulerController
 from unittest.mock import MagicMock, patch
 
 
@@ -13,8 +22,8 @@ class TestAudioController(unittest.TestCase):
 
     """
 
-    @patch("scr.audio.controller.os.environ.get", return_value="mocked_api_key")
-    @patch("scr.audio.controller.ElevenLabs")
+    @patch("scr.clients.controller.os.environ.get", return_value="mocked_api_key")
+    @patch("elevenlabs.client.ElevenLabs")
     def test_generate_audio_valid_script(self, mock_elevenlabs, mock_environ_get):
         """
         Test that generate_audio works with a valid script input.
@@ -22,17 +31,17 @@ class TestAudioController(unittest.TestCase):
         audio_stream = [b"audio_chunk1", b"audio_chunk2"]
         client_instance = MagicMock()
         voice_settings_mock = MagicMock()
-        client_instance.text_to_speech.convert_as_stream.return_value = iter(audio_stream)
+        client_instance.text_to_speech.stream.return_value = iter(audio_stream)
         mock_elevenlabs.return_value = client_instance
 
         controller = AudioController()
-        with patch("scr.audio.controller.VoiceSettings", return_value=voice_settings_mock):
+        with patch("elevenlabs.VoiceSettings", return_value=voice_settings_mock):
             result = list(controller.generate_audio("This is a test script."))
 
         # Assert that the client was initialized
         mock_environ_get.assert_called_once_with("ELEVEN_LABS_KEY")
-        mock_elevenlabs.assert_called_once_with(api_key="mocked_api_key")
-        client_instance.text_to_speech.convert_as_stream.assert_called_once_with(
+        mock_elevenlabs.assert_called_once_with(api_key="mocked_api_key", timeout=30.0)
+        client_instance.text_to_speech.stream.assert_called_once_with(
             text="This is a test script.",
             voice_id="22VndfJPBU7AZORAZZTT",
             model_id="eleven_multilingual_v2",
@@ -40,7 +49,7 @@ class TestAudioController(unittest.TestCase):
         )
         self.assertEqual(result, audio_stream)
 
-    @patch("scr.audio.controller.os.environ.get", return_value="mocked_api_key")
+    @patch("scr.clients.controller.os.environ.get", return_value="mocked_api_key")
     def test_generate_audio_empty_script(self, mock_environ_get):
         """
         Test that generate_audio raises ValueError when script is empty.
@@ -52,7 +61,7 @@ class TestAudioController(unittest.TestCase):
 
         self.assertEqual(str(context.exception), "script cannot be empty")
 
-    @patch("scr.audio.controller.os.environ.get", return_value=None)
+    @patch("scr.clients.controller.os.environ.get", return_value=None)
     def test_generate_audio_missing_api_key(self, mock_environ_get):
         """
         Test that generate_audio raises EnvironmentError when ELEVEN_LABS_KEY is not set.
@@ -64,64 +73,301 @@ class TestAudioController(unittest.TestCase):
 
         self.assertEqual(str(context.exception), "ELEVEN_LABS_KEY environment variable is not set")
 
-    @patch("scr.audio.controller.Path.mkdir")
-    @patch("builtins.open", new_callable=MagicMock)
-    def test_save_audio_to_file_valid_input(self, mock_open, mock_mkdir):
+    @patch("scr.clients.controller.os.environ.get", return_value="mocked_api_key")
+    @patch("elevenlabs.client.ElevenLabs")
+    def test_generate_audio_reuses_client(self, mock_elevenlabs, mock_environ_get):
+        """
+        Test that consecutive generate_audio calls share a single ElevenLabs client.
+        """
+        controller = AudioController()
+        with patch("elevenlabs.VoiceSettings"):
+            controller.generate_audio("First script.")
+            controller.generate_audio("Second script.")
+
+        mock_elevenlabs.assert_called_once()
+        self.assertEqual(
+            mock_elevenlabs.return_value.text_to_speech.stream.call_count, 2)
+
+    @patch("scr.clients.controller.os.environ.get", return_value="mocked_api_key")
+    @patch("elevenlabs.client.ElevenLabs")
+    def test_generate_audio_caches_complete_stream(self, mock_elevenlabs, mock_environ_get):
+        """
+        Test that a fully consumed stream is cached and replayed without a new API call.
+        """
+        stream = mock_elevenlabs.return_value.text_to_speech.stream
+        stream.return_value = iter([b"chunk1", b"chunk2"])
+        cache = MagicMock()
+        cache.get.side_effect = [None, b"chunk1chunk2"]
+
+        controller = AudioController(cache=cache)
+        with patch("elevenlabs.VoiceSettings"):
+            first = list(controller.generate_audio("This is a test script."))
+            second = list(controller.generate_audio("This is a test script."))
+
+        self.assertEqual(first, [b"chunk1", b"chunk2"])
+        self.assertEqual(second, [b"chunk1chunk2"])
+        stream.assert_called_once()
+        cache.put.assert_called_once_with(cache.key.return_value, b"chunk1chunk2")
+
+    def test_save_audio_to_file_valid_input(self):
         """
         Test saving a valid audio stream to a file.
         """
         audio_chunks = [b"chunk1", b"chunk2", b"chunk3"]
-        file_name = "test_audio"
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
+        with tempfile.TemporaryDirectory() as audio_dir:
+            controller = AudioController(MagicMock(), audio_dir=Path(audio_dir))
+            result = controller.save_audio_to_file(audio_chunks, "test_audio")
 
-        controller = AudioController()
-        controller.save_audio_to_file(audio_chunks, file_name)
+            self.assertEqual(result.path, Path(audio_dir) / "test_audio.mp3")
+            self.assertEqual(result.path.read_bytes(), b"chunk1chunk2chunk3")
+            self.assertEqual(result.bytes_written, 18)
+            self.assertIsNotNone(result.time_to_first_byte)
+            self.assertEqual(os.listdir(audio_dir), ["test_audio.mp3"])
+            # Published clips follow the umask, not the owner-only mode of the temporary file
+            self.assertEqual(stat.S_IMODE(result.path.stat().st_mode), FILE_MODE)
 
-        current_dir = Path(__file__).parent
-        project_root = current_dir.parent.parent.parent
-        audio_file_path = project_root / "data" / "audios"
+    def test_save_audio_to_file_no_audio_chunks(self):
+        """
+        Test saving audio to a file when the audio iterator is empty.
+        """
+        with tempfile.TemporaryDirectory() as audio_dir:
+            controller = AudioController(MagicMock(), audio_dir=Path(audio_dir))
+            result = controller.save_audio_to_file([], "empty_audio")
 
-        mock_mkdir.assert_called_once()
-        mock_open.assert_called_once_with(Path(audio_file_path / "test_audio.mp3"), "wb")
-        mock_file.write.assert_any_call(b"chunk1")
-        mock_file.write.assert_any_call(b"chunk2")
-        mock_file.write.assert_any_call(b"chunk3")
+            self.assertEqual(result.path.read_bytes(), b"")
+            self.assertEqual(result.bytes_written, 0)
+            self.assertIsNone(result.time_to_first_byte)
 
-    @patch("scr.audio.controller.Path.mkdir")
-    @patch("builtins.open", new_callable=MagicMock)
-    def test_save_audio_to_file_no_audio_chunks(self, mock_open, mock_mkdir):
+    def test_save_audio_to_file_directory_creation(self):
         """
-        Test saving audio to a file when the audio iterator is empty.
+        Test that the method ensures the directory is created if it does not exist.
         """
-        audio_chunks = []
-        file_name = "empty_audio"
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audio_dir = Path(temp_dir) / "data" / "audios"
+            controller = AudioController(MagicMock(), audio_dir=audio_dir)
+            controller.save_audio_to_file([b"chunk1"], "new_directory_test")
 
-        controller = AudioController()
-        controller.save_audio_to_file(audio_chunks, file_name)
+            self.assertTrue((audio_dir / "new_directory_test.mp3").is_file())
+
+    def test_save_audio_to_file_interrupted_stream(self):
+        """
+        Test that a stream failing midway leaves neither a truncated file nor a temporary file.
+        """
+        def audio_chunks():
+            yield b"chunk1"
+            raise ConnectionError("stream dropped")
 
-        current_dir = Path(__file__).parent
-        project_root = current_dir.parent.parent.parent
-        audio_file_path = project_root / "data" / "audios"
+        with tempfile.TemporaryDirectory() as audio_dir:
+            controller = AudioController(MagicMock(), audio_dir=Path(audio_dir))
+            with self.assertRaises(ConnectionError):
+                controller.save_audio_to_file(audio_chunks(), "dropped")
 
-        mock_mkdir.assert_called_once()
-        mock_open.assert_called_once_with(Path(audio_file_path / "empty_audio.mp3"), "wb")
-        mock_file.write.assert_not_called()
+            self.assertEqual(os.listdir(audio_dir), [])
 
-    @patch("scr.audio.controller.Path.mkdir")
-    @patch("builtins.open", new_callable=MagicMock)
-    def test_save_audio_to_file_directory_creation(self, mock_open, mock_mkdir):
+    @patch("elevenlabs.VoiceSettings")
+    def test_synthesize_to_file_streams_and_caches(self, mock_voice_settings):
         """
-        Test that the method ensures the directory is created if it does not exist.
+        Test that synthesize_to_file writes the stream to disk and copies the finished file into the cache.
         """
-        audio_chunks = [b"chunk1"]
-        file_name = "new_directory_test"
-        mock_file = MagicMock()
-        mock_open.return_value.__enter__.return_value = mock_file
+        mock_clients = MagicMock()
+        stream = mock_clients.eleven_labs_client.return_value.text_to_speech.stream
+        stream.return_value = iter([b"chunk1", b"chunk2"])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = CacheController(Path(temp_dir) / "cache")
+            controller = AudioController(mock_clients, cache, audio_dir=Path(temp_dir) / "audios")
+
+            first = controller.synthesize_to_file("This is a test script.", "first")
+            second = controller.synthesize_to_file("This is a test script.", "second")
+
+            self.assertEqual(first.path.read_bytes(), b"chunk1chunk2")
+            self.assertEqual(second.path.read_bytes(), b"chunk1chunk2")
+            stream.assert_called_once()
+
+    @patch("elevenlabs.VoiceSettings")
+    def test_synthesize_to_file_renders_profiles_separately(self, mock_voice_settings):
+        """
+        Test that another narration profile is read with its own voice and language, cached under its
+        own key and written to its own directory.
+        """
+        mock_clients = MagicMock()
+        stream = mock_clients.eleven_labs_client.return_value.text_to_speech.stream
+        stream.side_effect = lambda text, **kwargs: iter([f"{kwargs['voice_id']}:{text}".encode("utf-8")])
+        english = NarrationProfile("en", voice_id="english-voice", language="en")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = CacheController(Path(temp_dir) / "cache")
+            controller = AudioController(mock_clients, cache, audio_dir=Path(temp_dir) / "audios")
+
+            default = controller.synthesize_to_file("Tequila.", "Tequila")
+            localized = controller.synthesize_to_file("Tequila.", "Tequila", profile=english)
+
+            self.assertEqual(default.path, Path(temp_dir) / "audios" / "Tequila.mp3")
+            self.assertEqual(localized.path, Path(temp_dir) / "audios" / "en" / "Tequila.mp3")
+            self.assertEqual(localized.path.read_bytes(), b"english-voice:Tequila.")
+            self.assertEqual(stream.call_count, 2)
+            self.assertEqual(stream.call_args.kwargs["language_code"], "en")
+            self.assertNotIn("language_code", stream.call_args_list[0].kwargs)
+
+    def test_parse_profiles(self):
+        """
+        Test that profiles name an optional language and voice, and that names must be unique.
+        """
+        profiles = parse_profiles("es, en:en=english-voice,", voice_id="episode-voice")
+
+        self.assertEqual(profiles, [NarrationProfile("es", voice_id="episode-voice"),
+                                    NarrationProfile("en", voice_id="english-voice", language="en")])
+        self.assertEqual(parse_profiles(""), [])
+        with self.assertRaises(ValueError):
+            parse_profiles("es,es:es")
+        with self.assertRaises(ValueError):
+            parse_profiles(":en=voice")
+
+    def test_synthesize_to_file_empty_script(self):
+        """
+        Test that synthesize_to_file raises ValueError when script is empty.
+        """
+        controller = AudioController(MagicMock())
+
+        with self.assertRaises(ValueError) as context:
+            controller.synthesize_to_file("", "empty")
+
+        self.assertEqual(str(context.exception), "script cannot be empty")
+
+    @patch("elevenlabs.VoiceSettings")
+    def test_synthesize_many(self, mock_voice_settings):
+        """
+        Test that synthesize_many writes one file per job and returns results in input order.
+        """
+        mock_clients = MagicMock()
+        stream = mock_clients.eleven_labs_client.return_value.text_to_speech.stream
+        stream.side_effect = lambda text, **kwargs: iter([text.encode("utf-8")])
+
+        with tempfile.TemporaryDirectory() as audio_dir:
+            controller = AudioController(mock_clients, audio_dir=Path(audio_dir))
+            results = controller.synthesize_many([("Tequila", "Tequila"), ("Mezcal", "Mezcal")], max_workers=2)
+
+            self.assertEqual([result.path.name for result in results], ["Tequila.mp3", "Mezcal.mp3"])
+            self.assertEqual(results[1].path.read_bytes(), b"Mezcal")
+
+    @patch("elevenlabs.VoiceSettings")
+    def test_synthesize_to_file_retries_throttled_stream(self, mock_voice_settings):
+        """
+        Test that a stream throttled on its first chunk is retried through the scheduler, and its
+        characters are billed once.
+        """
+        def throttled(**kwargs):
+            error = Exception("Too many requests")
+            error.status_code = 429
+            raise error
+            yield
+
+        mock_clients = MagicMock()
+        stream = mock_clients.eleven_labs_client.return_value.text_to_speech.stream
+        stream.side_effect = [throttled(), iter([b"chunk1"])]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            budget = BudgetController(ledger_path=Path(temp_dir) / "budget.json")
+            scheduler = SchedulerController(quota_path=Path(temp_dir) / "quota.json", sleep=MagicMock(), budget=budget)
+            controller = AudioController(mock_clients, audio_dir=Path(temp_dir), scheduler=scheduler)
+            result = controller.synthesize_to_file("This is a test script.", "retried")
+
+            self.assertEqual(result.path.read_bytes(), b"chunk1")
+            self.assertEqual(stream.call_count, 2)
+            self.assertEqual(budget.report()["providers"]["elevenlabs"]["units"], {"characters": 22})
+
+    @patch("elevenlabs.VoiceSettings")
+    def test_synthesize_to_file_reuses_stored_phrases(self, mock_voice_settings):
+        """
+        Test that only sentences missing from the phrase store are synthesized, and clips are assembled in order.
+        """
+        mock_clients = MagicMock()
+        stream = mock_clients.eleven_labs_client.return_value.text_to_speech.stream
+        stream.side_effect = lambda text, **kwargs: iter([f"<{text}>".encode("utf-8")])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            phrases = PhrasesController(Path(temp_dir) / "phrases")
+            controller = AudioController(mock_clients, audio_dir=Path(temp_dir) / "audios", phrases=phrases)
+
+            controller.synthesize_to_file("Our next category is Tequila. Get ready!", "Tequila")
+            result = controller.synthesize_to_file("Our next category is  Mezcal. Get ready!", "Mezcal")
+
+            self.assertEqual(result.path.read_bytes(), b"<Our next category is Mezcal.><Get ready!>")
+            self.assertEqual(sorted(call.kwargs["text"] for call in stream.call_args_list), [
+                "Get ready!", "Our next category is Mezcal.", "Our next category is Tequila."])
+
+
+
+async def async_stream(chunks, delay=0.0):
+    for chunk in chunks:
+        await asyncio.sleep(delay)
+        yield chunk
+
+
+class TestAudioControllerAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the async synthesis, validating streaming to disk, caching, retries and timeouts.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.audio_dir = Path(self.temp_dir.name) / "audios"
+        self.clients = MagicMock()
+        self.stream = self.clients.async_eleven_labs_client.return_value.text_to_speech.stream
+        patcher = patch("elevenlabs.VoiceSettings")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_asynthesize_to_file_streams_and_caches(self):
+        self.stream.side_effect = lambda **kwargs: async_stream([b"chunk1", b"chunk2"])
+        cache = CacheController(Path(self.temp_dir.name) / "cache")
+        controller = AudioController(self.clients, cache, audio_dir=self.audio_dir)
+
+        first, second = await asyncio.gather(
+            controller.asynthesize_to_file("This is a test script.", "first"),
+            controller.asynthesize_to_file("Another script.", "second"),
+        )
+        replayed = await controller.asynthesize_to_file("This is a test script.", "replayed")
+
+        self.assertEqual(first.path.read_bytes(), b"chunk1chunk2")
+        self.assertEqual(second.path.read_bytes(), b"chunk1chunk2")
+        self.assertEqual(replayed.path.read_bytes(), b"chunk1chunk2")
+        self.assertEqual(self.stream.call_count, 2)
+
+    async def test_asynthesize_to_file_retries_throttled_stream(self):
+        async def throttled():
+            error = Exception("Too many requests")
+            error.status_code = 429
+            raise error
+            yield
+
+        self.stream.side_effect = [throttled(), async_stream([b"chunk1"])]
+        scheduler = SchedulerController(quota_path=Path(self.temp_dir.name) / "quota.json",
+                                        async_sleep=lambda delay: asyncio.sleep(0))
+        controller = AudioController(self.clients, audio_dir=self.audio_dir, scheduler=scheduler)
+
+        result = await controller.asynthesize_to_file("This is a test script.", "retried")
+
+        self.assertEqual(result.path.read_bytes(), b"chunk1")
+        self.assertEqual(self.stream.call_count, 2)
+
+    async def test_asynthesize_to_file_timeout_leaves_no_file(self):
+        self.stream.side_effect = lambda **kwargs: async_stream([b"chunk1", b"chunk2"], delay=1.0)
+        controller = AudioController(self.clients, audio_dir=self.audio_dir)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await controller.asynthesize_to_file("This is a test script.", "slow", timeout=0.05)
+        self.assertEqual(os.listdir(self.audio_dir), [])
+
+    async def test_agenerate_audio_yields_chunks(self):
+        self.stream.side_effect = lambda **kwargs: async_stream([b"chunk1", b"chunk2"])
+        controller = AudioController(self.clients, audio_dir=self.audio_dir)
+
+        self.assertEqual([chunk async for chunk in controller.agenerate_audio("Script.")], [b"chunk1", b"chunk2"])
 
-        controller = AudioController()
-        controller.save_audio_to_file(audio_chunks, file_name)
 
-        mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from scr.audio.controller import VOICE_ID, NarrationProfile
+from scr.batch.controller import BatchController, EpisodeSpec, load_episodes, parse_episode
+from scr.bundle.controller import BundleController
+from scr.script.controller import ScriptRecord
+
+
+def records(categories):
+    return [ScriptRecord(category, f"{category.lower()} photo", f"{category} narration") for category in categories]
+
+
+class TestLoadEpisodes(unittest.TestCase):
+    """
+    Unit tests for reading episodes from CSV, JSON-lines and YAML files.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, content):
+        path = self.dir / name
+        path.write_text(content, encoding="utf-8")
+        return path
+
+    def test_load_csv(self):
+        path = self.write("episodes.csv", 'name,categories,voice,orientation,providers\n'
+                                          'Drinks,"Tequila, Mezcal",voice-1,landscape,"unsplash, google_search"\n'
+                                          ',Tacos,,,\n')
+
+        episodes = load_episodes(path)
+
+        self.assertEqual(episodes[0], EpisodeSpec("Drinks", ["Tequila", "Mezcal"], "voice-1", "landscape",
+                                                  ["unsplash", "google_search"]))
+        self.assertEqual(episodes[1], EpisodeSpec("Tacos", ["Tacos"]))
+
+    def test_load_jsonl(self):
+        path = self.write("episodes.jsonl", '{"name": "Drinks", "topics": ["Tequila", "Mezcal"]}\n\n'
+                                            '{"categories": "Tacos", "frame": "landscape"}\n')
+
+        episodes = load_episodes(path)
+
+        self.assertEqual(episodes, [EpisodeSpec("Drinks", ["Tequila", "Mezcal"]),
+                                    EpisodeSpec("Tacos", ["Tacos"], frame="landscape")])
+
+    def test_load_yaml(self):
+        path = self.write("episodes.yaml", "episodes:\n"
+                                           "  - name: Drinks\n"
+                                           "    categories: [Tequila, Mezcal]\n"
+                                           "    providers: [shutterstock]\n")
+
+        episodes = load_episodes(path)
+
+        self.assertEqual(episodes, [EpisodeSpec("Drinks", ["Tequila", "Mezcal"], providers=["shutterstock"])])
+
+    def test_load_profiles(self):
+        path = self.write("episodes.jsonl",
+                          '{"categories": "Tequila", "voice": "voice-1", "profiles": "es,en:en=voice-2"}\n')
+
+        episodes = load_episodes(path)
+
+        self.assertEqual(episodes[0].profiles, [NarrationProfile("es", voice_id="voice-1"),
+                                                NarrationProfile("en", voice_id="voice-2", language="en")])
+        with self.assertRaises(ValueError):
+            parse_episode({"categories": "Tequila", "profiles": "es,es"}, 1)
+
+    def test_unsupported_file_raises(self):
+        path = self.write("episodes.txt", "Tequila")
+
+        with self.assertRaises(ValueError) as context:
+            load_episodes(path)
+
+        self.assertEqual(str(context.exception), "Unsupported episodes file: episodes.txt")
+
+    def test_invalid_episodes_raise(self):
+        with self.assertRaises(ValueError) as context:
+            parse_episode({"name": "Empty"}, 3)
+        self.assertEqual(str(context.exception), "Episode 3 has no categories")
+
+        with self.assertRaises(ValueError):
+            parse_episode({"categories": "Tequila", "orientation": "square"}, 1)
+
+        with self.assertRaises(ValueError) as context:
+            parse_episode({"categories": "Tequila", "providers": "bing"}, 1)
+        self.assertEqual(str(context.exception), "Episode 1 has unknown providers: bing")
+
+
+@patch("scr.batch.controller.ImagingController")
+@patch("scr.batch.controller.AudioController")
+@patch("scr.batch.controller.PhotosController")
+@patch("scr.batch.controller.ScriptController")
+class TestBatchController(unittest.TestCase):
+    """
+    Unit tests for the BatchController class, validating per-episode configuration,
+    failure isolation, progress output and the exit report.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.temp_dir.name)
+        self.output = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def asset(self, name):
+        path = self.data_dir / name
+        path.write_bytes(name.encode("utf-8"))
+        return path
+
+    def photo(self, query, name):
+        return SimpleNamespace(path=self.asset(f"{name}.jpg"), url=None)
+
+    def controller(self, **kwargs):
+        return BatchController(MagicMock(), data_dir=self.data_dir, max_workers=4, output=self.output.append,
+                               **kwargs)
+
+    def test_run_builds_every_episode(self, script_class, photos_class, audio_class, imaging_class):
+        script_class.return_value.stream_records.side_effect = records
+        photos_class.return_value.generate_photos.side_effect = self.photo
+        audio_class.return_value.synthesize_to_file.side_effect = lambda text, name: self.asset(f"{name}.mp3")
+        imaging_class.return_value.process.return_value = None
+
+        reports = self.controller().run([
+            EpisodeSpec("Drinks", ["Tequila", "Mezcal"], voice="voice-1", providers=["unsplash"]),
+            EpisodeSpec("Dishes", ["Tacos"], frame="landscape"),
+        ])
+
+        self.assertEqual([report.name for report in reports], ["Drinks", "Dishes"])
+        self.assertTrue(all(report.ok for report in reports))
+        self.assertEqual([report.categories for report in reports], [2, 1])
+        photos_kwargs = photos_class.call_args_list[0].kwargs
+        self.assertEqual(photos_kwargs["photos_dir"], self.data_dir / "photos" / "drinks")
+        self.assertEqual(photos_kwargs["search_providers"], ["unsplash"])
+        self.assertEqual(sorted(call.kwargs["voice_id"] for call in audio_class.call_args_list),
+                         sorted([VOICE_ID, "voice-1"]))
+        self.assertEqual(sorted(call.kwargs["frame"] for call in imaging_class.call_args_list),
+                         ["landscape", "portrait"])
+        self.assertEqual(imaging_class.return_value.close.call_count, 2)
+        self.assertEqual(len(self.output), 3)
+        self.assertEqual(self.output[-1], "Built 2/2 episodes, 0 failed stages")
+
+    def test_failed_episode_does_not_stop_others(self, script_class, photos_class, audio_class, imaging_class):
+        def generate_records(categories):
+            if categories == ["Broken"]:
+                raise ValueError("Gemini returned no records")
+            return records(categories)
+
+        script_class.return_value.stream_records.side_effect = generate_records
+        photos_class.return_value.generate_photos.side_effect = self.photo
+
+        reports = self.controller(audio=False).run([EpisodeSpec("Broken", ["Broken"]),
+                                                    EpisodeSpec("Dishes", ["Tacos"])])
+
+        self.assertEqual(reports[0].error, "ValueError: Gemini returned no records")
+        self.assertFalse(reports[0].ok)
+        self.assertTrue(reports[1].ok)
+        audio_class.assert_not_called()
+        self.assertEqual(self.output[-1], "Built 1/2 episodes, 0 failed stages")
+
+    def test_stage_errors_are_reported(self, script_class, photos_class, audio_class, imaging_class):
+        script_class.return_value.stream_records.side_effect = records
+        photos_class.return_value.generate_photos.side_effect = ConnectionError("Search failed")
+
+        controller = self.controller(audio=False)
+        reports = controller.run([EpisodeSpec("Drinks", ["Tequila"])])
+        controller.write_report(reports, self.data_dir / "reports" / "batch.json", elapsed=1.5)
+
+        self.assertEqual(reports[0].errors, {"Tequila": {"photos": "Search failed"}})
+        report = json.loads((self.data_dir / "reports" / "batch.json").read_text(encoding="utf-8"))
+        self.assertEqual(report["built"], 0)
+        self.assertEqual(report["elapsed"], 1.5)
+        self.assertFalse(report["reports"][0]["ok"])
+        self.assertEqual(report["reports"][0]["errors"], {"Tequila": {"photos": "Search failed"}})
+
+    def test_bundles_collect_each_episode(self, script_class, photos_class, audio_class, imaging_class):
+        script_class.return_value.stream_records.side_effect = records
+        photos_class.return_value.generate_photos.side_effect = self.photo
+        imaging_class.return_value.process.return_value = None
+
+        self.controller(audio=False, bundles=True).run([EpisodeSpec("Drinks", ["Tequila", "Mezcal"])])
+
+        bundle = BundleController("Drinks", bundles_dir=self.data_dir / "bundles")
+        self.assertEqual(sorted(entry.name for entry in bundle.entries()), ["Mezcal", "Tequila"])
+        self.assertEqual(bundle.verify(), [])
+        bundle.close()
+
+    def test_invalid_concurrency_raises(self, *mocks):
+        with self.assertRaises(ValueError):
+            self.controller(episodes_in_flight=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import datetime
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from scr.budget.controller import BudgetController, BudgetExceededError, UnitPrice, episode_scope
+from scr.scheduler.controller import QuotaExceededError
+
+
+class TestBudgetController(unittest.TestCase):
+    """
+    Unit tests for the BudgetController class, validating pricing with free daily units,
+    attribution to episodes, budget enforcement and the monthly ledger.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ledger_path = Path(self.temp_dir.name) / "budget.json"
+        self.today = datetime.date(2024, 5, 17)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def controller(self, **kwargs):
+        kwargs.setdefault("prices", {
+            "paid": {"characters": UnitPrice(0.01)},
+            "tiered": {"queries": UnitPrice(1.0, free_daily=2)},
+            "free": {"queries": UnitPrice(0.0)},
+        })
+        return BudgetController(ledger_path=self.ledger_path, today=lambda: self.today, **kwargs)
+
+    def test_record_prices_units(self):
+        budget = self.controller()
+
+        self.assertAlmostEqual(budget.record("paid", characters=150), 1.5)
+        self.assertAlmostEqual(budget.record("free", queries=10), 0.0)
+        self.assertAlmostEqual(budget.spent(), 1.5)
+        self.assertAlmostEqual(budget.spent("paid"), 1.5)
+        self.assertEqual(budget.report()["providers"]["free"]["units"], {"queries": 10})
+
+    def test_free_daily_units_are_not_charged(self):
+        budget = self.controller()
+
+        costs = [budget.record("tiered", queries=1) for _ in range(3)]
+        self.today += datetime.timedelta(days=1)
+        costs.append(budget.record("tiered", queries=3))
+
+        self.assertEqual(costs, [0.0, 0.0, 1.0, 1.0])
+        self.assertEqual(budget.unit_cost("tiered"), 1.0)
+
+    def test_unknown_units_are_free(self):
+        self.assertEqual(self.controller().record("other", downloads=3), 0.0)
+
+    def test_ledger_is_persisted_and_reset_monthly(self):
+        self.controller().record("paid", characters=100)
+        self.assertAlmostEqual(self.controller().spent(), 1.0)
+        self.assertEqual(json.loads(self.ledger_path.read_text())["month"], "2024-05")
+
+        self.today = datetime.date(2024, 6, 1)
+
+        self.assertEqual(self.controller().spent(), 0.0)
+
+    def test_ledger_is_shared_by_concurrent_controllers(self):
+        # Every controller has its own thread lock, as in separate worker processes; only the file lock is shared
+        budgets = [self.controller() for _ in range(4)]
+
+        def work(budget):
+            for _ in range(25):
+                budget.record("paid", characters=1)
+
+        threads = [threading.Thread(target=work, args=(budget,)) for budget in budgets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.controller().report()["providers"]["paid"]["units"], {"characters": 100})
+
+    def test_spend_is_attributed_to_the_episode_across_threads(self):
+        budget = self.controller()
+
+        with episode_scope("Bebidas"):
+            budget.record("paid", characters=100)
+            worker = threading.Thread(target=budget.record, args=("paid",), kwargs={"characters": 50})
+            worker.start()
+            worker.join()
+        budget.record("paid", characters=10)
+
+        # Plain threads start with an empty context, so only the copied context carries the episode
+        self.assertAlmostEqual(budget.spent(episode="Bebidas"), 1.0)
+        self.assertAlmostEqual(budget.spent(), 1.6)
+
+    def test_check_refuses_paid_calls_once_spent(self):
+        budget = self.controller(monthly_budget=1.0)
+        budget.check("paid")
+        budget.record("paid", characters=100)
+
+        with self.assertRaises(BudgetExceededError) as context:
+            budget.check("paid")
+        self.assertIsInstance(context.exception, QuotaExceededError)
+        budget.check("free")
+        budget.check("tiered")
+
+    def test_check_enforces_provider_budgets(self):
+        budget = self.controller(monthly_budget=100.0, provider_budgets={"paid": 0.5})
+        budget.record("paid", characters=50)
+
+        with self.assertRaises(BudgetExceededError):
+            budget.check("paid")
+        budget.record("tiered", queries=3)
+        budget.check("tiered")
+
+    def test_constrained_once_reserve_is_reached(self):
+        budget = self.controller(monthly_budget=10.0, reserve=0.2)
+        budget.record("paid", characters=700)
+        self.assertFalse(budget.constrained())
+
+        budget.record("paid", characters=100)
+
+        self.assertTrue(budget.constrained())
+        self.assertFalse(self.controller().constrained())
+
+    def test_record_counts_units_and_spend(self):
+        tracer = MagicMock()
+
+        self.controller(tracer=tracer).record("paid", characters=100)
+
+        tracer.count.assert_any_call("units", 100, provider="paid", unit="characters")
+        tracer.count.assert_any_call("spend_dollars", 1.0, provider="paid")
+
+    def test_invalid_settings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.controller(monthly_budget=-1)
+        with self.assertRaises(ValueError):
+            self.controller(reserve=1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import hashlib
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from scr.bundle.controller import ALIGNMENT, BundleController
+
+
+class TestBundleController(unittest.TestCase):
+    """
+    Unit tests for the BundleController class, validating the header index, payload alignment,
+    zero-copy reads, incremental appends and hash verification.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bundle = BundleController("Bebidas mexicanas", bundles_dir=Path(self.temp_dir.name), capacity=8)
+
+    def tearDown(self):
+        self.bundle.close()
+        self.temp_dir.cleanup()
+
+    def test_bundle_path_is_slugged(self):
+        self.assertEqual(self.bundle.path.name, "bebidas_mexicanas.bundle")
+
+    def test_append_aligns_payloads_and_keeps_names(self):
+        photo = self.bundle.append("photos", "Agua de Jamaica", [b"image", b"_data"])
+        audio = self.bundle.append("audio", "Agua de Jamaica", [b"audio" * 1000])
+
+        self.assertEqual(photo.offset, self.bundle.data_start)
+        self.assertEqual(audio.offset, self.bundle.data_start + ALIGNMENT)
+        self.assertEqual(photo.sha256, hashlib.sha256(b"image_data").hexdigest())
+        self.assertEqual(self.bundle.entries(), [photo, audio])
+
+        view = self.bundle.view("photos", "Agua de Jamaica")
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view.tobytes(), b"image_data")
+        self.assertTrue(view.readonly)
+        view.release()
+
+    def test_entries_survive_reopening(self):
+        self.bundle.append("audio", "Café", [b"audio_data"])
+
+        reopened = BundleController("Bebidas mexicanas", bundles_dir=Path(self.temp_dir.name))
+        self.assertEqual(bytes(reopened.view("audio", "Café")), b"audio_data")
+        self.assertEqual(reopened.capacity, 8)
+        reopened.close()
+
+    def test_readers_see_appends_after_they_mapped_the_bundle(self):
+        self.bundle.append("photos", "Tequila", [b"one"])
+        view = self.bundle.view("photos", "Tequila")
+
+        self.bundle.append("photos", "Mezcal", [b"two"])
+
+        self.assertEqual(bytes(self.bundle.view("photos", "Mezcal")), b"two")
+        self.assertEqual(bytes(view), b"one")
+        view.release()
+
+    def test_append_supersedes_and_remove_hides(self):
+        self.bundle.append("photos", "Tequila", [b"old"])
+        self.bundle.append("photos", "Mezcal", [b"mezcal"])
+        self.bundle.append("photos", "Tequila", [b"new"])
+
+        self.assertEqual([entry.name for entry in self.bundle.entries()], ["Tequila", "Mezcal"])
+        self.assertEqual(bytes(self.bundle.view("photos", "Tequila")), b"new")
+
+        self.bundle.remove("photos", "Tequila")
+        self.assertIsNone(self.bundle.entry("photos", "Tequila"))
+        with self.assertRaises(KeyError):
+            self.bundle.view("photos", "Tequila")
+
+    def test_append_file_skips_unchanged_contents(self):
+        path = Path(self.temp_dir.name) / "Tequila.jpg"
+        path.write_bytes(b"image_data")
+
+        first = self.bundle.append_file("photos", "Tequila", path)
+        self.assertEqual(self.bundle.append_file("photos", "Tequila", path), first)
+        self.assertEqual(len(self.bundle.entries()), 1)
+
+    def test_full_index_raises(self):
+        bundle = BundleController("small", bundles_dir=Path(self.temp_dir.name), capacity=1)
+        bundle.append("photos", "Tequila", [b"one"])
+
+        with self.assertRaises(ValueError):
+            bundle.append("photos", "Mezcal", [b"two"])
+        self.assertEqual([entry.name for entry in bundle.entries()], ["Tequila"])
+        bundle.close()
+
+    def test_concurrent_appends_get_distinct_offsets(self):
+        threads = [
+            threading.Thread(target=self.bundle.append, args=("audio", str(index), [bytes([index]) * 100]))
+            for index in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        offsets = [entry.offset for entry in self.bundle.entries()]
+        self.assertEqual(len(set(offsets)), 8)
+        self.assertTrue(all(offset % ALIGNMENT == 0 for offset in offsets))
+        self.assertEqual(self.bundle.verify(), [])
+
+    def test_verify_reports_corrupt_payloads(self):
+        entry = self.bundle.append("photos", "Tequila", [b"image_data"])
+        with open(self.bundle.path, "r+b") as file:
+            file.seek(entry.offset)
+            file.write(b"X")
+        self.bundle.refresh()
+
+        self.assertEqual(self.bundle.verify(), [entry])
+
+    def test_url_addresses_the_payload(self):
+        entry = self.bundle.append("audio", "Tequila", [b"audio_data"])
+
+        self.assertEqual(self.bundle.url("audio", "Tequila"),
+                         f"subfile,,start,{entry.offset},end,{entry.offset + 9},,:{self.bundle.path.resolve()}")
+
+    def test_invalid_names(self):
+        with self.assertRaises(ValueError):
+            self.bundle.append("photos", "x" * 200, [b"data"])
+        with self.assertRaises(ValueError):
+            BundleController(" ")
+
+    def test_not_a_bundle(self):
+        self.bundle.path.write_bytes(b"not a bundle" * 10)
+
+        with self.assertRaises(ValueError):
+            self.bundle.entries()
+
+
+if __name__ == '__main__':
+    unittest.main()
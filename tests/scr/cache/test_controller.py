@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from scr.cache.controller import CacheController
+from scr.tracing.controller import TracingController
+
+
+class TestCacheController(unittest.TestCase):
+    """
+    Unit tests for the CacheController class, validating content addressing, TTL expiry,
+    LRU eviction and the bypass/refresh flags.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_depends_on_every_part(self):
+        key = CacheController.key("gemini", "model", {"a": 1}, "text")
+
+        self.assertEqual(key, CacheController.key("gemini", "model", {"a": 1}, "text"))
+        self.assertNotEqual(key, CacheController.key("elevenlabs", "model", {"a": 1}, "text"))
+        self.assertNotEqual(key, CacheController.key("gemini", "other", {"a": 1}, "text"))
+        self.assertNotEqual(key, CacheController.key("gemini", "model", {"a": 2}, "text"))
+        self.assertNotEqual(key, CacheController.key("gemini", "model", {"a": 1}, "other"))
+
+    def test_put_and_get(self):
+        controller = CacheController(self.cache_dir)
+        key = controller.key("gemini", "model", None, "prompt")
+
+        controller.put(key, b"payload")
+
+        self.assertEqual(controller.get(key), b"payload")
+        self.assertEqual(list(self.cache_dir.glob("*/.tmp-*")), [])
+
+    def test_get_missing_entry(self):
+        controller = CacheController(self.cache_dir)
+        self.assertIsNone(controller.get(controller.key("gemini", "model", None, "prompt")))
+
+    def test_get_expired_entry(self):
+        controller = CacheController(self.cache_dir, ttl=60)
+        key = controller.key("gemini", "model", None, "prompt")
+        controller.put(key, b"payload")
+        old = time.time() - 120
+        os.utime(controller.path(key), (old, old))
+
+        self.assertIsNone(controller.get(key))
+
+    def test_get_or_fetch_only_fetches_once(self):
+        controller = CacheController(self.cache_dir)
+        fetch = MagicMock(return_value=b"payload")
+
+        first = controller.get_or_fetch("gemini", "model", None, "prompt", fetch)
+        second = controller.get_or_fetch("gemini", "model", None, "prompt", fetch)
+
+        self.assertEqual(first, b"payload")
+        self.assertEqual(second, b"payload")
+        fetch.assert_called_once()
+
+    def test_lookups_are_counted(self):
+        tracer = TracingController()
+        controller = CacheController(self.cache_dir, tracer=tracer)
+        fetch = MagicMock(return_value=b"payload")
+
+        controller.get_or_fetch("gemini", "model", None, "prompt", fetch)
+        controller.get_or_fetch("gemini", "model", None, "prompt", fetch)
+
+        self.assertEqual(tracer.counter("cache_lookups", result="miss"), 1)
+        self.assertEqual(tracer.counter("cache_lookups", result="hit"), 1)
+
+    def test_refresh_ignores_existing_entries(self):
+        CacheController(self.cache_dir).get_or_fetch("gemini", "model", None, "prompt", lambda: b"old")
+
+        controller = CacheController(self.cache_dir, refresh=True)
+        data = controller.get_or_fetch("gemini", "model", None, "prompt", lambda: b"new")
+
+        self.assertEqual(data, b"new")
+        self.assertEqual(CacheController(self.cache_dir).get(controller.key("gemini", "model", None, "prompt")),
+                         b"new")
+
+    def test_disabled_cache_never_writes(self):
+        controller = CacheController(self.cache_dir, enabled=False)
+        fetch = MagicMock(return_value=b"payload")
+
+        controller.get_or_fetch("gemini", "model", None, "prompt", fetch)
+        controller.get_or_fetch("gemini", "model", None, "prompt", fetch)
+
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_eviction_removes_least_recently_used(self):
+        controller = CacheController(self.cache_dir, max_bytes=10)
+        first = controller.key("p", "m", None, "first")
+        second = controller.key("p", "m", None, "second")
+        third = controller.key("p", "m", None, "third")
+
+        controller.put(first, b"12345")
+        controller.put(second, b"12345")
+        now = time.time()
+        os.utime(controller.path(first), (now, now))
+        os.utime(controller.path(second), (now - 100, now))
+        controller.put(third, b"12345")
+
+        self.assertEqual(controller.get(first), b"12345")
+        self.assertIsNone(controller.get(second))
+        self.assertEqual(controller.get(third), b"12345")
+
+
+    def test_eviction_skips_entries_removed_by_other_processes(self):
+        controller = CacheController(self.cache_dir, max_bytes=10)
+        key = controller.key("p", "m", None, "first")
+        vanished = self.cache_dir / "ab" / "vanished"
+
+        # Another worker evicts an entry between listing and stat
+        with patch.object(CacheController, "_entries", lambda _: [controller.path(key), vanished]):
+            controller.put(key, b"12345")
+
+        self.assertEqual(controller.get(key), b"12345")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import unittest
+from unittest.mock import MagicMock, patch
+
+from scr.clients.controller import ClientsController
+from scr.tracing.controller import TracingController
+
+
+class TestClientsController(unittest.TestCase):
+    """
+    Unit tests for the ClientsController class, validating session pooling, default timeouts
+    and lazy reuse of the SDK clients.
+    """
+
+    def test_session_is_created_once(self):
+        controller = ClientsController(pool_size=4)
+
+        session = controller.session
+
+        self.assertIs(controller.session, session)
+        adapter = session.get_adapter("https://www.googleapis.com")
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_get_applies_default_timeout(self):
+        controller = ClientsController(connect_timeout=2.0, read_timeout=10.0)
+        controller._session = MagicMock()
+
+        controller.get("https://example.com/photo.jpg")
+
+        controller._session.get.assert_called_once_with(
+            "https://example.com/photo.jpg", timeout=(2.0, 10.0))
+
+    def test_get_keeps_explicit_timeout(self):
+        controller = ClientsController()
+        controller._session = MagicMock()
+
+        controller.get("https://example.com/photo.jpg", timeout=1)
+
+        controller._session.get.assert_called_once_with("https://example.com/photo.jpg", timeout=1)
+
+    @patch("google.genai.Client")
+    def test_genai_client_is_reused(self, mock_client):
+        with patch.dict("os.environ", {"GOOGLE_KEY": "dummy_key"}):
+            controller = ClientsController()
+            first = controller.genai_client()
+            second = controller.genai_client()
+
+        self.assertIs(first, second)
+        mock_client.assert_called_once()
+
+    @patch("google.genai.Client")
+    def test_genai_client_missing_key(self, mock_client):
+        with patch.dict("os.environ", {"GOOGLE_KEY": ""}):
+            controller = ClientsController()
+            with self.assertRaises(EnvironmentError) as context:
+                controller.genai_client()
+        self.assertEqual(str(context.exception), "GOOGLE_KEY environment variable is not set")
+        mock_client.assert_not_called()
+
+    @patch("elevenlabs.client.ElevenLabs")
+    def test_eleven_labs_client_is_reused(self, mock_elevenlabs):
+        with patch.dict("os.environ", {"ELEVEN_LABS_KEY": "dummy_key"}):
+            controller = ClientsController(read_timeout=12.0)
+            first = controller.eleven_labs_client()
+            second = controller.eleven_labs_client()
+
+        self.assertIs(first, second)
+        mock_elevenlabs.assert_called_once_with(api_key="dummy_key", timeout=12.0)
+
+    @patch("elevenlabs.client.ElevenLabs")
+    def test_eleven_labs_client_base_url(self, mock_elevenlabs):
+        with patch.dict("os.environ", {"ELEVEN_LABS_KEY": "dummy_key"}):
+            ClientsController(eleven_labs_base_url="http://127.0.0.1:8765").eleven_labs_client()
+
+        mock_elevenlabs.assert_called_once_with(api_key="dummy_key", timeout=30.0, base_url="http://127.0.0.1:8765")
+
+    def test_get_records_http_span(self):
+        tracer = TracingController()
+        controller = ClientsController(tracer=tracer)
+        controller._session = MagicMock()
+        response = controller._session.get.return_value
+        response.status_code = 200
+        response.elapsed = datetime.timedelta(milliseconds=120)
+        response.content = b"payload"
+
+        with patch.object(tracer, "_finish") as finish:
+            controller.get("https://example.com/photo.jpg")
+
+        span = finish.call_args.args[0]
+        self.assertEqual(span.name, "http")
+        self.assertEqual(span.attributes["host"], "example.com")
+        self.assertEqual(span.attributes["ttfb"], 0.12)
+        self.assertEqual(span.attributes["bytes"], 7)
+        self.assertEqual(tracer.counter("bytes", kind="http"), 7)
+
+    def test_invalid_pool_size(self):
+        with self.assertRaises(ValueError) as context:
+            ClientsController(pool_size=0)
+        self.assertEqual(str(context.exception), "pool_size must be at least 1")
+
+
+
+class TestClientsControllerAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the async clients, validating one pooled client per event loop and traced requests.
+    """
+
+    async def test_async_session_is_shared_within_a_loop(self):
+        controller = ClientsController()
+        session = controller.async_session()
+
+        self.assertIs(controller.async_session(), session)
+        await controller.aclose()
+        self.assertTrue(session.is_closed)
+        self.assertIsNot(controller.async_session(), session)
+        await controller.aclose()
+
+    def test_async_session_is_not_shared_across_loops(self):
+        controller = ClientsController()
+
+        async def session():
+            client = controller.async_session()
+            await controller.aclose()
+            return client
+
+        self.assertIsNot(asyncio.run(session()), asyncio.run(session()))
+
+    async def test_aget_records_a_span(self):
+        import httpx
+
+        tracer = TracingController()
+        controller = ClientsController(tracer=tracer)
+        session = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"ok")))
+        controller.async_session = lambda: session
+
+        with patch.object(tracer, "_finish") as finish:
+            response = await controller.aget("http://example.com/search")
+        await session.aclose()
+
+        self.assertEqual(response.content, b"ok")
+        span = finish.call_args.args[0]
+        self.assertEqual(span.name, "http")
+        self.assertEqual(span.attributes["host"], "example.com")
+        self.assertEqual(span.attributes["bytes"], 2)
+        self.assertEqual(tracer.counter("bytes", kind="http"), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
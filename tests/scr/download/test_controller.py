@@ -0,0 +1,249 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import httpx
+import requests
+
+from scr.clients.controller import ClientsController
+from scr.download.controller import DownloadController
+
+
+def image_response(chunks, status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Content-Type": "image/jpeg", **(headers or {})}
+    response.iter_content.return_value = iter(chunks)
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status_code} Error")
+    return response
+
+
+class TestDownloadController(unittest.TestCase):
+    """
+    Unit tests for the DownloadController class, validating chunked streaming, size and content-type
+    limits, Range resume and fallback across candidate URLs.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.destination = Path(self.temp_dir.name) / "photo.jpg"
+        self.clients = MagicMock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_download_streams_to_destination(self):
+        self.clients.get.return_value = image_response([b"abc", b"def"])
+
+        controller = DownloadController(self.clients, chunk_size=3)
+        result = controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.clients.get.assert_called_once_with("http://example.com/photo.jpg", stream=True)
+        self.clients.get.return_value.iter_content.assert_called_once_with(chunk_size=3)
+        self.assertEqual(self.destination.read_bytes(), b"abcdef")
+        self.assertEqual(result.bytes_written, 6)
+        self.assertEqual(result.content_type, "image/jpeg")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["photo.jpg"])
+
+    def test_download_rejects_content_type(self):
+        self.clients.get.return_value = image_response([b"<html>"], headers={"Content-Type": "text/html"})
+
+        controller = DownloadController(self.clients)
+        with self.assertRaises(ValueError):
+            controller.download("http://example.com/page", self.destination)
+
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_download_rejects_declared_size(self):
+        self.clients.get.return_value = image_response([b"x" * 10], headers={"Content-Length": "10"})
+
+        controller = DownloadController(self.clients, max_bytes=5)
+        with self.assertRaises(ValueError):
+            controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.clients.get.return_value.iter_content.assert_not_called()
+
+    def test_download_rejects_streamed_size(self):
+        self.clients.get.return_value = image_response([b"xxx", b"xxx"])
+
+        controller = DownloadController(self.clients, max_bytes=5)
+        with self.assertRaises(ValueError):
+            controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_download_resumes_partial_file(self):
+        def interrupted():
+            yield b"abc"
+            raise requests.exceptions.ConnectionError("connection reset")
+
+        controller = DownloadController(self.clients)
+        self.clients.get.return_value = image_response(interrupted(), headers={"ETag": '"v1"'})
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.clients.get.return_value = image_response([b"def"], status_code=206)
+        result = controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.clients.get.assert_called_with(
+            "http://example.com/photo.jpg", stream=True, headers={"Range": "bytes=3-", "If-Range": '"v1"'})
+        self.assertTrue(result.resumed)
+        self.assertEqual(self.destination.read_bytes(), b"abcdef")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["photo.jpg"])
+
+    def test_download_restarts_when_the_remote_file_changed(self):
+        controller = DownloadController(self.clients)
+        part_path = controller._part_path("http://example.com/photo.jpg", self.destination)
+        part_path.write_bytes(b"stale")
+        controller._validator_path(part_path).write_text("Tue, 01 Oct 2024 10:00:00 GMT")
+
+        # The server answers If-Range with the whole, newer file
+        self.clients.get.return_value = image_response([b"abcdef"], status_code=200)
+        result = controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.assertEqual(self.clients.get.call_args.kwargs["headers"],
+                         {"Range": "bytes=5-", "If-Range": "Tue, 01 Oct 2024 10:00:00 GMT"})
+        self.assertFalse(result.resumed)
+        self.assertEqual(self.destination.read_bytes(), b"abcdef")
+
+    def test_download_restarts_part_file_without_validator(self):
+        controller = DownloadController(self.clients)
+        part_path = controller._part_path("http://example.com/photo.jpg", self.destination)
+        part_path.write_bytes(b"stale")
+
+        self.clients.get.return_value = image_response([b"abcdef"], headers={"ETag": 'W/"weak"'})
+        result = controller.download("http://example.com/photo.jpg", self.destination)
+
+        self.clients.get.assert_called_once_with("http://example.com/photo.jpg", stream=True)
+        self.assertFalse(result.resumed)
+        self.assertEqual(self.destination.read_bytes(), b"abcdef")
+
+    def test_download_first_walks_candidates(self):
+        self.clients.get.side_effect = [
+            image_response([], status_code=404),
+            image_response([b"image_data"]),
+        ]
+
+        controller = DownloadController(self.clients)
+        result = controller.download_first(
+            ["http://example.com/dead.jpg", "http://example.com/photo.jpg"], self.destination)
+
+        self.assertEqual(result.url, "http://example.com/photo.jpg")
+        self.assertEqual(result.failed, ["http://example.com/dead.jpg"])
+        self.assertEqual(self.destination.read_bytes(), b"image_data")
+
+    def test_download_first_raises_last_error(self):
+        self.clients.get.side_effect = [
+            image_response([], status_code=404),
+            image_response([], status_code=500),
+        ]
+
+        controller = DownloadController(self.clients)
+        with self.assertRaises(requests.exceptions.HTTPError) as context:
+            controller.download_first(["http://example.com/a.jpg", "http://example.com/b.jpg"], self.destination)
+        self.assertEqual(str(context.exception), "500 Error")
+
+    def test_download_first_without_candidates(self):
+        controller = DownloadController(self.clients)
+        with self.assertRaises(ValueError) as context:
+            controller.download_first([], self.destination)
+        self.assertEqual(str(context.exception), "No candidate URLs to download")
+
+    def test_download_first_races_candidates(self):
+        responses = {
+            "http://example.com/dead.jpg": image_response([], status_code=404),
+            "http://example.com/photo.jpg": image_response([b"image_data"]),
+        }
+        self.clients.get.side_effect = lambda url, **kwargs: responses[url]
+
+        controller = DownloadController(self.clients)
+        result = controller.download_first(list(responses), self.destination, race=2)
+
+        self.assertEqual(result.url, "http://example.com/photo.jpg")
+        self.assertEqual(self.destination.read_bytes(), b"image_data")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["photo.jpg"])
+
+    def test_download_first_returns_without_waiting_for_losers(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def get(url, **kwargs):
+            if url == "http://slow.example/photo.jpg":
+                # A host that takes its time before sending the headers
+                release.wait(5)
+                return image_response([b"slow_data"])
+            return image_response([b"image_data"])
+        self.clients.get.side_effect = get
+
+        controller = DownloadController(self.clients)
+        started = time.perf_counter()
+        result = controller.download_first(["http://slow.example/photo.jpg", "http://example.com/photo.jpg"],
+                                           self.destination, race=2)
+
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(result.url, "http://example.com/photo.jpg")
+        self.assertEqual(self.destination.read_bytes(), b"image_data")
+
+        # The loser is cancelled in the background once its host answers
+        release.set()
+        deadline = time.monotonic() + 5
+        while os.listdir(self.temp_dir.name) != ["photo.jpg"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["photo.jpg"])
+        self.assertEqual(self.destination.read_bytes(), b"image_data")
+
+
+class TestDownloadControllerAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the async downloads, validating streaming and fallback through an httpx transport.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.destination = Path(self.temp_dir.name) / "photo.jpg"
+        self.clients = ClientsController()
+        self.clients.async_session = lambda: self.session
+
+    async def asyncTearDown(self):
+        await self.session.aclose()
+        self.temp_dir.cleanup()
+
+    def serve(self, handler):
+        self.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def test_adownload_first_falls_back_to_the_next_candidate(self):
+        def handler(request):
+            if request.url.path == "/broken.jpg":
+                return httpx.Response(404)
+            if request.url.path == "/page.html":
+                return httpx.Response(200, headers={"Content-Type": "text/html"}, content=b"<html>")
+            return httpx.Response(200, headers={"Content-Type": "image/jpeg"}, content=b"abcdef")
+        self.serve(handler)
+
+        controller = DownloadController(self.clients, chunk_size=4)
+        result = await controller.adownload_first(
+            ["http://example.com/broken.jpg", "http://example.com/page.html", "http://example.com/photo.jpg"],
+            self.destination,
+        )
+
+        self.assertEqual(result.url, "http://example.com/photo.jpg")
+        self.assertEqual(result.failed, ["http://example.com/broken.jpg", "http://example.com/page.html"])
+        self.assertEqual(self.destination.read_bytes(), b"abcdef")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["photo.jpg"])
+
+    async def test_adownload_rejects_oversized_stream(self):
+        self.serve(lambda request: httpx.Response(200, headers={"Content-Type": "image/jpeg"}, content=b"x" * 10))
+
+        controller = DownloadController(self.clients, max_bytes=5)
+        with self.assertRaises(ValueError):
+            await controller.adownload("http://example.com/photo.jpg", self.destination)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
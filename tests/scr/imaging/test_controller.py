@@ -0,0 +1,98 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from scr.imaging.controller import ImagingController, ProcessedImage, dhash, hamming_distance
+
+
+def gradient(width, height):
+    image = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(image)
+    for x in range(width):
+        shade = int(255 * x / width)
+        draw.line([(x, 0), (x, height)], fill=(shade, shade, 255 - shade))
+    return image
+
+
+class TestImagingController(unittest.TestCase):
+    """
+    Unit tests for the ImagingController class, validating frame cropping, JPEG re-encoding
+    and near-duplicate detection.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.controller = ImagingController(frame="landscape", quality=80, max_workers=1)
+
+    def tearDown(self):
+        self.controller.close()
+        self.temp_dir.cleanup()
+
+    def test_process_crops_to_frame_and_reencodes(self):
+        # A PNG saved with a .jpg name, as image hosts commonly serve
+        source = self.root / "Tequila.jpg"
+        gradient(3000, 3000).save(source, "PNG")
+
+        result = self.controller.process(source)
+
+        self.assertEqual(result.path, source)
+        self.assertEqual((result.width, result.height), (1920, 1080))
+        with Image.open(source) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (1920, 1080))
+        self.assertEqual(result.bytes_written, source.stat().st_size)
+
+    def test_process_to_destination(self):
+        source = self.root / "source.jpg"
+        destination = self.root / "processed" / "Tequila.jpg"
+        gradient(400, 300).save(source, "JPEG")
+
+        controller = ImagingController(frame="portrait", max_workers=1)
+        try:
+            result = controller.process(source, destination)
+        finally:
+            controller.close()
+
+        self.assertEqual(result.path, destination)
+        self.assertEqual((result.width, result.height), (1080, 1920))
+        self.assertTrue(source.is_file())
+
+    def test_process_many_keeps_order(self):
+        sources = []
+        for name in ("a", "b"):
+            source = self.root / f"{name}.jpg"
+            gradient(640, 480).save(source, "JPEG")
+            sources.append(source)
+
+        results = self.controller.process_many(sources)
+
+        self.assertEqual([result.path for result in results], sources)
+
+    def test_dhash_matches_resized_copies(self):
+        original = gradient(800, 600)
+        resized = original.resize((400, 300))
+        different = original.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+        self.assertLessEqual(hamming_distance(dhash(original), dhash(resized)), 2)
+        self.assertGreater(hamming_distance(dhash(original), dhash(different)), 6)
+
+    def test_find_duplicates(self):
+        first = ProcessedImage(Path("a.jpg"), 1, 1, 0b1111, 1)
+        near = ProcessedImage(Path("b.jpg"), 1, 1, 0b1110, 1)
+        distinct = ProcessedImage(Path("c.jpg"), 1, 1, (1 << 64) - 1, 1)
+
+        duplicates = self.controller.find_duplicates([first, near, distinct])
+
+        self.assertEqual(duplicates, [(near, first)])
+
+    def test_invalid_frame(self):
+        with self.assertRaises(ValueError) as context:
+            ImagingController(frame="square")
+        self.assertEqual(str(context.exception), "frame must be one of: portrait, landscape")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from scr.audio.controller import parse_profiles
+from scr.batch.controller import EpisodeSpec
+from scr.jobs.controller import (STATUS_BLOCKED, STATUS_DONE, STATUS_FAILED, STATUS_PENDING, JobsController,
+                                 PermanentTaskError, TaskRunner)
+from scr.script.controller import ScriptRecord
+
+
+def script_result(*categories):
+    return {"records": [
+        {"category": category, "image_query": f"{category} photo", "narration_script": f"{category} narration"}
+        for category in categories
+    ]}
+
+
+class TestJobsController(unittest.TestCase):
+    """
+    Unit tests for the JobsController class, validating the task graph, leasing,
+    retries with backoff and rejection of results from expired leases.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.now = 1000.0
+        self.queue = JobsController(Path(self.temp_dir.name) / "jobs.sqlite", lease_seconds=60, max_attempts=2,
+                                    retry_delay=10, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.queue.close()
+        self.temp_dir.cleanup()
+
+    def test_submit_is_idempotent(self):
+        self.assertTrue(self.queue.submit(EpisodeSpec("Drinks", ["Tequila"])))
+        self.assertFalse(self.queue.submit(EpisodeSpec("Drinks", ["Tequila"])))
+
+        self.assertEqual(self.queue.status(), {"Drinks": {STATUS_PENDING: 1}})
+
+    def test_compose_requires_audio(self):
+        with self.assertRaises(ValueError):
+            self.queue.submit(EpisodeSpec("Drinks", ["Tequila"]), audio=False)
+
+    def test_script_queues_assets_and_assets_release_compose(self):
+        self.queue.submit(EpisodeSpec("Drinks", ["Tequila", "Mezcal"], voice="voice-1"))
+
+        script = self.queue.lease("worker")
+        self.assertEqual(script.stage, "script")
+        self.assertTrue(self.queue.complete(script, script_result("Tequila", "Mezcal")))
+        self.assertEqual(self.queue.status()["Drinks"], {STATUS_DONE: 1, STATUS_PENDING: 4, STATUS_BLOCKED: 1})
+
+        assets = [self.queue.lease("worker") for _ in range(4)]
+        self.assertIsNone(self.queue.lease("worker"))
+        self.assertEqual(sorted((task.stage, task.category) for task in assets), [
+            ("audio", "Mezcal"), ("audio", "Tequila"), ("photos", "Mezcal"), ("photos", "Tequila")])
+        audio = next(task for task in assets if task.stage == "audio")
+        self.assertEqual(audio.payload["voice"], "voice-1")
+        self.assertEqual(audio.payload["narration"], f"{audio.category} narration")
+
+        for task in assets:
+            self.queue.complete(task, {"path": f"{task.category}.{task.stage}"})
+
+        compose = self.queue.lease("worker")
+        self.assertEqual(compose.stage, "compose")
+        self.assertEqual(compose.payload["categories"], ["Tequila", "Mezcal"])
+        self.assertEqual(self.queue.result("Drinks", "photos", "Tequila"), {"path": "Tequila.photos"})
+
+    def test_failed_task_is_retried_with_backoff_then_failed(self):
+        self.queue.submit(EpisodeSpec("Drinks", ["Tequila"]), audio=False, compose=False)
+
+        task = self.queue.lease("worker")
+        self.assertTrue(self.queue.fail(task, ConnectionError("Gemini unavailable")))
+        self.assertIsNone(self.queue.lease("worker"))
+
+        self.now += 10
+        task = self.queue.lease("worker")
+        self.assertEqual(task.attempts, 2)
+        self.queue.fail(task, ConnectionError("Gemini unavailable"))
+
+        self.now += 1000
+        self.assertIsNone(self.queue.lease("worker"))
+        self.assertEqual(self.queue.status()["Drinks"], {STATUS_FAILED: 1})
+        self.assertEqual(self.queue.errors("Drinks"), {"script": "ConnectionError: Gemini unavailable"})
+
+    def test_expired_lease_is_leased_again_and_stale_result_rejected(self):
+        self.queue.submit(EpisodeSpec("Drinks", ["Tequila"]))
+        stale = self.queue.lease("first")
+
+        self.now += 61
+        current = self.queue.lease("second")
+
+        self.assertEqual(current.id, stale.id)
+        self.assertFalse(self.queue.renew(stale))
+        self.assertFalse(self.queue.complete(stale, script_result("Tequila")))
+        self.assertTrue(self.queue.renew(current))
+        self.assertTrue(self.queue.complete(current, script_result("Tequila")))
+
+    def test_failed_asset_fails_compose(self):
+        self.queue.submit(EpisodeSpec("Drinks", ["Tequila"]))
+        self.queue.complete(self.queue.lease("worker"), script_result("Tequila"))
+
+        photos = self.queue.lease("worker")
+        self.queue.fail(photos, ValueError("No image results"), retry=False)
+
+        self.assertEqual(self.queue.errors("Drinks")["compose"], "Missing asset: ValueError: No image results")
+
+    def test_work_runs_tasks_until_idle(self):
+        self.queue.submit(EpisodeSpec("Drinks", ["Tequila"]))
+        results = {
+            "script": script_result("Tequila"),
+            "photos": {"path": "Tequila.jpg"},
+            "audio": {"path": "Tequila.mp3"},
+            "compose": {"path": "drinks.mp4"},
+        }
+
+        processed = self.queue.work(lambda task: results[task.stage], idle_timeout=0, poll_interval=0)
+
+        self.assertEqual(processed, 4)
+        self.assertEqual(self.queue.status(), {"Drinks": {STATUS_DONE: 4}})
+
+    def test_permanent_error_is_not_retried(self):
+        self.queue.submit(EpisodeSpec("Drinks", ["Tequila"]))
+        self.queue.complete(self.queue.lease("worker"), script_result("Tequila"))
+        results = {"audio": {"path": "Tequila.mp3"}}
+
+        def runner(task):
+            if task.stage == "photos":
+                raise PermanentTaskError("No image results for: Tequila photo")
+            return results[task.stage]
+
+        self.assertEqual(self.queue.work(runner, idle_timeout=0, poll_interval=0), 2)
+
+        self.assertEqual(self.queue.errors("Drinks"), {
+            "photos/Tequila": "PermanentTaskError: No image results for: Tequila photo",
+            "compose": "Missing asset: PermanentTaskError: No image results for: Tequila photo",
+        })
+
+    def test_workers_in_threads_never_share_a_task(self):
+        self.queue.submit(EpisodeSpec("Drinks", [f"Category {index}" for index in range(10)]))
+        self.queue.complete(self.queue.lease("worker"), script_result(*[f"Category {index}" for index in range(10)]))
+        leased = []
+
+        def work():
+            while (task := self.queue.lease(threading.current_thread().name)) is not None:
+                leased.append(task.id)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(leased), 20)
+        self.assertEqual(len(set(leased)), 20)
+
+
+@patch("scr.jobs.controller.ScriptController")
+class TestTaskRunner(unittest.TestCase):
+    """
+    Unit tests for the TaskRunner class, validating how tasks map onto the controllers.
+    """
+
+    def test_script_task_returns_records(self, script_class):
+        script_class.return_value.generate_records.return_value = [ScriptRecord("Tequila", "agave", "Tequila!")]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            queue = JobsController(Path(temp_dir) / "jobs.sqlite")
+            queue.submit(EpisodeSpec("Drinks", ["Tequila"]))
+            task = queue.lease("worker")
+            queue.close()
+
+        result = TaskRunner(MagicMock(), data_dir=Path("/tmp"))(task)
+
+        script_class.return_value.generate_records.assert_called_once_with(["Tequila"])
+        self.assertEqual(result, {"records": [
+            {"category": "Tequila", "image_query": "agave", "narration_script": "Tequila!", "narrations": {}}]})
+
+    @patch("scr.jobs.controller.PhotosController")
+    def test_photos_task_without_results_fails_permanently(self, photos_class, script_class):
+        photos_class.return_value.generate_photos.return_value = None
+        with tempfile.TemporaryDirectory() as temp_dir:
+            queue = JobsController(Path(temp_dir) / "jobs.sqlite")
+            queue.submit(EpisodeSpec("Drinks", ["Tequila"]))
+            queue.complete(queue.lease("worker"), script_result("Tequila"))
+            photos = next(task for task in iter(lambda: queue.lease("worker"), None) if task.stage == "photos")
+            queue.close()
+
+            with self.assertRaises(PermanentTaskError):
+                TaskRunner(MagicMock(), data_dir=Path(temp_dir))(photos)
+
+    def test_profiles_are_translated_and_rendered(self, script_class):
+        script_class.return_value.generate_records.return_value = [
+            ScriptRecord("Tequila", "agave", "¡Tequila!", narrations={"en": "Tequila!"})]
+        episode = EpisodeSpec("Drinks", ["Tequila"], profiles=parse_profiles("es,en:en=voice-en"))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            queue = JobsController(Path(temp_dir) / "jobs.sqlite")
+            queue.submit(episode, compose=False)
+            runner = TaskRunner(MagicMock(), data_dir=Path(temp_dir))
+            script = queue.lease("worker")
+            queue.complete(script, runner(script))
+            audio = next(task for task in iter(lambda: queue.lease("worker"), None) if task.stage == "audio")
+            queue.close()
+
+            with patch("scr.jobs.controller.AudioController") as audio_class, \
+                    patch("scr.jobs.controller.file_sha256", return_value="digest"):
+                controller = audio_class.return_value
+                controller.profile = episode.profiles[0]
+                controller.synthesize_to_file.side_effect = lambda script, name, profile: MagicMock(
+                    path=Path(temp_dir) / profile.name / f"{name}.mp3")
+                result = runner(audio)
+
+        self.assertEqual(script_class.call_args.kwargs["languages"], ["en"])
+        self.assertEqual(audio_class.call_args.kwargs["profile"], episode.profiles[0])
+        self.assertEqual([call.args[0] for call in controller.synthesize_to_file.call_args_list],
+                         ["¡Tequila!", "Tequila!"])
+        self.assertEqual(result["sha256"], "digest")
+        self.assertEqual(result["profiles"], {"en": {"path": str(Path(temp_dir) / "en" / "Tequila.mp3"),
+                                                     "sha256": "digest"}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+
+from scr.manifest.controller import FILE_MODE, ManifestController, shared_mkstemp
+
+
+class TestManifestController(unittest.TestCase):
+    """
+    Unit tests for the ManifestController class, validating persistence and the checks deciding
+    whether an asset can be reused.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.photo = self.root / "Tequila.jpg"
+        self.photo.write_bytes(b"image_data")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def manifest(self):
+        return ManifestController("Drinks, Tequila", manifests_dir=self.root / "manifests")
+
+    def test_manifest_path_is_slugged(self):
+        self.assertEqual(self.manifest().path, self.root / "manifests" / "drinks_tequila.json")
+
+    def test_long_episode_names_are_shortened(self):
+        manifest = ManifestController(",".join(["Category"] * 40), manifests_dir=self.root)
+        self.assertLessEqual(len(manifest.path.name), 100)
+
+    def test_empty_episode(self):
+        with self.assertRaises(ValueError) as context:
+            ManifestController(" ", manifests_dir=self.root)
+        self.assertEqual(str(context.exception), "episode cannot be empty")
+
+    def test_complete_entry_survives_reload(self):
+        self.manifest().record_complete("Tequila", "photos", "tequila photo", self.photo, "http://example.com/t.jpg")
+
+        manifest = self.manifest()
+
+        self.assertTrue(manifest.is_complete("Tequila", "photos", "tequila photo"))
+        entry = manifest.entry("Tequila", "photos")
+        self.assertEqual(entry["url"], "http://example.com/t.jpg")
+        self.assertEqual(entry["path"], str(self.photo))
+
+    def test_changed_query_is_not_complete(self):
+        manifest = self.manifest()
+        manifest.record_complete("Tequila", "photos", "tequila photo", self.photo)
+
+        self.assertFalse(manifest.is_complete("Tequila", "photos", "agave field photo"))
+
+    def test_missing_or_modified_file_is_not_complete(self):
+        manifest = self.manifest()
+        manifest.record_complete("Tequila", "photos", "tequila photo", self.photo)
+
+        self.photo.write_bytes(b"truncated")
+        self.assertFalse(manifest.is_complete("Tequila", "photos", "tequila photo"))
+
+        self.photo.unlink()
+        self.assertFalse(manifest.is_complete("Tequila", "photos", "tequila photo"))
+
+    def test_failed_entry_is_not_complete(self):
+        manifest = self.manifest()
+        manifest.record_failed("Tequila", "audio", "narration", RuntimeError("quota exhausted"))
+
+        self.assertFalse(manifest.is_complete("Tequila", "audio", "narration"))
+        self.assertEqual(manifest.entry("Tequila", "audio")["error"], "quota exhausted")
+
+    def test_shared_temp_files_follow_the_umask(self):
+        file_descriptor, temp_path = shared_mkstemp(self.root, prefix=".Tequila.jpg.")
+        os.close(file_descriptor)
+        self.manifest().record_complete("Tequila", "photos", "agave", self.photo, "http://example.com/1.jpg")
+
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(FILE_MODE, 0o666 & ~umask)
+        for path in (Path(temp_path), self.manifest().path):
+            self.assertEqual(stat.S_IMODE(path.stat().st_mode), FILE_MODE)
+
+
+if __name__ == '__main__':
+    unittest.main()
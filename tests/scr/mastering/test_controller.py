@@ -0,0 +1,115 @@
+import tempfile
+import unittest
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from scr.mastering.controller import (MasteringController, cue_time, integrated_loudness, read_audio,
+                                      silence_bounds, write_wav)
+
+RATE = 44100
+
+
+def tone(seconds, amplitude, frequency=997.0):
+    time = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * time))[np.newaxis, :].astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros((1, int(seconds * RATE)), dtype=np.float32)
+
+
+class TestMasteringController(unittest.TestCase):
+    """
+    Unit tests for the MasteringController class, validating loudness measurement,
+    silence trimming, normalization and the concatenated episode track.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.audio_dir = Path(self.temp_dir.name)
+        self.controller = MasteringController(audio_dir=self.audio_dir, max_workers=1, gap=0.5)
+
+    def tearDown(self):
+        self.controller.close()
+        self.temp_dir.cleanup()
+
+    def write_clip(self, name, *parts):
+        write_wav(self.audio_dir / f"{name}.wav", np.concatenate(parts, axis=1), RATE)
+
+    def test_integrated_loudness_matches_reference_tone(self):
+        # BS.1770 reference: a 997 Hz sine at -20 dBFS reads -23.0 LUFS in mono
+        self.assertAlmostEqual(integrated_loudness(tone(5, 0.1), RATE), -23.0, delta=0.05)
+        self.assertEqual(integrated_loudness(silence(1), RATE), float("-inf"))
+
+    def test_silence_bounds_keep_padding(self):
+        samples = np.concatenate([silence(1), tone(2, 0.1), silence(0.5)], axis=1)
+
+        start, end = silence_bounds(samples, RATE, padding=0.05)
+
+        self.assertAlmostEqual(start / RATE, 0.95, delta=0.011)
+        self.assertAlmostEqual(end / RATE, 3.05, delta=0.011)
+
+    def test_process_trims_and_normalizes(self):
+        self.write_clip("Tequila", silence(1), tone(3, 0.02), silence(0.5))
+
+        clip = self.controller.process(self.audio_dir / "Tequila.wav")
+
+        self.assertEqual(clip.path, self.audio_dir / "mastered" / "Tequila.wav")
+        self.assertAlmostEqual(clip.duration, 3.1, delta=0.02)
+        self.assertAlmostEqual(clip.loudness, -37.0, delta=0.1)
+        self.assertAlmostEqual(clip.gain, 14.0, delta=0.1)
+        self.assertAlmostEqual(clip.trimmed[0], 0.95, delta=0.011)
+        processed = read_audio(clip.path, RATE)
+        self.assertAlmostEqual(integrated_loudness(processed, RATE), -23.0, delta=0.1)
+
+    def test_peak_ceiling_limits_gain(self):
+        # A short loud burst in quiet speech: full normalization would clip the burst
+        self.write_clip("Mezcal", tone(2, 0.005), tone(0.05, 0.5), tone(2, 0.005))
+
+        clip = self.controller.process(self.audio_dir / "Mezcal.wav")
+
+        peak = np.abs(read_audio(clip.path, RATE)).max()
+        self.assertLessEqual(20 * np.log10(peak), -0.99)
+
+    def test_master_concatenates_with_cue_sheet(self):
+        self.write_clip("intro", tone(1, 0.1))
+        self.write_clip("Tequila", silence(0.5), tone(2, 0.05))
+        self.write_clip("Mezcal", tone(1.5, 0.2))
+
+        track = self.controller.master(["Tequila", "Mezcal"], output_name="drinks")
+
+        self.assertEqual([cue.name for cue in track.cues], ["intro", "Tequila", "Mezcal"])
+        self.assertAlmostEqual(track.cues[1].start, 1.5, delta=0.01)
+        self.assertAlmostEqual(track.cues[2].start, 1.5 + 2.05 + 0.5, delta=0.02)
+        with wave.open(str(track.path), "rb") as file:
+            self.assertAlmostEqual(file.getnframes() / RATE, track.duration, delta=0.001)
+        cue_sheet = track.cue_sheet.read_text(encoding="utf-8")
+        self.assertIn('FILE "drinks.wav" WAVE', cue_sheet)
+        self.assertIn('    TITLE "Mezcal"\n    INDEX 01 ' + cue_time(track.cues[2].start), cue_sheet)
+
+    def test_missing_and_silent_clips_raise(self):
+        with self.assertRaises(FileNotFoundError):
+            self.controller.master(["Pulque"])
+
+        self.write_clip("Pulque", silence(1))
+        with self.assertRaises(ValueError) as context:
+            self.controller.master(["Pulque"])
+        self.assertEqual(str(context.exception), "Pulque.wav is silent")
+
+    def test_mp3_without_ffmpeg_raises(self):
+        (self.audio_dir / "Tequila.mp3").write_bytes(b"\xff\xfb\x00")
+
+        with self.assertRaises(EnvironmentError) as context:
+            read_audio(self.audio_dir / "Tequila.mp3", ffmpeg="missing-ffmpeg")
+
+        self.assertEqual(str(context.exception), "missing-ffmpeg is not installed")
+
+    def test_cue_time(self):
+        self.assertEqual(cue_time(0), "00:00:00")
+        self.assertEqual(cue_time(61.4), "01:01:30")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,37 @@
+import asyncio
+import os
+import tempfile
 import unittest
 from pathlib import Path
+
+import httpx
+import requests
+from PIL import Image
+
+from scr.assets.controller import AssetsController
+from scr.clients.controller import ClientsController
 from scr.photos.controller import PhotosController
+from scr.search.controller import Candidate, SearchController
 from unittest.mock import MagicMock, patch
 
 
+def search_response(links):
+    response = MagicMock()
+    response.json.return_value = {"items": [{"link": link} for link in links]}
+    response.status_code = 200
+    return response
+
+
+def image_response(chunks, status_code=200, content_type="image/jpeg"):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Content-Type": content_type}
+    response.iter_content.return_value = iter(chunks)
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(f"{status_code} Error")
+    return response
+
+
 class TestPhotosController(unittest.TestCase):
     """
     Unit tests for the PhotosController class, validating its functionalities including photo generation,
@@ -13,8 +41,8 @@ class TestPhotosController(unittest.TestCase):
     @patch("scr.photos.controller.os.environ.get", return_value=None)
     def test_generate_photos_missing_api_key(self, mock_environ_get):
         with self.assertRaises(EnvironmentError) as context:
-            controller = PhotosController()
-            controller.generate_photos("test query")
+            controller = PhotosController(MagicMock())
+            controller.generate_photos("test query", "test_photo")
         self.assertEqual(
             str(context.exception),
             "GOOGLE_SEARCH_KEY environment variable is not set"
@@ -23,74 +51,317 @@ class TestPhotosController(unittest.TestCase):
     @patch("scr.photos.controller.os.environ.get", side_effect=["mocked_search_key", None])
     def test_generate_photos_missing_search_engine_id(self, mock_environ_get):
         with self.assertRaises(EnvironmentError) as context:
-            controller = PhotosController()
-            controller.generate_photos("test query")
+            controller = PhotosController(MagicMock())
+            controller.generate_photos("test query", "test_photo")
         self.assertEqual(
             str(context.exception),
             "SEARCH_ENGINE_ID environment variable is not set"
         )
 
-    @patch("scr.photos.controller.requests.get")
     @patch("scr.photos.controller.os.environ.get", side_effect=["mocked_search_key", "mocked_search_engine_id"])
-    def test_generate_photos_api_call(self, mock_environ_get, mock_requests_get):
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "items": [{"link": "http://example.com/photo1.jpg"}]
-        }
-        mock_response.status_code = 200
-        mock_response.content = b"image_data"  # Adding actual byte content to avoid TypeError
-        mock_requests_get.return_value = mock_response
-
-        controller = PhotosController()
-        with patch("scr.photos.controller.Path.open", new_callable=MagicMock) as mock_open:
-            with patch("scr.photos.controller.Path.mkdir") as mock_mkdir:
-                controller.generate_photos("test query")
-
-                # Assert that the API was called with correct parameters
-                mock_requests_get.assert_any_call(
-                    'https://www.googleapis.com/customsearch/v1',
-                    params={
-                        'q': 'test query',
-                        'key': 'mocked_search_key',
-                        'cx': 'mocked_search_engine_id',
-                        'searchType': 'image',
-                        'gl': 'MX',
-                    }
-                )
-                # Assert directory creation
-                mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
-
-    @patch("scr.photos.controller.requests.get")
+    def test_generate_photos_api_call(self, mock_environ_get):
+        mock_clients = MagicMock()
+        mock_clients.get.side_effect = [
+            search_response(["http://example.com/photo1.jpg"]),
+            image_response([b"image_data"]),
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            photos_dir = Path(temp_dir) / "data" / "photos"
+            controller = PhotosController(mock_clients, photos_dir=photos_dir)
+            controller.generate_photos("test query", "test_photo")
+
+            # Assert that the API was called with correct parameters
+            mock_clients.get.assert_any_call(
+                'https://www.googleapis.com/customsearch/v1',
+                params={
+                    'q': 'test query',
+                    'key': 'mocked_search_key',
+                    'cx': 'mocked_search_engine_id',
+                    'searchType': 'image',
+                    'image_sort_by': '',
+                }
+            )
+            # Assert directory creation
+            self.assertTrue(photos_dir.is_dir())
+
+    @patch("scr.photos.controller.os.environ.get", side_effect=["mocked_search_key", "mocked_search_engine_id"])
+    def test_generate_photos_saves_images(self, mock_environ_get):
+        mock_clients = MagicMock()
+        mock_clients.get.side_effect = [
+            search_response(["http://example.com/photo1.jpg"]),
+            image_response([b"image_", b"data"]),
+        ]
+
+        with tempfile.TemporaryDirectory() as photos_dir:
+            controller = PhotosController(mock_clients, photos_dir=Path(photos_dir))
+            result = controller.generate_photos("test query", "photo_1")
+
+            mock_clients.get.assert_called_with("http://example.com/photo1.jpg", stream=True)
+            self.assertEqual(result.path, Path(photos_dir) / "photo_1.jpg")
+            self.assertEqual(result.path.read_bytes(), b"image_data")
+            self.assertEqual(os.listdir(photos_dir), ["photo_1.jpg"])
+
     @patch("scr.photos.controller.os.environ.get", side_effect=["mocked_search_key", "mocked_search_engine_id"])
-    def test_generate_photos_saves_images(self, mock_environ_get, mock_requests_get):
-        mock_search_response = MagicMock()
-        mock_search_response.json.return_value = {
-            "items": [{"link": "http://example.com/photo1.jpg"}]
-        }
-        mock_search_response.status_code = 200
-
-        mock_image_response = MagicMock()
-        mock_image_response.content = b"image_data"
-        mock_image_response.status_code = 200
-
-        mock_requests_get.side_effect = [mock_search_response, mock_image_response]
-
-        controller = PhotosController()
-        with patch("scr.photos.controller.Path.open", new_callable=MagicMock) as mock_open:
-            with patch("scr.photos.controller.Path.mkdir") as mock_mkdir:
-                with patch("scr.photos.controller.Path") as mock_path:
-                    mock_path.return_value = Path("data/photos/photo_1.jpg")
-                    mock_mkdir.return_value = None  # Ensure mkdir is called for the directory
-                    mock_path("data/photos").mkdir(parents=True, exist_ok=True)  # Mock directory creation
-                    controller.generate_photos("test query")
-                    # Assert that the image data was written to the file
-                    mock_open.assert_called_once_with(Path("data/photos/photo_1.jpg"), "wb")
-                    mock_open().write.assert_called_once_with(b"image_data")
-
-    @patch("scr.photos.controller.requests.get", side_effect=Exception("Network error"))
+    def test_generate_photos_falls_back_through_results(self, mock_environ_get):
+        mock_clients = MagicMock()
+        mock_clients.get.side_effect = [
+            search_response([
+                "http://example.com/dead.jpg",
+                "http://example.com/page.html",
+                "http://example.com/photo3.jpg",
+            ]),
+            image_response([], status_code=404),
+            image_response([b"<html>"], content_type="text/html"),
+            image_response([b"image_data"]),
+        ]
+
+        with tempfile.TemporaryDirectory() as photos_dir:
+            controller = PhotosController(mock_clients, photos_dir=Path(photos_dir))
+            result = controller.generate_photos("test query", "photo_1")
+
+            self.assertEqual(result.url, "http://example.com/photo3.jpg")
+            self.assertEqual(result.path.read_bytes(), b"image_data")
+            self.assertEqual(os.listdir(photos_dir), ["photo_1.jpg"])
+
     @patch("scr.photos.controller.os.environ.get", side_effect=["mocked_search_key", "mocked_search_engine_id"])
-    def test_generate_photos_handles_network_errors(self, mock_environ_get, mock_requests_get):
-        controller = PhotosController()
+    def test_generate_photos_handles_network_errors(self, mock_environ_get):
+        mock_clients = MagicMock()
+        mock_clients.get.side_effect = Exception("Network error")
+
+        controller = PhotosController(mock_clients)
         with self.assertRaises(Exception) as context:
-            controller.generate_photos("test query")
+            controller.generate_photos("test query", "test_photo")
         self.assertEqual(str(context.exception), "Network error")
+
+
+    def test_add_photo_to_video_delegates_to_compositor(self):
+        video = MagicMock()
+        video.compose.return_value = Path("episode.mp4")
+        controller = PhotosController(MagicMock())
+
+        result = controller.add_photo_to_video(["Tequila", "Mezcal"], "drinks", video=video)
+
+        self.assertEqual(result, Path("episode.mp4"))
+        video.compose.assert_called_once_with(["Tequila", "Mezcal"], "drinks")
+
+    @patch("scr.photos.controller.VideoController")
+    def test_add_photo_to_video_renders_at_the_photos_frame(self, video_class):
+        controller = PhotosController(MagicMock(), photos_dir=Path("photos/drinks"), frame="landscape")
+
+        controller.add_photo_to_video(["Tequila"], "drinks", audio_dir=Path("audios/drinks"))
+
+        video_class.assert_called_once_with(photos_dir=Path("photos/drinks"), audio_dir=Path("audios/drinks"),
+                                            frame="landscape")
+        video_class.return_value.compose.assert_called_once_with(["Tequila"], "drinks")
+
+
+    def test_generate_photos_routes_through_search(self):
+        mock_clients = MagicMock()
+        mock_clients.get.return_value = image_response([b"image_data"])
+        search = MagicMock()
+        search.candidates.return_value = [Candidate("http://example.com/photo1.jpg", "unsplash", "tequila")]
+        search.rank_candidates.side_effect = lambda candidates, *args: candidates
+
+        with tempfile.TemporaryDirectory() as photos_dir:
+            controller = PhotosController(mock_clients, photos_dir=Path(photos_dir), search=search)
+            result = controller.generate_photos("tequila", "Tequila")
+
+            search.candidates.assert_called_once_with(["tequila"], 1, None, start=1)
+            search.record_download.assert_called_once_with("http://example.com/photo1.jpg", ok=True)
+            self.assertEqual(result.path, Path(photos_dir) / "Tequila.jpg")
+
+    def test_next_page_is_searched_only_without_usable_candidates(self):
+        mock_clients = MagicMock()
+        mock_clients.get.return_value = image_response([b"image_data"])
+        page = Candidate("http://example.com/page.html", "unsplash", mime="text/html")
+        tall = Candidate("http://example.com/tall.jpg", "unsplash", width=1080, height=1920)
+        pager = MagicMock(side_effect=lambda query, number: [page] if number == 1 else [tall])
+        search = SearchController()
+        search.register("unsplash", lambda query: [], pager)
+
+        with tempfile.TemporaryDirectory() as photos_dir:
+            controller = PhotosController(mock_clients, photos_dir=Path(photos_dir), search=search, max_pages=3)
+            result = controller.generate_photos("tequila", "Tequila")
+        search.close()
+
+        self.assertEqual(result.url, "http://example.com/tall.jpg")
+        self.assertEqual([call.args for call in pager.call_args_list], [("tequila", 1), ("tequila", 2)])
+
+    def test_generate_photos_reuses_indexed_asset(self):
+        mock_clients = MagicMock()
+        search = MagicMock()
+        search.candidates.return_value = [Candidate("http://example.com/photo1.jpg", "unsplash", "tequila")]
+        search.rank_candidates.side_effect = lambda candidates, *args: candidates
+
+        with tempfile.TemporaryDirectory() as root:
+            photo = Path(root) / "source.jpg"
+            Image.new("RGB", (32, 24), "orange").save(photo)
+            mock_clients.get.return_value = image_response([photo.read_bytes()])
+            assets = AssetsController(Path(root) / "assets.sqlite", Path(root) / "library")
+            first = PhotosController(mock_clients, photos_dir=Path(root) / "first", search=search, assets=assets)
+            second = PhotosController(mock_clients, photos_dir=Path(root) / "second", search=search, assets=assets)
+
+            first.generate_photos("tequila", "Tequila")
+            result = second.generate_photos("tequila", "Tequila")
+            assets.close()
+
+            search.candidates.assert_called_once()
+            mock_clients.get.assert_called_once()
+            self.assertEqual(result.url, "http://example.com/photo1.jpg")
+            self.assertEqual(result.path.read_bytes(), photo.read_bytes())
+
+    @patch("scr.photos.controller.os.environ.get", side_effect=["mocked_search_key", "mocked_search_engine_id"])
+    def test_google_candidates_read_metadata_and_page(self, mock_environ_get):
+        response = MagicMock()
+        response.json.return_value = {"items": [
+            {"link": "http://example.com/1.png", "mime": "image/png", "image": {"width": 800, "height": 600}},
+        ]}
+        mock_clients = MagicMock()
+        mock_clients.get.return_value = response
+
+        candidates = PhotosController(mock_clients).google_candidates("tequila", page=3)
+
+        self.assertEqual(mock_clients.get.call_args.kwargs["params"]["start"], 21)
+        self.assertEqual(candidates, [Candidate("http://example.com/1.png", "google_search", "tequila", 20,
+                                                800, 600, "image/png")])
+
+    def test_generate_photos_downloads_best_candidates_only(self):
+        mock_clients = MagicMock()
+        mock_clients.get.side_effect = [image_response([], status_code=404), image_response([b"image_data"])]
+        search = SearchController()
+        listed = [
+            Candidate("http://example.com/small.jpg", width=200, height=300, mime="image/jpeg"),
+            Candidate("http://example.com/wide.jpg", width=3000, height=1000, mime="image/jpeg"),
+            Candidate("http://example.com/tall.jpg", width=1200, height=2100, mime="image/jpeg"),
+            Candidate("http://example.com/logo.svg", mime="image/svg+xml"),
+        ]
+        search.register("google_search", lambda query: [], lambda query, page: listed if page == 1 else [])
+
+        with tempfile.TemporaryDirectory() as photos_dir:
+            controller = PhotosController(mock_clients, photos_dir=Path(photos_dir), search=search, max_candidates=2)
+            result = controller.generate_photos("tequila", "Tequila")
+        search.close()
+
+        self.assertEqual([call.args[0] for call in mock_clients.get.call_args_list],
+                         ["http://example.com/tall.jpg", "http://example.com/wide.jpg"])
+        self.assertEqual(result.url, "http://example.com/wide.jpg")
+        self.assertLess(search.domain_success_rate("example.com"), 0.5 + 1e-9)
+
+    def test_constrained_budget_defers_optional_searches_and_meters_downloads(self):
+        mock_clients = MagicMock()
+        mock_clients.get.return_value = image_response([b"image_data"])
+        scheduler = MagicMock()
+        scheduler.constrained.return_value = True
+        pager = MagicMock(return_value=[Candidate("http://example.com/1.jpg", "unsplash", width=1080, height=1920)])
+        search = SearchController()
+        search.register("unsplash", lambda query: [], pager)
+
+        with tempfile.TemporaryDirectory() as photos_dir:
+            controller = PhotosController(mock_clients, photos_dir=Path(photos_dir), scheduler=scheduler,
+                                          search=search, pages=3, query_variants=2)
+            result = controller.generate_photos("tequila", "Tequila")
+        search.close()
+
+        self.assertEqual(result.url, "http://example.com/1.jpg")
+        pager.assert_called_once_with("tequila", 1)
+        scheduler.record_usage.assert_called_once_with("unsplash", downloads=1)
+
+    def test_unknown_frame_raises(self):
+        with self.assertRaises(ValueError):
+            PhotosController(MagicMock(), frame="square")
+
+    @patch.dict("scr.photos.controller.os.environ", {"UNSPLASH_KEY": "key"}, clear=True)
+    def test_register_providers_skips_unconfigured(self):
+        controller = PhotosController(MagicMock())
+
+        search = controller.register_providers(SearchController())
+
+        self.assertEqual(list(search.providers), ["unsplash"])
+
+
+class TestPhotosControllerAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the async photo search, validating concurrent paging, provider fallback and downloads
+    through an httpx transport.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.requests = []
+        self.failing_hosts = set()
+        self.clients = ClientsController()
+        self.session = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        self.clients.async_session = lambda: self.session
+        patcher = patch.dict("scr.photos.controller.os.environ", {
+            "GOOGLE_SEARCH_KEY": "key", "SEARCH_ENGINE_ID": "engine", "UNSPLASH_KEY": "key",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.session.aclose()
+        self.temp_dir.cleanup()
+
+    def handle(self, request):
+        self.requests.append(request.url)
+        if request.url.host in self.failing_hosts:
+            return httpx.Response(500)
+        if request.url.host == "www.googleapis.com":
+            start = int(request.url.params.get("start", 1))
+            return httpx.Response(200, json={"items": [
+                {"link": f"http://images.example.com/{start + index}.jpg", "mime": "image/jpeg",
+                 "image": {"width": 1080, "height": 1920 if start + index == 12 else 1080}}
+                for index in range(2)
+            ]})
+        if request.url.host == "api.unsplash.com":
+            return httpx.Response(200, json={"results": [
+                {"urls": {"regular": "http://images.example.com/unsplash.jpg"}, "width": 1080, "height": 1920},
+            ]})
+        return httpx.Response(200, headers={"Content-Type": "image/jpeg"}, content=request.url.path.encode())
+
+    async def test_agenerate_photos_pages_concurrently_and_downloads_best(self):
+        controller = PhotosController(self.clients, photos_dir=Path(self.temp_dir.name), pages=2)
+
+        result = await controller.agenerate_photos("tequila", "Tequila")
+
+        searches = [url for url in self.requests if url.host == "www.googleapis.com"]
+        self.assertEqual(sorted(url.params.get("start", "1") for url in searches), ["1", "11"])
+        self.assertEqual(result.url, "http://images.example.com/12.jpg")
+        self.assertEqual(result.path.read_bytes(), b"/12.jpg")
+
+    async def test_agenerate_photos_searches_one_page_while_it_has_usable_candidates(self):
+        controller = PhotosController(self.clients, photos_dir=Path(self.temp_dir.name))
+
+        result = await controller.agenerate_photos("tequila", "Tequila")
+
+        searches = [url for url in self.requests if url.host == "www.googleapis.com"]
+        self.assertEqual([url.params.get("start", "1") for url in searches], ["1"])
+        self.assertEqual(result.url, "http://images.example.com/1.jpg")
+
+    async def test_agenerate_photos_falls_back_to_the_next_provider(self):
+        search = SearchController()
+        search.register("google_search", MagicMock(), MagicMock())
+        search.register("unsplash", MagicMock(), MagicMock())
+        self.failing_hosts.add("www.googleapis.com")
+        controller = PhotosController(self.clients, photos_dir=Path(self.temp_dir.name), search=search)
+
+        result = await controller.agenerate_photos("tequila", "Tequila")
+        search.close()
+
+        self.assertEqual(result.url, "http://images.example.com/unsplash.jpg")
+        self.assertEqual(search.domain_success_rate("images.example.com"), 2 / 3)
+
+    async def test_agenerate_photos_timeout(self):
+        async def slow(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        self.clients.aget = slow
+        controller = PhotosController(self.clients, photos_dir=Path(self.temp_dir.name))
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await controller.agenerate_photos("tequila", "Tequila", timeout=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
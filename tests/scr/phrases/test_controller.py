@@ -0,0 +1,84 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from scr.phrases.controller import PhrasesController, normalize_phrase, split_phrases, strip_id3
+
+SETTINGS = {"speed": 1.0}
+
+
+class TestPhrasesController(unittest.TestCase):
+    """
+    Unit tests for the PhrasesController class, validating phrase normalization and splitting,
+    keying, single synthesis of concurrent requests and segment assembly.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.controller = PhrasesController(Path(self.temp_dir.name))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_normalize_phrase(self):
+        self.assertEqual(normalize_phrase("  It’s   “Tequila” — ready?\n"), 'It\'s "Tequila" - ready?')
+
+    def test_split_phrases(self):
+        self.assertEqual(
+            split_phrases('Our next category is "Tequila." Get ready! Question one… go'),
+            ['Our next category is "Tequila."', "Get ready!", "Question one...", "go"],
+        )
+        self.assertEqual(split_phrases("   "), [])
+
+    def test_key_depends_on_normalized_text_voice_model_and_settings(self):
+        key = self.controller.key("Get ready!", "voice", "model", SETTINGS)
+
+        self.assertEqual(key, self.controller.key("  Get   ready! ", "voice", "model", SETTINGS))
+        self.assertNotEqual(key, self.controller.key("Get ready!", "other", "model", SETTINGS))
+        self.assertNotEqual(key, self.controller.key("Get ready!", "voice", "other", SETTINGS))
+        self.assertNotEqual(key, self.controller.key("Get ready!", "voice", "model", {"speed": 1.1}))
+
+    def test_get_or_create_synthesizes_once(self):
+        calls = []
+
+        def synthesize():
+            calls.append(1)
+            time.sleep(0.05)
+            return iter([b"ID3\x00\x00\x00\x00\x00\x00\x02xx", b"frames"])
+
+        key = self.controller.key("Get ready!", "voice", "model", SETTINGS)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.controller.get_or_create(key, synthesize)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(created for _, created in results), [False, False, False, True])
+        self.assertEqual(self.controller.path(key).read_bytes(), b"frames")
+
+    def test_empty_synthesis_raises(self):
+        with self.assertRaises(ValueError):
+            self.controller.get_or_create("key", lambda: iter([]))
+        self.assertFalse(self.controller.path("key").exists())
+
+    def test_assemble_joins_segments_in_order(self):
+        first, _ = self.controller.get_or_create("first", lambda: iter([b"one"]))
+        second, _ = self.controller.get_or_create("second", lambda: iter([b"two"]))
+
+        self.assertEqual(b"".join(self.controller.assemble([second, first, second], chunk_size=2)),
+                         b"twoonetwo")
+
+    def test_strip_id3(self):
+        self.assertEqual(strip_id3(b"frames" + b"TAG" + b"\x00" * 125), b"frames")
+        self.assertEqual(strip_id3(b"frames"), b"frames")
+
+
+if __name__ == '__main__':
+    unittest.main()
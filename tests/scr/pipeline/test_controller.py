@@ -0,0 +1,221 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from scr.audio.controller import NarrationProfile
+from scr.bundle.controller import BundleController
+from scr.manifest.controller import ManifestController
+from scr.pipeline.controller import PipelineController
+from scr.script.controller import ScriptRecord
+
+
+def records(*categories):
+    return [ScriptRecord(category, f"{category.lower()} photo", f"{category} narration") for category in categories]
+
+
+class TestPipelineController(unittest.TestCase):
+    """
+    Unit tests for the PipelineController class, validating concurrent stage execution,
+    per-provider limits and per-category error isolation.
+    """
+
+    def test_run_returns_results_in_input_order(self):
+        photos_controller = MagicMock()
+        photos_controller.generate_photos.side_effect = lambda query, name: f"{name}.jpg"
+
+        controller = PipelineController(photos_controller=photos_controller, max_workers=4)
+        results = controller.run(records("Tequila", "Mezcal"))
+
+        self.assertEqual([result.category for result in results], ["Tequila", "Mezcal"])
+        self.assertEqual(results[0].outputs["photos"], "Tequila.jpg")
+        self.assertEqual(results[1].outputs["photos"], "Mezcal.jpg")
+        photos_controller.generate_photos.assert_any_call("tequila photo", "Tequila")
+        photos_controller.generate_photos.assert_any_call("mezcal photo", "Mezcal")
+        self.assertEqual(list(results[0].durations), ["photos"])
+        self.assertGreaterEqual(results[0].durations["photos"], 0)
+
+    def test_run_isolates_failing_category(self):
+        def generate_photos(query, name):
+            if name == "Mezcal":
+                raise RuntimeError("search failed")
+            return f"{name}.jpg"
+
+        photos_controller = MagicMock()
+        photos_controller.generate_photos.side_effect = generate_photos
+
+        controller = PipelineController(photos_controller=photos_controller)
+        results = controller.run(records("Tequila", "Mezcal", "Pulque"))
+
+        self.assertTrue(results[0].ok)
+        self.assertFalse(results[1].ok)
+        self.assertEqual(str(results[1].errors["photos"]), "search failed")
+        self.assertTrue(results[2].ok)
+
+    def test_run_includes_audio_stage(self):
+        audio_controller = MagicMock()
+
+        controller = PipelineController(audio_controller=audio_controller)
+        results = controller.run(records("Tequila"))
+
+        audio_controller.synthesize_to_file.assert_called_once_with("Tequila narration", "Tequila")
+        self.assertIs(results[0].outputs["audio"], audio_controller.synthesize_to_file.return_value)
+
+    def test_run_renders_every_profile_as_its_own_stage(self):
+        default = NarrationProfile("es")
+        english = NarrationProfile("en", voice_id="english-voice", language="en")
+        audio_controller = MagicMock(profile=default)
+        record = ScriptRecord("Tequila", "tequila photo", "Hablemos de tequila.", {"en": "Let's talk tequila."})
+
+        controller = PipelineController(audio_controller=audio_controller, profiles=[default, english])
+        results = controller.run([record])
+
+        audio_controller.synthesize_to_file.assert_any_call("Hablemos de tequila.", "Tequila")
+        audio_controller.synthesize_to_file.assert_any_call("Let's talk tequila.", "Tequila", profile=english)
+        self.assertEqual(sorted(results[0].outputs), ["audio", "audio.en"])
+
+    def test_provider_limit_caps_concurrency(self):
+        lock = threading.Lock()
+        active = [0]
+        peak = [0]
+
+        def generate_photos(query, name):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+        photos_controller = MagicMock()
+        photos_controller.generate_photos.side_effect = generate_photos
+
+        controller = PipelineController(
+            photos_controller=photos_controller,
+            max_workers=8,
+            provider_limits={"google_search": 2},
+        )
+        controller.run(records(*[str(i) for i in range(8)]))
+
+        self.assertLessEqual(peak[0], 2)
+
+    def test_run_skips_assets_complete_in_manifest(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def generate_photos(query, name):
+                if name == "Mezcal":
+                    raise RuntimeError("search failed")
+                path = Path(temp_dir) / f"{name}.jpg"
+                path.write_bytes(b"image_data")
+                output = MagicMock()
+                output.path = path
+                output.url = f"http://example.com/{name}.jpg"
+                return output
+
+            photos_controller = MagicMock()
+            photos_controller.generate_photos.side_effect = generate_photos
+            manifest = ManifestController("drinks", manifests_dir=Path(temp_dir))
+            controller = PipelineController(photos_controller=photos_controller, manifest=manifest)
+
+            controller.run(records("Tequila", "Mezcal"))
+            photos_controller.generate_photos.reset_mock()
+            results = controller.run(records("Tequila", "Mezcal"))
+
+            photos_controller.generate_photos.assert_called_once_with("mezcal photo", "Mezcal")
+            self.assertEqual(results[0].skipped, ["photos"])
+            self.assertEqual(results[0].outputs["photos"], Path(temp_dir) / "Tequila.jpg")
+            self.assertEqual(manifest.entry("Tequila", "photos")["url"], "http://example.com/Tequila.jpg")
+            self.assertEqual(manifest.entry("Mezcal", "photos")["status"], "failed")
+
+    def test_run_drops_duplicate_photos(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def generate_photos(query, name):
+                output = MagicMock()
+                output.path = Path(temp_dir) / f"{name}.jpg"
+                output.path.write_bytes(b"image_data")
+                return output
+
+            photos_controller = MagicMock()
+            photos_controller.generate_photos.side_effect = generate_photos
+            imaging_controller = MagicMock()
+            imaging_controller.process.side_effect = lambda path: MagicMock(path=path)
+            imaging_controller.find_duplicates.side_effect = lambda images: [(images[1], images[0])]
+
+            controller = PipelineController(photos_controller=photos_controller, max_workers=1,
+                                            imaging_controller=imaging_controller)
+            results = controller.run(records("Tequila", "Mezcal"))
+
+            self.assertTrue(results[0].ok)
+            self.assertIn("image", results[0].outputs)
+            self.assertEqual(str(results[1].errors["photos"]), "Photo is a near-duplicate of Tequila's photo")
+            self.assertNotIn("photos", results[1].outputs)
+            self.assertFalse((Path(temp_dir) / "Mezcal.jpg").exists())
+
+    def test_photo_processing_does_not_hold_a_search_slot(self):
+        # Each photo is only processed once the other one is downloaded; with processing inside the
+        # provider's single slot, neither could ever finish
+        downloaded = threading.Barrier(2, timeout=5)
+        photos_controller = MagicMock()
+        photos_controller.generate_photos.side_effect = lambda query, name: MagicMock(path=Path(f"{name}.jpg"))
+        imaging_controller = MagicMock()
+        imaging_controller.process.side_effect = lambda path: (downloaded.wait(), MagicMock(path=path))[1]
+        imaging_controller.find_duplicates.return_value = []
+
+        controller = PipelineController(photos_controller=photos_controller, max_workers=2,
+                                        provider_limits={"google_search": 1}, imaging_controller=imaging_controller)
+        results = controller.run(records("Tequila", "Mezcal"))
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([result.outputs["image"].path for result in results],
+                         [Path("Tequila.jpg"), Path("Mezcal.jpg")])
+
+    def test_run_appends_finished_assets_to_bundle(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def generate_photos(query, name):
+                output = MagicMock()
+                output.path = Path(temp_dir) / f"{name}.jpg"
+                output.path.write_bytes(f"{name} image".encode())
+                return output
+
+            photos_controller = MagicMock()
+            photos_controller.generate_photos.side_effect = generate_photos
+            imaging_controller = MagicMock()
+            imaging_controller.process.side_effect = lambda path: MagicMock(path=path)
+            imaging_controller.find_duplicates.side_effect = lambda images: [(images[1], images[0])]
+            bundle = BundleController("drinks", bundles_dir=Path(temp_dir))
+
+            controller = PipelineController(photos_controller=photos_controller, max_workers=1,
+                                            imaging_controller=imaging_controller, bundle=bundle)
+            controller.run(records("Agua de Jamaica", "Mezcal"))
+
+            self.assertEqual([(entry.kind, entry.name) for entry in bundle.entries()],
+                             [("photos", "Agua de Jamaica")])
+            self.assertEqual(bytes(bundle.view("photos", "Agua de Jamaica")), b"Agua de Jamaica image")
+            bundle.close()
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValueError) as context:
+            PipelineController(max_workers=0)
+        self.assertEqual(str(context.exception), "max_workers must be at least 1")
+
+    def test_run_starts_stages_while_records_stream_in(self):
+        photo_started = threading.Event()
+        photos_controller = MagicMock()
+        photos_controller.generate_photos.side_effect = lambda query, name: photo_started.set()
+
+        def stream():
+            yield from records("Tequila")
+            # The second record only arrives once the first category's photo stage has started
+            self.assertTrue(photo_started.wait(5))
+            yield from records("Mezcal")
+
+        controller = PipelineController(photos_controller=photos_controller, max_workers=2)
+        results = controller.run(stream())
+
+        self.assertEqual([result.category for result in results], ["Tequila", "Mezcal"])
+        self.assertTrue(all(result.ok for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
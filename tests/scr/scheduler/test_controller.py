@@ -0,0 +1,261 @@
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import requests
+
+from scr.budget.controller import BudgetExceededError
+from scr.scheduler.controller import ProviderLimit, QuotaExceededError, SchedulerController, TokenBucket, file_lock
+from scr.tracing.controller import TracingController
+
+
+def http_error(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return requests.exceptions.HTTPError(f"{status_code} Error", response=response)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """
+    Unit tests for the TokenBucket class, validating bursts and refill waits.
+    """
+
+    def test_acquire_waits_for_refill(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        bucket.acquire()
+
+        self.assertEqual(sleeps, [0.5])
+
+
+class TestSchedulerController(unittest.TestCase):
+    """
+    Unit tests for the SchedulerController class, validating retries, Retry-After handling
+    and the persisted daily quota.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.quota_path = Path(self.temp_dir.name) / "quota.json"
+        self.sleep = MagicMock()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def controller(self, **kwargs):
+        kwargs.setdefault("limits", {"test": ProviderLimit(rate=1000.0, burst=1000)})
+        return SchedulerController(quota_path=self.quota_path, sleep=self.sleep, **kwargs)
+
+    def test_call_returns_result(self):
+        function = MagicMock(return_value="result")
+
+        result = self.controller().call("test", function, "argument", key="key", option=True)
+
+        self.assertEqual(result, "result")
+        function.assert_called_once_with("argument", option=True)
+
+    def test_call_retries_throttling(self):
+        function = MagicMock(side_effect=[http_error(429), http_error(503), "result"])
+
+        result = self.controller().call("test", function)
+
+        self.assertEqual(result, "result")
+        self.assertEqual(function.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_call_counts_retries(self):
+        tracer = TracingController()
+        function = MagicMock(side_effect=[http_error(429), "result"])
+
+        self.controller(tracer=tracer).call("test", function)
+
+        self.assertEqual(tracer.counter("retries", provider="test"), 1)
+
+    def test_call_honours_retry_after(self):
+        function = MagicMock(side_effect=[http_error(429, {"Retry-After": "7"}), "result"])
+
+        self.controller().call("test", function)
+
+        self.sleep.assert_called_once_with(7.0)
+
+    def test_call_retries_sdk_errors(self):
+        error = Exception("Resource exhausted")
+        error.code = 429
+        function = MagicMock(side_effect=[error, "result"])
+
+        self.assertEqual(self.controller().call("test", function), "result")
+
+    def test_call_does_not_retry_client_errors(self):
+        function = MagicMock(side_effect=http_error(400))
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.controller().call("test", function)
+
+        function.assert_called_once()
+        self.sleep.assert_not_called()
+
+    def test_call_gives_up_after_max_retries(self):
+        function = MagicMock(side_effect=http_error(429))
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.controller(max_retries=2).call("test", function)
+
+        self.assertEqual(function.call_count, 3)
+
+    @patch("scr.scheduler.controller.random.uniform", side_effect=lambda low, high: high)
+    def test_backoff_is_exponential_and_capped(self, mock_uniform):
+        function = MagicMock(side_effect=[http_error(500)] * 4 + ["result"])
+
+        self.controller(base_delay=1.0, max_delay=5.0).call("test", function)
+
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [1.0, 2.0, 4.0, 5.0])
+
+    def test_daily_quota_is_persisted(self):
+        limits = {"test": ProviderLimit(rate=1000.0, burst=1000, daily_quota=2)}
+        function = MagicMock(return_value="result")
+
+        self.controller(limits=limits).call("test", function)
+        controller = self.controller(limits=limits)
+        controller.call("test", function)
+
+        self.assertEqual(controller.usage("test"), 2)
+        with self.assertRaises(QuotaExceededError):
+            controller.call("test", function)
+        self.assertEqual(function.call_count, 2)
+
+    def test_daily_quota_is_shared_by_concurrent_controllers(self):
+        limits = {"test": ProviderLimit(rate=1000.0, burst=1000, daily_quota=1000)}
+        # Every controller has its own thread lock, as in separate worker processes; only the file lock is shared
+        controllers = [self.controller(limits=limits) for _ in range(4)]
+
+        def work(controller):
+            for _ in range(25):
+                controller.call("test", MagicMock())
+
+        threads = [threading.Thread(target=work, args=(controller,)) for controller in controllers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(controllers[0].usage("test"), 100)
+
+    def test_daily_quota_resets_on_new_day(self):
+        self.quota_path.write_text(json.dumps({"date": "2000-01-01", "counts": {"test": 5}}))
+
+        controller = self.controller(limits={"test": ProviderLimit(rate=1000.0, burst=1000, daily_quota=5)})
+
+        self.assertEqual(controller.usage("test"), 0)
+        controller.call("test", MagicMock())
+        self.assertEqual(controller.usage("test"), 1)
+
+    def test_call_checks_the_budget_before_every_attempt(self):
+        budget = MagicMock()
+        budget.check.side_effect = [None, BudgetExceededError("spent")]
+        function = MagicMock(side_effect=http_error(429))
+
+        with self.assertRaises(BudgetExceededError):
+            self.controller(budget=budget).call("test", function)
+        self.assertEqual(function.call_count, 1)
+
+    def test_record_usage_reaches_the_budget(self):
+        budget = MagicMock()
+        budget.constrained.return_value = True
+        controller = self.controller(budget=budget)
+
+        controller.record_usage("test", characters=12)
+
+        budget.record.assert_called_once_with("test", characters=12)
+        self.assertTrue(controller.constrained())
+        self.controller().record_usage("test", characters=12)
+        self.assertFalse(self.controller().constrained())
+
+
+
+class TestSchedulerControllerAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for SchedulerController.acall, validating retries and quotas of coroutines.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.delays = []
+
+        async def sleep(delay):
+            self.delays.append(delay)
+
+        self.scheduler = SchedulerController(
+            limits={"gemini": ProviderLimit(rate=1000, burst=1000, daily_quota=3)},
+            base_delay=1.0, quota_path=Path(self.temp_dir.name) / "quota.json", async_sleep=sleep,
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_acall_retries_transient_errors(self):
+        function = AsyncMock(side_effect=[http_error(503), "ok"])
+
+        self.assertEqual(await self.scheduler.acall("gemini", function, "prompt"), "ok")
+        self.assertEqual(function.await_count, 2)
+        self.assertEqual(len(self.delays), 1)
+
+    async def test_acall_retries_httpx_transport_errors(self):
+        import httpx
+
+        function = AsyncMock(side_effect=[httpx.ConnectError("refused"), "ok"])
+
+        self.assertEqual(await self.scheduler.acall("gemini", function), "ok")
+
+    async def test_acall_enforces_daily_quota(self):
+        function = AsyncMock(return_value="ok")
+        await asyncio.gather(*(self.scheduler.acall("gemini", function) for _ in range(3)))
+
+        with self.assertRaises(QuotaExceededError):
+            await self.scheduler.acall("gemini", function)
+
+    async def test_acall_waits_for_the_quota_lock_off_the_loop(self):
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            # Another worker process holding the quota file's lock
+            with file_lock(self.scheduler.quota_path.with_suffix(".lock")):
+                locked.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        locked.wait(5)
+        call = asyncio.ensure_future(self.scheduler.acall("gemini", AsyncMock(return_value="ok")))
+
+        # The loop keeps running other coroutines while the call waits for the lock
+        await asyncio.wait_for(asyncio.sleep(0.05), 1)
+        self.assertFalse(call.done())
+        release.set()
+        self.assertEqual(await call, "ok")
+        holder.join()
+        self.assertEqual(self.scheduler.usage("gemini"), 1)
+
+    async def test_quota_is_locked_between_threads_without_fcntl(self):
+        with patch("scr.scheduler.controller.fcntl", None):
+            await asyncio.gather(*(self.scheduler.acall("gemini", AsyncMock(return_value="ok")) for _ in range(3)))
+
+            with self.assertRaises(QuotaExceededError):
+                await self.scheduler.acall("gemini", AsyncMock())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,12 @@
+import asyncio
+import json
+import tempfile
+import threading
 import unittest
-from scr.script.controller import ScriptController
-from unittest.mock import patch, MagicMock
+from pathlib import Path
+from scr.cache.controller import CacheController
+from scr.script.controller import ScriptController, iter_json_array
+from unittest.mock import AsyncMock, patch, MagicMock
 
 
 class TestScriptController(unittest.TestCase):
@@ -9,7 +15,7 @@ class TestScriptController(unittest.TestCase):
     Tests ensure proper handling of inputs, responses, and exceptions.
     """
 
-    @patch("scr.script.controller.genai.Client")
+    @patch("google.genai.Client")
     def test_generate_content_valid_prompt(self, mock_client):
         """Test generate_content with a valid prompt."""
         mock_response = MagicMock()
@@ -22,14 +28,15 @@ class TestScriptController(unittest.TestCase):
             prompt = "Describe the benefits of machine learning in 3 words."
             result = controller.generate_content(prompt)
 
-            mock_client.assert_called_once_with(api_key="dummy_key")  # Ensures API key usage
+            mock_client.assert_called_once()
+            self.assertEqual(mock_client.call_args.kwargs["api_key"], "dummy_key")  # Ensures API key usage
             mock_client_instance.models.generate_content.assert_called_once_with(
                 model="gemini-2.0-flash-lite",
                 contents=prompt,
             )
             self.assertEqual(result, "Generated content.")
 
-    @patch("scr.script.controller.genai.Client")
+    @patch("google.genai.Client")
     def test_generate_content_empty_prompt(self, mock_client):
         """Test generate_content raises ValueError for an empty prompt."""
         mock_client_instance = mock_client.return_value
@@ -40,7 +47,7 @@ class TestScriptController(unittest.TestCase):
             self.assertEqual(str(context.exception), "Prompt cannot be empty")
         mock_client_instance.models.generate_content.assert_not_called()
 
-    @patch("scr.script.controller.genai.Client")
+    @patch("google.genai.Client")
     def test_generate_content_no_google_key(self, mock_client):
         """Test generate_content raises EnvironmentError if GOOGLE_KEY is not set."""
         mock_client_instance = mock_client.return_value
@@ -50,7 +57,7 @@ class TestScriptController(unittest.TestCase):
                 controller.generate_content("This is a test prompt.")
         mock_client_instance.models.generate_content.assert_not_called()
 
-    @patch("scr.script.controller.genai.Client")
+    @patch("google.genai.Client")
     def test_generate_content_api_error(self, mock_client):
         """Test generate_content raises exception if API call fails."""
         mock_client_instance = mock_client.return_value
@@ -59,3 +66,252 @@ class TestScriptController(unittest.TestCase):
         controller = ScriptController()
         with self.assertRaises(Exception):
             controller.generate_content("This is a test prompt.")
+
+    @patch("google.genai.Client")
+    def test_generate_content_reuses_client(self, mock_client):
+        """Test consecutive generate_content calls share a single Gemini client."""
+        mock_client.return_value.models.generate_content.return_value.text = "Generated content."
+
+        with patch.dict("os.environ", {"GOOGLE_KEY": "dummy_key"}):
+            controller = ScriptController()
+            controller.generate_content("First prompt.")
+            controller.generate_content("Second prompt.")
+
+        mock_client.assert_called_once()
+        self.assertEqual(mock_client.return_value.models.generate_content.call_count, 2)
+
+    @patch("google.genai.Client")
+    def test_generate_content_uses_cache(self, mock_client):
+        """Test a cached prompt is answered without calling the API again."""
+        mock_client.return_value.models.generate_content.return_value.text = "Generated content."
+        cache = CacheController(enabled=True)
+        cache.get = MagicMock(side_effect=[None, b"Generated content."])
+        cache.put = MagicMock()
+
+        with patch.dict("os.environ", {"GOOGLE_KEY": "dummy_key"}):
+            controller = ScriptController(cache=cache)
+            first = controller.generate_content("Prompt.")
+            second = controller.generate_content("Prompt.")
+
+        self.assertEqual(first, "Generated content.")
+        self.assertEqual(second, "Generated content.")
+        mock_client.return_value.models.generate_content.assert_called_once()
+        cache.put.assert_called_once_with(
+            CacheController.key("gemini", "gemini-2.0-flash-lite", None, "Prompt."), b"Generated content.")
+
+    def test_generate_records_matches_categories(self):
+        """Test generate_records parses structured output and keeps the input order."""
+        mock_clients = MagicMock()
+        generate_content = mock_clients.genai_client.return_value.models.generate_content
+        generate_content.return_value.text = json.dumps([
+            {"category": "mezcal", "image_query": " Mezcal photo ", "narration_script": "Mezcal."},
+            {"category": "Tequila", "image_query": "Tequila photo", "narration_script": "Tequila."},
+            {"category": "Unrequested", "image_query": "x", "narration_script": "x"},
+        ])
+
+        controller = ScriptController(mock_clients)
+        records = controller.generate_records(["Tequila", " Mezcal", ""])
+
+        self.assertEqual([record.category for record in records], ["Tequila", "Mezcal"])
+        self.assertEqual(records[1].image_query, "Mezcal photo")
+        self.assertEqual(records[1].narration_script, "Mezcal.")
+        generate_content.assert_called_once()
+        config = generate_content.call_args.kwargs["config"]
+        self.assertEqual(config.response_mime_type, "application/json")
+
+    def test_generate_records_batches_requests(self):
+        """Test generate_records splits categories into batches of batch_size."""
+        mock_clients = MagicMock()
+        generate_content = mock_clients.genai_client.return_value.models.generate_content
+
+        def respond(model, contents, config):
+            categories = contents.split("Categories:\n")[1].split()
+            response = MagicMock()
+            response.text = json.dumps([
+                {"category": category, "image_query": f"{category} photo", "narration_script": category}
+                for category in categories
+            ])
+            return response
+
+        generate_content.side_effect = respond
+
+        controller = ScriptController(mock_clients)
+        categories = [f"Category{index}" for index in range(5)]
+        records = controller.generate_records(categories, batch_size=2)
+
+        self.assertEqual(generate_content.call_count, 3)
+        self.assertEqual([record.category for record in records], categories)
+
+    def test_generate_records_requests_missing_categories_again(self):
+        """Test categories left out by the model are requested once more."""
+        mock_clients = MagicMock()
+        generate_content = mock_clients.genai_client.return_value.models.generate_content
+        first, second = MagicMock(), MagicMock()
+        first.text = json.dumps([{"category": "Tequila", "image_query": "q", "narration_script": "n"}])
+        second.text = json.dumps([{"category": "Mezcal", "image_query": "q", "narration_script": "n"}])
+        generate_content.side_effect = [first, second]
+
+        controller = ScriptController(mock_clients)
+        records = controller.generate_records(["Tequila", "Mezcal"])
+
+        self.assertEqual([record.category for record in records], ["Tequila", "Mezcal"])
+        self.assertEqual(generate_content.call_count, 2)
+
+    def test_generate_records_translates_narrations_in_the_same_request(self):
+        """Test narrations are requested in every language at once and missing languages are left out."""
+        mock_clients = MagicMock()
+        generate_content = mock_clients.genai_client.return_value.models.generate_content
+        generate_content.return_value.text = json.dumps([{
+            "category": "Tequila", "image_query": "q", "narration_script": "Hablemos de tequila.",
+            "translations": [{"language": "en", "narration_script": "Let's talk tequila."},
+                             {"language": "fr", "narration_script": ""}],
+        }])
+
+        controller = ScriptController(mock_clients, languages=["en", "fr"])
+        records = controller.generate_records(["Tequila"])
+
+        self.assertEqual(generate_content.call_count, 1)
+        self.assertIn("translated into each of these languages", generate_content.call_args.kwargs["contents"])
+        self.assertEqual(records[0].narration_script, "Hablemos de tequila.")
+        self.assertEqual(records[0].narrations, {"en": "Let's talk tequila."})
+
+    def test_generate_records_empty_categories(self):
+        """Test generate_records raises ValueError when no categories are given."""
+        controller = ScriptController(MagicMock())
+        with self.assertRaises(ValueError) as context:
+            controller.generate_records([" ", ""])
+        self.assertEqual(str(context.exception), "Categories cannot be empty")
+
+    def test_iter_json_array_yields_items_before_the_array_ends(self):
+        """Test iter_json_array yields each item as soon as it is complete."""
+        consumed = []
+
+        def chunks():
+            for chunk in ['[{"a": "x]', ', y"}', ', {"b": [1, 2]}', ']']:
+                consumed.append(chunk)
+                yield chunk
+
+        items = iter_json_array(chunks())
+
+        self.assertEqual(next(items), {"a": "x], y"})
+        self.assertEqual(len(consumed), 2)
+        self.assertEqual(list(items), [{"b": [1, 2]}])
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['[{"a": 1}, {"b"']))
+
+    def test_stream_content_yields_complete_lines(self):
+        """Test stream_content yields every line of the streamed response once it is complete."""
+        mock_clients = MagicMock()
+        stream = mock_clients.genai_client.return_value.models.generate_content_stream
+        stream.return_value = iter([MagicMock(text=text) for text in ["Tequ", "ila\nMez", "cal\n", "Pulque"]])
+
+        controller = ScriptController(mock_clients)
+
+        self.assertEqual(list(controller.stream_content("Name three drinks")), ["Tequila", "Mezcal", "Pulque"])
+
+    def test_stream_records_yields_records_while_streaming(self):
+        """Test stream_records yields the first record before the model has finished the response."""
+        mock_clients = MagicMock()
+        stream = mock_clients.genai_client.return_value.models.generate_content_stream
+        first = json.dumps({"category": "Tequila", "image_query": "agave field photo", "narration_script": "Tequila!"})
+        second = json.dumps({"category": "Mezcal", "image_query": "mezcal photo", "narration_script": "Mezcal!"})
+        first_consumed = threading.Event()
+
+        def respond(model, contents, config):
+            yield MagicMock(text=f"[{first}")
+            # The model only writes the second record once the first one reached the caller
+            self.assertTrue(first_consumed.wait(5))
+            yield MagicMock(text=f", {second}]")
+
+        stream.side_effect = respond
+
+        controller = ScriptController(mock_clients)
+        records = controller.stream_records(["Tequila", "Mezcal"])
+
+        self.assertEqual(next(records).category, "Tequila")
+        first_consumed.set()
+        self.assertEqual([record.category for record in records], ["Mezcal"])
+
+    def test_stream_records_requests_missing_categories_again(self):
+        """Test stream_records requests categories left out of the stream once more."""
+        mock_clients = MagicMock()
+        models = mock_clients.genai_client.return_value.models
+        models.generate_content_stream.return_value = iter([MagicMock(text=json.dumps([
+            {"category": "Tequila", "image_query": "agave field photo", "narration_script": "Tequila!"}]))])
+        models.generate_content.return_value = MagicMock(text=json.dumps([
+            {"category": "Mezcal", "image_query": "mezcal photo", "narration_script": "Mezcal!"}]))
+
+        controller = ScriptController(mock_clients)
+        records = list(controller.stream_records(["Tequila", "Mezcal"]))
+
+        self.assertEqual([record.category for record in records], ["Tequila", "Mezcal"])
+        models.generate_content.assert_called_once()
+
+    def test_stream_records_shares_cache_with_generate_records(self):
+        """Test a streamed response is cached and replayed by the non-streaming request."""
+        mock_clients = MagicMock()
+        models = mock_clients.genai_client.return_value.models
+        text = json.dumps([{"category": "Tequila", "image_query": "agave field photo", "narration_script": "Tequila!"}])
+        models.generate_content_stream.return_value = iter([MagicMock(text=text[:20]), MagicMock(text=text[20:])])
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            controller = ScriptController(mock_clients, CacheController(Path(cache_dir)))
+            streamed = list(controller.stream_records(["Tequila"]))
+            generated = controller.generate_records(["Tequila"])
+
+        self.assertEqual(streamed, generated)
+        models.generate_content.assert_not_called()
+
+
+class TestScriptControllerAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the async script generation, validating the Gemini async interface, batching and timeouts.
+    """
+
+    def setUp(self):
+        self.clients = MagicMock()
+        self.generate_content = self.clients.genai_client.return_value.aio.models.generate_content = AsyncMock()
+
+    async def test_agenerate_content(self):
+        self.generate_content.return_value.text = "Generated content."
+
+        result = await ScriptController(self.clients).agenerate_content("Prompt")
+
+        self.assertEqual(result, "Generated content.")
+        self.generate_content.assert_awaited_once_with(model="gemini-2.0-flash-lite", contents="Prompt")
+
+    async def test_agenerate_content_uses_cache(self):
+        self.generate_content.return_value.text = "Generated content."
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            controller = ScriptController(self.clients, CacheController(Path(cache_dir)))
+            await controller.agenerate_content("Prompt")
+            self.assertEqual(await controller.agenerate_content("Prompt"), "Generated content.")
+
+        self.generate_content.assert_awaited_once()
+
+    async def test_agenerate_content_timeout(self):
+        async def slow(**kwargs):
+            await asyncio.sleep(1)
+
+        self.generate_content.side_effect = slow
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await ScriptController(self.clients).agenerate_content("Prompt", timeout=0.05)
+
+    async def test_agenerate_records_requests_batches_concurrently(self):
+        def respond(model, contents, config):
+            categories = contents.split("Categories:\n", 1)[1].split()
+            response = MagicMock()
+            response.text = json.dumps([
+                {"category": category, "image_query": f"{category} photo", "narration_script": f"{category}."}
+                for category in categories
+            ])
+            return response
+
+        self.generate_content.side_effect = respond
+
+        records = await ScriptController(self.clients).agenerate_records(["Tequila", "Mezcal", "Rum"], batch_size=2)
+
+        self.assertEqual([record.image_query for record in records], ["Tequila photo", "Mezcal photo", "Rum photo"])
+        self.assertEqual(self.generate_content.await_count, 2)
@@ -0,0 +1,229 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from scr.scheduler.controller import QuotaExceededError
+from scr.search.controller import MIN_SAMPLES, Candidate, SearchController, score_candidate
+
+FRAME = (1080, 1920)
+
+
+class TestSearchController(unittest.TestCase):
+    """
+    Unit tests for the SearchController class, validating routing by observed latency and
+    error rate, fallback between providers and hedged requests, and candidate paging and scoring.
+    """
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow(self, urls):
+        def search(query):
+            self.release.wait(5)
+            return urls
+        return search
+
+    def test_first_provider_answers(self):
+        search = SearchController({"google_search": lambda query: [f"http://g/{query}.jpg"],
+                                   "unsplash": lambda query: ["http://u/1.jpg"]})
+
+        result = search.search("tequila")
+
+        self.assertEqual(result.provider, "google_search")
+        self.assertEqual(result.urls, ["http://g/tequila.jpg"])
+        search.close()
+
+    def test_falls_back_on_error_and_empty_result(self):
+        def failing(query):
+            raise ConnectionError("timed out")
+
+        search = SearchController({"google_search": failing, "unsplash": lambda query: [],
+                                   "shutterstock": lambda query: ["http://s/1.jpg"]})
+
+        result = search.search("tequila")
+
+        self.assertEqual(result.provider, "shutterstock")
+        self.assertEqual(search.stats("google_search").error_rate, 1.0)
+        search.close()
+
+    def test_hedges_slow_provider(self):
+        search = SearchController({"google_search": self.slow(["http://g/1.jpg"]),
+                                   "unsplash": lambda query: ["http://u/1.jpg"]}, hedge_delay=0.01)
+
+        result = search.search("tequila")
+
+        self.assertEqual(result.provider, "unsplash")
+        search.close()
+
+    def test_quota_exhausted_provider_is_skipped(self):
+        calls = []
+
+        def exhausted(query):
+            calls.append(query)
+            raise QuotaExceededError("google_search daily quota of 100 requests exhausted")
+
+        search = SearchController({"google_search": exhausted, "unsplash": lambda query: ["http://u/1.jpg"]})
+
+        search.search("tequila")
+        search.search("mezcal")
+
+        self.assertEqual(calls, ["tequila"])
+        self.assertEqual(search.rank(), ["unsplash"])
+        search.close()
+
+    def test_rank_prefers_fast_reliable_providers(self):
+        search = SearchController({"google_search": lambda query: [], "unsplash": lambda query: []})
+        for _ in range(MIN_SAMPLES):
+            search.stats("google_search").record(0.5, ok=True)
+            search.stats("unsplash").record(0.2, ok=True)
+
+        self.assertEqual(search.rank(), ["unsplash", "google_search"])
+
+        for _ in range(MIN_SAMPLES * 4):
+            search.stats("unsplash").record(0.2, ok=False)
+        self.assertEqual(search.rank(), ["google_search", "unsplash"])
+
+    def test_rank_prefers_cheap_providers_once_budget_is_constrained(self):
+        budget = MagicMock()
+        budget.constrained.return_value = False
+        budget.unit_cost.side_effect = lambda name: {"google_search": 0.005, "unsplash": 0.0}[name]
+        search = SearchController({"google_search": lambda query: [], "unsplash": lambda query: []}, budget=budget)
+        for _ in range(MIN_SAMPLES):
+            search.stats("google_search").record(0.2, ok=True)
+            search.stats("unsplash").record(0.5, ok=True)
+        self.assertEqual(search.rank(), ["google_search", "unsplash"])
+
+        budget.constrained.return_value = True
+
+        self.assertEqual(search.rank(), ["unsplash", "google_search"])
+
+    def test_constrained_budget_stops_hedging(self):
+        budget = MagicMock()
+        budget.constrained.return_value = True
+        budget.unit_cost.return_value = 0.0
+        search = SearchController({"google_search": self.slow(["http://g/1.jpg"]),
+                                   "unsplash": lambda query: ["http://u/1.jpg"]}, hedge_delay=0.01, budget=budget)
+        threading.Timer(0.1, self.release.set).start()
+
+        result = search.search("tequila")
+
+        self.assertEqual(result.provider, "google_search")
+        search.close()
+
+    def test_all_providers_fail(self):
+        def failing(query):
+            raise ConnectionError("timed out")
+
+        search = SearchController({"google_search": failing})
+
+        with self.assertRaises(ConnectionError):
+            search.search("tequila")
+        search.close()
+
+    def test_no_results(self):
+        search = SearchController({"google_search": lambda query: []})
+
+        with self.assertRaises(ValueError) as context:
+            search.search("tequila")
+        self.assertEqual(str(context.exception), "No image results for: tequila")
+        search.close()
+
+    def test_no_providers(self):
+        with self.assertRaises(EnvironmentError):
+            SearchController().search("tequila")
+
+    def test_candidates_request_pages_and_variants_together(self):
+        calls = []
+        started = threading.Barrier(4, timeout=5)
+
+        def pages(query, page):
+            calls.append((query, page))
+            started.wait()
+            return [Candidate(f"http://g/{page}-{index}.jpg", "google_search", query, index) for index in range(2)]
+
+        search = SearchController()
+        search.register("google_search", lambda query: [], pages)
+
+        candidates = search.candidates(["tequila", "tequila photo"], pages=2)
+        search.close()
+
+        self.assertEqual(sorted(calls), [("tequila", 1), ("tequila", 2), ("tequila photo", 1), ("tequila photo", 2)])
+        self.assertEqual([candidate.url for candidate in candidates],
+                         ["http://g/1-0.jpg", "http://g/1-1.jpg", "http://g/2-0.jpg", "http://g/2-1.jpg"])
+
+    def test_candidates_hedge_slow_provider(self):
+        def slow(query, page):
+            self.release.wait(5)
+            return [Candidate("http://g/1.jpg", "google_search", query)]
+
+        search = SearchController({"google_search": lambda query: [], "unsplash": lambda query: []}, hedge_delay=0.01)
+        search.register("google_search", lambda query: [], slow)
+        search.register("unsplash", lambda query: [],
+                        lambda query, page: [Candidate(f"http://u/{page}.jpg", "unsplash", query)])
+
+        started = time.monotonic()
+        candidates = search.candidates(["tequila"], pages=2)
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([candidate.url for candidate in candidates], ["http://u/1.jpg", "http://u/2.jpg"])
+        search.close()
+
+    def test_candidates_fall_back_to_url_provider(self):
+        def failing(query, page):
+            raise ConnectionError("timeout")
+
+        search = SearchController()
+        search.register("google_search", lambda query: [], failing)
+        search.register("unsplash", lambda query: ["http://u/1.jpg"])
+
+        candidates = search.candidates(["tequila"], pages=3)
+        search.close()
+
+        self.assertEqual(candidates, [Candidate("http://u/1.jpg", "unsplash", "tequila", 0)])
+
+    def test_later_pages_skip_providers_without_paging(self):
+        pager = MagicMock(side_effect=lambda query, page: [Candidate(f"http://g/{page}.jpg", "google_search", query)])
+        first_page = MagicMock(return_value=["http://u/1.jpg"])
+        search = SearchController()
+        search.register("unsplash", first_page)
+        search.register("google_search", lambda query: [], pager)
+
+        candidates = search.candidates(["tequila"], pages=1, start=2)
+        search.close()
+
+        self.assertEqual([candidate.url for candidate in candidates], ["http://g/2.jpg"])
+        first_page.assert_not_called()
+
+    def test_score_candidate_prefers_frame_filling_images(self):
+        portrait = Candidate("http://g/1.jpg", width=1200, height=2000, mime="image/jpeg")
+        landscape = Candidate("http://g/2.jpg", width=2000, height=1200, mime="image/jpeg")
+        small = Candidate("http://g/3.jpg", width=300, height=500, mime="image/jpeg")
+        unknown = Candidate("http://g/4.jpg")
+
+        scores = [score_candidate(candidate, FRAME) for candidate in (portrait, landscape, unknown, small)]
+
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(score_candidate(Candidate("http://g/5.svg", mime="image/svg+xml"), FRAME), 0.0)
+        self.assertEqual(score_candidate(Candidate("http://g/6.jpg", byte_size=20), FRAME, max_bytes=10), 0.0)
+
+    def test_rank_candidates_learns_domain_success(self):
+        search = SearchController()
+        flaky = Candidate("http://flaky.example/1.jpg", position=0)
+        steady = Candidate("http://www.steady.example/1.jpg", position=1)
+        svg = Candidate("http://steady.example/2.svg", mime="image/svg+xml")
+
+        self.assertEqual(search.rank_candidates([flaky, steady, svg], FRAME), [flaky, steady])
+        for _ in range(3):
+            search.record_download(flaky.url, ok=False)
+            search.record_download("https://steady.example/other.jpg", ok=True)
+
+        self.assertEqual(search.rank_candidates([flaky, steady, svg], FRAME, limit=1), [steady])
+        self.assertAlmostEqual(search.domain_success_rate("flaky.example"), 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
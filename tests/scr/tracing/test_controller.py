@@ -0,0 +1,109 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import requests
+
+from scr.tracing.controller import DISABLED, NOOP_SPAN, TracingController
+
+
+class TestTracingController(unittest.TestCase):
+    """
+    Unit tests for the TracingController class, validating span nesting, the JSON-lines trace,
+    counters and the Prometheus text export.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.trace_path = Path(self.temp_dir.name) / "trace.jsonl"
+        self.tracer = TracingController(trace_path=self.trace_path)
+
+    def tearDown(self):
+        self.tracer.close()
+        self.temp_dir.cleanup()
+
+    def spans(self):
+        return [json.loads(line) for line in self.trace_path.read_text().splitlines()]
+
+    def test_nested_spans_inherit_category_and_stage(self):
+        with self.tracer.span("stage", category="Tequila", stage="photos") as stage:
+            with self.tracer.span("http", host="example.com") as http:
+                http.set(status=200)
+
+        inner, outer = self.spans()
+        self.assertEqual(inner["name"], "http")
+        self.assertEqual(inner["parent_id"], outer["span_id"])
+        self.assertEqual(inner["trace_id"], outer["trace_id"])
+        self.assertEqual(inner["attributes"],
+                         {"host": "example.com", "status": 200, "category": "Tequila", "stage": "photos"})
+        self.assertIsNone(outer["parent_id"])
+        self.assertIsNot(stage, NOOP_SPAN)
+
+    def test_spans_in_other_threads_start_new_traces(self):
+        def worker():
+            with self.tracer.span("http"):
+                pass
+
+        with self.tracer.span("stage", category="Tequila"):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+
+        worker_span = self.spans()[0]
+        self.assertIsNone(worker_span["parent_id"])
+        self.assertNotIn("category", worker_span["attributes"])
+
+    def test_failed_span_records_error(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("download"):
+                raise ValueError("too large")
+
+        self.assertEqual(self.spans()[0]["error"], "ValueError: too large")
+
+    def test_record_links_to_current_span(self):
+        with self.tracer.span("audio.synthesize", category="Tequila"):
+            self.tracer.record("audio.stream", 0.5, time_to_first_chunk=0.1)
+
+        stream = self.spans()[0]
+        self.assertEqual(stream["duration"], 0.5)
+        self.assertEqual(stream["attributes"]["category"], "Tequila")
+
+    def test_prometheus_export(self):
+        self.tracer.count("bytes", 100, kind="audio")
+        self.tracer.count("bytes", 50, kind="audio")
+        self.tracer.count("cache_lookups", result="hit")
+        with self.tracer.span("http"):
+            pass
+
+        text = self.tracer.prometheus()
+
+        self.assertIn('# TYPE trivia_bytes_total counter', text)
+        self.assertIn('trivia_bytes_total{kind="audio"} 150', text)
+        self.assertIn('trivia_cache_lookups_total{result="hit"} 1', text)
+        self.assertIn('trivia_span_duration_seconds_bucket{span="http",le="+Inf"} 1', text)
+        self.assertIn('trivia_span_duration_seconds_count{span="http"} 1', text)
+        self.assertEqual(self.tracer.counter("bytes", kind="audio"), 150)
+
+    def test_serve_metrics(self):
+        self.tracer.count("retries", provider="gemini")
+        server = self.tracer.serve(port=0)
+
+        response = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('trivia_retries_total{provider="gemini"} 1', response.text)
+
+    def test_disabled_tracer_records_nothing(self):
+        self.assertIs(DISABLED.span("http"), NOOP_SPAN)
+        with DISABLED.span("http") as span:
+            span.set(status=200)
+        DISABLED.count("bytes", 10)
+        DISABLED.record("audio.stream", 1.0)
+
+        self.assertEqual(DISABLED.prometheus(), "\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from scr.bundle.controller import BundleController
+from scr.mastering.controller import MasteredClip
+from scr.video.controller import Segment, VideoController
+
+DURATIONS = {"intro.mp3": "2.500000", "Tequila.mp3": "7.250000", "Mezcal.mp3": "4.000000"}
+
+
+def fake_run(command, **kwargs):
+    """
+    Stands in for ffmpeg and ffprobe: probes answer from DURATIONS and encodes write their output file.
+    """
+    if command[0] == "ffprobe":
+        return MagicMock(stdout=f"{DURATIONS[Path(command[-1]).name]}\n")
+    Path(command[-1]).write_bytes(b"video:" + Path(command[-1]).name.encode())
+    return MagicMock(stdout="")
+
+
+class TestVideoController(unittest.TestCase):
+    """
+    Unit tests for the VideoController class, validating segment timing, parallel rendering
+    and concatenation with ffmpeg replaced by a local stand-in.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.photos_dir = root / "photos"
+        self.audio_dir = root / "audios"
+        self.videos_dir = root / "videos"
+        self.photos_dir.mkdir()
+        self.audio_dir.mkdir()
+        for category in ("Tequila", "Mezcal"):
+            (self.photos_dir / f"{category}.jpg").write_bytes(b"image_data")
+            (self.audio_dir / f"{category}.mp3").write_bytes(b"audio_data")
+        (self.audio_dir / "intro.mp3").write_bytes(b"audio_data")
+        self.controller = VideoController(self.photos_dir, self.audio_dir, self.videos_dir, max_workers=2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_segments_start_with_intro(self):
+        segments = self.controller.segments(["Tequila", "Mezcal"])
+
+        self.assertEqual([segment.name for segment in segments], ["intro", "Tequila", "Mezcal"])
+        self.assertIsNone(segments[0].photo)
+        self.assertEqual(segments[1].photo, self.photos_dir / "Tequila.jpg")
+
+    def test_missing_asset(self):
+        (self.photos_dir / "Mezcal.jpg").unlink()
+
+        with self.assertRaises(FileNotFoundError):
+            self.controller.segments(["Tequila", "Mezcal"])
+
+    @patch("scr.video.controller.subprocess.run", side_effect=fake_run)
+    def test_compose_times_segments_to_audio(self, mock_run):
+        output = self.controller.compose(["Tequila", "Mezcal"], "drinks")
+
+        self.assertEqual(output, self.videos_dir / "drinks.mp4")
+        self.assertEqual(output.read_bytes(), b"video:episode.mp4")
+        # Temporary segments are removed once the video is joined
+        self.assertEqual([path.name for path in self.videos_dir.iterdir()], ["drinks.mp4"])
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        renders = [command for command in commands if command[0] == "ffmpeg" and "concat" not in command]
+        durations = sorted(command[command.index("-t") + 1] for command in renders)
+        self.assertEqual(durations, ["2.500", "4.000", "7.250"])
+        self.assertTrue(any("color=c=black:s=1080x1920:r=30" in command for command in renders))
+
+        concat = commands[-1]
+        self.assertIn("concat", concat)
+        self.assertEqual(concat[concat.index("-c") + 1], "copy")
+
+    @patch("scr.video.controller.subprocess.run", side_effect=fake_run)
+    def test_compose_without_intro(self, mock_run):
+        self.controller.compose(["Tequila"], intro=False)
+
+        probed = [call.args[0][-1] for call in mock_run.call_args_list if call.args[0][0] == "ffprobe"]
+        self.assertEqual(probed, [str(self.audio_dir / "Tequila.mp3")])
+
+    @patch("scr.video.controller.subprocess.run", side_effect=fake_run)
+    def test_compose_renders_mastered_clips(self, mock_run):
+        mastered_dir = self.audio_dir / "mastered"
+        mastering = MagicMock()
+        mastering.master.return_value = MagicMock(clips=[
+            MasteredClip("intro", mastered_dir / "intro.wav", 2.0, -20.0, -3.0, (0.25, 0.25)),
+            MasteredClip("Tequila", mastered_dir / "Tequila.wav", 7.0, -25.0, 2.0, (0.1, 0.15)),
+        ])
+        self.controller.mastering = mastering
+
+        self.controller.compose(["Tequila"], "drinks")
+
+        mastering.master.assert_called_once_with(["Tequila"], output_name="drinks", intro=True)
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        # Mastered clips already know their length, so nothing is probed
+        self.assertFalse(any(command[0] == "ffprobe" for command in commands))
+        renders = [command for command in commands if command[0] == "ffmpeg" and "concat" not in command]
+        self.assertEqual(sorted(command[command.index("-t") + 1] for command in renders), ["2.000", "7.000"])
+        self.assertTrue(all(str(mastered_dir) in command[command.index("-t") - 1] for command in renders))
+
+    @patch("scr.video.controller.subprocess.run")
+    def test_failed_render_cleans_up(self, mock_run):
+        mock_run.side_effect = subprocess.CalledProcessError(1, ["ffmpeg"])
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.controller.compose(["Tequila"])
+        self.assertEqual(list(self.videos_dir.iterdir()), [])
+
+    @patch("scr.video.controller.subprocess.run", side_effect=FileNotFoundError)
+    def test_ffmpeg_not_installed(self, mock_run):
+        with self.assertRaises(EnvironmentError) as context:
+            self.controller.duration(self.audio_dir / "Tequila.mp3")
+        self.assertEqual(str(context.exception), "ffprobe is not installed")
+
+    def test_render_segment_streams_still_photo(self):
+        segment = Segment("Tequila", self.photos_dir / "Tequila.jpg", self.audio_dir / "Tequila.mp3", 7.25)
+        with patch("scr.video.controller.subprocess.run", side_effect=fake_run) as mock_run:
+            self.controller.render_segment(segment, self.photos_dir / "segment.mp4")
+
+        command = mock_run.call_args.args[0]
+        self.assertEqual(command[command.index("-loop") + 1], "1")
+        self.assertIn(str(segment.photo), command)
+
+    def test_segments_read_from_bundle(self):
+        bundle = BundleController("drinks", bundles_dir=Path(self.temp_dir.name))
+        bundle.append("audio", "intro", [b"audio_data"])
+        bundle.append("photos", "Agua de Jamaica", [b"image_data"])
+        bundle.append("audio", "Agua de Jamaica", [b"audio_data"])
+        controller = VideoController(videos_dir=self.videos_dir, bundle=bundle)
+
+        segments = controller.segments(["Agua de Jamaica"])
+
+        self.assertEqual([segment.name for segment in segments], ["intro", "Agua de Jamaica"])
+        self.assertIsNone(segments[0].photo)
+        self.assertEqual(segments[1].photo, bundle.url("photos", "Agua de Jamaica"))
+        with self.assertRaises(FileNotFoundError):
+            controller.segments(["Mezcal"])
+
+        with patch("scr.video.controller.subprocess.run", side_effect=fake_run) as mock_run:
+            controller.render_segment(segments[1], self.photos_dir / "segment.mp4")
+        command = mock_run.call_args.args[0]
+        self.assertEqual(command[command.index("-f") + 1], "image2")
+        self.assertIn(segments[1].photo, command)
+        bundle.close()
+
+    def test_invalid_frame(self):
+        with self.assertRaises(ValueError):
+            VideoController(frame="square")
+
+
+if __name__ == '__main__':
+    unittest.main()